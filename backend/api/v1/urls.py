@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework.authtoken.views import obtain_auth_token
@@ -29,13 +30,21 @@ from apps.accounts.views.dashboard import (
 from apps.accounts.views.profile_views import CitizenProfileView, OfficerProfileView, ChairmanProfileView, ProfilePictureUploadView
 from .views.common_views import DocumentTypeViewSet
 from .views.document_verification import DocumentVerificationView, DocumentBlockchainHistoryView
-from .views.document_verification import DocumentVerificationAPIView, DocumentHistoryAPIView
+from .views.document_verification import DocumentVerificationAPIView, DocumentHistoryAPIView, DocumentBulkVerificationAPIView
 from .views.blockchain_endpoints import (
     BlockchainRegisterUserAPIView,
     BlockchainUserInfoAPIView,
     BlockchainUserRoleUpdateAPIView,
     BlockchainApprovalWorkflowAPIView,
-    BlockchainPendingApprovalsAPIView
+    BlockchainPendingApprovalsAPIView,
+    BlockchainMetricsAPIView
+)
+from .views.async_blockchain import (
+    AsyncDocumentVerificationView,
+    AsyncDocumentBlockchainHistoryView,
+    AsyncDocumentVerificationAPIView,
+    AsyncDocumentHistoryAPIView,
+    AsyncBlockchainUserInfoView
 )
 # Import the proper LoginView and RegisterView
 from api.auth.views import LoginView, RegisterView, RegisterChairmanView
@@ -83,10 +92,13 @@ profile_urlpatterns = [
     path('chairman/profile/', ChairmanProfileView.as_view(), name='chairman-profile'),
 ]
 
+# Endpoint chỉ đọc blockchain chạy bằng view async (AsyncWeb3) khi BLOCKCHAIN_ASYNC_VIEWS bật
+ASYNC_VIEWS = getattr(settings, 'BLOCKCHAIN_ASYNC_VIEWS', True)
+
 # Blockchain verification endpoints
 blockchain_urlpatterns = [
-    path('verify/document/<str:document_id>/', DocumentVerificationView.as_view(), name='verify-document'),
-    path('document/<str:document_id>/history/', DocumentBlockchainHistoryView.as_view(), name='document-blockchain-history'),
+    path('verify/document/<str:document_id>/', (AsyncDocumentVerificationView if ASYNC_VIEWS else DocumentVerificationView).as_view(), name='verify-document'),
+    path('document/<str:document_id>/history/', (AsyncDocumentBlockchainHistoryView if ASYNC_VIEWS else DocumentBlockchainHistoryView).as_view(), name='document-blockchain-history'),
 ]
 
 router = DefaultRouter()
@@ -138,18 +150,22 @@ urlpatterns = [
     path('blockchain/', include(blockchain_urlpatterns)),
     
     # Blockchain Document Verification
-    path('blockchain/verify-document/', DocumentVerificationAPIView.as_view(), name='verify-document'),
-    path('blockchain/document-history/<str:document_id>/', DocumentHistoryAPIView.as_view(), name='document-history'),
+    path('blockchain/verify-document/', (AsyncDocumentVerificationAPIView if ASYNC_VIEWS else DocumentVerificationAPIView).as_view(), name='verify-document'),
+    path('blockchain/document-history/<str:document_id>/', (AsyncDocumentHistoryAPIView if ASYNC_VIEWS else DocumentHistoryAPIView).as_view(), name='document-history'),
+    path('documents/verify/bulk/', DocumentBulkVerificationAPIView.as_view(), name='verify-documents-bulk'),
     
     # Blockchain User Management
     path('blockchain/register-user/', BlockchainRegisterUserAPIView.as_view(), name='blockchain-register-user'),
-    path('blockchain/user-info/<str:blockchain_id>/', BlockchainUserInfoAPIView.as_view(), name='blockchain-user-info'),
+    path('blockchain/user-info/<str:blockchain_id>/', (AsyncBlockchainUserInfoView if ASYNC_VIEWS else BlockchainUserInfoAPIView).as_view(), name='blockchain-user-info'),
     path('blockchain/update-user-role/', BlockchainUserRoleUpdateAPIView.as_view(), name='blockchain-update-user-role'),
     
     # Blockchain Approval Workflow
     path('blockchain/approval-workflow/<str:approval_id>/', BlockchainApprovalWorkflowAPIView.as_view(), name='blockchain-approval-workflow'),
     path('blockchain/pending-approvals/<str:approver_id>/', BlockchainPendingApprovalsAPIView.as_view(), name='blockchain-pending-approvals'),
     
+    # Blockchain metrics (Prometheus)
+    path('blockchain/metrics/', BlockchainMetricsAPIView.as_view(), name='blockchain-metrics'),
+    
     # Debug endpoints
     path('debug/user-info/', debug_user_info, name='debug_user_info'),
 ]
@@ -0,0 +1,410 @@
+from asgiref.sync import sync_to_async
+from django.contrib.contenttypes.models import ContentType
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from apps.administrative.models import Document
+from apps.blockchain.services.async_client import async_client
+
+# Các trường của struct User trong kết quả getUser
+USER_FIELDS = ('userId', 'role', 'email', 'dataHash', 'isVerified')
+
+
+def _can_view_citizen(user, document):
+    """
+    Người dùng được xem thông tin công dân của giấy tờ hay không
+
+    is_officer/is_chairman truy vấn bảng role, nên hàm chạy trên thread (sync_to_async).
+    """
+    return bool(document.citizen) and user.is_authenticated and (
+        user.is_superuser or
+        user.is_officer or
+        user.is_chairman or
+        user.id == document.citizen.id
+    )
+
+
+class AsyncAPIView(View):
+    """
+    View async của Django cho các endpoint chỉ đọc blockchain
+
+    APIView của DRF không chạy async, nên view này dùng lại authentication, permission và
+    parser của DRF (trên thread, vì cần truy vấn database) rồi xử lý request trên event
+    loop. Lời gọi tới node đi qua AsyncBlockchainClient: dưới ASGI một worker giữ được
+    nhiều request đang chờ node cùng lúc mà không cần một thread cho mỗi request.
+    """
+    permission_classes = [AllowAny]
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Giống APIView: CSRF được kiểm tra bởi SessionAuthentication
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        denied = await sync_to_async(self.initial)(request)
+        if denied is not None:
+            return denied
+        return await super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request):
+        """
+        Xác thực người dùng, kiểm tra quyền và đọc body của request
+
+        :return: JsonResponse lỗi hoặc None nếu request hợp lệ
+        """
+        drf_request = Request(
+            request,
+            parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+            authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+        )
+        try:
+            request.user = drf_request.user
+            for permission in [permission() for permission in self.permission_classes]:
+                if not permission.has_permission(drf_request, self):
+                    if drf_request.authenticators and not drf_request.successful_authenticator:
+                        raise exceptions.NotAuthenticated()
+                    raise exceptions.PermissionDenied()
+            self.data = drf_request.data if request.method in ('POST', 'PUT', 'PATCH') else {}
+        except exceptions.APIException as e:
+            return self.respond({'detail': e.detail}, status=e.status_code)
+        return None
+
+    def respond(self, data, status=status.HTTP_200_OK):
+        return JsonResponse(
+            data, status=status, safe=False, encoder=DjangoJSONEncoder, json_dumps_params={'ensure_ascii': False}
+        )
+
+    def client(self):
+        """
+        Client blockchain cho request: client dùng chung của worker dưới ASGI, client riêng
+        cho request khi chạy dưới WSGI (mỗi request một event loop)
+        """
+        return async_client(shared=isinstance(self.request, ASGIRequest))
+
+
+class AsyncDocumentVerificationView(AsyncAPIView):
+    """
+    API endpoint để xác thực giấy tờ sử dụng blockchain (async)
+    """
+
+    async def get(self, request, document_id=None):
+        """
+        Kiểm tra và trả về thông tin xác thực của giấy tờ
+        """
+        if not document_id:
+            return self.respond(
+                {"error": "Vui lòng cung cấp ID của giấy tờ"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            document = await Document.objects.select_related('citizen').aget(document_id=document_id)
+        except Document.DoesNotExist:
+            return self.respond(
+                {
+                    "status": "not_found",
+                    "message": "Không tìm thấy giấy tờ với ID đã cung cấp"
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        # Nếu giấy tờ chưa được lưu vào blockchain, trả về lỗi
+        if not document.blockchain_status:
+            return self.respond({
+                "status": "unverified",
+                "message": "Giấy tờ chưa được lưu vào blockchain",
+                "document_info": {
+                    "document_id": document.document_id,
+                    "title": document.title,
+                    "type": document.get_document_type_display(),
+                    "status": document.get_status_display(),
+                }
+            })
+
+        async with self.client() as client:
+            verification_result = await client.verify_document_record(document)
+
+        if verification_result.get('error'):
+            return self.respond(
+                {
+                    "status": "error",
+                    "message": f"Lỗi khi xác thực giấy tờ: {verification_result['error']}"
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        is_verified = verification_result.get('verified', False)
+
+        document_info = {
+            "document_id": document.document_id,
+            "title": document.title,
+            "type": document.get_document_type_display(),
+            "issue_date": document.issue_date.strftime('%d/%m/%Y') if document.issue_date else None,
+            "status": document.get_status_display(),
+            "blockchain_tx_id": document.blockchain_tx_id,
+            "blockchain_timestamp": document.blockchain_timestamp.strftime('%d/%m/%Y %H:%M:%S') if document.blockchain_timestamp else None,
+        }
+
+        # Thông tin người được cấp chỉ trả về cho cán bộ hoặc chính công dân đó
+        if await sync_to_async(_can_view_citizen)(request.user, document):
+            document_info["citizen"] = {
+                "name": document.citizen.full_name,
+                "email": document.citizen.email,
+            }
+
+        response = {
+            "status": "verified" if is_verified else "invalid",
+            "message": "Giấy tờ hợp lệ và đã được xác thực trên blockchain" if is_verified else "Giấy tờ không hợp lệ hoặc đã bị thay đổi",
+            "document_info": document_info,
+            "blockchain_data": verification_result.get('document', {}),
+        }
+        if 'batchId' in verification_result:
+            response["anchor"] = {
+                key: verification_result[key] for key in ('batchId', 'merkleRoot', 'leafIndex', 'proof', 'txId', 'proofValid')
+            }
+        return self.respond(response)
+
+
+class AsyncDocumentBlockchainHistoryView(AsyncAPIView):
+    """
+    API endpoint để lấy lịch sử giao dịch blockchain của giấy tờ (async)
+    """
+
+    async def get(self, request, document_id=None):
+        """
+        Lấy lịch sử giao dịch blockchain của giấy tờ
+        """
+        from apps.blockchain.models import BlockchainRecord
+
+        if not document_id:
+            return self.respond(
+                {"error": "Vui lòng cung cấp ID của giấy tờ"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            document = await Document.objects.aget(document_id=document_id)
+        except Document.DoesNotExist:
+            return self.respond(
+                {
+                    "status": "not_found",
+                    "message": "Không tìm thấy giấy tờ với ID đã cung cấp"
+                },
+                status=status.HTTP_404_NOT_FOUND
+            )
+
+        if not document.blockchain_status:
+            return self.respond({
+                "status": "not_available",
+                "message": "Giấy tờ chưa được lưu vào blockchain"
+            })
+
+        async with self.client() as client:
+            history_result = await client.get_document_history(document.document_id)
+
+        content_type = await sync_to_async(ContentType.objects.get_for_model)(Document)
+        record_data = []
+        async for record in BlockchainRecord.objects.filter(
+            content_type=content_type,
+            object_id=str(document.id)
+        ).select_related('created_by').order_by('-created_at'):
+            record_data.append({
+                "transaction_id": record.transaction_id,
+                "transaction_hash": record.transaction_hash,
+                "record_type": record.get_record_type_display(),
+                "status": record.get_status_display(),
+                "created_at": record.created_at.strftime('%d/%m/%Y %H:%M:%S'),
+                "created_by": record.created_by.full_name if record.created_by else None,
+                "data": record.data,
+            })
+
+        return self.respond({
+            "status": "success",
+            "document_info": {
+                "document_id": document.document_id,
+                "title": document.title,
+                "blockchain_tx_id": document.blockchain_tx_id,
+            },
+            "blockchain_history": history_result,
+            "blockchain_records": record_data,
+        })
+
+
+class AsyncDocumentVerificationAPIView(AsyncAPIView):
+    """
+    API để xác thực giấy tờ hành chính trên blockchain (async)
+    """
+
+    async def post(self, request, *args, **kwargs):
+        document_id = self.data.get('document_id')
+        document_number = self.data.get('document_number')
+        identification_number = self.data.get('identification_number')
+
+        if not document_id and not document_number:
+            return self.respond(
+                {"error": "Cần cung cấp ID hoặc số giấy tờ để xác thực"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Document không có trường blockchain_id/document_number như view đồng bộ tra cứu:
+        # mã giấy tờ trong database cũng là mã trên blockchain, số giấy tờ chính là mã giấy tờ
+        try:
+            document = await Document.objects.select_related('citizen').aget(document_id=document_id or document_number)
+        except Document.DoesNotExist:
+            if not document_id:
+                return self.respond(
+                    {"error": "Không tìm thấy giấy tờ với số giấy tờ đã cung cấp"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            # Không tìm thấy trong database, kiểm tra trên blockchain
+            async with self.client() as client:
+                verification_result = await client.verify_document(document_id)
+
+            # Lỗi khi gọi node/indexer không có nghĩa là giấy tờ không tồn tại
+            if verification_result.get('error'):
+                return self.respond(
+                    {"error": f"Không thể xác thực giấy tờ trên blockchain: {verification_result['error']}"},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            if not verification_result.get('exists', False):
+                return self.respond(
+                    {"error": "Không tìm thấy giấy tờ trên blockchain"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            doc_info = verification_result['document']
+            return self.respond({
+                'verified': verification_result['verified'],
+                'exists': True,
+                'document': {
+                    'blockchain_id': document_id,
+                    'document_type': doc_info.get('documentType'),
+                    'status': doc_info.get('state'),
+                    'issue_date': doc_info.get('issueDate'),
+                    'valid_until': doc_info.get('validUntil'),
+                },
+                'blockchain_info': {
+                    'verification_timestamp': doc_info.get('updatedAt'),
+                }
+            })
+
+        # Như view đồng bộ: chỉ đối chiếu CMND/CCCD khi tra cứu theo số giấy tờ
+        if not document_id and identification_number and (
+            document.citizen is None or document.citizen.identification_number != identification_number
+        ):
+            return self.respond(
+                {"error": "Thông tin CMND/CCCD không khớp với giấy tờ"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        async with self.client() as client:
+            verification_result = await client.verify_document_record(document)
+
+        return self.respond({
+            'verified': verification_result.get('verified', False),
+            'exists': verification_result.get('exists', False),
+            'document': {
+                'id': document.id,
+                'blockchain_id': document.document_id,
+                'document_number': document.document_id,
+                'title': document.title,
+                'document_type': document.document_type,
+                'document_type_display': document.get_document_type_display(),
+                'status': document.status,
+                'status_display': document.get_status_display(),
+                'issue_date': document.issue_date,
+                'valid_until': document.valid_until,
+            },
+            'blockchain_info': {
+                'tx_id': document.blockchain_tx_id,
+                'timestamp': document.blockchain_timestamp,
+                'status': document.blockchain_status
+            }
+        })
+
+
+class AsyncDocumentHistoryAPIView(AsyncAPIView):
+    """
+    API để lấy lịch sử của giấy tờ hành chính trên blockchain (async)
+    """
+
+    async def get(self, request, document_id, *args, **kwargs):
+        if not document_id:
+            return self.respond(
+                {"error": "Cần cung cấp ID giấy tờ để lấy lịch sử"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        async with self.client() as client:
+            history_result = await client.get_document_history(document_id)
+
+        if isinstance(history_result, dict) and not history_result.get('success'):
+            return self.respond(
+                {"error": "Không tìm thấy giấy tờ trên blockchain"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return self.respond(history_result)
+
+
+class AsyncBlockchainUserInfoView(AsyncAPIView):
+    """
+    API để lấy thông tin người dùng từ blockchain (async)
+    """
+    permission_classes = [IsAuthenticated]
+
+    async def get(self, request, blockchain_id, *args, **kwargs):
+        from apps.accounts.models import User
+
+        if not blockchain_id:
+            return self.respond(
+                {"error": "Cần cung cấp blockchain ID của người dùng"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # getUser revert khi người dùng chưa có trên blockchain
+        async with self.client() as client:
+            try:
+                chain_user = await client.call('user_contract', 'getUser', (blockchain_id,), ids=[blockchain_id])
+            except Exception:
+                chain_user = None
+
+        user = await User.objects.filter(blockchain_id=blockchain_id).afirst()
+        if user is None:
+            if chain_user is None:
+                return self.respond(
+                    {"error": "Không tìm thấy người dùng trên blockchain"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            return self.respond({
+                'exists': True,
+                'user': dict(zip(USER_FIELDS, chain_user)),
+            })
+
+        return self.respond({
+            'verified': chain_user is not None and chain_user[4],
+            'exists': chain_user is not None,
+            'user': {
+                'id': user.id,
+                'blockchain_id': user.blockchain_id,
+                'username': user.username,
+                'full_name': user.get_full_name(),
+                'email': user.email,
+                'role': user.role,
+                'status': chain_user[1] if chain_user is not None else None,
+            },
+            'blockchain_info': {
+                'tx_id': user.blockchain_tx_id,
+                'timestamp': user.blockchain_timestamp,
+                'status': user.blockchain_status
+            }
+        })
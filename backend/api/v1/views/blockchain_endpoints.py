@@ -1,3 +1,4 @@
+from django.http import HttpResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -361,4 +362,25 @@ class BlockchainPendingApprovalsAPIView(APIView):
         blockchain_service = BlockchainService()
         result = blockchain_service.get_pending_approvals(approver_id)
         
-        return Response(result) 
\ No newline at end of file
+        return Response(result) 
+
+
+class BlockchainMetricsAPIView(APIView):
+    """
+    API xuất metric blockchain của process (độ sâu hàng đợi, độ trễ theo lane ký...)
+    theo định dạng text của Prometheus
+    """
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    
+    @swagger_auto_schema(
+        operation_description="Metric blockchain theo định dạng Prometheus",
+        responses={200: openapi.Response(description="Metric dạng text/plain")}
+    )
+    def get(self, request, *args, **kwargs):
+        from apps.blockchain.services.metrics import REGISTRY, CONTENT_TYPE
+        from apps.blockchain.services.signer_pool import get_signer_pool
+        
+        # Khởi tạo pool để các lane xuất hiện trong metric ngay cả khi chưa gửi giao dịch nào
+        get_signer_pool()
+        
+        return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
@@ -6,13 +6,14 @@ from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
 from django.db.models import Count, Q
 from apps.accounts.models import User
-from apps.administrative.models import AdminRequest, DocumentType, Attachment
+from apps.administrative.models import AdminRequest, DocumentType, Attachment, UploadSession
+from apps.administrative.models.upload_session import UploadLocked, UploadOffsetMismatch
 # Import Document model
 from apps.administrative.models import Document
 from apps.administrative.serializers import (
     DocumentSerializer as AdminDocumentSerializer
 )
-from apps.administrative.serializers.attachment_serializer import AttachmentUploadSerializer
+from apps.administrative.serializers.attachment_serializer import AttachmentSerializer, AttachmentUploadSerializer
 from api.v1.serializers.request_serializers import RequestSerializer, RequestDetailSerializer
 from api.v1.serializers.document_type_serializers import DocumentTypeProcedureSerializer
 from api.v1.serializers.document_serializers import DocumentSerializer
@@ -20,6 +21,11 @@ from apps.feedback.models import Feedback
 from apps.feedback.serializers import FeedbackSerializer, FeedbackCreateSerializer
 from utils.permissions import IsCitizen, IsOwnerOrAdmin
 from django.shortcuts import get_object_or_404
+from django.http import Http404
+from django.conf import settings
+import io
+import os
+import uuid
 
 # Debug view to test permissions
 class DebugPermissionView(APIView):
@@ -347,6 +353,132 @@ class CitizenRequestViewSet(viewsets.ModelViewSet):
             )
 
 
+    # Upload nhiều phần (kiểu tus) cho file lớn qua đường truyền chậm: tạo phiên, PATCH từng
+    # đoạn kèm Upload-Offset (mất kết nối thì GET để lấy offset rồi gửi tiếp), sau đó finalize
+
+    @action(detail=True, methods=['post'], url_path='uploads')
+    def create_upload(self, request, pk=None):
+        """
+        Tạo phiên upload: file_name, length (bytes), name, description, attachment_type
+        """
+        admin_request = self._owned_request(pk)
+
+        try:
+            length = int(request.data.get('length') or request.headers.get('Upload-Length'))
+        except (TypeError, ValueError):
+            return Response({'detail': 'length is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({'detail': 'length must be positive.'}, status=status.HTTP_400_BAD_REQUEST)
+        max_size = getattr(settings, 'RESUMABLE_UPLOAD_MAX_SIZE', 104857600)
+        if length > max_size:
+            return Response(
+                {'detail': f'File is larger than {max_size} bytes.'},
+                status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+            )
+
+        file_name = os.path.basename(request.data.get('file_name') or '')
+        if not file_name:
+            return Response({'detail': 'file_name is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        session = UploadSession.objects.create(
+            request=admin_request,
+            uploaded_by=request.user,
+            file_name=file_name[:255],
+            name=(request.data.get('name') or file_name)[:255],
+            description=request.data.get('description'),
+            attachment_type=request.data.get('attachment_type') or 'supporting_document',
+            length=length,
+        )
+        response = self._upload_response(session, status.HTTP_201_CREATED)
+        response['Location'] = request.build_absolute_uri(f'{session.upload_id}/')
+        return response
+
+    @action(detail=True, methods=['get', 'patch', 'delete'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{32,36})')
+    def upload_chunk(self, request, pk=None, upload_id=None):
+        """
+        GET: offset hiện tại; PATCH: gửi tiếp dữ liệu (Content-Type application/offset+octet-stream,
+        header Upload-Offset); DELETE: hủy phiên
+        """
+        session = self._upload_session(pk, upload_id)
+
+        if request.method == 'GET':
+            return self._upload_response(session)
+
+        if request.method == 'DELETE':
+            session.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        if session.attachment_id:
+            return Response({'detail': 'Upload has already been finalized.'}, status=status.HTTP_409_CONFLICT)
+        if session.is_expired:
+            session.delete()
+            return Response({'detail': 'Upload session has expired.'}, status=status.HTTP_410_GONE)
+        if request.content_type.split(';')[0].strip() != 'application/offset+octet-stream':
+            return Response(
+                {'detail': 'Content-Type must be application/offset+octet-stream.'},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+            )
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response({'detail': 'Upload-Offset header is required.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Đọc thẳng body từ request (không qua parser) và ghi dần xuống đĩa
+        try:
+            session.append(request.stream or io.BytesIO(), offset)
+        except UploadOffsetMismatch:
+            return self._upload_response(session, status.HTTP_409_CONFLICT)
+        except UploadLocked:
+            return Response(
+                {'detail': 'Another request is uploading to this session.'}, status=status.HTTP_423_LOCKED
+            )
+        return self._upload_response(session, status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'], url_path=r'uploads/(?P<upload_id>[0-9a-f-]{32,36})/finalize')
+    def finalize_upload(self, request, pk=None, upload_id=None):
+        """
+        Tạo tài liệu đính kèm cho yêu cầu từ file đã upload đủ
+        """
+        session = self._upload_session(pk, upload_id)
+
+        if session.attachment_id:
+            # Client gửi lại finalize sau khi mất phản hồi
+            return Response(AttachmentSerializer(session.attachment).data, status=status.HTTP_200_OK)
+        if not session.is_complete:
+            return self._upload_response(session, status.HTTP_409_CONFLICT)
+
+        attachment = session.finalize()
+        return Response(AttachmentSerializer(attachment).data, status=status.HTTP_201_CREATED)
+
+    def _owned_request(self, pk):
+        admin_request = get_object_or_404(AdminRequest, request_id=pk)
+        if admin_request.citizen != self.request.user and admin_request.requestor != self.request.user:
+            self.permission_denied(self.request, message='You do not have permission to add attachments to this request.')
+        return admin_request
+
+    def _upload_session(self, pk, upload_id):
+        admin_request = self._owned_request(pk)
+        try:
+            upload_id = uuid.UUID(upload_id)
+        except ValueError:
+            raise Http404
+        return get_object_or_404(UploadSession, upload_id=upload_id, request=admin_request, uploaded_by=self.request.user)
+
+    def _upload_response(self, session, status_code=status.HTTP_200_OK):
+        data = None
+        if status_code != status.HTTP_204_NO_CONTENT:
+            data = {
+                'upload_id': str(session.upload_id),
+                'offset': session.offset,
+                'length': session.length,
+                'expires_at': session.expires_at,
+            }
+        response = Response(data, status=status_code)
+        response['Upload-Offset'] = str(session.offset)
+        response['Upload-Length'] = str(session.length)
+        response['Cache-Control'] = 'no-store'
+        return response
+
 class CitizenDocumentViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoints cho xem giấy tờ của công dân
@@ -1,4 +1,8 @@
-import asyncio
+import json
+from django.conf import settings
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -53,9 +57,7 @@ class DocumentVerificationView(APIView):
             current_hash = document.calculate_data_hash()
             
             # Lấy kết quả xác thực từ blockchain
-            verification_result = asyncio.run(
-                document_contract_service.verify_document(document.document_id, current_hash)
-            )
+            verification_result = document_contract_service.verify_document(document.document_id, current_hash)
             
             # Xác định trạng thái xác thực
             is_verified = verification_result.get('verified', False)
@@ -142,9 +144,7 @@ class DocumentBlockchainHistoryView(APIView):
                 )
                 
             # Lấy lịch sử giao dịch từ blockchain
-            history_result = asyncio.run(
-                document_contract_service.get_document_history(document.document_id)
-            )
+            history_result = document_contract_service.get_document_history(document.document_id)
             
             # Lấy danh sách bản ghi blockchain từ database
             from apps.blockchain.models import BlockchainRecord
@@ -416,4 +416,142 @@ class DocumentHistoryAPIView(APIView):
                 return Response(
                     {"error": "Không tìm thấy giấy tờ trên blockchain"},
                     status=status.HTTP_404_NOT_FOUND
-                ) 
\ No newline at end of file
+                ) 
+
+
+class DocumentBulkVerificationAPIView(APIView):
+    """
+    API để xác thực nhiều giấy tờ trong một request
+
+    Giấy tờ được tìm bằng một truy vấn database, mỗi nhóm DOCUMENT_BULK_VERIFY_CHUNK_SIZE
+    giấy tờ được xác thực bằng một lần đọc blockchain và kết quả được trả về dần
+    dưới dạng NDJSON (mỗi dòng một giấy tờ, theo thứ tự đầu vào).
+    """
+    permission_classes = [AllowAny]  # Cho phép truy cập công khai
+
+    @swagger_auto_schema(
+        operation_description="Xác thực nhiều giấy tờ hành chính trên blockchain, kết quả trả về dạng NDJSON",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'document_ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='Danh sách mã giấy tờ'),
+                'data_hashes': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_STRING), description='Danh sách data hash của giấy tờ'),
+            },
+        ),
+        responses={
+            200: openapi.Response(description="Mỗi dòng là kết quả xác thực của một giấy tờ (application/x-ndjson)"),
+            400: openapi.Response(description="Dữ liệu không hợp lệ"),
+        }
+    )
+    def post(self, request, *args, **kwargs):
+        document_ids = request.data.get('document_ids') or []
+        data_hashes = request.data.get('data_hashes') or []
+
+        if not isinstance(document_ids, list) or not isinstance(data_hashes, list):
+            return Response(
+                {"error": "document_ids và data_hashes phải là danh sách"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        document_ids = [str(value) for value in document_ids]
+        data_hashes = [str(value).lower() for value in data_hashes]
+        items = [('document_id', value) for value in document_ids] + [('data_hash', value) for value in data_hashes]
+        if not items:
+            return Response(
+                {"error": "Cần cung cấp ít nhất một mã giấy tờ hoặc data hash để xác thực"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        max_items = getattr(settings, 'DOCUMENT_BULK_VERIFY_MAX_ITEMS', 500)
+        if len(items) > max_items:
+            return Response(
+                {"error": f"Chỉ được xác thực tối đa {max_items} giấy tờ mỗi lần"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        documents = self._resolve(document_ids, data_hashes)
+
+        response = StreamingHttpResponse(self._stream(items, documents), content_type='application/x-ndjson')
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def _resolve(self, document_ids, data_hashes):
+        """
+        Tìm giấy tờ theo mã hoặc data hash hiện tại bằng một truy vấn trên hai cột có index
+
+        :return: (dict mã giấy tờ -> Document, dict data hash -> Document)
+        """
+        query = Q(document_id__in=document_ids)
+        if data_hashes:
+            query |= Q(data_hash__in=data_hashes)
+
+        by_id, by_hash = {}, {}
+        wanted = set(data_hashes)
+        for document in Document.objects.filter(query):
+            by_id[document.document_id] = document
+            if wanted:
+                data_hash = document.calculate_data_hash()
+                if data_hash in wanted:
+                    by_hash[data_hash] = document
+
+        return by_id, by_hash
+
+    def _stream(self, items, documents):
+        by_id, by_hash = documents
+        chunk_size = getattr(settings, 'DOCUMENT_BULK_VERIFY_CHUNK_SIZE', 100)
+        blockchain_service = BlockchainService()
+
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start:start + chunk_size]
+            found = [(by_id if kind == 'document_id' else by_hash).get(value) for kind, value in chunk]
+
+            stored = [document for document in found if document is not None and self._is_stored(document)]
+            try:
+                results = dict(zip([document.pk for document in stored], blockchain_service.verify_document_records(stored)))
+            except Exception as e:
+                results = {document.pk: {'success': False, 'error': str(e), 'verified': False} for document in stored}
+
+            for (kind, value), document in zip(chunk, found):
+                line = self._line(kind, value, document, results)
+                yield json.dumps(line, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+    def _is_stored(self, document):
+        return document.blockchain_status not in (None, '', 'NOT_STORED')
+
+    def _line(self, kind, value, document, results):
+        line = {kind: value}
+
+        if document is None:
+            line.update({'status': 'not_found', 'verified': False, 'exists': False})
+            return line
+
+        line['document'] = {
+            'document_id': document.document_id,
+            'title': document.title,
+            'document_type': document.document_type,
+            'document_type_display': document.get_document_type_display(),
+            'status': document.status,
+            'status_display': document.get_status_display(),
+            'issue_date': document.issue_date,
+            'valid_until': document.valid_until,
+            'blockchain_tx_id': document.blockchain_tx_id,
+            'blockchain_timestamp': document.blockchain_timestamp,
+        }
+
+        if not self._is_stored(document):
+            line.update({'status': 'unverified', 'verified': False, 'exists': False})
+            return line
+
+        result = results[document.pk]
+        if result.get('error'):
+            line.update({'status': 'error', 'verified': False, 'exists': result.get('exists', False), 'error': result['error']})
+            return line
+
+        line.update({
+            'status': 'verified' if result['verified'] else 'invalid',
+            'verified': result['verified'],
+            'exists': result['exists'],
+        })
+        if 'batchId' in result:
+            line['anchor'] = {key: result[key] for key in ('batchId', 'merkleRoot', 'leafIndex', 'proof', 'txId', 'proofValid')}
+        return line
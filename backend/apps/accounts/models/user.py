@@ -1,9 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
-import json
-import hashlib
+
+from utils.data_hash import DataHashMixin
 
 
 class UserManager(BaseUserManager):
@@ -48,7 +48,7 @@ class UserManager(BaseUserManager):
         return user
 
 
-class User(AbstractUser):
+class User(DataHashMixin, AbstractUser):
     """
     Custom User model that uses email instead of username
     and has role-based permissions
@@ -100,6 +100,9 @@ class User(AbstractUser):
     blockchain_tx_id = models.CharField(_('Blockchain Transaction ID'), max_length=100, blank=True, null=True)
     blockchain_timestamp = models.DateTimeField(_('Blockchain Timestamp'), blank=True, null=True)
     
+    # Các trường tạo nên data hash, xem hash_payload()
+    HASHED_FIELDS = ('id', 'email', 'role', 'first_name', 'last_name', 'is_active', 'is_verified')
+    
     objects = UserManager()
 
     USERNAME_FIELD = 'email'
@@ -157,32 +160,18 @@ class User(AbstractUser):
                 import uuid
                 self.blockchain_id = f"USR-{uuid.uuid4().hex[:8].upper()}"
         
-        # Save user to database first
-        super().save(*args, **kwargs)
-        
-        # Đăng ký người dùng trên blockchain nếu chưa đăng ký
-        if (is_new or self.blockchain_status == 'NOT_REGISTERED') and not kwargs.get('update_fields'):
-            try:
-                from apps.blockchain.services.blockchain_service import BlockchainService
-                blockchain_service = BlockchainService()
-                result = blockchain_service.register_user_on_blockchain(self)
-                
-                if result.get('success'):
-                    # Cập nhật trạng thái blockchain
-                    self.blockchain_status = 'REGISTERED'
-                    self.blockchain_tx_id = result.get('txId')
-                    self.blockchain_timestamp = timezone.now()
-                    # Save without triggering this function again
-                    super().save(update_fields=['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
-            except (ImportError, Exception) as e:
-                print(f"Error registering user on blockchain: {str(e)}")
-                # Set status to indicate blockchain registration failed
-                self.blockchain_status = 'ERROR'
+        # Lưu user và đưa thao tác đăng ký blockchain vào outbox trong cùng một transaction,
+        # worker sẽ gửi giao dịch sau nên request không phải chờ blockchain
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Đăng ký người dùng trên blockchain nếu chưa đăng ký
+            if (is_new or self.blockchain_status == 'NOT_REGISTERED') and not kwargs.get('update_fields'):
+                self.save_to_blockchain()
     
-    def calculate_data_hash(self):
-        """Tạo hash từ dữ liệu user để lưu và xác thực trên blockchain"""
-        # Tạo một dict chứa các thông tin quan trọng của user
-        data = {
+    def hash_payload(self):
+        """Dữ liệu của user được hash để lưu và xác thực trên blockchain"""
+        return {
             'id': str(self.id),
             'email': self.email,
             'role': self.role,
@@ -190,79 +179,21 @@ class User(AbstractUser):
             'is_active': self.is_active,
             'is_verified': self.is_verified,
         }
-        
-        # Chuyển đổi dict thành chuỗi JSON và tạo hash
-        data_string = json.dumps(data, sort_keys=True)
-        data_hash = hashlib.sha256(data_string.encode()).hexdigest()
-        
-        return data_hash
     
-    async def save_to_blockchain(self):
-        """Lưu thông tin người dùng vào blockchain"""
+    def save_to_blockchain(self, created_by='system'):
+        """Đưa thao tác đăng ký người dùng vào outbox blockchain"""
         # Import service ở đây để tránh circular import
-        from apps.blockchain.services.user_contract import user_contract_service
-        
-        # Tạo hash từ dữ liệu user
-        data_hash = self.calculate_data_hash()
-        
-        # Chuẩn bị dữ liệu để lưu vào blockchain
-        user_data = {
-            'id': self.blockchain_id or f"USER-{self.id}",
-            'role': self.role,
-            'name': self.full_name,
-            'email': self.email,
-            'created_by': 'system',
-            'status': 'ACTIVE' if self.is_active else 'INACTIVE',
-            'metadata': json.dumps({
-                'is_verified': self.is_verified,
-                'data_hash': data_hash
-            }),
-        }
+        from apps.blockchain.services import outbox
         
-        try:
-            # Gọi service để lưu vào blockchain
-            response = await user_contract_service.register_user(user_data)
-            tx_id = response.get('txId')
-            
-            # Cập nhật trạng thái blockchain
-            self.last_blockchain_update = timezone.now()
-            
-            # Lưu thông tin vào BlockchainRecord model
-            from django.contrib.contenttypes.models import ContentType
-            from apps.blockchain.models import BlockchainRecord
-            
-            content_type = ContentType.objects.get_for_model(self)
-            
-            BlockchainRecord.objects.create(
-                transaction_id=tx_id,
-                network='hyperledger',
-                content_type=content_type,
-                object_id=str(self.id),
-                record_type='officer_approval' if self.is_officer else 'user_registration',
-                status='confirmed',
-                data={
-                    'user_id': self.blockchain_id,
-                    'action': 'register',
-                    'role': self.role,
-                    'data_hash': data_hash
-                },
-                verification_hash=data_hash,
-                is_verified=True,
-                verification_timestamp=timezone.now(),
-                confirmed_at=timezone.now()
-            )
-            
-            # Cập nhật model
-            User.objects.filter(id=self.id).update(
-                last_blockchain_update=self.last_blockchain_update
-            )
-            
-            return tx_id
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error saving user to blockchain: {str(e)}")
+        if outbox.has_pending(self, 'register_user'):
             return None
+        
+        return outbox.enqueue(
+            self,
+            'register_user',
+            {'user_id': self.blockchain_id, 'role': self.role, 'created_by': created_by},
+            data_hash=self.calculate_data_hash()
+        )
     
     async def update_role_on_blockchain(self, new_role, approver_id=None):
         """Cập nhật vai trò người dùng trên blockchain"""
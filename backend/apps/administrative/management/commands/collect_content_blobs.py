@@ -0,0 +1,60 @@
+import datetime
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.administrative.models import Attachment, ContentBlob
+from apps.administrative.models.document import DocumentAttachment
+
+# Các model trỏ tới ContentBlob (BlobReferenceMixin)
+REFERENCING_MODELS = [Attachment, DocumentAttachment]
+
+
+class Command(BaseCommand):
+    help = 'Đếm lại tham chiếu của ContentBlob và xóa blob (cả file trong storage) không còn tài liệu đính kèm nào dùng'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=int, default=None, help='Chỉ xóa blob không dùng tới ít nhất số giây này (mặc định CONTENT_BLOB_GC_GRACE)')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ liệt kê, không sửa/xóa')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        grace = options['grace']
+        if grace is None:
+            grace = getattr(settings, 'CONTENT_BLOB_GC_GRACE', 3600)
+
+        # ref_count có thể lệch khi bản ghi bị sửa bằng QuerySet.update()/bulk_create()
+        counts = {}
+        for model in REFERENCING_MODELS:
+            for row in model._base_manager.filter(blob__isnull=False).values('blob').annotate(total=Count('pk')):
+                counts[row['blob']] = counts.get(row['blob'], 0) + row['total']
+
+        fixed = 0
+        for blob in ContentBlob.objects.only('pk', 'ref_count').iterator():
+            actual = counts.get(blob.pk, 0)
+            if blob.ref_count != actual:
+                fixed += 1
+                if not dry_run:
+                    ContentBlob.objects.filter(pk=blob.pk).update(ref_count=actual)
+
+        cutoff = timezone.now() - datetime.timedelta(seconds=grace)
+        deleted = freed = 0
+        for blob in ContentBlob.objects.filter(last_used_at__lt=cutoff).iterator():
+            if blob.pk in counts:
+                continue
+            if dry_run:
+                deleted += 1
+                freed += blob.size
+                continue
+            # Điều kiện lặp lại trong DELETE: blob vừa được upload lại (store()/acquire()) thì bỏ qua
+            removed, _ = ContentBlob.objects.filter(pk=blob.pk, ref_count=0, last_used_at__lt=cutoff).delete()
+            if removed:
+                blob.file.storage.delete(blob.file.name)
+                deleted += 1
+                freed += blob.size
+
+        action = 'Sẽ' if dry_run else 'Đã'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} sửa ref_count của {fixed} blob, xóa {deleted} blob không dùng ({freed} bytes).'
+        ))
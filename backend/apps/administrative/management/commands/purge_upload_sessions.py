@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.administrative.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = 'Xóa các phiên upload nhiều phần đã hết hạn cùng file đang upload dở của chúng'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm, không xóa')
+
+    def handle(self, *args, **options):
+        expired = UploadSession.objects.filter(expires_at__lte=timezone.now())
+        total = 0
+        for session in expired.iterator():
+            total += 1
+            if not options['dry_run']:
+                # delete() của model xóa cả file tạm
+                session.delete()
+
+        action = 'Sẽ xóa' if options['dry_run'] else 'Đã xóa'
+        self.stdout.write(self.style.SUCCESS(f'{action} {total} phiên upload hết hạn.'))
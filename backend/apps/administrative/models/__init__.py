@@ -5,5 +5,7 @@ from .document_type import DocumentType
 from .attachment import Attachment
 from .approval import Approval
 from .activity import Activity
+from .content_blob import ContentBlob
+from .upload_session import UploadSession
 
-__all__ = ['Document', 'AdminRequest', 'DocumentType', 'Attachment', 'Approval', 'Activity'] # 'Document' added back 
\ No newline at end of file
+__all__ = ['Document', 'AdminRequest', 'DocumentType', 'Attachment', 'Approval', 'Activity', 'ContentBlob', 'UploadSession'] # 'Document' added back 
\ No newline at end of file
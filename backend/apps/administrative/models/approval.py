@@ -1,14 +1,14 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 import uuid
-import asyncio
-import hashlib
 import json
 
+from utils.hashing import hash_data
+
 
 class Approval(models.Model):
     """
@@ -102,12 +102,11 @@ class Approval(models.Model):
         self.approved_by = approver
         self.approved_at = timezone.now()
         
-        if save:
-            self.save()
-            
-        # Lưu thông tin phê duyệt vào blockchain
-        from django.db import transaction
-        transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('approve')))
+        # Lưu thông tin phê duyệt vào outbox blockchain cùng transaction với phê duyệt
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('approve')
             
         return self
     
@@ -118,12 +117,11 @@ class Approval(models.Model):
         self.approved_at = timezone.now()
         self.rejection_reason = reason
         
-        if save:
-            self.save()
-            
-        # Lưu thông tin từ chối vào blockchain
-        from django.db import transaction
-        transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('reject')))
+        # Lưu thông tin từ chối vào outbox blockchain cùng transaction với phê duyệt
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('reject')
             
         return self
     
@@ -131,12 +129,11 @@ class Approval(models.Model):
         """Cancel the request"""
         self.status = 'cancelled'
         
-        if save:
-            self.save()
-            
-        # Lưu thông tin hủy vào blockchain
-        from django.db import transaction
-        transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('cancel')))
+        # Lưu thông tin hủy vào outbox blockchain cùng transaction với phê duyệt
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('cancel')
             
         return self
     
@@ -150,101 +147,57 @@ class Approval(models.Model):
             'description': self.description,
             'status': self.status,
             'object_id': self.object_id,
-            'requested_by': str(self.requested_by.id),
-            'requested_at': self.requested_at.isoformat() if self.requested_at else None,
-            'approved_by': str(self.approved_by.id) if self.approved_by else None,
-            'approved_at': self.approved_at.isoformat() if self.approved_at else None,
+            'requested_by': str(self.requested_by_id),
+            'requested_at': self.requested_at,
+            'approved_by': str(self.approved_by_id) if self.approved_by_id else None,
+            'approved_at': self.approved_at,
         }
         
-        # Chuyển đổi dict thành chuỗi JSON và tạo hash
-        data_string = json.dumps(data, sort_keys=True)
-        data_hash = hashlib.sha256(data_string.encode()).hexdigest()
-        
-        return data_hash
+        return hash_data(data)
     
-    async def save_to_blockchain(self, action_type='create'):
-        """Lưu thông tin phê duyệt vào blockchain"""
+    def save_to_blockchain(self, action_type='create'):
+        """
+        Đưa thao tác blockchain của phê duyệt vào outbox
+        
+        Nên gọi trong cùng transaction với thay đổi của phê duyệt, worker outbox
+        sẽ gửi giao dịch sau khi transaction được commit.
+        """
         # Import service ở đây để tránh circular import
-        from apps.blockchain.services.admin_contract import admin_contract_service
+        from apps.blockchain.services import outbox
         
         # Tạo hash từ dữ liệu
         data_hash = self.calculate_data_hash()
         
-        try:
-            if action_type == 'create':
-                # Chuẩn bị dữ liệu để tạo approval request mới
-                request_data = {
-                    'id': self.approval_id,
-                    'workflow_id': f"WORKFLOW-{self.approval_type}",
-                    'object_id': self.object_id,
+        if action_type == 'create':
+            created_by = self.requested_by
+            payload = {
+                'approval_id': self.approval_id,
+                'approval_type': self.approval_type.upper(),
+                'target_id': self.object_id,
+                'requested_by': str(self.requested_by.id),
+                'approvers': str(self.approved_by.id) if self.approved_by else '',
+                'metadata': json.dumps({
+                    'title': self.title,
+                    'description': self.description,
                     'object_type': self.content_type.model if self.content_type else 'unknown',
-                    'requested_by': str(self.requested_by.id),
-                    'details': json.dumps({
-                        'title': self.title,
-                        'description': self.description,
-                        'data_hash': data_hash
-                    }),
-                    'status': 'PENDING',
-                }
-                
-                # Gọi service để tạo approval request
-                response = await admin_contract_service.create_approval_request(request_data)
-                tx_id = response.get('txId')
-                
-            elif action_type in ['approve', 'reject', 'cancel']:
-                # Chuyển đổi trạng thái
-                status_map = {
-                    'approve': 'APPROVED',
-                    'reject': 'REJECTED',
-                    'cancel': 'CANCELLED'
-                }
-                
-                # Gọi service để cập nhật trạng thái
-                response = await admin_contract_service.update_approval_request_status(
-                    self.approval_id,
-                    status_map[action_type],
-                    str(self.approved_by.id) if self.approved_by else str(self.requested_by.id),
-                    self.rejection_reason if action_type == 'reject' else None
-                )
-                tx_id = response.get('txId')
-                
-            else:
-                return None
-            
-            # Cập nhật trạng thái blockchain
-            self.add_blockchain_record(tx_id)
-            
-            # Lưu thông tin vào BlockchainRecord model
-            from django.contrib.contenttypes.models import ContentType
-            from apps.blockchain.models import BlockchainRecord
-            
-            content_type = ContentType.objects.get_for_model(self)
-            
-            BlockchainRecord.objects.create(
-                transaction_id=tx_id,
-                network='ethereum',
-                content_type=content_type,
-                object_id=str(self.id),
-                record_type=f'approval_{action_type}',
-                status='confirmed',
-                data={
-                    'approval_id': self.approval_id,
-                    'action': action_type,
                     'data_hash': data_hash
-                },
-                created_by=self.approved_by if action_type in ['approve', 'reject'] else self.requested_by,
-                verification_hash=data_hash,
-                is_verified=True,
-                verification_timestamp=timezone.now(),
-                confirmed_at=timezone.now()
-            )
-            
-            return tx_id
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error saving approval to blockchain: {str(e)}")
+                }),
+                'priority': 'MEDIUM',
+            }
+        elif action_type in ['approve', 'reject', 'cancel']:
+            created_by = self.approved_by if action_type in ['approve', 'reject'] else self.requested_by
+            payload = {
+                'approval_id': self.approval_id,
+                'approver_id': str(self.approved_by.id) if self.approved_by else str(self.requested_by.id),
+            }
+            if action_type == 'reject':
+                payload['reason'] = self.rejection_reason or ''
+            elif action_type == 'cancel':
+                payload['reason'] = 'CANCELLED'
+        else:
             return None
+        
+        return outbox.enqueue(self, f'approval_{action_type}', payload, created_by=created_by, data_hash=data_hash)
     
     def add_blockchain_record(self, tx_id, save=True):
         """Add blockchain transaction record"""
@@ -285,11 +238,12 @@ class Approval(models.Model):
             # Tạo approval_id mới
             self.approval_id = f"APR-{date_prefix}-{new_number:03d}"
         
-        # Gọi phương thức save ban đầu
-        super().save(*args, **kwargs)
+        # pk là UUID có giá trị mặc định nên dùng _state.adding để nhận biết bản ghi mới
+        is_new = self._state.adding
         
-        # Lưu vào blockchain nếu đây là bản ghi mới và chưa có thông tin blockchain
-        if not self.blockchain_status:
-            # Sử dụng asyncio để gọi phương thức bất đồng bộ
-            from django.db import transaction
-            transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('create')))
+        # Lưu phê duyệt và đưa thao tác tạo trên blockchain vào outbox trong cùng một transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            if is_new and not self.blockchain_status:
+                self.save_to_blockchain('create')
@@ -3,6 +3,8 @@ from django.conf import settings
 import uuid
 import os
 
+from .content_blob import BlobReferenceMixin
+
 
 def attachment_file_path(instance, filename):
     """Tạo đường dẫn lưu trữ cho file đính kèm"""
@@ -18,7 +20,7 @@ def attachment_file_path(instance, filename):
         return f"attachments/other/{new_filename}"
 
 
-class Attachment(models.Model):
+class Attachment(BlobReferenceMixin, models.Model):
     """
     Model đại diện cho tài liệu đính kèm trong hệ thống
     """
@@ -89,8 +91,18 @@ class Attachment(models.Model):
         return self.file_extension == '.pdf'
     
     def save(self, *args, **kwargs):
+        # File mới upload: hash, kích thước và loại file đã tính khi nhận dữ liệu (utils/uploads.py)
+        if self.file and not self.file._committed:
+            from utils.uploads import file_digest
+            digest = file_digest(self.file)
+            self.verification_hash = digest['sha256']
+            self.file_size = digest['size']
+            self.file_type = digest['content_type']
+            # Nội dung đã có trong storage thì không ghi lại
+            self.store_blob(digest)
+
         # Cập nhật kích thước file nếu có file
-        if self.file and hasattr(self.file, 'size'):
+        elif self.file and hasattr(self.file, 'size'):
             self.file_size = self.file.size
             
         # Cập nhật loại file nếu có file
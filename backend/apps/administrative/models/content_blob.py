@@ -0,0 +1,118 @@
+import os
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+
+def blob_path(sha256, filename=''):
+    """Đường dẫn lưu trữ theo nội dung: blobs/ab/cd/abcd....ext (giữ phần mở rộng của lần upload đầu)"""
+    ext = os.path.splitext(filename)[1].lower()
+    if len(ext) > 10:
+        ext = ''
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+class ContentBlobManager(models.Manager):
+    def store(self, content, digest):
+        """
+        Lấy blob có cùng SHA-256, chỉ ghi content vào storage khi chưa có
+
+        :param content: File vừa upload (UploadedFile, không phải FieldFile, để storage
+                        chuyển file tạm thay vì chép lại)
+        :param digest: Kết quả utils.uploads.file_digest()
+        """
+        sha256 = digest['sha256']
+        blob = self.filter(sha256=sha256).first()
+        if blob is not None and blob.file.storage.exists(blob.file.name):
+            # Đánh dấu vừa dùng để collect_content_blobs không xóa trước khi bản ghi tham chiếu được lưu
+            self.filter(pk=blob.pk).update(last_used_at=timezone.now())
+            return blob
+
+        name = blob_path(sha256, content.name or '')
+        storage = self.model._meta.get_field('file').storage
+        if not storage.exists(name):
+            saved = storage.save(name, content)
+            if saved != name:
+                # Một upload cùng nội dung vừa ghi xong trước, bỏ bản thừa
+                storage.delete(saved)
+
+        blob, _ = self.get_or_create(sha256=sha256, defaults={
+            'file': name,
+            'size': digest['size'],
+            'content_type': digest['content_type'],
+        })
+        return blob
+
+    def acquire(self, pk):
+        self.filter(pk=pk).update(ref_count=F('ref_count') + 1, last_used_at=timezone.now())
+
+    def release(self, pk):
+        self.filter(pk=pk, ref_count__gt=0).update(ref_count=F('ref_count') - 1, last_used_at=timezone.now())
+
+
+class ContentBlob(models.Model):
+    """
+    Nội dung file lưu một lần theo SHA-256, dùng chung cho mọi Attachment/DocumentAttachment
+    có cùng nội dung
+
+    ref_count là số bản ghi đang trỏ tới blob; blob không còn tham chiếu được lệnh
+    collect_content_blobs xóa (cả file trong storage).
+    """
+    sha256 = models.CharField(_('SHA-256'), max_length=64, unique=True)
+    file = models.FileField(_('File'), upload_to='blobs/', max_length=255)
+    size = models.PositiveBigIntegerField(_('Size'), default=0)
+    content_type = models.CharField(_('Content Type'), max_length=100, blank=True, default='')
+    ref_count = models.PositiveIntegerField(_('Reference Count'), default=0)
+    created_at = models.DateTimeField(_('Created At'), auto_now_add=True)
+    last_used_at = models.DateTimeField(_('Last Used At'), default=timezone.now)
+
+    objects = ContentBlobManager()
+
+    def __str__(self):
+        return self.sha256
+
+    class Meta:
+        verbose_name = _('Content Blob')
+        verbose_name_plural = _('Content Blobs')
+        indexes = [
+            models.Index(fields=['ref_count', 'last_used_at']),
+        ]
+
+
+class BlobReferenceMixin(models.Model):
+    """
+    Model có trường file lưu theo nội dung qua ContentBlob
+
+    Model con gọi store_blob() cho file vừa upload trước khi super().save(); save() cập nhật
+    ref_count khi blob của bản ghi thay đổi, còn xóa bản ghi được xử lý ở signal post_delete.
+    """
+    blob = models.ForeignKey(ContentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+', editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_blob_id = instance.__dict__.get('blob_id')
+        return instance
+
+    def store_blob(self, digest):
+        """Trỏ file vừa upload tới blob cùng nội dung (ghi blob nếu chưa có)"""
+        if not getattr(settings, 'ATTACHMENT_CONTENT_ADDRESSED', True):
+            return
+        self.blob = ContentBlob.objects.store(self.file.file, digest)
+        # Gán tên file đã lưu: FileField không ghi lại file lúc save
+        self.file = self.blob.file.name
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        saved_blob_id = getattr(self, '_saved_blob_id', None)
+        if self.blob_id != saved_blob_id:
+            if self.blob_id:
+                ContentBlob.objects.acquire(self.blob_id)
+            if saved_blob_id:
+                ContentBlob.objects.release(saved_blob_id)
+            self._saved_blob_id = self.blob_id
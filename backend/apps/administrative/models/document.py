@@ -1,16 +1,16 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 import uuid
 import os
-import asyncio
-import hashlib
-import json
 import random
 import string
+from datetime import datetime
 
 from apps.accounts.models import User
+from utils.data_hash import DataHashMixin
+from .content_blob import BlobReferenceMixin
 
 # Tạm thời comment các import liên quan đến blockchain để tránh lỗi
 # from apps.blockchain.services.document_contract import document_contract_service
@@ -28,7 +28,21 @@ def document_file_path(instance, filename):
     else:
         return os.path.join('documents', 'unassigned', filename)
 
-class Document(models.Model):
+def _field_date(value):
+    """
+    Ngày mà DateField lưu vào database cho giá trị đang giữ trên instance
+
+    valid_from mặc định là timezone.now (datetime UTC) cho tới khi được đọc lại từ database,
+    DateField lưu ngày theo TIME_ZONE nên hash phải dùng cùng ngày đó.
+    """
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value, timezone.get_default_timezone())
+        return value.date()
+    return value
+
+
+class Document(DataHashMixin, models.Model):
     """
     Model for official documents issued to citizens
     """
@@ -146,6 +160,11 @@ class Document(models.Model):
     blockchain_tx_id = models.CharField(_('Mã giao dịch blockchain'), max_length=100, blank=True, null=True)
     blockchain_timestamp = models.DateTimeField(_('Thời gian lưu blockchain'), blank=True, null=True)
     
+    # Các trường tạo nên data hash, xem hash_payload()
+    HASHED_FIELDS = (
+        'document_id', 'document_type', 'title', 'issue_date', 'valid_from', 'valid_until', 'content', 'citizen', 'status',
+    )
+    
     class Meta:
         verbose_name = _('Giấy tờ')
         verbose_name_plural = _('Giấy tờ')
@@ -195,15 +214,12 @@ class Document(models.Model):
         
         if self.status == 'draft':
             self.status = 'active'
-            
-        if save:
-            self.save()
-            
-        # Tạm thời comment phần lưu thông tin phê duyệt vào blockchain
-        # if self.status == 'active':
-        #     # Sử dụng asyncio để gọi phương thức bất đồng bộ
-        #     from django.db import transaction
-        #     transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('approve')))
+        
+        # Lưu thông tin phê duyệt vào outbox blockchain cùng transaction với giấy tờ
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('approve')
             
         return self
     
@@ -214,13 +230,11 @@ class Document(models.Model):
         self.revocation_date = timezone.now()
         self.revoked_by = officer
         
-        if save:
-            self.save()
-            
-        # Tạm thời comment phần lưu thông tin thu hồi vào blockchain
-        # # Sử dụng asyncio để gọi phương thức bất đồng bộ
-        # from django.db import transaction
-        # transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('revoke')))
+        # Lưu thông tin thu hồi vào outbox blockchain cùng transaction với giấy tờ
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('revoke')
             
         return self
     
@@ -228,113 +242,68 @@ class Document(models.Model):
         """Activate the document"""
         self.status = 'active'
         
-        if save:
-            self.save()
-            
-        # Tạm thời comment phần lưu thông tin kích hoạt vào blockchain
-        # # Sử dụng asyncio để gọi phương thức bất đồng bộ
-        # from django.db import transaction
-        # transaction.on_commit(lambda: asyncio.ensure_future(self.save_to_blockchain('activate')))
+        # Lưu giấy tờ lên blockchain nếu chưa được lưu
+        with transaction.atomic():
+            if save:
+                self.save()
+            self.save_to_blockchain('activate')
             
         return self
     
-    def calculate_data_hash(self):
-        """Tạo hash từ dữ liệu document để lưu và xác thực trên blockchain"""
-        # Tạo một dict chứa các thông tin quan trọng của document
-        data = {
+    def hash_payload(self):
+        """Dữ liệu của document được hash để lưu và xác thực trên blockchain"""
+        return {
             'document_id': self.document_id,
             'document_type': self.document_type,
             'title': self.title,
-            'issue_date': str(self.issue_date) if self.issue_date else None,
-            'valid_from': str(self.valid_from) if self.valid_from else None,
-            'valid_until': str(self.valid_until) if self.valid_until else None,
+            'issue_date': self.issue_date,
+            'valid_from': _field_date(self.valid_from),
+            'valid_until': _field_date(self.valid_until),
             'content': self.content,
-            'citizen_id': str(self.citizen.id) if self.citizen else None,
+            'citizen_id': str(self.citizen_id) if self.citizen_id else None,
             'status': self.status,
         }
-        
-        # Chuyển đổi dict thành chuỗi JSON và tạo hash
-        data_string = json.dumps(data, sort_keys=True)
-        data_hash = hashlib.sha256(data_string.encode()).hexdigest()
-        
-        return data_hash
     
-    async def save_to_blockchain(self, action_type='create'):
-        """Lưu document vào blockchain"""
-        # Tạo hash từ dữ liệu document
-        data_hash = self.calculate_data_hash()
+    def save_to_blockchain(self, action_type='create'):
+        """
+        Đưa thao tác blockchain của document vào outbox
         
-        # Chuẩn bị dữ liệu để lưu vào blockchain
-        document_data = {
-            'id': self.document_id,
-            'type': self.document_type,
-            'citizen_id': str(self.citizen.id) if self.citizen else None,
-            'issued_by': str(self.issued_by.id) if self.issued_by else None,
-            'issued_date': str(self.issue_date) if self.issue_date else timezone.now().strftime('%Y-%m-%d'),
-            'valid_until': str(self.valid_until) if self.valid_until else 'UNLIMITED',
-            'status': self.status.upper(),
-            'data_hash': data_hash,
-        }
+        Nên gọi trong cùng transaction với thay đổi của document, worker outbox
+        sẽ gửi giao dịch sau khi transaction được commit.
+        """
+        # Import service ở đây để tránh circular import
+        from apps.blockchain.services import outbox
         
-        try:
-            # Gọi service tương ứng với action type
-            if action_type == 'create' or action_type == 'activate':
-                response = await document_contract_service.create_document(document_data)
-                tx_id = response.get('txId')
-            elif action_type == 'approve':
-                chairman_id = str(self.chairman_approved_by.id) if self.chairman_approved_by else None
-                response = await document_contract_service.approve_document(
-                    self.document_id,
-                    chairman_id,
-                    "Approved by chairman"
-                )
-                tx_id = response.get('txId')
-            elif action_type == 'revoke':
-                revoker_id = str(self.revoked_by.id) if self.revoked_by else None
-                reason = self.revocation_reason or "Document revoked"
-                response = await document_contract_service.update_document_status(
-                    self.document_id,
-                    'REVOKED',
-                    reason
-                )
-                tx_id = response.get('txId')
-            else:
+        if action_type in ('create', 'activate'):
+            # Giấy tờ chỉ được tạo trên blockchain một lần
+            if self.blockchain_status != 'NOT_STORED' or outbox.has_pending(self, 'document_create'):
                 return None
-            
-            # Lưu thông tin transaction vào model
-            self.add_blockchain_record(tx_id)
-            
-            # Lưu thông tin vào BlockchainRecord model
-            from django.contrib.contenttypes.models import ContentType
-            from apps.blockchain.models import BlockchainRecord
-            
-            content_type = ContentType.objects.get_for_model(self)
-            
-            BlockchainRecord.objects.create(
-                transaction_id=tx_id,
-                network='ethereum',
-                content_type=content_type,
-                object_id=str(self.id),
-                record_type=f'document_{action_type}',
-                status='confirmed',
-                data={
-                    'document_id': self.document_id,
-                    'action': action_type,
-                    'data_hash': data_hash
-                },
-                created_by=self.issued_by or self.chairman_approved_by or self.revoked_by,
-                verification_hash=data_hash,
-                is_verified=True,
-                verification_timestamp=timezone.now(),
-                confirmed_at=timezone.now()
-            )
-            
-            return tx_id
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.error(f"Error saving document to blockchain: {str(e)}")
+            operation = 'document_create'
+            created_by = self.issued_by
+            payload = {
+                'document_id': self.document_id,
+                'officer_id': str(self.issued_by.id) if self.issued_by else 'system',
+            }
+        elif action_type == 'approve':
+            operation = 'document_approve'
+            created_by = self.chairman_approved_by
+            payload = {
+                'document_id': self.document_id,
+                'approver_id': str(self.chairman_approved_by.id) if self.chairman_approved_by else None,
+                'comments': 'Approved by chairman',
+            }
+        elif action_type == 'revoke':
+            operation = 'document_revoke'
+            created_by = self.revoked_by
+            payload = {
+                'document_id': self.document_id,
+                'revoker_id': str(self.revoked_by.id) if self.revoked_by else None,
+                'reason': self.revocation_reason or 'Document revoked',
+            }
+        else:
             return None
+        
+        return outbox.enqueue(self, operation, payload, created_by=created_by, data_hash=self.calculate_data_hash())
     
     def add_blockchain_record(self, tx_id, save=True):
         """Add blockchain transaction record"""
@@ -377,7 +346,8 @@ class Document(models.Model):
         }
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
+        # pk là UUID có giá trị mặc định nên không dùng pk is None để nhận biết bản ghi mới
+        is_new = self._state.adding
         
         # Generate document_id if it doesn't exist and is a new record
         if not self.document_id and is_new:
@@ -391,17 +361,13 @@ class Document(models.Model):
             random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=10))
             self.document_id = f"{doc_prefix}-{random_part}"
         
-        # Save document to database first
-        super().save(*args, **kwargs)
-        
-        # Tạm thời comment phần lưu lên blockchain
-        # Lưu lên blockchain nếu là bản ghi mới hoặc chưa được lưu
-        # if (is_new or self.blockchain_status == 'NOT_STORED') and not kwargs.get('update_fields'):
-        #     try:
-        #         # Lưu lên blockchain
-        #         asyncio.ensure_future(self.save_to_blockchain('create'))
-        #     except Exception as e:
-        #         print(f"Error saving document to blockchain: {str(e)}")
+        # Lưu document và đưa thao tác tạo trên blockchain vào outbox trong cùng một transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            # Lưu lên blockchain nếu là bản ghi mới
+            if is_new and not kwargs.get('update_fields'):
+                self.save_to_blockchain('create')
     
     def submit_for_approval(self, requested_by):
         """
@@ -549,24 +515,27 @@ class Document(models.Model):
             print(f"Error getting blockchain history: {str(e)}")
             return {'success': False, 'error': str(e), 'history': []}
 
-class DocumentAttachment(models.Model):
+class DocumentAttachment(BlobReferenceMixin, models.Model):
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='document_attachments')
     file = models.FileField(_('File'), upload_to='attachments/documents/')
     file_name = models.CharField(_('File Name'), max_length=255)
     file_type = models.CharField(_('File Type'), max_length=50)
     uploaded_at = models.DateTimeField(_('Uploaded At'), auto_now_add=True)
     
-    # Blockchain hash to verify file integrity
+    # Blockchain hash to verify file integrity (SHA-256; bản ghi cũ có thể là MD5 32 ký tự)
     file_hash = models.CharField(_('File Hash'), max_length=64, blank=True, null=True)
     
     def save(self, *args, **kwargs):
-        # Calculate file hash if file is available and hash is not set
-        if self.file and not self.file_hash:
-            import hashlib
-            md5 = hashlib.md5()
-            for chunk in self.file.chunks():
-                md5.update(chunk)
-            self.file_hash = md5.hexdigest()
+        # File mới upload dùng hash đã tính khi nhận dữ liệu (utils/uploads.py), không đọc lại file
+        if self.file and (not self.file._committed or not self.file_hash):
+            from utils.uploads import file_digest
+            digest = file_digest(self.file)
+            self.file_hash = digest['sha256']
+            if not self.file_type:
+                self.file_type = digest['content_type']
+            if not self.file._committed:
+                # Nội dung đã có trong storage thì không ghi lại
+                self.store_blob(digest)
         
         super().save(*args, **kwargs)
     
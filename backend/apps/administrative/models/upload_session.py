@@ -0,0 +1,223 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.hashing import StreamHasher
+from utils.uploads import SNIFF_BYTES, StagedUploadedFile, sniff_content_type
+
+# Kích thước mỗi lần đọc body PATCH và ghi xuống đĩa
+CHUNK_SIZE = 64 * 1024
+
+# Hasher của các phiên đang upload trong process này: upload_id -> StreamHasher.
+# Trạng thái SHA-256 không lưu được vào database; khi PATCH rơi vào process khác
+# (hoặc server khởi động lại) hasher bị bỏ và finalize() hash lại file từ đĩa.
+_hashers = {}
+_hashers_lock = threading.Lock()
+
+
+def upload_dir():
+    """Thư mục chứa file đang upload dở"""
+    path = getattr(settings, 'RESUMABLE_UPLOAD_DIR', None) or os.path.join(
+        getattr(settings, 'FILE_UPLOAD_TEMP_DIR', None) or tempfile.gettempdir(), 'resumable-uploads'
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+class UploadOffsetMismatch(Exception):
+    """Upload-Offset của client khác số byte đã nhận"""
+
+
+class UploadLocked(Exception):
+    """Một request khác đang ghi vào phiên upload"""
+
+
+class UploadSession(models.Model):
+    """
+    Phiên upload nhiều phần (kiểu tus) của một tài liệu đính kèm cho yêu cầu
+
+    Client tạo phiên với tổng kích thước, gửi từng đoạn bằng PATCH kèm Upload-Offset
+    (có thể gửi lại từ offset hiện tại sau khi mất kết nối), rồi finalize để tạo Attachment.
+    """
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, verbose_name="Mã phiên upload")
+    request = models.ForeignKey('administrative.AdminRequest', on_delete=models.CASCADE, related_name='upload_sessions', verbose_name="Yêu cầu")
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions', verbose_name="Người tải lên")
+
+    # Thông tin của Attachment sẽ tạo khi finalize
+    file_name = models.CharField(max_length=255, verbose_name="Tên file")
+    name = models.CharField(max_length=255, verbose_name="Tên tài liệu")
+    description = models.TextField(blank=True, null=True, verbose_name="Mô tả")
+    attachment_type = models.CharField(max_length=30, default='supporting_document', verbose_name="Loại tài liệu")
+
+    length = models.PositiveBigIntegerField(verbose_name="Tổng kích thước (bytes)")
+    offset = models.PositiveBigIntegerField(default=0, verbose_name="Số byte đã nhận")
+    attachment = models.ForeignKey('administrative.Attachment', on_delete=models.SET_NULL, null=True, blank=True, related_name='+', verbose_name="Tài liệu đính kèm")
+    # Thời điểm PATCH đang ghi nhận khóa phiên, gia hạn trong lúc ghi; None khi không có ai ghi
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Thời gian khóa ghi")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(verbose_name="Hết hạn")
+
+    def __str__(self):
+        return f"{self.file_name} ({self.offset}/{self.length})"
+
+    @property
+    def path(self):
+        return os.path.join(upload_dir(), f"{self.upload_id.hex}.part")
+
+    @property
+    def is_complete(self):
+        return self.offset == self.length
+
+    @property
+    def is_expired(self):
+        return timezone.now() >= self.expires_at
+
+    def save(self, *args, **kwargs):
+        if not self.expires_at:
+            self.expires_at = self._next_expiry()
+        super().save(*args, **kwargs)
+
+    def append(self, stream, offset):
+        """
+        Ghi tiếp dữ liệu từ stream (body của PATCH) vào cuối file, từng đoạn CHUNK_SIZE
+
+        :param offset: Upload-Offset client gửi, phải bằng số byte đã nhận
+        :return: Offset mới
+        :raises UploadLocked: Request khác đang ghi vào phiên này
+        """
+        self._lock()
+        try:
+            return self._append(stream, offset)
+        finally:
+            UploadSession.objects.filter(pk=self.pk, locked_at=self.locked_at).update(locked_at=None)
+            self.locked_at = None
+
+    def _append(self, stream, offset):
+        # Kích thước file trên đĩa là số byte đã nhận thật sự (PATCH trước có thể bị ngắt giữa chừng)
+        received = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        if offset != received:
+            self._sync_offset(received)
+            raise UploadOffsetMismatch(received)
+
+        key = self.upload_id.hex
+        with _hashers_lock:
+            hasher = _hashers.pop(key, None)
+        if hasher is None and received == 0:
+            hasher = StreamHasher()
+        elif hasher is not None and hasher.size != received:
+            hasher = None
+
+        remaining = self.length - received
+        renew_at = time.monotonic() + self._lock_timeout() / 3
+        try:
+            with open(self.path, 'ab') as output:
+                while remaining > 0:
+                    chunk = stream.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    if time.monotonic() >= renew_at:
+                        # Gia hạn khóa trước khi ghi: request khác có thể đã nhận khóa nếu client gửi quá chậm
+                        self._lock(renew=True)
+                        renew_at = time.monotonic() + self._lock_timeout() / 3
+                    output.write(chunk)
+                    remaining -= len(chunk)
+                    if hasher is not None:
+                        hasher.update(chunk)
+        finally:
+            if hasher is not None:
+                with _hashers_lock:
+                    _hashers[key] = hasher
+            self._sync_offset(self.length - remaining)
+        return self.offset
+
+    def finalize(self):
+        """
+        Tạo Attachment từ file đã nhận đủ; file tạm được chuyển vào storage (hoặc bỏ nếu
+        nội dung đã có, xem ContentBlob)
+        """
+        from .attachment import Attachment
+
+        with _hashers_lock:
+            hasher = _hashers.pop(self.upload_id.hex, None)
+        if hasher is None or hasher.size != self.length:
+            hasher = StreamHasher()
+            with open(self.path, 'rb') as source:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+        with open(self.path, 'rb') as source:
+            head = source.read(SNIFF_BYTES)
+
+        uploaded = StagedUploadedFile(self.path, self.file_name, hasher, sniff_content_type(head, self.file_name))
+        try:
+            attachment = Attachment(
+                request=self.request,
+                name=self.name,
+                description=self.description,
+                attachment_type=self.attachment_type,
+                file=uploaded,
+                uploaded_by=self.uploaded_by,
+            )
+            attachment.save()
+        finally:
+            uploaded.close()
+
+        self.attachment = attachment
+        self.save(update_fields=['attachment', 'updated_at'])
+        self.discard_file()
+        return attachment
+
+    def discard_file(self):
+        with _hashers_lock:
+            _hashers.pop(self.upload_id.hex, None)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, *args, **kwargs):
+        self.discard_file()
+        return super().delete(*args, **kwargs)
+
+    def _lock(self, renew=False):
+        """
+        Nhận (hoặc gia hạn) khóa ghi của phiên bằng một UPDATE có điều kiện
+
+        Khóa cũ hơn RESUMABLE_UPLOAD_LOCK_TIMEOUT giây được coi là của request đã dừng.
+        """
+        now = timezone.now()
+        sessions = UploadSession.objects.filter(pk=self.pk)
+        if renew:
+            sessions = sessions.filter(locked_at=self.locked_at)
+        else:
+            stale = now - timezone.timedelta(seconds=self._lock_timeout())
+            sessions = sessions.filter(Q(locked_at__isnull=True) | Q(locked_at__lt=stale))
+        if not sessions.update(locked_at=now):
+            raise UploadLocked()
+        self.locked_at = now
+        return now
+
+    def _lock_timeout(self):
+        return getattr(settings, 'RESUMABLE_UPLOAD_LOCK_TIMEOUT', 60)
+
+    def _sync_offset(self, received):
+        if received != self.offset:
+            # Phiên còn nhận dữ liệu thì gia hạn
+            self.offset = received
+            self.expires_at = self._next_expiry()
+            self.save(update_fields=['offset', 'expires_at', 'updated_at'])
+
+    def _next_expiry(self):
+        return timezone.now() + timezone.timedelta(seconds=getattr(settings, 'RESUMABLE_UPLOAD_EXPIRY', 86400))
+
+    class Meta:
+        verbose_name = "Phiên upload"
+        verbose_name_plural = "Phiên upload"
+        ordering = ['-created_at']
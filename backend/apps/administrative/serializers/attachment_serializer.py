@@ -9,9 +9,10 @@ class AttachmentSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = Attachment
-        fields = '__all__'
+        # Không trả về SHA-256 nội dung file và blob lưu trữ
+        exclude = ['verification_hash', 'blob']
         read_only_fields = ['attachment_id', 'file_size', 'file_type', 'created_at', 'updated_at',
-                           'verification_hash', 'verification_date', 'verified_by',
+                           'verification_date', 'verified_by',
                            'is_stored_blockchain', 'blockchain_transaction_id']
 
 
@@ -65,9 +66,10 @@ class AttachmentDetailSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Attachment
-        fields = '__all__'
+        # Không trả về SHA-256 nội dung file và blob lưu trữ
+        exclude = ['verification_hash', 'blob']
         read_only_fields = ['attachment_id', 'file_size', 'file_type', 'created_at', 'updated_at',
-                           'verification_hash', 'verification_date', 'verified_by',
+                           'verification_date', 'verified_by',
                            'is_stored_blockchain', 'blockchain_transaction_id']
     
     def get_uploaded_by_name(self, obj):
@@ -1,10 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 import uuid
 
 from apps.administrative.models.request import AdminRequest
-from apps.administrative.models.document import Document
+from apps.administrative.models.document import Document, DocumentAttachment
+from apps.administrative.models.attachment import Attachment
+from apps.administrative.models.content_blob import ContentBlob
 
 @receiver(post_save, sender=AdminRequest)
 def auto_connect_document_to_completed_request(sender, instance, created, **kwargs):
@@ -52,4 +54,15 @@ def auto_connect_document_to_completed_request(sender, instance, created, **kwar
             print(f"Đã tự động tạo document {document.document_id} cho yêu cầu {instance.request_id}")
             
         except Exception as e:
-            print(f"Lỗi khi tự động tạo document cho yêu cầu {instance.request_id}: {str(e)}") 
\ No newline at end of file
+            print(f"Lỗi khi tự động tạo document cho yêu cầu {instance.request_id}: {str(e)}")
+
+
+@receiver(post_delete, sender=Attachment)
+@receiver(post_delete, sender=DocumentAttachment)
+def release_content_blob(sender, instance, **kwargs):
+    """
+    Giảm số tham chiếu của blob khi xóa tài liệu đính kèm (kể cả xóa theo cascade);
+    file chỉ bị xóa khi chạy collect_content_blobs
+    """
+    if instance.blob_id:
+        ContentBlob.objects.release(instance.blob_id)
@@ -0,0 +1,21 @@
+import datetime
+from django.test import TestCase
+
+from apps.administrative.models import Document
+
+# 05:30 ngày 16/03 theo giờ Việt Nam (TIME_ZONE), vẫn là ngày 15/03 theo UTC
+BEFORE_7AM_LOCAL = datetime.datetime(2024, 3, 15, 22, 30, tzinfo=datetime.timezone.utc)
+
+
+class DocumentDataHashTests(TestCase):
+    def test_hash_uses_local_date_of_valid_from(self):
+        document = Document.objects.create(
+            document_id='DOC-1', document_type='birth_certificate', title='Test', valid_from=BEFORE_7AM_LOCAL
+        )
+        stored_hash = document.data_hash
+
+        document = Document.objects.get(pk=document.pk)
+
+        self.assertEqual(document.valid_from, datetime.date(2024, 3, 16))
+        self.assertEqual(document.data_hash, stored_hash)
+        self.assertEqual(document.compute_data_hash(), stored_hash)
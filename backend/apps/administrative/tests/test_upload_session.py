@@ -0,0 +1,65 @@
+import io
+import os
+import shutil
+import tempfile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.administrative.models import AdminRequest, DocumentType, UploadSession
+from apps.administrative.models.upload_session import UploadLocked, UploadOffsetMismatch
+
+UPLOAD_DIR = tempfile.mkdtemp(prefix='upload-session-tests-')
+
+
+def tearDownModule():
+    shutil.rmtree(UPLOAD_DIR, ignore_errors=True)
+
+
+@override_settings(RESUMABLE_UPLOAD_DIR=UPLOAD_DIR, RESUMABLE_UPLOAD_LOCK_TIMEOUT=60)
+class UploadSessionAppendTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='citizen@example.com', password='secret')
+        document_type = DocumentType.objects.create(name='Giấy khai sinh', code='KS')
+        request = AdminRequest.objects.create(
+            request_id='REQ-1', reference_number='REF-1', document_type=document_type, title='Test', requestor=user
+        )
+        self.session = UploadSession.objects.create(
+            request=request, uploaded_by=user, file_name='scan.pdf', name='Scan', length=10
+        )
+        self.addCleanup(self.session.discard_file)
+
+    def received(self):
+        return os.path.getsize(self.session.path) if os.path.exists(self.session.path) else 0
+
+    def test_appends_and_releases_lock(self):
+        self.assertEqual(self.session.append(io.BytesIO(b'12345'), 0), 5)
+        self.assertEqual(self.session.append(io.BytesIO(b'67890'), 5), 10)
+
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.locked_at)
+        self.assertTrue(self.session.is_complete)
+
+    def test_concurrent_append_is_rejected(self):
+        # Một PATCH khác đang giữ khóa
+        UploadSession.objects.filter(pk=self.session.pk).update(locked_at=timezone.now())
+
+        with self.assertRaises(UploadLocked):
+            self.session.append(io.BytesIO(b'12345'), 0)
+        self.assertEqual(self.received(), 0)
+
+    def test_stale_lock_is_taken_over(self):
+        UploadSession.objects.filter(pk=self.session.pk).update(
+            locked_at=timezone.now() - timezone.timedelta(seconds=61)
+        )
+        self.assertEqual(self.session.append(io.BytesIO(b'12345'), 0), 5)
+
+    def test_offset_mismatch_releases_lock(self):
+        self.session.append(io.BytesIO(b'12345'), 0)
+
+        with self.assertRaises(UploadOffsetMismatch):
+            self.session.append(io.BytesIO(b'12345'), 0)
+
+        self.session.refresh_from_db()
+        self.assertIsNone(self.session.locked_at)
+        self.assertEqual(self.received(), 5)
@@ -4,9 +4,10 @@ from rest_framework.response import Response
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.db.models import Q
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+import os
 
-from ..models import AdminRequest, Attachment
+from ..models import AdminRequest, Attachment, ContentBlob
 from ..serializers import (
     RequestSerializer, RequestListSerializer, RequestDetailSerializer, 
     RequestCreateSerializer, SubmitRequestSerializer, OfficerRequestUpdateSerializer,
@@ -234,7 +235,46 @@ class AttachmentViewSet(viewsets.ModelViewSet):
             self.permission_denied(self.request)
         
         serializer.save(uploaded_by=self.request.user)
-    
+
+    @action(detail=False, methods=['post'], url_path='by-hash', parser_classes=[JSONParser, MultiPartParser, FormParser])
+    def create_by_hash(self, request):
+        """
+        Tạo tài liệu đính kèm từ SHA-256 của file người dùng đã tải lên trước đó (trong các
+        tài liệu đính kèm họ được xem), không cần gửi lại file.
+        Trả về 404 nếu không có, khi đó client upload file như bình thường.
+        """
+        sha256 = (request.data.get('sha256') or '').lower()
+        if len(sha256) != 64:
+            return Response({"error": "sha256 không hợp lệ"}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_obj = get_object_or_404(AdminRequest, pk=request.data.get('request'))
+        if not (request.user.is_staff or
+                request.user.role in ['chairman', 'officer'] or
+                request_obj.requestor == request.user):
+            self.permission_denied(request)
+
+        # Chỉ dùng lại nội dung người dùng đã có quyền truy cập: biết mã băm không chứng minh
+        # được có file, và trả lời khác nhau sẽ lộ file của người khác có tồn tại hay không
+        owned = self.get_queryset().filter(blob__sha256=sha256).values('blob')
+        blob = ContentBlob.objects.filter(pk__in=owned).first()
+        if blob is None or not blob.file.storage.exists(blob.file.name):
+            return Response({"error": "Không tìm thấy file với mã băm này, vui lòng tải file lên"}, status=status.HTTP_404_NOT_FOUND)
+
+        attachment = Attachment(
+            request=request_obj,
+            name=request.data.get('name') or os.path.basename(blob.file.name),
+            description=request.data.get('description'),
+            attachment_type=request.data.get('attachment_type', 'supporting_document'),
+            file=blob.file.name,
+            blob=blob,
+            file_size=blob.size,
+            file_type=blob.content_type,
+            verification_hash=blob.sha256,
+            uploaded_by=request.user,
+        )
+        attachment.save()
+        return Response(AttachmentSerializer(attachment).data, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['patch'])
     def verify_attachment(self, request, pk=None):
         """API xác thực tài liệu đính kèm (chỉ dành cho cán bộ xã và chủ tịch)"""
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+
+from apps.blockchain.services.anchoring import DocumentAnchorService
+
+
+class Command(BaseCommand):
+    help = 'Neo các giấy tờ đang chờ lên blockchain theo lô Merkle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Neo toàn bộ giấy tờ đang chờ rồi thoát')
+        parser.add_argument('--interval', type=float, default=1.0, help='Số giây giữa hai lần kiểm tra hàng chờ')
+
+    def handle(self, *args, **options):
+        anchor_service = DocumentAnchorService()
+
+        if options['once']:
+            batches = anchor_service.flush_all()
+            self._report(batches)
+            return
+
+        self.stdout.write(
+            f'Đang neo giấy tờ theo lô (tối đa {anchor_service.batch_size} giấy tờ, '
+            f'cửa sổ {anchor_service.batch_window}s)...'
+        )
+
+        try:
+            while True:
+                anchor_service.retry_failed()
+                batch = anchor_service.flush()
+                if batch:
+                    self._report([batch])
+                else:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
+
+    def _report(self, batches):
+        for batch in batches:
+            style = self.style.ERROR if batch.status in ('failed', 'abandoned') else self.style.SUCCESS
+            self.stdout.write(style(
+                f'{batch.batch_id}: {batch.leaf_count} giấy tờ, root {batch.merkle_root}, '
+                f'trạng thái {batch.status}, tx {batch.transaction_hash}'
+            ))
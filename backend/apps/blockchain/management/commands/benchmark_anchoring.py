@@ -0,0 +1,92 @@
+import hashlib
+import json
+import math
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.blockchain.services import merkle
+from apps.blockchain.services.blockchain_service import BlockchainService
+
+
+class Command(BaseCommand):
+    help = 'So sánh số giấy tờ/giây giữa neo từng giấy tờ và neo theo lô Merkle'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=200, help='Số giấy tờ giả lập')
+        parser.add_argument('--batch-size', type=int, default=500, help='Số giấy tờ mỗi lô Merkle')
+        parser.add_argument('--skip-single', action='store_true', help='Bỏ qua đo neo từng giấy tờ')
+
+    def handle(self, *args, **options):
+        count = options['documents']
+        batch_size = options['batch_size']
+
+        blockchain_service = BlockchainService()
+        if not blockchain_service.document_contract:
+            raise CommandError('Document contract chưa được cấu hình')
+
+        run_id = uuid.uuid4().hex[:8]
+        data_hashes = [hashlib.sha256(f'{run_id}-{i}'.encode()).hexdigest() for i in range(count)]
+
+        results = {}
+
+        if not options['skip_single']:
+            started = time.perf_counter()
+            failures = 0
+            for i, data_hash in enumerate(data_hashes):
+                transaction = blockchain_service.document_contract.functions.createDocument(
+                    f'BENCH-{run_id}-{i}',
+                    'benchmark',
+                    '0',
+                    'benchmark',
+                    timezone.now().isoformat(),
+                    'UNLIMITED',
+                    data_hash,
+                    '{}'
+                )
+                if not blockchain_service._sign_and_send_transaction(transaction, wait_for_receipt=True).get('success'):
+                    failures += 1
+            elapsed = time.perf_counter() - started
+            results['single'] = {
+                'documents': count,
+                'transactions': count,
+                'failures': failures,
+                'seconds': round(elapsed, 3),
+                'documents_per_second': round(count / elapsed, 2) if elapsed else None,
+            }
+
+        started = time.perf_counter()
+        tree_seconds = 0.0
+        failures = 0
+        batches = math.ceil(count / batch_size)
+        for b in range(batches):
+            chunk = data_hashes[b * batch_size:(b + 1) * batch_size]
+
+            tree_started = time.perf_counter()
+            levels = merkle.build_tree(chunk)
+            root = merkle.merkle_root(levels)
+            for index in range(len(chunk)):
+                merkle.inclusion_proof(levels, index)
+            tree_seconds += time.perf_counter() - tree_started
+
+            result = blockchain_service.anchor_merkle_root(f'MRK-BENCH-{run_id}-{b}', root, len(chunk))
+            if not result.get('success'):
+                failures += 1
+        elapsed = time.perf_counter() - started
+        results['batch'] = {
+            'documents': count,
+            'transactions': batches,
+            'batch_size': batch_size,
+            'failures': failures,
+            'seconds': round(elapsed, 3),
+            'tree_seconds': round(tree_seconds, 3),
+            'documents_per_second': round(count / elapsed, 2) if elapsed else None,
+        }
+
+        if 'single' in results and results['single']['documents_per_second']:
+            results['speedup'] = round(
+                results['batch']['documents_per_second'] / results['single']['documents_per_second'], 1
+            )
+
+        self.stdout.write(json.dumps(results, indent=2))
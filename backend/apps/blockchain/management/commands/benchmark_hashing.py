@@ -0,0 +1,68 @@
+import hashlib
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.hashing import canonical_json, hash_data, hash_data_many
+
+
+class Command(BaseCommand):
+    help = 'Đo tốc độ hash dữ liệu (utils/hashing.py) so với json.dumps + sha256'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--records', type=int, default=5000, help='Số bản ghi giả lập')
+        parser.add_argument('--content-bytes', type=int, default=256, help='Kích thước gần đúng của trường content mỗi bản ghi')
+        parser.add_argument('--workers', type=int, default=4, help='Số thread của hash_data_many')
+        parser.add_argument('--repeat', type=int, default=3, help='Số lần đo, lấy lần nhanh nhất')
+
+    def handle(self, *args, **options):
+        records = [self._record(index, options['content_bytes']) for index in range(options['records'])]
+        expected = [self._legacy(record) for record in records]
+
+        cases = {
+            'legacy': lambda: [self._legacy(record) for record in records],
+            'hash_data': lambda: [hash_data(record) for record in records],
+            'hash_data_many': lambda: hash_data_many(records, workers=1),
+            f'hash_data_many_{options["workers"]}_workers': lambda: hash_data_many(records, workers=options['workers']),
+        }
+
+        results = {}
+        for name, run in cases.items():
+            best = None
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                hashes = run()
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            if hashes != expected:
+                raise CommandError(f'{name} cho kết quả khác json.dumps + sha256')
+            results[name] = {
+                'seconds': round(best, 4),
+                'records_per_second': round(len(records) / best) if best else None,
+            }
+
+        baseline = results['legacy']['seconds']
+        for result in results.values():
+            result['speedup'] = round(baseline / result['seconds'], 2) if result['seconds'] else None
+
+        self.stdout.write(json.dumps({
+            'records': len(records),
+            'bytes_per_record': round(sum(len(canonical_json(record)) for record in records) / len(records)) if records else 0,
+            'results': results,
+        }, indent=2))
+
+    def _record(self, index, content_bytes):
+        return {
+            'document_id': f'BENCH-{index:08d}',
+            'document_type': 'birth_certificate',
+            'title': f'Giấy tờ {index}',
+            'issue_date': '2024-03-15',
+            'valid_from': '2024-03-15',
+            'valid_until': None,
+            'content': {'field': 'x' * content_bytes, 'index': index},
+            'citizen_id': str(index % 1000),
+            'status': 'DRAFT',
+        }
+
+    def _legacy(self, record):
+        return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
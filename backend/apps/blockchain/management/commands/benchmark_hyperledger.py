@@ -0,0 +1,110 @@
+import asyncio
+import json
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blockchain.services.fabric_simulator import PROFILES, ChaincodeError, FabricSimulator, MVCCConflictError
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * percent / 100))], 4)
+
+
+class Command(BaseCommand):
+    help = 'Đo thông lượng và độ trễ của luồng giấy tờ trên ledger Fabric giả lập'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=200, help='Số giấy tờ tạo mới')
+        parser.add_argument('--concurrency', type=int, default=50, help='Số giao dịch gửi đồng thời')
+        parser.add_argument('--profile', default='lan', choices=sorted(PROFILES), help='Profile độ trễ')
+        parser.add_argument('--seed', type=int, default=0, help='Seed cho độ trễ và khối lượng công việc')
+        parser.add_argument('--batch-size', type=int, help='Ghi đè MaxMessageCount của orderer')
+        parser.add_argument('--batch-timeout', type=float, help='Ghi đè BatchTimeout (giây) của orderer')
+        parser.add_argument('--hot-documents', type=int, default=0,
+                            help='Dồn các giao dịch duyệt vào N giấy tờ đầu để tạo xung đột MVCC (0: mỗi giấy tờ một lần)')
+        parser.add_argument('--queries', type=int, default=200, help='Số lời gọi readDocument')
+
+    def handle(self, *args, **options):
+        if options['documents'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--documents và --concurrency phải lớn hơn 0')
+
+        overrides = {}
+        if options['batch_size']:
+            overrides['batch_size'] = options['batch_size']
+        if options['batch_timeout'] is not None:
+            overrides['batch_timeout'] = options['batch_timeout']
+
+        simulator = FabricSimulator(options['profile'], options['seed'], overrides)
+        results = asyncio.run(self._run(simulator, options))
+        results['ledger'] = {
+            'blocks': len(simulator.blocks),
+            'average_block_size': round(
+                sum(len(block['transactions']) for block in simulator.blocks) / len(simulator.blocks), 2
+            ) if simulator.blocks else 0,
+            'stats': simulator.stats,
+        }
+        self.stdout.write(json.dumps(results, indent=2))
+
+    async def _run(self, simulator, options):
+        rng = random.Random(options['seed'])
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        count = options['documents']
+        document_ids = [f'BENCH-{i}' for i in range(count)]
+
+        create = [
+            ('invoke', 'createDocument', [document_id, 'benchmark', f'CITIZEN-{i % 50}', 'OFFICER-1', '{}', f'{i:064x}'])
+            for i, document_id in enumerate(document_ids)
+        ]
+        submit = [('invoke', 'submitDocument', [document_id]) for document_id in document_ids]
+
+        if options['hot_documents']:
+            targets = [rng.choice(document_ids[:options['hot_documents']]) for _ in range(count)]
+        else:
+            targets = document_ids
+        approve = [('invoke', 'approveDocument', [document_id, 'CHAIRMAN-1', '']) for document_id in targets]
+        query = [('query', 'readDocument', [rng.choice(document_ids)]) for _ in range(options['queries'])]
+
+        return {
+            'profile': options['profile'],
+            'seed': options['seed'],
+            'concurrency': options['concurrency'],
+            'phases': {
+                name: await self._phase(simulator, semaphore, calls)
+                for name, calls in (('create', create), ('submit', submit), ('approve', approve), ('query', query))
+                if calls
+            },
+        }
+
+    async def _phase(self, simulator, semaphore, calls):
+        latencies = []
+        outcomes = {'success': 0, 'mvcc_conflict': 0, 'chaincode_error': 0}
+
+        async def run(kind, function_name, args):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await getattr(simulator, kind)('document_contract', function_name, args)
+                    outcomes['success'] += 1
+                except MVCCConflictError:
+                    outcomes['mvcc_conflict'] += 1
+                except ChaincodeError:
+                    outcomes['chaincode_error'] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(run(*call) for call in calls))
+        elapsed = time.perf_counter() - started
+
+        return {
+            'calls': len(calls),
+            **outcomes,
+            'seconds': round(elapsed, 3),
+            'per_second': round(outcomes['success'] / elapsed, 2) if elapsed else None,
+            'latency_p50': _percentile(latencies, 50),
+            'latency_p95': _percentile(latencies, 95),
+            'latency_p99': _percentile(latencies, 99),
+        }
@@ -0,0 +1,359 @@
+import hashlib
+import json
+import platform
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from hexbytes import HexBytes
+from web3 import Web3
+
+MODES = ('serial', 'pipelined', 'batched')
+
+# Role trong DocumentContract, các tài khoản ký được cấp cả hai để tạo và duyệt giấy tờ
+ROLES = ('OFFICER_ROLE', 'CHAIRMAN_ROLE')
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * percent / 100))], 4)
+
+
+class ReceiptWatcher:
+    """
+    Chờ receipt của nhiều giao dịch bằng JSON-RPC batch, như ReceiptTracker
+
+    Receipt được hỏi trong thread nền ngay từ giao dịch đầu tiên, thời điểm receipt
+    xuất hiện lần đầu được ghi lại để tính độ trễ xác nhận.
+    """
+
+    def __init__(self, rpc, poll_interval):
+        self.rpc = rpc
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.confirmed = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._stopped = threading.Event()
+        self._error = None
+        self._thread = None
+
+    def add(self, tx_hash):
+        with self._lock:
+            self.pending[tx_hash] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='receipt-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self.poll()
+                with self._lock:
+                    # Đã gửi xong và không còn giao dịch chờ receipt
+                    if self._closed.is_set() and not self.pending:
+                        return
+                self._stopped.wait(self.poll_interval)
+        except Exception as e:
+            self._error = e
+
+    def poll(self):
+        with self._lock:
+            hashes = list(self.pending)
+        if not hashes:
+            return
+        receipts = self.rpc.batch([('eth_getTransactionReceipt', [tx_hash]) for tx_hash in hashes])
+        now = time.perf_counter()
+        with self._lock:
+            for tx_hash, receipt in zip(hashes, receipts):
+                if isinstance(receipt, dict):
+                    self.confirmed[tx_hash] = (now, int(receipt['status'], 16) == 1)
+                    self.pending.pop(tx_hash, None)
+
+    def wait(self, timeout):
+        """
+        Chờ receipt của mọi giao dịch đã add, gọi sau khi đã gửi xong
+        """
+        self._closed.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._stopped.set()
+            self._thread.join()
+            raise CommandError(f'{len(self.pending)} transactions were not confirmed in {timeout}s')
+        if self._error is not None:
+            raise CommandError(f'Error polling receipts: {self._error}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Đo thông lượng ghi (createDocument, submitForApproval, approveDocument) của BlockchainService '
+        'trên node EVM trong process (eth-tester/py-evm) với contract trong blockchain/contracts/solidity'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=200, help='Số giấy tờ mỗi chế độ')
+        parser.add_argument('--modes', default=','.join(MODES), help=f'Các chế độ, phân cách bằng dấu phẩy ({", ".join(MODES)})')
+        parser.add_argument('--concurrency', type=int, default=16, help='Số giao dịch gửi đồng thời (pipelined, batched)')
+        parser.add_argument('--signers', type=int, default=4, help='Số tài khoản ký (lane của SignerPool)')
+        parser.add_argument('--batch-size', type=int, default=50, help='Số giấy tờ mỗi lô Merkle (batched)')
+        parser.add_argument('--block-time', type=float, default=0, help='Số giây giữa hai block, 0: đào ngay khi có giao dịch')
+        parser.add_argument('--poll-interval', type=float, default=0.05, help='Số giây giữa hai lần hỏi receipt (pipelined, batched)')
+        parser.add_argument('--artifacts', help='Thư mục chứa ABI và bytecode đã biên dịch, bỏ qua bước biên dịch')
+        parser.add_argument('--solc-version', help='Phiên bản solc, mặc định BLOCKCHAIN_SOLC_VERSION')
+        parser.add_argument('--openzeppelin', help='Thư mục @openzeppelin (OpenZeppelin Contracts 4.x)')
+        parser.add_argument('--output', help='Ghi báo cáo JSON vào file thay vì stdout')
+        parser.add_argument('--baseline', help='Báo cáo JSON của lần chạy trước để so sánh')
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'Unknown modes: {", ".join(sorted(unknown))}')
+        if options['documents'] < 1 or options['concurrency'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--documents, --concurrency và --batch-size phải lớn hơn 0')
+
+        from apps.blockchain.services.local_evm import LocalEVMNode, compile_contracts, load_artifacts
+
+        try:
+            if options['artifacts']:
+                artifacts = load_artifacts(['document_contract'], options['artifacts'])
+            else:
+                artifacts = compile_contracts(['document_contract'], options['solc_version'], options['openzeppelin'])
+            node = LocalEVMNode(options['block_time']).start()
+        except (ImportError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        accounts = node.accounts
+        if not 1 <= options['signers'] < len(accounts):
+            raise CommandError(f'--signers phải từ 1 đến {len(accounts) - 1}')
+        signers = accounts[1:1 + options['signers']]
+
+        try:
+            document = artifacts['document_contract']
+            address = node.deploy(document['abi'], document['bytecode'])
+            for role in ROLES:
+                role_id = Web3.keccak(text=role)
+                for signer, _ in signers:
+                    node.transact(address, document['abi'], 'grantRole', (role_id, signer))
+
+            with tempfile.TemporaryDirectory() as abi_dir:
+                with open(f'{abi_dir}/document_contract.json', 'w') as f:
+                    json.dump({'contractName': 'DocumentContract', 'abi': document['abi']}, f)
+
+                with override_settings(
+                    WEB3_PROVIDER_URI=node.uri,
+                    WEB3_PROVIDER_URIS=[],
+                    WEB3_SEQUENCER_URI=None,
+                    CONTRACT_ABI_DIR=abi_dir,
+                    DOCUMENT_CONTRACT_ADDRESS=address,
+                    BLOCKCHAIN_SIGNER_ACCOUNTS=[private_key for _, private_key in signers],
+                    BLOCKCHAIN_SIGNER_MAX_IN_FLIGHT=options['concurrency'],
+                    BLOCKCHAIN_RECEIPT_WAIT_TIMEOUT=max(30, options['block_time'] * 10),
+                    BLOCKCHAIN_ANCHOR_MODE='single',
+                ):
+                    report = self._run(node, modes, options)
+        finally:
+            node.stop()
+
+        report['comparison'] = self._compare(report, options['baseline']) if options['baseline'] else None
+
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    def _run(self, node, modes, options):
+        from apps.blockchain.services.blockchain_service import BlockchainService
+        from apps.blockchain.services.signer_pool import get_signer_pool
+
+        service = BlockchainService(wait_for_receipt=False)
+        if service.document_contract is None:
+            raise CommandError('Document contract chưa được cấu hình')
+
+        # Bộ đếm nonce trong database có thể còn từ lần chạy trước trên chain khác
+        for lane in get_signer_pool().lanes:
+            lane.nonce_manager(service.web3).resync()
+
+        report = {
+            'benchmark': 'transactions',
+            'created_at': timezone.now().isoformat(),
+            'environment': {'python': platform.python_version(), 'node': 'eth-tester/py-evm'},
+            'options': {
+                key: options[key]
+                for key in ('documents', 'concurrency', 'signers', 'batch_size', 'block_time', 'poll_interval')
+            },
+            'modes': {},
+        }
+
+        for mode in modes:
+            run_id = uuid.uuid4().hex[:8]
+            document_ids = [f'BENCH-{run_id}-{i}' for i in range(options['documents'])]
+            if mode == 'batched':
+                report['modes'][mode] = {'anchor': self._batched(node, service, document_ids, options)}
+                continue
+
+            phases = {}
+            for phase, build in self._phases(service):
+                transactions = [build(document_id) for document_id in document_ids]
+                if mode == 'serial':
+                    phases[phase] = self._serial(node, service, transactions)
+                else:
+                    phases[phase] = self._pipelined(node, service, transactions, options)
+            report['modes'][mode] = phases
+
+        return report
+
+    def _phases(self, service):
+        functions = service.document_contract.functions
+        now = timezone.now().isoformat()
+
+        def create(document_id):
+            data_hash = hashlib.sha256(document_id.encode()).hexdigest()
+            return functions.createDocument(document_id, 'benchmark', '0', 'benchmark', now, 'UNLIMITED', data_hash, '{}')
+
+        return (
+            ('create', create),
+            ('submit', lambda document_id: functions.submitForApproval(document_id)),
+            ('approve', lambda document_id: functions.approveDocument(document_id, 'benchmark', '')),
+        )
+
+    def _serial(self, node, service, transactions):
+        """
+        Từng giao dịch một: gửi rồi chờ receipt trước khi gửi giao dịch tiếp theo
+        """
+        submit_latencies, confirm_latencies, failures = [], [], 0
+
+        node.reset_stats()
+        started = time.perf_counter()
+        for transaction in transactions:
+            sent = time.perf_counter()
+            result = service._sign_and_send_transaction(transaction, wait_for_receipt=False)
+            submit_latencies.append(time.perf_counter() - sent)
+            if not result.get('success'):
+                failures += 1
+                continue
+
+            receipt = service._wait_for_receipt(HexBytes(result['txId']))
+            confirm_latencies.append(time.perf_counter() - sent)
+            if receipt is None or receipt.status != 1:
+                failures += 1
+        elapsed = time.perf_counter() - started
+
+        return self._summary(node, len(transactions), len(transactions), failures, elapsed, submit_latencies, confirm_latencies)
+
+    def _pipelined(self, node, service, transactions, options, submit=None):
+        """
+        Gửi không chờ receipt với nhiều giao dịch đồng thời, receipt được hỏi theo batch
+        trong lúc vẫn đang gửi
+
+        :param submit: Hàm gửi một phần tử của transactions, mặc định _sign_and_send_transaction
+        """
+        from apps.blockchain.services.rpc import JsonRpcClient
+
+        if submit is None:
+            def submit(transaction):
+                return service._sign_and_send_transaction(transaction, wait_for_receipt=False)
+
+        watcher = ReceiptWatcher(JsonRpcClient(), options['poll_interval'])
+        submit_latencies, sent_at, failures = [], {}, [0]
+        lock = threading.Lock()
+
+        def send(transaction):
+            sent = time.perf_counter()
+            result = submit(transaction)
+            with lock:
+                submit_latencies.append(time.perf_counter() - sent)
+                if not result.get('success'):
+                    failures[0] += 1
+                    return
+                sent_at[result['txId']] = sent
+            watcher.add(result['txId'])
+
+        node.reset_stats()
+        started = time.perf_counter()
+        watcher.start()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(send, transactions))
+        watcher.wait(max(60, options['block_time'] * 20))
+        elapsed = time.perf_counter() - started
+
+        confirm_latencies = [watcher.confirmed[tx_hash][0] - sent for tx_hash, sent in sent_at.items()]
+        failures = failures[0] + sum(1 for _, ok in watcher.confirmed.values() if not ok)
+        return self._summary(node, len(transactions), len(transactions), failures, elapsed, submit_latencies, confirm_latencies)
+
+    def _batched(self, node, service, document_ids, options):
+        """
+        Neo theo lô Merkle qua DocumentAnchorService và BlockchainService.anchor_merkle_root:
+        mỗi lô batch_size giấy tờ là một giao dịch, gửi như chế độ pipelined
+        """
+        batch_size = options['batch_size']
+        chunks = [document_ids[i:i + batch_size] for i in range(0, len(document_ids), batch_size)]
+
+        def anchor(chunk):
+            # Không tạo Document/DocumentAnchor trong database, chỉ dựng cây và gửi root
+            root, _ = service.anchor_service.build_tree(
+                [hashlib.sha256(document_id.encode()).hexdigest() for document_id in chunk]
+            )
+            return service.anchor_merkle_root(service.generate_blockchain_id(prefix='MRK'), root, len(chunk))
+
+        result = self._pipelined(node, service, chunks, options, submit=anchor)
+        # Thông lượng tính theo giấy tờ, RPC tính trên mỗi giấy tờ
+        result['operations'] = len(document_ids)
+        result['operations_per_second'] = round(len(document_ids) / result['seconds'], 2) if result['seconds'] else None
+        result['rpc_requests_per_operation'] = round(result['rpc']['requests'] / len(document_ids), 3)
+        result['rpc_calls_per_operation'] = round(result['rpc']['calls'] / len(document_ids), 3)
+        result['batch_size'] = batch_size
+        return result
+
+    def _summary(self, node, operations, transactions, failures, elapsed, submit_latencies, confirm_latencies):
+        stats = node.stats()
+        return {
+            'operations': operations,
+            'transactions': transactions,
+            'failures': failures,
+            'seconds': round(elapsed, 3),
+            'operations_per_second': round(operations / elapsed, 2) if elapsed else None,
+            'transactions_per_second': round((transactions - failures) / elapsed, 2) if elapsed else None,
+            'submit_latency': {'p50': _percentile(submit_latencies, 50), 'p99': _percentile(submit_latencies, 99)},
+            'confirm_latency': {'p50': _percentile(confirm_latencies, 50), 'p99': _percentile(confirm_latencies, 99)},
+            'rpc': stats,
+            'rpc_requests_per_operation': round(stats['requests'] / operations, 3),
+            'rpc_calls_per_operation': round(stats['calls'] / operations, 3),
+        }
+
+    def _compare(self, report, baseline_path):
+        """
+        Thay đổi (%) của thông lượng, độ trễ p99 và số RPC mỗi thao tác so với báo cáo trước
+        """
+        with open(baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+        def change(current, previous):
+            if current is None or not previous:
+                return None
+            return round((current - previous) / previous * 100, 1)
+
+        comparison = {}
+        for mode, phases in report['modes'].items():
+            for phase, result in phases.items():
+                previous = baseline.get('modes', {}).get(mode, {}).get(phase)
+                if previous is None:
+                    continue
+                comparison[f'{mode}.{phase}'] = {
+                    'operations_per_second': change(result['operations_per_second'], previous.get('operations_per_second')),
+                    'submit_latency_p99': change(result['submit_latency']['p99'], previous.get('submit_latency', {}).get('p99')),
+                    'confirm_latency_p99': change(result['confirm_latency']['p99'], previous.get('confirm_latency', {}).get('p99')),
+                    'rpc_calls_per_operation': change(result['rpc_calls_per_operation'], previous.get('rpc_calls_per_operation')),
+                }
+        return {'baseline': baseline_path, 'baseline_created_at': baseline.get('created_at'), 'changes_percent': comparison}
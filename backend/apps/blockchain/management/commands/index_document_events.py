@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+
+from apps.blockchain.services.indexer import DocumentEventIndexer
+
+
+class Command(BaseCommand):
+    help = 'Đọc event của DocumentContract và lưu lịch sử giấy tờ vào database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Đọc đến block mới nhất rồi thoát')
+        parser.add_argument('--interval', type=float, default=2.0, help='Số giây chờ khi đã bắt kịp block mới nhất')
+
+    def handle(self, *args, **options):
+        indexer = DocumentEventIndexer()
+
+        if options['once']:
+            count = indexer.run_until_head()
+            self.stdout.write(self.style.SUCCESS(f'Đã lưu {count} event.'))
+            return
+
+        self.stdout.write(f'Đang đọc event của {indexer.contract_address} (độ sâu reorg {indexer.reorg_depth} block)...')
+
+        try:
+            while True:
+                try:
+                    result = indexer.tick()
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Lỗi khi đọc event: {str(e)}'))
+                    time.sleep(options['interval'])
+                    continue
+
+                if result['events'] or result['reorg']:
+                    self.stdout.write(str(result))
+                if not result['reorg'] and result.get('head', result['last_block']) <= result['last_block']:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
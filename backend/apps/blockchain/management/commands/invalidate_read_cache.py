@@ -0,0 +1,41 @@
+import time
+from django.core.management.base import BaseCommand
+
+from apps.blockchain.services.read_cache import ReadCacheInvalidator, get_read_cache
+
+
+class Command(BaseCommand):
+    help = 'Đọc event log của các contract và bỏ các kết quả đọc contract đã cũ khỏi cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Xử lý đến block mới nhất rồi thoát')
+        parser.add_argument('--clear', action='store_true', help='Bỏ toàn bộ cache đọc contract rồi thoát')
+        parser.add_argument('--interval', type=float, default=1.0, help='Số giây chờ khi đã bắt kịp block mới nhất')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            get_read_cache().invalidate_all()
+            self.stdout.write(self.style.SUCCESS('Đã bỏ toàn bộ cache đọc contract.'))
+            return
+
+        invalidator = ReadCacheInvalidator()
+        self.stdout.write(f'Đang theo dõi event của {len(invalidator.addresses)} contract...')
+
+        try:
+            while True:
+                try:
+                    result = invalidator.tick()
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Lỗi khi đọc event: {str(e)}'))
+                    time.sleep(options['interval'])
+                    continue
+
+                if result['invalidated'] or result['reorg']:
+                    self.stdout.write(str(result))
+
+                if result['last_block'] >= result['head']:
+                    if options['once']:
+                        return
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
@@ -0,0 +1,37 @@
+import asyncio
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.blockchain.models import IndexerCheckpoint
+from apps.blockchain.services.fabric_events import FabricBlockListener
+from apps.blockchain.services.hyperledger import HyperledgerService
+
+
+class Command(BaseCommand):
+    help = 'Nhận block của kênh Hyperledger Fabric và cập nhật trạng thái BlockchainRecord/Document'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-block', type=int, default=None, help='Bắt đầu lại từ block này thay vì checkpoint')
+
+    def handle(self, *args, **options):
+        service = HyperledgerService()
+        if service.simulate:
+            # Ledger giả lập nằm trong bộ nhớ của process web, listener chạy cùng process đó
+            raise CommandError('HYPERLEDGER_SIMULATE đang bật: listener chạy trong process dùng ledger giả lập')
+
+        listener = FabricBlockListener(service=service)
+
+        if options['from_block'] is not None:
+            if options['from_block'] > 0:
+                IndexerCheckpoint.objects.update_or_create(
+                    name=listener.name,
+                    defaults={'last_block': options['from_block'] - 1, 'last_block_hash': 'manual'}
+                )
+            else:
+                IndexerCheckpoint.objects.filter(name=listener.name).delete()
+
+        self.stdout.write(f'Đang nhận block của kênh {service.channel_name} từ block {listener.next_block()}...')
+
+        try:
+            asyncio.run(listener.run())
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
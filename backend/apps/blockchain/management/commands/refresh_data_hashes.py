@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from apps.accounts.models import User
+from apps.administrative.models import Document
+from utils.hashing import hash_data_many
+
+MODELS = {
+    'document': Document,
+    'user': User,
+}
+
+
+class Command(BaseCommand):
+    help = 'Tính lại cột data_hash của giấy tờ và người dùng (sau khi thêm cột hoặc sửa dữ liệu bằng QuerySet.update)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=sorted(MODELS), action='append', help='Chỉ xử lý model này (mặc định tất cả)')
+        parser.add_argument('--all', action='store_true', help='Tính lại cả bản ghi đã có data_hash')
+        parser.add_argument('--batch-size', type=int, default=500, help='Số bản ghi mỗi lần ghi')
+
+    def handle(self, *args, **options):
+        for name in options['model'] or sorted(MODELS):
+            model = MODELS[name]
+            queryset = model._base_manager.order_by('pk')
+            if not options['all']:
+                queryset = queryset.filter(data_hash='')
+
+            chunk = []
+            total = updated = 0
+            for instance in queryset.iterator(chunk_size=options['batch_size']):
+                total += 1
+                chunk.append(instance)
+                if len(chunk) >= options['batch_size']:
+                    updated += self._refresh(model, chunk)
+            updated += self._refresh(model, chunk)
+
+            self.stdout.write(self.style.SUCCESS(f'{name}: đã kiểm tra {total}, cập nhật {updated} data hash.'))
+
+    def _refresh(self, model, instances):
+        changed = []
+        for instance, data_hash in zip(instances, hash_data_many([instance.hash_payload() for instance in instances])):
+            if data_hash != instance.data_hash:
+                instance.data_hash = data_hash
+                changed.append(instance)
+        if changed:
+            model._base_manager.bulk_update(changed, ['data_hash'])
+        instances.clear()
+        return len(changed)
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.blockchain.services.outbox import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Gửi các thao tác blockchain đang chờ trong outbox bằng nhiều worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Số worker gửi giao dịch song song')
+        parser.add_argument('--once', action='store_true', help='Xử lý các thao tác đang đến hạn rồi thoát')
+        parser.add_argument('--interval', type=float, default=1.0, help='Số giây giữa hai lần kiểm tra outbox')
+
+    def handle(self, *args, **options):
+        dispatcher = OutboxDispatcher(workers=options['workers'])
+
+        try:
+            if options['once']:
+                processed = 0
+                while True:
+                    count = dispatcher.run_once()
+                    if not count:
+                        break
+                    processed += count
+                self.stdout.write(self.style.SUCCESS(f'Đã xử lý {processed} thao tác.'))
+                return
+
+            self.stdout.write(f'Đang xử lý outbox blockchain với {dispatcher.workers} worker ({dispatcher.worker_id})...')
+            dispatcher.run_forever(interval=options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
+        finally:
+            dispatcher.shutdown()
@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+
+from apps.blockchain.services.receipt_tracker import ReceiptTracker
+
+
+class Command(BaseCommand):
+    help = 'Theo dõi receipt của các giao dịch đã gửi và cập nhật trạng thái xác nhận'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Kiểm tra một lượt rồi thoát')
+        parser.add_argument('--interval', type=float, default=2.0, help='Số giây giữa hai lượt kiểm tra (nên gần thời gian tạo block)')
+        parser.add_argument('--depth', type=int, default=None, help='Số block xác nhận, mặc định theo BLOCKCHAIN_CONFIRMATION_DEPTH')
+
+    def handle(self, *args, **options):
+        tracker = ReceiptTracker(confirmation_depth=options['depth'])
+
+        if options['once']:
+            self.stdout.write(str(tracker.tick()))
+            return
+
+        self.stdout.write(f'Đang theo dõi receipt (xác nhận sau {tracker.confirmation_depth} block)...')
+
+        try:
+            while True:
+                try:
+                    stats = tracker.tick()
+                    if stats['confirmed'] or stats['failed']:
+                        self.stdout.write(str(stats))
+                except Exception as e:
+                    self.stderr.write(self.style.ERROR(f'Lỗi khi kiểm tra receipt: {str(e)}'))
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Đã dừng.')
@@ -1,7 +1,9 @@
 # Blockchain models
-# Tạm thời comment để tránh lỗi import
-# from .blockchain_record import BlockchainRecord
-# from .blockchain_transaction import BlockchainTransaction
+from .blockchain_record import BlockchainRecord
+from .account_nonce import AccountNonce
+from .document_anchor import DocumentAnchorBatch, DocumentAnchor
+from .outbox import BlockchainOutbox
+from .chain_index import IndexerCheckpoint, DocumentEvent, ChainDocument
 from .smart_contract import SmartContract
 from .document import Document
 from .request import Request
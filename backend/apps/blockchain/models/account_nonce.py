@@ -0,0 +1,29 @@
+from django.db import models
+
+
+class AccountNonce(models.Model):
+    """
+    Model lưu bộ đếm nonce dùng chung giữa các process cho một tài khoản gửi giao dịch
+    Mỗi process giữ riêng một khối nonce được cấp từ bản ghi này (xem NonceManager)
+    """
+    address = models.CharField(max_length=42, unique=True, verbose_name="Địa chỉ tài khoản")
+    next_nonce = models.PositiveBigIntegerField(default=0, verbose_name="Nonce tiếp theo chưa cấp")
+    synced_at = models.DateTimeField(blank=True, null=True, verbose_name="Thời gian đồng bộ với node")
+
+    # Nonce đã cấp nhưng không được gửi (phần còn lại của khối hết hạn, khoảng trống phát hiện trên node),
+    # được cấp lại trước nonce mới
+    free_nonces = models.JSONField(default=list, blank=True, verbose_name="Nonce trả lại")
+    # Nonce 'pending' của node đang đứng yên dưới next_nonce và thời điểm bắt đầu đứng yên
+    stalled_nonce = models.PositiveBigIntegerField(blank=True, null=True, verbose_name="Nonce đang kẹt")
+    stalled_since = models.DateTimeField(blank=True, null=True, verbose_name="Kẹt từ")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.address} - {self.next_nonce}"
+
+    class Meta:
+        verbose_name = "Nonce tài khoản"
+        verbose_name_plural = "Nonce tài khoản"
+        ordering = ['address']
@@ -19,6 +19,10 @@ class BlockchainRecord(models.Model):
         ('document_creation', 'Tạo giấy tờ'),
         ('document_update', 'Cập nhật giấy tờ'),
         ('document_revocation', 'Thu hồi giấy tờ'),
+        ('document_approval', 'Phê duyệt giấy tờ'),
+        ('user_registration', 'Đăng ký người dùng'),
+        ('approval_creation', 'Tạo quy trình phê duyệt'),
+        ('approval_update', 'Cập nhật quy trình phê duyệt'),
         ('officer_approval', 'Phê duyệt cán bộ'),
         ('request_creation', 'Tạo yêu cầu'),
         ('request_update', 'Cập nhật yêu cầu'),
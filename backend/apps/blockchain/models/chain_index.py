@@ -0,0 +1,126 @@
+from django.db import models
+
+
+class IndexerCheckpoint(models.Model):
+    """
+    Model lưu block cuối cùng mà một indexer đã xử lý, dùng để tiếp tục và phát hiện reorg
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="Tên indexer")
+    last_block = models.PositiveBigIntegerField(default=0, verbose_name="Block cuối đã xử lý")
+    last_block_hash = models.CharField(max_length=66, blank=True, null=True, verbose_name="Hash block cuối")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_block}"
+
+    class Meta:
+        verbose_name = "Checkpoint indexer"
+        verbose_name_plural = "Checkpoint indexer"
+
+
+class DocumentEvent(models.Model):
+    """
+    Model lưu các event của DocumentContract đã được giải mã từ log trên blockchain
+    """
+    ACTION_CHOICES = [
+        ('CREATE', 'Tạo giấy tờ'),
+        ('SUBMIT_FOR_APPROVAL', 'Gửi phê duyệt'),
+        ('APPROVE', 'Phê duyệt'),
+        ('REJECT', 'Từ chối'),
+        ('REVOKE', 'Thu hồi'),
+        ('UPDATE_STATUS', 'Cập nhật trạng thái'),
+    ]
+
+    document_id = models.CharField(max_length=100, verbose_name="Mã giấy tờ")
+    event_name = models.CharField(max_length=50, verbose_name="Tên event")
+    action = models.CharField(max_length=30, choices=ACTION_CHOICES, verbose_name="Hành động")
+    user_id = models.CharField(max_length=100, blank=True, default='', verbose_name="Người thực hiện")
+    user_role = models.CharField(max_length=30, blank=True, default='', verbose_name="Vai trò")
+    comments = models.TextField(blank=True, default='', verbose_name="Ghi chú")
+    chain_tx_id = models.CharField(max_length=100, blank=True, default='', verbose_name="txId trong contract")
+    args = models.JSONField(default=dict, blank=True, verbose_name="Tham số event")
+
+    # Vị trí trên blockchain
+    block_number = models.PositiveBigIntegerField(verbose_name="Số block")
+    block_hash = models.CharField(max_length=66, verbose_name="Hash block")
+    block_timestamp = models.PositiveBigIntegerField(default=0, verbose_name="Thời gian block")
+    transaction_hash = models.CharField(max_length=66, verbose_name="Hash giao dịch")
+    log_index = models.PositiveIntegerField(verbose_name="Vị trí log")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.document_id} - {self.action} @ {self.block_number}"
+
+    class Meta:
+        verbose_name = "Event giấy tờ"
+        verbose_name_plural = "Event giấy tờ"
+        ordering = ['block_number', 'log_index']
+        constraints = [
+            models.UniqueConstraint(fields=['transaction_hash', 'log_index'], name='unique_document_event_log'),
+        ]
+        indexes = [
+            models.Index(fields=['document_id', 'block_number', 'log_index']),
+            models.Index(fields=['block_number']),
+        ]
+
+
+class ChainDocument(models.Model):
+    """
+    Model lưu trạng thái hiện tại của giấy tờ trên blockchain, dựng lại từ DocumentEvent
+
+    Các trường tương ứng với struct Document trong DocumentContract.sol.
+    """
+    STATE_CHOICES = [
+        (0, 'DRAFT'),
+        (1, 'PENDING_APPROVAL'),
+        (2, 'ACTIVE'),
+        (3, 'REVOKED'),
+        (4, 'EXPIRED'),
+    ]
+
+    document_id = models.CharField(max_length=100, unique=True, verbose_name="Mã giấy tờ")
+    document_type = models.CharField(max_length=50, blank=True, default='', verbose_name="Loại giấy tờ")
+    citizen_id = models.CharField(max_length=100, blank=True, default='', verbose_name="Mã công dân")
+    issued_by = models.CharField(max_length=100, blank=True, default='', verbose_name="Người cấp")
+    issue_date = models.CharField(max_length=50, blank=True, default='', verbose_name="Ngày cấp")
+    valid_until = models.CharField(max_length=50, blank=True, default='', verbose_name="Có hiệu lực đến")
+    data_hash = models.CharField(max_length=128, blank=True, default='', verbose_name="Data hash")
+    metadata = models.TextField(blank=True, default='', verbose_name="Metadata")
+    state = models.PositiveSmallIntegerField(choices=STATE_CHOICES, default=0, verbose_name="Trạng thái")
+
+    created_at_chain = models.PositiveBigIntegerField(default=0, verbose_name="Thời gian tạo")
+    updated_at_chain = models.PositiveBigIntegerField(default=0, verbose_name="Thời gian cập nhật")
+    approved_by = models.CharField(max_length=100, blank=True, default='', verbose_name="Người phê duyệt")
+    approved_at = models.PositiveBigIntegerField(default=0, verbose_name="Thời gian phê duyệt")
+    revoked_by = models.CharField(max_length=100, blank=True, default='', verbose_name="Người thu hồi")
+    revoked_at = models.PositiveBigIntegerField(default=0, verbose_name="Thời gian thu hồi")
+    revocation_reason = models.TextField(blank=True, default='', verbose_name="Lý do thu hồi")
+
+    created_block = models.PositiveBigIntegerField(default=0, verbose_name="Block tạo")
+    updated_block = models.PositiveBigIntegerField(default=0, verbose_name="Block cập nhật")
+
+    def __str__(self):
+        return f"{self.document_id} - {self.get_state_display()}"
+
+    def as_struct(self):
+        """
+        Trả về tuple theo thứ tự struct Document, giống kết quả gọi contract
+        """
+        return (
+            self.document_id, self.document_type, self.citizen_id, self.issued_by,
+            self.issue_date, self.valid_until, self.data_hash, self.metadata, self.state,
+            self.created_at_chain, self.updated_at_chain, self.approved_by, self.approved_at,
+            self.revoked_by, self.revoked_at, self.revocation_reason,
+        )
+
+    class Meta:
+        verbose_name = "Giấy tờ trên blockchain"
+        verbose_name_plural = "Giấy tờ trên blockchain"
+        ordering = ['created_block']
+        indexes = [
+            models.Index(fields=['citizen_id', 'created_block']),
+            models.Index(fields=['state']),
+        ]
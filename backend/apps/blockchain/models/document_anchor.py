@@ -0,0 +1,68 @@
+from django.db import models
+
+
+class DocumentAnchorBatch(models.Model):
+    """
+    Model lưu một lô giấy tờ được neo lên blockchain bằng một Merkle root duy nhất
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Đang chờ'),
+        ('submitted', 'Đã gửi'),
+        ('confirmed', 'Đã xác nhận'),
+        ('failed', 'Thất bại'),
+        ('abandoned', 'Ngừng gửi lại'),
+    ]
+
+    batch_id = models.CharField(max_length=50, unique=True, verbose_name="Mã lô")
+    merkle_root = models.CharField(max_length=64, verbose_name="Merkle root")
+    leaf_count = models.PositiveIntegerField(default=0, verbose_name="Số giấy tờ")
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Trạng thái")
+    transaction_hash = models.CharField(max_length=255, blank=True, null=True, verbose_name="Hash giao dịch")
+    block_number = models.PositiveIntegerField(blank=True, null=True, verbose_name="Số block")
+    error_message = models.TextField(blank=True, null=True, verbose_name="Thông báo lỗi")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Số lần gửi")
+    next_attempt_at = models.DateTimeField(blank=True, null=True, verbose_name="Thời gian được gửi lại")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    submitted_at = models.DateTimeField(blank=True, null=True, verbose_name="Thời gian gửi")
+
+    def __str__(self):
+        return f"{self.batch_id} ({self.leaf_count}) - {self.get_status_display()}"
+
+    class Meta:
+        verbose_name = "Lô neo giấy tờ"
+        verbose_name_plural = "Lô neo giấy tờ"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status']),
+            models.Index(fields=['merkle_root']),
+        ]
+
+
+class DocumentAnchor(models.Model):
+    """
+    Model lưu data hash của một giấy tờ đang chờ hoặc đã được neo trong một lô Merkle
+    cùng với leaf index và inclusion proof để chứng minh thành viên
+    """
+    document = models.ForeignKey('administrative.Document', on_delete=models.CASCADE, related_name='blockchain_anchors', verbose_name="Giấy tờ")
+    batch = models.ForeignKey(DocumentAnchorBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='anchors', verbose_name="Lô")
+
+    data_hash = models.CharField(max_length=64, verbose_name="Data hash")
+    leaf_index = models.PositiveIntegerField(blank=True, null=True, verbose_name="Vị trí lá")
+    proof = models.JSONField(default=list, blank=True, verbose_name="Inclusion proof")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.document_id} - {self.batch.batch_id if self.batch else 'pending'}"
+
+    class Meta:
+        verbose_name = "Neo giấy tờ"
+        verbose_name_plural = "Neo giấy tờ"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['batch', 'created_at']),
+            models.Index(fields=['data_hash']),
+        ]
@@ -0,0 +1,36 @@
+from django.db import models
+from django.utils import timezone
+
+
+class BlockchainOutbox(models.Model):
+    """
+    Model hàng đợi outbox cho các thao tác ghi lên blockchain
+
+    Mỗi dòng được ghi trong cùng transaction với thay đổi của model nghiệp vụ,
+    nên thao tác blockchain không bị mất khi request kết thúc hoặc process dừng.
+    Trạng thái và số lần thử lại được lưu ở BlockchainRecord tương ứng.
+    """
+    record = models.OneToOneField('blockchain.BlockchainRecord', on_delete=models.CASCADE, related_name='outbox', verbose_name="Bản ghi blockchain")
+    operation = models.CharField(max_length=50, verbose_name="Thao tác")
+    payload = models.JSONField(default=dict, blank=True, verbose_name="Tham số")
+
+    # Điều phối
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Thời điểm xử lý")
+    locked_by = models.CharField(max_length=100, blank=True, null=True, verbose_name="Worker xử lý")
+    locked_at = models.DateTimeField(blank=True, null=True, verbose_name="Thời gian nhận xử lý")
+    processed_at = models.DateTimeField(blank=True, null=True, verbose_name="Thời gian xử lý xong")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.operation} - {self.record.object_id}"
+
+    class Meta:
+        verbose_name = "Hàng đợi blockchain"
+        verbose_name_plural = "Hàng đợi blockchain"
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['processed_at', 'available_at']),
+            models.Index(fields=['operation']),
+        ]
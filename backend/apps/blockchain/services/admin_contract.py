@@ -1,8 +1,8 @@
 import logging
 import json
-from django.conf import settings
-from web3 import Web3
 from .blockchain_service import BlockchainService
+from .client import get_client
+from .read_cache import cached_call
 
 logger = logging.getLogger(__name__)
 
@@ -11,22 +11,22 @@ class AdminContractService:
     Service for interacting with admin contract on the blockchain using Web3.py
     """
     
-    def __init__(self):
-        self.blockchain_service = BlockchainService()
-        
-        # Initialize Web3 connection
-        self.web3_provider = getattr(settings, 'WEB3_PROVIDER_URI', 'http://localhost:8545')
-        self.web3 = Web3(Web3.HTTPProvider(self.web3_provider))
-        
-        # Get contract address and ABI
-        self.contract_address = getattr(settings, 'ADMIN_CONTRACT_ADDRESS', None)
-        self.contract = None
-        
-        if self.contract_address:
-            self.contract = self.web3.eth.contract(
-                address=self.contract_address,
-                abi=self.blockchain_service.admin_contract_abi
-            )
+    @property
+    def blockchain_service(self):
+        return BlockchainService()
+    
+    @property
+    def web3(self):
+        return get_client().web3
+    
+    @property
+    def contract_address(self):
+        return get_client().addresses['admin_contract']
+    
+    @property
+    def contract(self):
+        # Contract dùng chung trong process, được tạo lại khi setting thay đổi
+        return get_client().contracts['admin_contract']
     
     def create_approval_workflow(self, workflow_data):
         """
@@ -86,7 +86,7 @@ class AdminContractService:
                 return {'success': False, 'error': 'Admin contract is not initialized'}
             
             # Call the contract function
-            workflow = self.contract.functions.getApprovalWorkflow(workflow_id).call()
+            workflow = cached_call('admin_contract', self.contract.functions.getApprovalWorkflow, (workflow_id,), ids=[workflow_id])
             
             # Format the response
             formatted_workflow = {
@@ -187,7 +187,7 @@ class AdminContractService:
                 return {'success': False, 'error': 'Admin contract is not initialized'}
             
             # Call the contract function
-            history = self.contract.functions.getApprovalHistory(approval_id).call()
+            history = cached_call('admin_contract', self.contract.functions.getApprovalHistory, (approval_id,), ids=[approval_id])
             
             # Format the response
             formatted_history = []
@@ -221,7 +221,7 @@ class AdminContractService:
                 return {'success': False, 'error': 'Admin contract is not initialized'}
             
             # Call the contract function
-            pending_approvals = self.contract.functions.getPendingApprovalsByApprover(approver_id).call()
+            pending_approvals = cached_call('admin_contract', self.contract.functions.getPendingApprovalsByApprover, (approver_id,))
             
             return {'success': True, 'pendingApprovals': pending_approvals}
             
@@ -0,0 +1,333 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import merkle
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentAnchorService:
+    """
+    Gom data hash của các giấy tờ theo cửa sổ thời gian/kích thước và neo
+    mỗi lô lên blockchain bằng một Merkle root duy nhất
+    """
+
+    def __init__(self, blockchain_service=None):
+        self._blockchain_service = blockchain_service
+
+        self.batch_size = getattr(settings, 'BLOCKCHAIN_ANCHOR_BATCH_SIZE', 500)
+        self.batch_window = getattr(settings, 'BLOCKCHAIN_ANCHOR_BATCH_WINDOW', 30)
+        self.pending_grace = getattr(settings, 'BLOCKCHAIN_ANCHOR_PENDING_GRACE', 300)
+        self.max_attempts = getattr(settings, 'BLOCKCHAIN_ANCHOR_MAX_ATTEMPTS', 5)
+        self.retry_backoff = getattr(settings, 'BLOCKCHAIN_ANCHOR_RETRY_BACKOFF', 30)
+
+    @property
+    def blockchain_service(self):
+        if self._blockchain_service is None:
+            from .blockchain_service import BlockchainService
+            self._blockchain_service = BlockchainService()
+        return self._blockchain_service
+
+    def enqueue(self, document):
+        """
+        Đưa data hash hiện tại của giấy tờ vào hàng chờ neo
+        """
+        from apps.blockchain.models import DocumentAnchor
+
+        data_hash = document.calculate_data_hash()
+
+        # Không xếp hàng lại nếu cùng dữ liệu đang chờ
+        anchor = DocumentAnchor.objects.filter(
+            document=document,
+            data_hash=data_hash,
+            batch__isnull=True
+        ).first()
+
+        if anchor is None:
+            anchor = DocumentAnchor.objects.create(document=document, data_hash=data_hash)
+
+        return anchor
+
+    def is_flush_due(self):
+        """
+        Kiểm tra lô hiện tại đã đủ kích thước hoặc đã hết cửa sổ thời gian chưa
+        """
+        from apps.blockchain.models import DocumentAnchor
+
+        pending = DocumentAnchor.objects.filter(batch__isnull=True)
+        oldest = pending.order_by('created_at').values_list('created_at', flat=True).first()
+
+        if oldest is None:
+            return False
+
+        if oldest <= timezone.now() - timedelta(seconds=self.batch_window):
+            return True
+
+        return pending[:self.batch_size].count() >= self.batch_size
+
+    def flush(self, force=False):
+        """
+        Neo một lô giấy tờ đang chờ lên blockchain
+
+        :param force: Neo ngay cả khi lô chưa đủ kích thước/cửa sổ thời gian
+        :return: DocumentAnchorBatch đã tạo hoặc None nếu không có gì để neo
+        """
+        if not force and not self.is_flush_due():
+            return None
+
+        batch = self._create_batch()
+        if batch is None:
+            return None
+
+        self._commit_batch(batch)
+        return batch
+
+    def flush_all(self):
+        """
+        Neo toàn bộ giấy tờ đang chờ, theo từng lô
+        """
+        batches = []
+        while True:
+            batch = self.flush(force=True)
+            if batch is None:
+                return batches
+            batches.append(batch)
+
+    def build_tree(self, data_hashes):
+        """
+        Dựng cây Merkle của một lô data hash
+
+        :return: (merkle_root, danh sách inclusion proof theo thứ tự data_hashes)
+        """
+        levels = merkle.build_tree(data_hashes)
+        return merkle.merkle_root(levels), [merkle.inclusion_proof(levels, index) for index in range(len(data_hashes))]
+
+    def _create_batch(self):
+        from apps.blockchain.models import DocumentAnchor, DocumentAnchorBatch
+
+        with transaction.atomic():
+            anchors = list(
+                DocumentAnchor.objects.select_for_update(skip_locked=True)
+                .filter(batch__isnull=True)
+                .order_by('created_at')[:self.batch_size]
+            )
+
+            if not anchors:
+                return None
+
+            root, proofs = self.build_tree([anchor.data_hash for anchor in anchors])
+
+            batch = DocumentAnchorBatch.objects.create(
+                batch_id=self.blockchain_service.generate_blockchain_id(prefix='MRK'),
+                merkle_root=root,
+                leaf_count=len(anchors)
+            )
+
+            for index, anchor in enumerate(anchors):
+                anchor.batch = batch
+                anchor.leaf_index = index
+                anchor.proof = proofs[index]
+
+            DocumentAnchor.objects.bulk_update(anchors, ['batch', 'leaf_index', 'proof'])
+
+        return batch
+
+    def _commit_batch(self, batch):
+        from apps.administrative.models import Document
+        from apps.blockchain.models import DocumentAnchorBatch
+
+        # Nhận lượt gửi bằng cập nhật có điều kiện: lô đã được process khác gửi thì bỏ qua.
+        # Thời điểm được gửi lại tính ngay từ lúc gửi, để lô bị revert (ReceiptTracker
+        # đánh dấu 'failed') cũng phải chờ backoff
+        now = timezone.now()
+        next_attempt_at = now + timedelta(seconds=self.retry_backoff * 2 ** batch.attempts)
+        claimed = DocumentAnchorBatch.objects.filter(pk=batch.pk, attempts=batch.attempts).update(
+            attempts=F('attempts') + 1, next_attempt_at=next_attempt_at, updated_at=now
+        )
+        if not claimed:
+            return {'success': False, 'error': 'Batch is already being sent by another process'}
+        batch.attempts += 1
+        batch.next_attempt_at = next_attempt_at
+
+        result = self.blockchain_service.anchor_merkle_root(batch.batch_id, batch.merkle_root, batch.leaf_count)
+
+        if not result.get('success'):
+            batch.status = 'failed'
+            batch.error_message = result.get('error')
+            batch.save(update_fields=['status', 'error_message', 'updated_at'])
+            logger.error(f"Error anchoring batch {batch.batch_id} (attempt {batch.attempts}): {result.get('error')}")
+            if batch.attempts >= self.max_attempts:
+                self._abandon_batch(batch)
+            return result
+
+        now = timezone.now()
+        batch.status = result.get('status', 'confirmed')
+        batch.transaction_hash = result.get('txId')
+        batch.block_number = result.get('blockNumber')
+        batch.submitted_at = now
+        batch.save(update_fields=['status', 'transaction_hash', 'block_number', 'submitted_at', 'updated_at'])
+        self._update_records(batch, now)
+
+        # Cập nhật trạng thái blockchain của toàn bộ giấy tờ trong lô bằng một câu lệnh
+        Document.objects.filter(blockchain_anchors__batch=batch).update(
+            blockchain_status='STORED',
+            blockchain_tx_id=batch.transaction_hash,
+            blockchain_timestamp=now
+        )
+
+        logger.info(f"Anchored {batch.leaf_count} documents in batch {batch.batch_id}")
+        return result
+
+    def _update_records(self, batch, now):
+        """
+        Gắn giao dịch của lô vào BlockchainRecord của outbox đang chờ lô (metadata anchor_id),
+        để ReceiptTracker xác nhận các bản ghi này cùng giao dịch của lô
+        """
+        from apps.blockchain.models import BlockchainRecord
+
+        confirmed = batch.status == 'confirmed'
+        BlockchainRecord.objects.filter(
+            metadata__anchor_id__in=list(batch.anchors.values_list('id', flat=True))
+        ).exclude(status='confirmed').update(
+            status='confirmed' if confirmed else 'submitted',
+            transaction_id=batch.transaction_hash,
+            transaction_hash=batch.transaction_hash,
+            block_number=batch.block_number,
+            confirmed_at=now if confirmed else None,
+            error_message=None,
+            updated_at=now
+        )
+
+    def _abandon_batch(self, batch):
+        """
+        Ngừng gửi lại lô đã hết số lần gửi (BLOCKCHAIN_ANCHOR_MAX_ATTEMPTS)
+        và đánh dấu lỗi các BlockchainRecord đang chờ lô
+        """
+        from apps.blockchain.models import BlockchainRecord
+
+        batch.status = 'abandoned'
+        batch.save(update_fields=['status', 'updated_at'])
+        BlockchainRecord.objects.filter(
+            metadata__anchor_id__in=list(batch.anchors.values_list('id', flat=True))
+        ).exclude(status='confirmed').update(
+            status='failed', error_message=batch.error_message, updated_at=timezone.now()
+        )
+        logger.error(f"Giving up on anchor batch {batch.batch_id} after {batch.attempts} attempts: {batch.error_message}")
+
+    def retry_failed(self):
+        """
+        Gửi lại các lô bị lỗi khi neo
+
+        Mỗi lô được gửi lại sau BLOCKCHAIN_ANCHOR_RETRY_BACKOFF giây (nhân đôi sau mỗi lần gửi),
+        tối đa BLOCKCHAIN_ANCHOR_MAX_ATTEMPTS lần; sau đó lô chuyển sang 'abandoned'.
+
+        Lô 'pending' chưa có giao dịch quá BLOCKCHAIN_ANCHOR_PENDING_GRACE giây cũng được gửi
+        lại: lô được ghi vào database trước khi gửi, process có thể dừng giữa hai bước đó.
+        """
+        from apps.blockchain.models import DocumentAnchorBatch
+
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.pending_grace)
+        batches = DocumentAnchorBatch.objects.filter(
+            Q(status='failed') |
+            Q(status='pending', transaction_hash__isnull=True, created_at__lt=stale)
+        ).filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now) | Q(attempts__gte=self.max_attempts)
+        ).order_by('created_at')
+
+        for batch in batches:
+            if batch.attempts >= self.max_attempts:
+                self._abandon_batch(batch)
+            else:
+                self._commit_batch(batch)
+
+    def get_anchor(self, document_id):
+        """
+        Lấy bản neo mới nhất đã vào lô của giấy tờ theo mã giấy tờ
+        """
+        from apps.blockchain.models import DocumentAnchor
+
+        return (
+            DocumentAnchor.objects.select_related('batch', 'document')
+            .filter(document__document_id=document_id, batch__isnull=False)
+            .order_by('-created_at')
+            .first()
+        )
+
+    def get_anchors(self, documents):
+        """
+        Lấy bản neo mới nhất đã vào lô của nhiều giấy tờ trong một truy vấn
+
+        :return: dict document.pk -> DocumentAnchor
+        """
+        from apps.blockchain.models import DocumentAnchor
+
+        anchors = {}
+        queryset = (
+            DocumentAnchor.objects.select_related('batch')
+            .filter(document__in=documents, batch__isnull=False)
+            .order_by('created_at')
+        )
+        for anchor in queryset:
+            anchors[anchor.document_id] = anchor
+        return anchors
+
+    def check_proof(self, anchor, current_hash=None):
+        """
+        Kiểm tra inclusion proof của giấy tờ với dữ liệu hiện tại, chưa đối chiếu blockchain
+
+        :return: dict kết quả, 'proofValid' cho biết có cần đối chiếu Merkle root hay không
+        """
+        batch = anchor.batch
+        if current_hash is None:
+            current_hash = anchor.document.calculate_data_hash()
+
+        proof_valid = (
+            current_hash == anchor.data_hash and
+            merkle.verify_proof(current_hash, anchor.leaf_index, anchor.proof, batch.merkle_root)
+        )
+
+        return {
+            'verified': False,
+            'exists': False,
+            'proofValid': proof_valid,
+            'batchId': batch.batch_id,
+            'merkleRoot': batch.merkle_root,
+            'leafIndex': anchor.leaf_index,
+            'proof': anchor.proof,
+            'txId': batch.transaction_hash,
+        }
+
+    def apply_chain_result(self, result, chain_result):
+        """
+        Bổ sung kết quả verifyDocument(batch_id, merkle_root) vào kết quả check_proof
+        """
+        # verifyDocument trả về (verified, exists, isActive, isExpired, dataIntegrity, document),
+        # BlockchainService.verify_document trả về dict cùng các khóa đó
+        if isinstance(chain_result, dict):
+            if 'dataIntegrity' not in chain_result:
+                result['error'] = chain_result.get('error')
+                return result
+            exists, data_integrity = chain_result['exists'], chain_result['dataIntegrity']
+        else:
+            exists, data_integrity = chain_result[1], chain_result[4]
+        result['exists'] = exists
+        result['verified'] = exists and data_integrity
+        return result
+
+    def verify_membership(self, anchor):
+        """
+        Chứng minh giấy tờ thuộc lô đã neo: kiểm tra inclusion proof với dữ liệu
+        hiện tại, sau đó đối chiếu Merkle root với bản ghi trên blockchain
+        """
+        result = self.check_proof(anchor)
+        if not result['proofValid']:
+            return result
+
+        batch = anchor.batch
+        chain_result = self.blockchain_service.verify_document(batch.batch_id, batch.merkle_root, raw_hash=True)
+        return self.apply_chain_result(result, chain_result)
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import weakref
+from contextlib import asynccontextmanager
+import aiohttp
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from web3 import AsyncHTTPProvider, AsyncWeb3
+
+from .circuit_breaker import CircuitOpenError
+from .client import CONTRACTS, get_client, sort_batch_response
+from .read_cache import acached_call
+from .verification import verification_result
+
+logger = logging.getLogger(__name__)
+
+# Event loop -> task tạo AsyncBlockchainClient dùng chung trên loop đó
+_clients = weakref.WeakKeyDictionary()
+
+
+class AsyncGuardedHTTPProvider(AsyncHTTPProvider):
+    """
+    AsyncHTTPProvider gửi request qua EndpointPool, xem GuardedHTTPProvider
+    """
+
+    def __init__(self, pool, timeout, session, **kwargs):
+        super().__init__(pool.sequencer.uri, request_kwargs={'timeout': aiohttp.ClientTimeout(total=timeout)}, **kwargs)
+        self.pool = pool
+        self.timeout = timeout
+        # Session dùng chung cho mọi node trong pool, thay vì session mặc định của web3
+        self.session = session
+
+    async def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = await self.pool.arequest([(method, params)], self._sender(request_data), self.timeout)
+        return self.decode_rpc_response(raw_response)
+
+    async def make_batch_request(self, batch_requests):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        raw_response = await self.pool.arequest(batch_requests, self._sender(request_data), self.timeout)
+        response = self.decode_rpc_response(raw_response)
+        if not isinstance(response, list):
+            # Node trả về một lỗi cho cả batch
+            return response
+        return sort_batch_response(response)
+
+    def _sender(self, request_data):
+        async def send(endpoint_uri, timeout):
+            kwargs = dict(self.get_request_kwargs(), timeout=aiohttp.ClientTimeout(total=timeout))
+            async with self.session.post(endpoint_uri, data=request_data, **kwargs) as response:
+                response.raise_for_status()
+                return await response.read()
+        return send
+
+
+class AsyncBlockchainClient:
+    """
+    AsyncWeb3 cho các lời gọi đọc tới node từ view async
+
+    Mọi request đi qua một aiohttp session giữ tối đa BLOCKCHAIN_ASYNC_POOL_SIZE kết nối
+    keep-alive tới node, nên một event loop có thể chờ hàng trăm lời gọi cùng lúc mà không
+    cần thêm thread. Session gắn với event loop tạo ra nó: dùng get_async_client() để lấy
+    client dùng chung của loop hiện tại. ABI và địa chỉ contract lấy từ client đồng bộ.
+    """
+
+    def __init__(self, client, session):
+        self.fingerprint = client.fingerprint
+        self.session = session
+
+        self.web3 = AsyncWeb3(AsyncGuardedHTTPProvider(client.pool, client.timeout, session))
+
+        self.contracts = {}
+        for contract_name in CONTRACTS:
+            contract = client.contracts[contract_name]
+            self.contracts[contract_name] = self.web3.eth.contract(
+                address=contract.address, abi=client.abis[contract_name]
+            ) if contract is not None else None
+
+        from .anchoring import DocumentAnchorService
+        self.anchor_service = DocumentAnchorService()
+
+    @classmethod
+    async def create(cls, client=None):
+        """
+        Tạo client trên event loop đang chạy
+        """
+        client = client or get_client()
+        pool_size = getattr(settings, 'BLOCKCHAIN_ASYNC_POOL_SIZE', 100)
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size, limit_per_host=pool_size),
+            raise_for_status=True
+        )
+
+        return cls(client, session)
+
+    async def close(self):
+        await self.session.close()
+
+    def function(self, contract_name, function_name):
+        contract = self.contracts.get(contract_name)
+        if contract is None:
+            raise ValueError(f"Contract {contract_name} is not configured")
+        return getattr(contract.functions, function_name)
+
+    async def call(self, contract_name, function_name, args=(), ids=None):
+        """
+        Gọi hàm view của contract qua ReadCache (dùng chung với lời gọi đồng bộ)
+        """
+        return await acached_call(contract_name, self.function(contract_name, function_name), args, ids)
+
+    async def verify_document(self, document_id, data_hash=''):
+        """
+        Gọi verifyDocument(document_id, data_hash)
+
+        :return: dict verified, exists, isActive, isExpired, dataIntegrity và document,
+                 hoặc {'success': False, 'error', 'verified': False} khi lỗi
+        """
+        try:
+            try:
+                result = await self.call('document_contract', 'verifyDocument', (document_id, data_hash), ids=[document_id])
+            except CircuitOpenError:
+                # Node không khả dụng: đọc từ bảng ChainDocument do indexer dựng
+                result = await sync_to_async(self._verify_from_index)(document_id, data_hash)
+                if result is None:
+                    raise
+        except Exception as e:
+            logger.error(f"Error verifying document {document_id}: {str(e)}")
+            return {'success': False, 'error': str(e), 'verified': False}
+
+        return verification_result(result)
+
+    def _verify_from_index(self, document_id, data_hash):
+        from . import indexer
+
+        if not indexer.is_index_available():
+            return None
+        return indexer.verify_document(document_id, data_hash)
+
+    async def verify_document_record(self, document):
+        """
+        Xác thực giấy tờ trong database, giống BlockchainService.verify_document_records
+
+        Giấy tờ được neo theo lô được kiểm tra inclusion proof rồi đối chiếu Merkle root.
+
+        :param document: Document
+        """
+        from apps.blockchain.models import DocumentAnchor
+
+        current_hash = document.calculate_data_hash()
+        anchor = await (
+            DocumentAnchor.objects.select_related('batch')
+            .filter(document=document, batch__isnull=False)
+            .order_by('-created_at')
+            .afirst()
+        ) if getattr(settings, 'BLOCKCHAIN_ANCHOR_MODE', 'single') == 'batch' else None
+        if anchor is None:
+            return await self.verify_document(document.document_id, current_hash)
+
+        anchor.document = document
+        result = self.anchor_service.check_proof(anchor, current_hash)
+        if not result['proofValid']:
+            return result
+
+        batch = anchor.batch
+        try:
+            chain_result = await self.call(
+                'document_contract', 'verifyDocument', (batch.batch_id, batch.merkle_root), ids=[batch.batch_id]
+            )
+        except Exception as e:
+            logger.error(f"Error verifying batch {batch.batch_id}: {str(e)}")
+            chain_result = {'success': False, 'error': str(e)}
+        return self.anchor_service.apply_chain_result(result, chain_result)
+
+    async def get_document_history(self, document_id):
+        """
+        Lịch sử giấy tờ, đọc từ indexer khi có dữ liệu, giống BlockchainService.get_document_history
+        """
+        from . import indexer
+
+        def indexed_history():
+            if indexer.is_index_available():
+                return indexer.get_document_history(document_id)
+            return None
+
+        try:
+            history = await sync_to_async(indexed_history)()
+            if history:
+                return history
+            return await self.call('document_contract', 'getDocumentHistory', (document_id,), ids=[document_id])
+        except Exception as e:
+            logger.error(f"Error getting document history: {str(e)}")
+            return {'success': False, 'error': str(e)}
+
+
+async def get_async_client():
+    """
+    Lấy client dùng chung của event loop đang chạy, tạo mới khi chưa có hoặc khi setting thay đổi
+    """
+    loop = asyncio.get_running_loop()
+    client = get_client()
+
+    task = _clients.get(loop)
+    if task is not None and task.done():
+        if task.cancelled() or task.exception() is not None:
+            task = None
+        elif task.result().fingerprint != client.fingerprint:
+            previous = task.result()
+            task = None
+            loop.create_task(previous.close())
+            logger.info("Blockchain settings changed, async client reloaded")
+
+    if task is None:
+        task = _clients[loop] = loop.create_task(AsyncBlockchainClient.create(client))
+    return await asyncio.shield(task)
+
+
+async def close_async_client():
+    """
+    Đóng client của event loop đang chạy (khi tắt worker)
+    """
+    task = _clients.pop(asyncio.get_running_loop(), None)
+    if task is not None and task.done() and not task.cancelled() and task.exception() is None:
+        await task.result().close()
+
+
+@asynccontextmanager
+async def async_client(shared=True):
+    """
+    Client cho một request
+
+    :param shared: Dùng client của event loop (ASGI, loop sống cùng worker); False tạo
+                   client riêng và đóng khi xong, cho loop chỉ sống trong một request
+                   (view async chạy dưới WSGI)
+    """
+    if shared:
+        yield await get_async_client()
+        return
+
+    client = await AsyncBlockchainClient.create()
+    try:
+        yield client
+    finally:
+        await client.close()
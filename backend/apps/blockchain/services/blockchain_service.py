@@ -1,120 +1,88 @@
-import os
 import json
-import hashlib
 import base64
 import uuid
 import logging
 from django.conf import settings
 from django.utils import timezone
 from web3 import Web3
-from eth_account import Account
+from web3.exceptions import TimeExhausted
 from eth_account.messages import encode_defunct
+from utils.hashing import hash_data
+
+from .circuit_breaker import CircuitOpenError, is_node_error
+from .client import get_client, load_contract_abi
+from .deadline import DeadlineExceeded, timeout_for
+from .read_cache import cached_call
+from .nonce_manager import is_already_known, is_nonce_error, is_nonce_too_high
+from .signer_pool import get_signer_pool
+from .verification import verification_result
 
 logger = logging.getLogger(__name__)
 
+# Số lần thử lại khi node từ chối nonce
+NONCE_RETRY_LIMIT = 3
+
+# Gas limit mặc định của một giao dịch
+DEFAULT_GAS = 2000000
+
+
+def _raw_transaction(signed_tx):
+    """Lấy raw transaction, tương thích cả web3 v6 (rawTransaction) và v7+ (raw_transaction)"""
+    return getattr(signed_tx, 'raw_transaction', None) or signed_tx.rawTransaction
+
+
 class BlockchainService:
     """
     Service class để tương tác với blockchain Ethereum/Quorum
     """
     
-    def __init__(self):
+    def __init__(self, wait_for_receipt=None):
         """
         Khởi tạo blockchain service với cấu hình từ settings
-        """
-        # Lấy cấu hình blockchain từ settings
-        self.blockchain_dir = getattr(settings, 'BLOCKCHAIN_DIR', os.path.join(settings.BASE_DIR, '..', 'blockchain'))
-        
-        # Kết nối đến node Ethereum/Quorum
-        self.web3_provider = getattr(settings, 'WEB3_PROVIDER_URI', 'http://localhost:8545')
-        self.web3 = Web3(Web3.HTTPProvider(self.web3_provider))
         
-        # Contract addresses
-        self.document_contract_address = getattr(settings, 'DOCUMENT_CONTRACT_ADDRESS', None)
-        self.user_contract_address = getattr(settings, 'USER_CONTRACT_ADDRESS', None)
-        self.admin_contract_address = getattr(settings, 'ADMIN_CONTRACT_ADDRESS', None)
+        :param wait_for_receipt: Chờ receipt sau khi gửi giao dịch, mặc định theo BLOCKCHAIN_WAIT_FOR_RECEIPT
+        """
+        if wait_for_receipt is None:
+            wait_for_receipt = getattr(settings, 'BLOCKCHAIN_WAIT_FOR_RECEIPT', True)
+        self.wait_for_receipt = wait_for_receipt
         
-        # Load contract ABIs
-        self.document_contract_abi = self._load_contract_abi('document_contract')
-        self.user_contract_abi = self._load_contract_abi('user_contract')
-        self.admin_contract_abi = self._load_contract_abi('admin_contract')
+        # Web3, ABI và contract được dùng chung trong process, không đọc file/tạo kết nối mỗi lần khởi tạo
+        client = get_client()
         
-        # Initialize contracts if addresses are provided
-        self.document_contract = None
-        self.user_contract = None
-        self.admin_contract = None
+        self.blockchain_dir = client.blockchain_dir
         
-        if self.document_contract_address and self.document_contract_abi:
-            try:
-                self.document_contract = self.web3.eth.contract(
-                    address=self.document_contract_address,
-                    abi=self.document_contract_abi
-                )
-            except Exception as e:
-                logger.error(f"Error initializing document contract: {str(e)}")
+        # Kết nối đến node Ethereum/Quorum
+        self.web3_provider = client.provider_uri
+        self.web3 = client.web3
         
-        if self.user_contract_address and self.user_contract_abi:
-            try:
-                self.user_contract = self.web3.eth.contract(
-                    address=self.user_contract_address,
-                    abi=self.user_contract_abi
-                )
-            except Exception as e:
-                logger.error(f"Error initializing user contract: {str(e)}")
+        # Contract addresses
+        self.document_contract_address = client.addresses['document_contract']
+        self.user_contract_address = client.addresses['user_contract']
+        self.admin_contract_address = client.addresses['admin_contract']
         
-        if self.admin_contract_address and self.admin_contract_abi:
-            try:
-                self.admin_contract = self.web3.eth.contract(
-                    address=self.admin_contract_address,
-                    abi=self.admin_contract_abi
-                )
-            except Exception as e:
-                logger.error(f"Error initializing admin contract: {str(e)}")
+        # Contract ABIs
+        self.document_contract_abi = client.abis['document_contract']
+        self.user_contract_abi = client.abis['user_contract']
+        self.admin_contract_abi = client.abis['admin_contract']
         
-        # Default account for sending transactions
-        self.default_account_address = getattr(settings, 'BLOCKCHAIN_DEFAULT_ACCOUNT', None)
-        self.default_account_private_key = getattr(settings, 'BLOCKCHAIN_DEFAULT_PRIVATE_KEY', None)
+        # Contracts (None nếu chưa cấu hình địa chỉ)
+        self.document_contract = client.contracts['document_contract']
+        self.user_contract = client.contracts['user_contract']
+        self.admin_contract = client.contracts['admin_contract']
         
-        if self.default_account_address:
-            self.web3.eth.default_account = self.default_account_address
+        # Tài khoản gửi giao dịch được lấy từ SignerPool (BLOCKCHAIN_SIGNER_ACCOUNTS)
     
     def _load_contract_abi(self, contract_name):
         """
         Load contract ABI from file
         """
-        try:
-            # First try to load from CONTRACT_ABI_DIR if defined
-            contract_abi_dir = getattr(settings, 'CONTRACT_ABI_DIR', None)
-            if contract_abi_dir:
-                abi_path = os.path.join(contract_abi_dir, f'{contract_name}.json')
-                if os.path.exists(abi_path):
-                    with open(abi_path, 'r') as f:
-                        contract_data = json.load(f)
-                        return contract_data.get('abi', [])
-            
-            # Fallback to blockchain_dir/contracts path
-            abi_path = os.path.join(self.blockchain_dir, 'contracts', f'{contract_name}.json')
-            if os.path.exists(abi_path):
-                with open(abi_path, 'r') as f:
-                    contract_data = json.load(f)
-                    return contract_data.get('abi', [])
-            
-            logger.warning(f"Could not find ABI file for {contract_name}")
-            return []
-        except Exception as e:
-            logger.warning(f"Could not load ABI for {contract_name}: {str(e)}")
-            return []
+        return load_contract_abi(contract_name, getattr(settings, 'CONTRACT_ABI_DIR', None), self.blockchain_dir)
     
     def create_hash(self, data):
         """
-        Tạo hash từ dữ liệu
+        Tạo hash từ dữ liệu, xem utils/hashing.py
         """
-        if isinstance(data, dict) or isinstance(data, list):
-            data = json.dumps(data, sort_keys=True)
-        elif not isinstance(data, str):
-            data = str(data)
-        
-        data_bytes = data.encode('utf-8')
-        return hashlib.sha256(data_bytes).hexdigest()
+        return hash_data(data)
     
     def generate_blockchain_id(self, prefix='DOC', unique_id=None):
         """
@@ -127,48 +95,143 @@ class BlockchainService:
         
         return f"{prefix}-{unique_id}"
     
-    def _sign_and_send_transaction(self, transaction):
+    def _sign_and_send_transaction(self, transaction, wait_for_receipt=None, routing_key=None, gas=None):
         """
         Sign và gửi transaction
+
+        Giao dịch được gửi qua một lane của SignerPool (mỗi lane là một tài khoản có
+        nonce riêng). routing_key mặc định là tham số đầu tiên của hàm contract
+        (mã giấy tờ, mã người dùng...), nên các thao tác trên cùng đối tượng luôn
+        dùng cùng tài khoản và giữ đúng thứ tự.
+
+        Khi wait_for_receipt=False, hàm trả về ngay sau khi node nhận giao dịch
+        (status 'submitted'), receipt được xác nhận bởi ReceiptTracker.
+        
+        :param gas: Gas limit của giao dịch, mặc định DEFAULT_GAS (ước tính bởi node khi lane không có private key)
         """
+        if wait_for_receipt is None:
+            wait_for_receipt = self.wait_for_receipt
+        
+        if routing_key is None:
+            args = getattr(transaction, 'args', None) or ()
+            if args and isinstance(args[0], str):
+                routing_key = args[0]
+        
         try:
-            # Lấy account từ private key
-            if self.default_account_private_key:
-                account = Account.from_key(self.default_account_private_key)
-                
-                # Lấy nonce
-                nonce = self.web3.eth.get_transaction_count(account.address)
+            lane = get_signer_pool().lane_for(routing_key)
+        except Exception as e:
+            logger.exception(f"Error selecting signer account: {str(e)}")
+            return {'success': False, 'error': str(e)}
+        
+        with lane.acquire():
+            result = self._send_with_lane(lane, transaction, wait_for_receipt, gas)
+        lane.record(result)
+        return result
+    
+    def _send_with_lane(self, lane, transaction, wait_for_receipt, gas=None):
+        try:
+            # Ký bằng private key của lane
+            if lane.private_key:
+                nonce_manager = lane.nonce_manager(self.web3)
                 
-                # Build transaction
-                tx = transaction.build_transaction({
-                    'from': account.address,
-                    'nonce': nonce,
-                    'gas': 2000000,
-                    'gasPrice': self.web3.to_wei('50', 'gwei')
-                })
+                tx_hash = None
+                nonce = None
+                for attempt in range(NONCE_RETRY_LIMIT):
+                    # Lấy nonce từ bộ cấp phát cục bộ thay vì hỏi node mỗi lần
+                    nonce = nonce_manager.allocate()
+                    
+                    try:
+                        # Build transaction
+                        tx = transaction.build_transaction({
+                            'from': lane.address,
+                            'nonce': nonce,
+                            'gas': gas or DEFAULT_GAS,
+                            'gasPrice': self.web3.to_wei('50', 'gwei')
+                        })
+                        
+                        # Sign transaction
+                        signed_tx = self.web3.eth.account.sign_transaction(tx, lane.private_key)
+                    except Exception:
+                        nonce_manager.release(nonce)
+                        raise
+                    
+                    # Send transaction
+                    try:
+                        tx_hash = self.web3.eth.send_raw_transaction(_raw_transaction(signed_tx))
+                        break
+                    except Exception as e:
+                        if is_already_known(e):
+                            # Node đã nhận chính giao dịch này, gửi lại sẽ tạo giao dịch trùng
+                            tx_hash = signed_tx.hash
+                            break
+                        if is_nonce_error(e):
+                            logger.warning(f"Nonce {nonce} rejected for {lane.address}: {str(e)}")
+                            if is_nonce_too_high(e):
+                                # Nonce chưa được dùng trên chuỗi: trả lại để không để lại khoảng trống
+                                nonce_manager.release(nonce)
+                            nonce_manager.resync()
+                            continue
+                        nonce_manager.release(nonce)
+                        raise
                 
-                # Sign transaction
-                signed_tx = self.web3.eth.account.sign_transaction(tx, self.default_account_private_key)
+                if tx_hash is None:
+                    return {'success': False, 'error': 'Could not allocate a valid nonce', 'nonce': nonce}
                 
-                # Send transaction
-                tx_hash = self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+                if not wait_for_receipt:
+                    return {
+                        'success': True,
+                        'status': 'submitted',
+                        'txId': Web3.to_hex(tx_hash),
+                        'nonce': nonce,
+                        'from': lane.address
+                    }
                 
                 # Wait for transaction receipt
-                tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+                tx_receipt = self._wait_for_receipt(tx_hash)
+                if tx_receipt is None:
+                    return {
+                        'success': True,
+                        'status': 'submitted',
+                        'txId': Web3.to_hex(tx_hash),
+                        'nonce': nonce,
+                        'from': lane.address
+                    }
                 
                 return {
                     'success': tx_receipt.status == 1,
-                    'txId': tx_hash.hex(),
+                    'status': 'confirmed' if tx_receipt.status == 1 else 'failed',
+                    'txId': Web3.to_hex(tx_hash),
+                    'nonce': nonce,
                     'blockNumber': tx_receipt.blockNumber
                 }
             else:
                 # Nếu không có private key, sử dụng web3 provider có sẵn (ví dụ: Ganache)
-                tx_hash = transaction.transact({'from': self.default_account_address})
-                tx_receipt = self.web3.eth.wait_for_transaction_receipt(tx_hash)
+                tx_params = {'from': lane.address}
+                if gas:
+                    tx_params['gas'] = gas
+                tx_hash = transaction.transact(tx_params)
+                
+                if not wait_for_receipt:
+                    return {
+                        'success': True,
+                        'status': 'submitted',
+                        'txId': Web3.to_hex(tx_hash),
+                        'from': lane.address
+                    }
+                
+                tx_receipt = self._wait_for_receipt(tx_hash)
+                if tx_receipt is None:
+                    return {
+                        'success': True,
+                        'status': 'submitted',
+                        'txId': Web3.to_hex(tx_hash),
+                        'from': lane.address
+                    }
                 
                 return {
                     'success': tx_receipt.status == 1,
-                    'txId': tx_hash.hex(),
+                    'status': 'confirmed' if tx_receipt.status == 1 else 'failed',
+                    'txId': Web3.to_hex(tx_hash),
                     'blockNumber': tx_receipt.blockNumber
                 }
                 
@@ -176,109 +239,363 @@ class BlockchainService:
             logger.exception(f"Error sending transaction: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def _wait_for_receipt(self, tx_hash):
+        """
+        Chờ receipt tối đa BLOCKCHAIN_RECEIPT_WAIT_TIMEOUT giây, rút ngắn theo deadline của request
+        
+        :return: Receipt, hoặc None khi hết thời gian hay node không trả lời; giao dịch đã được
+                 gửi nên được trả về với status 'submitted' và ReceiptTracker xác nhận sau
+        """
+        try:
+            timeout = timeout_for(getattr(settings, 'BLOCKCHAIN_RECEIPT_WAIT_TIMEOUT', 30))
+            return self.web3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
+        except (TimeExhausted, DeadlineExceeded, CircuitOpenError) as e:
+            logger.warning(f"No receipt yet for {Web3.to_hex(tx_hash)}: {str(e)}")
+            return None
+        except Exception as e:
+            if not is_node_error(e):
+                raise
+            logger.warning(f"Node error while waiting for receipt of {Web3.to_hex(tx_hash)}: {str(e)}")
+            return None
+    
+    def submit_transaction(self, transaction):
+        """
+        Gửi transaction và trả về tx hash ngay, không chờ receipt
+        """
+        return self._sign_and_send_transaction(transaction, wait_for_receipt=False)
+    
+    @property
+    def anchor_service(self):
+        """
+        Service neo giấy tờ theo lô Merkle
+        """
+        if not hasattr(self, '_anchor_service'):
+            from .anchoring import DocumentAnchorService
+            self._anchor_service = DocumentAnchorService(blockchain_service=self)
+        return self._anchor_service
+    
+    def _batch_anchoring(self):
+        """Giấy tờ được neo theo lô Merkle (BLOCKCHAIN_ANCHOR_MODE = 'batch')"""
+        return getattr(settings, 'BLOCKCHAIN_ANCHOR_MODE', 'single') == 'batch'
+    
     def save_document_to_blockchain(self, document, officer_id, metadata=None):
         """
         Lưu giấy tờ vào blockchain
+        
+        Với BLOCKCHAIN_ANCHOR_MODE = 'batch', giấy tờ chỉ được đưa vào hàng chờ
+        và được neo cùng lô qua Merkle root (xem DocumentAnchorService).
         """
         try:
-            # Tạo ID blockchain nếu chưa có
+            if self._batch_anchoring():
+                anchor = self.anchor_service.enqueue(document)
+                return {'success': True, 'status': 'queued', 'anchorId': anchor.id, 'dataHash': anchor.data_hash}
+            
+            # Không hỏi node trước (is_connected): node không khả dụng sẽ làm lời gọi gửi giao dịch
+            # lỗi ngay, hoặc bị circuit breaker từ chối
+            if self.document_contract is None:
+                logger.error("Document contract not initialized")
+                return {'success': False, 'error': 'Document contract not initialized'}
+            
+            # Gọi smart contract function
+            transaction = self.document_contract.functions.createDocument(
+                *self._document_arguments(document, officer_id, metadata)
+            )
+            
+            result = self._sign_and_send_transaction(transaction)
+            self._mark_document_stored(document, result)
+            return result
+            
+        except Exception as e:
+            logger.exception(f"Error saving document to blockchain: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def save_documents_many(self, documents, officer_id, metadata=None):
+        """
+        Lưu nhiều giấy tờ vào blockchain, mỗi lô BLOCKCHAIN_WRITE_BATCH_SIZE giấy tờ là
+        một giao dịch createDocuments
+        
+        Với BLOCKCHAIN_ANCHOR_MODE = 'batch', giấy tờ được đưa vào hàng chờ neo Merkle như
+        save_document_to_blockchain.
+        
+        :return: Danh sách kết quả theo thứ tự documents; giấy tờ cùng lô có chung txId
+                 và cùng thành công hoặc thất bại (contract revert cả lô)
+        """
+        if self._batch_anchoring():
+            return [self.save_document_to_blockchain(document, officer_id, metadata) for document in documents]
+        
+        if self.document_contract is None:
+            logger.error("Document contract not initialized")
+            return [{'success': False, 'error': 'Document contract not initialized'} for _ in documents]
+        
+        items = []
+        for document in documents:
+            try:
+                items.append(self._document_arguments(document, officer_id, dict(metadata or {})))
+            except Exception as e:
+                logger.exception(f"Error preparing document {document.pk}: {str(e)}")
+                items.append({'success': False, 'error': str(e)})
+        
+        results = self._send_many(items, lambda chunk: self.document_contract.functions.createDocuments(chunk))
+        for document, result in zip(documents, results):
+            self._mark_document_stored(document, result)
+        return results
+    
+    def _document_arguments(self, document, officer_id, metadata=None):
+        """
+        Tham số của createDocument cho một giấy tờ, tạo blockchain_id khi chưa có
+        """
+        # Tạo ID blockchain nếu chưa có, giấy tờ hành chính dùng luôn document_id
+        if hasattr(document, 'blockchain_id'):
             if not document.blockchain_id:
                 doc_prefix = document.document_type[:4].upper()
                 document.blockchain_id = self.generate_blockchain_id(prefix=doc_prefix)
                 document.save(update_fields=['blockchain_id'])
-            
-            # Tạo hash cho dữ liệu giấy tờ
-            document_data = {
+            blockchain_id = document.blockchain_id
+        else:
+            blockchain_id = document.document_id
+        
+        # Tạo hash cho dữ liệu giấy tờ, cùng hash mà verify_document_records và bản neo đối chiếu
+        if hasattr(document, 'calculate_data_hash'):
+            data_hash = document.calculate_data_hash()
+        else:
+            data_hash = self.create_hash({
                 'id': str(document.id),
                 'document_type': document.document_type,
                 'citizen_id': str(document.citizen.id) if document.citizen else None,
                 'content': document.content,
-                'issue_date': document.issue_date.isoformat() if document.issue_date else None,
-                'valid_until': document.valid_until.isoformat() if document.valid_until else 'UNLIMITED',
+                'issue_date': document.issue_date,
+                'valid_until': document.valid_until or 'UNLIMITED',
                 'status': document.status,
-            }
-            
-            data_hash = self.create_hash(document_data)
-            
-            # Prepare metadata
-            if metadata is None:
-                metadata = {}
-            
-            metadata.update({
-                'document_title': document.title,
-                'document_number': getattr(document, 'document_number', ''),
-                'is_important': getattr(document, 'is_important', False),
-                'requiresChairmanApproval': getattr(document, 'is_important', False)
             })
+        
+        # Prepare metadata
+        if metadata is None:
+            metadata = {}
+        
+        metadata.update({
+            'document_title': document.title,
+            'document_number': getattr(document, 'document_number', ''),
+            'is_important': getattr(document, 'is_important', False),
+            'requiresChairmanApproval': getattr(document, 'is_important', False)
+        })
+        
+        # Chuẩn bị metadata JSON
+        metadata_json = json.dumps(metadata)
+        
+        return (
+            blockchain_id,
+            document.document_type,
+            str(document.citizen.id) if document.citizen else "0",
+            str(officer_id),
+            document.issue_date.isoformat() if document.issue_date else timezone.now().isoformat(),
+            document.valid_until.isoformat() if document.valid_until else 'UNLIMITED',
+            data_hash,
+            metadata_json
+        )
+    
+    def _mark_document_stored(self, document, result):
+        if result.get('success'):
+            # Cập nhật trạng thái blockchain
+            document.blockchain_status = 'STORED'
+            document.blockchain_tx_id = result.get('txId')
+            document.blockchain_timestamp = timezone.now()
+            document.save(update_fields=['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
+    
+    def _send_many(self, items, build_transaction):
+        """
+        Gửi các item theo lô BLOCKCHAIN_WRITE_BATCH_SIZE, mỗi lô một giao dịch
+        
+        :param items: Tham số của từng item, hoặc dict lỗi cho item không chuẩn bị được
+        :param build_transaction: Hàm nhận danh sách tham số của một lô, trả về hàm contract
+        :return: Danh sách kết quả theo thứ tự items, item cùng lô nhận chung kết quả giao dịch
+        """
+        batch_size = max(1, getattr(settings, 'BLOCKCHAIN_WRITE_BATCH_SIZE', 20))
+        gas_per_item = getattr(settings, 'BLOCKCHAIN_BATCH_GAS_PER_ITEM', 500000)
+        
+        results = [item if isinstance(item, dict) else None for item in items]
+        pending = [index for index, item in enumerate(items) if not isinstance(item, dict)]
+        for start in range(0, len(pending), batch_size):
+            indexes = pending[start:start + batch_size]
+            chunk = [items[index] for index in indexes]
+            try:
+                result = self._sign_and_send_transaction(
+                    build_transaction(chunk),
+                    # Lô đi qua lane của item đầu tiên, giống giao dịch đơn lẻ của item đó
+                    routing_key=chunk[0] if isinstance(chunk[0], str) else chunk[0][0],
+                    gas=DEFAULT_GAS + gas_per_item * len(chunk),
+                )
+            except Exception as e:
+                logger.exception(f"Error sending batch transaction: {str(e)}")
+                result = {'success': False, 'error': str(e)}
             
-            # Chuẩn bị metadata JSON
-            metadata_json = json.dumps(metadata)
-            
-            # Kiểm tra connection và contract
-            if not self.web3.is_connected():
-                logger.error("Not connected to Ethereum node")
-                return {'success': False, 'error': 'Not connected to Ethereum node'}
-            
-            if not hasattr(self, 'document_contract'):
+            for index in indexes:
+                results[index] = dict(result, batchSize=len(chunk))
+        return results
+    
+    def anchor_merkle_root(self, batch_id, merkle_root, leaf_count):
+        """
+        Neo Merkle root của một lô giấy tờ lên blockchain
+        
+        Root được lưu như một bản ghi createDocument loại MERKLE_BATCH,
+        với dataHash là Merkle root của lô.
+        """
+        try:
+            if not self.document_contract:
                 logger.error("Document contract not initialized")
                 return {'success': False, 'error': 'Document contract not initialized'}
             
-            # Gọi smart contract function
             transaction = self.document_contract.functions.createDocument(
-                document.blockchain_id,
-                document.document_type,
-                str(document.citizen.id) if document.citizen else "0",
-                str(officer_id),
-                document.issue_date.isoformat() if document.issue_date else timezone.now().isoformat(),
-                document.valid_until.isoformat() if document.valid_until else 'UNLIMITED',
-                data_hash,
-                metadata_json
+                batch_id,
+                'MERKLE_BATCH',
+                '0',
+                'system',
+                timezone.now().isoformat(),
+                'UNLIMITED',
+                merkle_root,
+                json.dumps({'leafCount': leaf_count, 'algorithm': 'sha256-merkle'})
             )
             
-            result = self._sign_and_send_transaction(transaction)
-            
-            if result.get('success'):
-                # Cập nhật trạng thái blockchain
-                document.blockchain_status = 'STORED'
-                document.blockchain_tx_id = result.get('txId')
-                document.blockchain_timestamp = timezone.now()
-                document.save(update_fields=['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
-            
-            return result
+            return self._sign_and_send_transaction(transaction)
             
         except Exception as e:
-            logger.exception(f"Error saving document to blockchain: {str(e)}")
+            logger.exception(f"Error anchoring merkle root: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def verify_document(self, document_id, document_data=None):
+    def verify_document(self, document_id, document_data=None, raw_hash=False):
         """
         Xác thực giấy tờ trên blockchain
+        
+        Với BLOCKCHAIN_ANCHOR_MODE = 'batch', giấy tờ được neo theo lô được xác thực bằng
+        inclusion proof tới Merkle root. Với raw_hash=True, document_data là data hash đã tính sẵn.
+
+        :return: dict verified, exists, isActive, isExpired, dataIntegrity và document (cùng
+                 định dạng với verify_document_records), hoặc dict lỗi với verified=False
         """
         try:
+            # Giấy tờ được neo theo lô: chứng minh thành viên bằng Merkle proof
+            if self._batch_anchoring():
+                anchor = self.anchor_service.get_anchor(document_id)
+                if anchor is not None:
+                    return self.anchor_service.verify_membership(anchor)
+            
             # Chuẩn bị hash dữ liệu nếu có
             data_hash = None
-            if document_data:
+            if raw_hash:
+                data_hash = document_data
+            elif document_data:
                 data_hash = self.create_hash(document_data)
             
-            # Gọi smart contract function
-            if data_hash:
-                result = self.document_contract.functions.verifyDocument(document_id, data_hash).call()
-            else:
-                result = self.document_contract.functions.verifyDocument(document_id).call()
+            # Gọi smart contract function (qua cache đọc)
+            function = self.document_contract.functions.verifyDocument
+            try:
+                # dataHash rỗng: contract không đối chiếu dữ liệu
+                result = cached_call('document_contract', function, (document_id, data_hash or ''), ids=[document_id])
+            except CircuitOpenError:
+                # Node không khả dụng: đọc từ bảng ChainDocument do indexer dựng
+                from . import indexer
+                if not indexer.is_index_available():
+                    raise
+                result = indexer.verify_document(document_id, data_hash or '')
             
-            return result
+            return verification_result(result)
             
         except Exception as e:
             logger.exception(f"Error verifying document: {str(e)}")
             return {'success': False, 'error': str(e), 'verified': False}
     
+    def call_many(self, calls, block_identifier='latest'):
+        """
+        Thực hiện nhiều lời gọi view tới contract trong một round trip
+        
+        Gửi theo JSON-RPC batch, hoặc qua Multicall3 khi có MULTICALL_CONTRACT_ADDRESS.
+        
+        :param calls: Danh sách contract.functions.f(*args) hoặc cặp (contract.functions.f, args)
+        :return: Danh sách {'success': True, 'result': ...} hoặc {'success': False, 'error': ...}
+                 cùng thứ tự với calls
+        """
+        from .multicall import ContractCaller
+        return ContractCaller(self.web3).call_many(calls, block_identifier)
+    
+    def verify_documents(self, items):
+        """
+        Xác thực nhiều giấy tờ trong một round trip
+        
+        :param items: Danh sách cặp (document_id, data_hash) với data_hash đã tính sẵn
+        :return: Danh sách kết quả cùng định dạng verify_document, theo thứ tự items
+        """
+        if self.document_contract is None:
+            return [{'success': False, 'error': 'Document contract is not configured', 'verified': False} for _ in items]
+        
+        if not get_client().pool.is_available():
+            # Node không khả dụng: đọc từ bảng ChainDocument do indexer dựng
+            from . import indexer
+            if indexer.is_index_available():
+                return indexer.verify_documents(items)
+        
+        results = self.call_many([
+            (self.document_contract.functions.verifyDocument, (document_id, data_hash or ''))
+            for document_id, data_hash in items
+        ])
+        return [
+            result['result'] if result['success'] else {'success': False, 'error': result['error'], 'verified': False}
+            for result in results
+        ]
+    
+    def verify_document_records(self, documents):
+        """
+        Xác thực nhiều giấy tờ trong database với một lần đọc blockchain
+        
+        Giấy tờ được neo theo lô được kiểm tra inclusion proof rồi đối chiếu Merkle root,
+        các giấy tờ còn lại được đối chiếu data hash hiện tại. Mọi lời gọi contract
+        được gửi chung trong một call_many.
+        
+        :param documents: Danh sách Document
+        :return: Danh sách dict (verified, exists, ...) theo thứ tự documents
+        """
+        if not documents:
+            return []
+        
+        anchors = self.anchor_service.get_anchors(documents) if self._batch_anchoring() else {}
+        
+        results = [None] * len(documents)
+        pending = []
+        for index, document in enumerate(documents):
+            anchor = anchors.get(document.pk)
+            if anchor is not None:
+                anchor.document = document
+                result = self.anchor_service.check_proof(anchor)
+                results[index] = result
+                if result['proofValid']:
+                    pending.append((index, anchor.batch.batch_id, anchor.batch.merkle_root))
+            else:
+                pending.append((index, document.document_id, document.calculate_data_hash()))
+        
+        chain_results = self.verify_documents([(chain_id, data_hash) for _, chain_id, data_hash in pending]) if pending else []
+        
+        for (index, _, _), chain_result in zip(pending, chain_results):
+            if results[index] is not None:
+                self.anchor_service.apply_chain_result(results[index], chain_result)
+            else:
+                results[index] = verification_result(chain_result)
+        
+        return results
+    
     def get_document_history(self, document_id):
         """
         Lấy lịch sử của giấy tờ trên blockchain
+        
+        Đọc từ bảng DocumentEvent khi indexer đang chạy, chỉ gọi contract
+        khi chưa có dữ liệu cục bộ.
         """
         try:
+            from . import indexer
+            if indexer.is_index_available():
+                history = indexer.get_document_history(document_id)
+                if history:
+                    return history
+            
             # Gọi smart contract function
-            history = self.document_contract.functions.getDocumentHistory(document_id).call()
+            history = cached_call('document_contract', self.document_contract.functions.getDocumentHistory, (document_id,), ids=[document_id])
             return history
             
         except Exception as e:
@@ -373,6 +690,24 @@ class BlockchainService:
             logger.exception(f"Error approving document: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def approve_documents_many(self, document_ids, approver_id, comments=''):
+        """
+        Phê duyệt nhiều giấy tờ, mỗi lô BLOCKCHAIN_WRITE_BATCH_SIZE giấy tờ là một giao dịch
+        approveDocuments
+        
+        Quy trình phê duyệt trên AdminContract không được cập nhật (dùng approve_workflow).
+        
+        :return: Danh sách kết quả theo thứ tự document_ids; giấy tờ cùng lô có chung txId
+                 và cùng thành công hoặc thất bại (contract revert cả lô)
+        """
+        if self.document_contract is None:
+            return [{'success': False, 'error': 'Document contract not initialized'} for _ in document_ids]
+        
+        return self._send_many(
+            list(document_ids),
+            lambda chunk: self.document_contract.functions.approveDocuments(chunk, str(approver_id), comments)
+        )
+    
     def reject_document(self, document_id, rejector_id, reason):
         """
         Từ chối giấy tờ
@@ -419,52 +754,162 @@ class BlockchainService:
             logger.exception(f"Error rejecting document: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def register_user_on_blockchain(self, user, created_by='system'):
+    def revoke_document(self, document_id, revoker_id, reason):
         """
-        Đăng ký người dùng trên blockchain
+        Thu hồi giấy tờ
         """
         try:
-            # Tạo ID blockchain nếu chưa có
-            if not user.blockchain_id:
-                user_prefix = 'USR'
-                user.blockchain_id = self.generate_blockchain_id(prefix=user_prefix)
-                user.save(update_fields=['blockchain_id'])
-            
-            # Chuẩn bị metadata
-            metadata = {
-                'user_type': user.user_type,
-                'phone': getattr(user, 'phone_number', ''),
-                'address': getattr(user, 'address', ''),
-                'identification_number': getattr(user, 'identification_number', '')
-            }
+            # Gọi smart contract function
+            transaction = self.document_contract.functions.revokeDocument(
+                document_id,
+                str(revoker_id),
+                reason
+            )
             
-            # Chuyển metadata thành JSON string
-            metadata_json = json.dumps(metadata)
+            return self._sign_and_send_transaction(transaction)
             
-            # Gọi smart contract function (chỉ 5 tham số theo ABI)
-            transaction = self.user_contract.functions.registerUser(
-                user.blockchain_id,
-                user.get_role_display().lower() if hasattr(user, 'get_role_display') else user.role.lower(),
-                user.get_full_name() if hasattr(user, 'get_full_name') else f"{user.first_name} {user.last_name}",
-                user.email,
-                metadata_json
+        except Exception as e:
+            logger.exception(f"Error revoking document: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def create_approval_workflow(self, approval_id, approval_type, target_id, requested_by, approvers, metadata='{}', priority='MEDIUM', deadline=None):
+        """
+        Tạo quy trình phê duyệt trên admin contract
+        """
+        try:
+            if deadline is None:
+                deadline = timezone.now() + timezone.timedelta(days=7)
+            
+            # Gọi smart contract function
+            transaction = self.admin_contract.functions.createApprovalWorkflow(
+                approval_id,
+                approval_type,
+                str(target_id),
+                str(requested_by),
+                approvers,
+                metadata,
+                priority,
+                deadline.isoformat()
             )
             
-            result = self._sign_and_send_transaction(transaction)
+            return self._sign_and_send_transaction(transaction)
             
-            if result.get('success'):
-                # Cập nhật trạng thái blockchain
-                user.blockchain_status = 'REGISTERED'
-                user.blockchain_tx_id = result.get('txId')
-                user.blockchain_timestamp = timezone.now()
-                user.save(update_fields=['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
+        except Exception as e:
+            logger.exception(f"Error creating approval workflow: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def approve_workflow(self, approval_id, approver_id, comments=''):
+        """
+        Phê duyệt quy trình phê duyệt trên admin contract
+        """
+        try:
+            # Gọi smart contract function
+            transaction = self.admin_contract.functions.approveWorkflow(
+                approval_id,
+                str(approver_id),
+                comments
+            )
+            
+            return self._sign_and_send_transaction(transaction)
+            
+        except Exception as e:
+            logger.exception(f"Error approving workflow: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def reject_workflow(self, approval_id, rejector_id, reason):
+        """
+        Từ chối quy trình phê duyệt trên admin contract
+        """
+        try:
+            # Gọi smart contract function
+            transaction = self.admin_contract.functions.rejectWorkflow(
+                approval_id,
+                str(rejector_id),
+                reason
+            )
             
+            return self._sign_and_send_transaction(transaction)
+            
+        except Exception as e:
+            logger.exception(f"Error rejecting workflow: {str(e)}")
+            return {'success': False, 'error': str(e)}
+    
+    def register_user_on_blockchain(self, user, created_by='system'):
+        """
+        Đăng ký người dùng trên blockchain
+        """
+        try:
+            # Gọi smart contract function (chỉ 5 tham số theo ABI)
+            transaction = self.user_contract.functions.registerUser(*self._user_profile(user))
+            
+            result = self._sign_and_send_transaction(transaction)
+            self._mark_user_registered(user, result)
             return result
             
         except Exception as e:
             logger.exception(f"Error registering user on blockchain: {str(e)}")
             return {'success': False, 'error': str(e)}
     
+    def register_users_many(self, users, created_by='system'):
+        """
+        Đăng ký nhiều người dùng, mỗi lô BLOCKCHAIN_WRITE_BATCH_SIZE người dùng là một giao
+        dịch registerUsers
+        
+        :return: Danh sách kết quả theo thứ tự users; người dùng cùng lô có chung txId
+        """
+        if self.user_contract is None:
+            return [{'success': False, 'error': 'User contract not initialized'} for _ in users]
+        
+        items = []
+        for user in users:
+            try:
+                blockchain_id, role, name, email, metadata_json = self._user_profile(user)
+                status = 'ACTIVE' if getattr(user, 'is_active', True) else 'INACTIVE'
+                items.append((blockchain_id, role, name, email, str(created_by), status, metadata_json))
+            except Exception as e:
+                logger.exception(f"Error preparing user {user.pk}: {str(e)}")
+                items.append({'success': False, 'error': str(e)})
+        
+        results = self._send_many(items, lambda chunk: self.user_contract.functions.registerUsers(chunk))
+        for user, result in zip(users, results):
+            self._mark_user_registered(user, result)
+        return results
+    
+    def _user_profile(self, user):
+        """
+        ID blockchain (tạo khi chưa có), vai trò, họ tên, email và metadata JSON của người dùng
+        """
+        # Tạo ID blockchain nếu chưa có
+        if not user.blockchain_id:
+            user_prefix = 'USR'
+            user.blockchain_id = self.generate_blockchain_id(prefix=user_prefix)
+            user.save(update_fields=['blockchain_id'])
+        
+        # Chuẩn bị metadata
+        metadata = {
+            'user_type': user.user_type,
+            'phone': getattr(user, 'phone_number', ''),
+            'address': getattr(user, 'address', ''),
+            'identification_number': getattr(user, 'identification_number', '')
+        }
+        
+        return (
+            user.blockchain_id,
+            user.get_role_display().lower() if hasattr(user, 'get_role_display') else user.role.lower(),
+            user.get_full_name() if hasattr(user, 'get_full_name') else f"{user.first_name} {user.last_name}",
+            user.email,
+            # Chuyển metadata thành JSON string
+            json.dumps(metadata)
+        )
+    
+    def _mark_user_registered(self, user, result):
+        if result.get('success'):
+            # Cập nhật trạng thái blockchain
+            user.blockchain_status = 'REGISTERED'
+            user.blockchain_tx_id = result.get('txId')
+            user.blockchain_timestamp = timezone.now()
+            user.save(update_fields=['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
+    
     def update_user_role(self, user_id, new_role, approver_id=None):
         """
         Cập nhật vai trò người dùng trên blockchain
@@ -496,11 +941,12 @@ class BlockchainService:
             if user_data:
                 data_hash = self.create_hash(user_data)
             
-            # Gọi smart contract function
+            # Gọi smart contract function (qua cache đọc)
+            function = self.user_contract.functions.verifyUser
             if data_hash:
-                result = self.user_contract.functions.verifyUser(user_id, data_hash).call()
+                result = cached_call('user_contract', function, (user_id, data_hash), ids=[user_id])
             else:
-                result = self.user_contract.functions.verifyUser(user_id).call()
+                result = cached_call('user_contract', function, (user_id,), ids=[user_id])
             
             return result
             
@@ -514,7 +960,8 @@ class BlockchainService:
         """
         try:
             # Gọi smart contract function
-            result = self.admin_contract.functions.getPendingApprovalsByApprover(str(approver_id)).call()
+            # Danh sách phụ thuộc mọi quy trình nên được làm mới theo mọi event của AdminContract
+            result = cached_call('admin_contract', self.admin_contract.functions.getPendingApprovalsByApprover, (str(approver_id),))
             return result
             
         except Exception as e:
@@ -524,12 +971,58 @@ class BlockchainService:
     def get_user_documents(self, citizen_id):
         """
         Lấy danh sách giấy tờ của công dân từ blockchain
+        
+        Đọc từ bảng ChainDocument khi indexer đang chạy, chỉ gọi contract
+        khi chưa có dữ liệu cục bộ.
         """
         try:
-            # Gọi smart contract function
-            result = self.document_contract.functions.getDocumentsByCitizen(str(citizen_id)).call()
-            return result
+            from . import indexer
+            if indexer.is_index_available():
+                documents = indexer.get_documents_by_citizen(citizen_id)
+                if documents:
+                    return documents
+            
+            # Gọi smart contract function, từng trang một
+            return list(self.iter_documents_by_citizen(citizen_id))
             
         except Exception as e:
             logger.exception(f"Error getting user documents: {str(e)}")
-            return {'success': False, 'error': str(e)} 
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
+    
+    def iter_documents_by_citizen(self, citizen_id, page_size=None):
+        """
+        Duyệt giấy tờ của công dân theo thứ tự tạo, gọi getDocumentsByCitizenPage khi cần trang tiếp theo
+        
+        :param page_size: Số giấy tờ mỗi lời gọi, mặc định BLOCKCHAIN_PAGE_SIZE
+        :return: Generator các struct Document, lỗi của node được ném ra khi đọc tới trang lỗi
+        """
+        return self._iter_pages(self.document_contract.functions.getDocumentsByCitizenPage, (str(citizen_id),), page_size)
+    
+    def iter_documents_by_state(self, state, page_size=None):
+        """
+        Duyệt giấy tờ đang ở một trạng thái, gọi getDocumentsByStatePage khi cần trang tiếp theo
+        
+        Contract đổi thứ tự danh sách khi giấy tờ chuyển trạng thái, giấy tờ đổi trạng thái trong
+        lúc duyệt có thể bị bỏ sót hoặc được trả về hai lần.
+        
+        :param state: Giá trị DocumentState (0-4) hoặc tên, ví dụ 'ACTIVE'
+        :param page_size: Số giấy tờ mỗi lời gọi, mặc định BLOCKCHAIN_PAGE_SIZE
+        """
+        from apps.blockchain.models import ChainDocument
+        
+        if isinstance(state, str):
+            states = {name: value for value, name in ChainDocument.STATE_CHOICES}
+            if state not in states:
+                raise ValueError(f"Unknown document state: {state}")
+            state = states[state]
+        return self._iter_pages(self.document_contract.functions.getDocumentsByStatePage, (int(state),), page_size)
+    
+    def _iter_pages(self, function, args, page_size=None):
+        page_size = page_size or getattr(settings, 'BLOCKCHAIN_PAGE_SIZE', 100)
+        cursor = 0
+        while True:
+            # Trang phụ thuộc trạng thái của mọi giấy tờ trong danh sách nên được làm mới theo mọi event
+            page, cursor = cached_call('document_contract', function, args + (cursor, page_size))
+            yield from page
+            if not cursor:
+                return 
\ No newline at end of file
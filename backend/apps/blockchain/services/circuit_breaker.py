@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from django.conf import settings
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+# Giá trị của gauge trạng thái
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+STATE = REGISTRY.gauge(
+    'blockchain_circuit_breaker_state', 'Trạng thái circuit breaker theo endpoint (0 closed, 1 half-open, 2 open)',
+    ('endpoint',)
+)
+TRANSITIONS = REGISTRY.counter(
+    'blockchain_circuit_breaker_transitions_total', 'Số lần circuit breaker chuyển trạng thái', ('endpoint', 'state')
+)
+REJECTED = REGISTRY.counter(
+    'blockchain_circuit_breaker_rejected_total', 'Số lời gọi bị từ chối ngay vì circuit breaker đang mở', ('endpoint',)
+)
+FAILURES = REGISTRY.counter(
+    'blockchain_circuit_breaker_failures_total', 'Số lời gọi tới node lỗi kết nối/timeout/5xx', ('endpoint',)
+)
+
+_lock = threading.Lock()
+_breakers = {}
+
+
+class CircuitOpenError(Exception):
+    """
+    Node đang được đánh dấu không khả dụng, lời gọi bị từ chối mà không gửi đi
+    """
+
+    def __init__(self, endpoint, retry_after):
+        super().__init__(f"Blockchain node {endpoint} is unavailable, retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def endpoint_label(endpoint_uri):
+    """
+    Tên endpoint dùng trong log và metric: scheme://host:port, bỏ path và thông tin đăng nhập (API key)
+    """
+    parts = urlsplit(endpoint_uri or '')
+    if not parts.hostname:
+        return endpoint_uri or ''
+    port = f':{parts.port}' if parts.port else ''
+    return f'{parts.scheme}://{parts.hostname}{port}'
+
+
+def is_node_error(exc):
+    """
+    Lỗi cho thấy node không khả dụng (kết nối, timeout, HTTP 5xx), không tính lỗi JSON-RPC/revert
+    """
+    import requests
+
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout, asyncio.TimeoutError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, requests.HTTPError):
+        return exc.response is None or exc.response.status_code >= 500
+
+    try:
+        import aiohttp
+    except ImportError:
+        return False
+    if isinstance(exc, aiohttp.ClientResponseError):
+        return exc.status >= 500
+    return isinstance(exc, aiohttp.ClientError)
+
+
+def is_timeout(exc):
+    import requests
+
+    return isinstance(exc, (requests.Timeout, asyncio.TimeoutError, TimeoutError))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker cho một endpoint RPC, dùng chung cho mọi thread và event loop của process
+
+    Sau BLOCKCHAIN_BREAKER_FAILURE_THRESHOLD lỗi liên tiếp breaker mở: mọi lời gọi bị từ chối
+    ngay bằng CircuitOpenError trong BLOCKCHAIN_BREAKER_RESET_TIMEOUT giây. Sau đó breaker
+    chuyển sang half-open và cho tối đa BLOCKCHAIN_BREAKER_HALF_OPEN_CALLS lời gọi thử:
+    thành công thì đóng lại, lỗi thì mở tiếp.
+    """
+
+    def __init__(self, endpoint, failure_threshold=None, reset_timeout=None, half_open_calls=None):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold or getattr(settings, 'BLOCKCHAIN_BREAKER_FAILURE_THRESHOLD', 5)
+        self.reset_timeout = reset_timeout or getattr(settings, 'BLOCKCHAIN_BREAKER_RESET_TIMEOUT', 30)
+        self.half_open_calls = half_open_calls or getattr(settings, 'BLOCKCHAIN_BREAKER_HALF_OPEN_CALLS', 1)
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0
+        self._trials = 0
+        self._lock = threading.Lock()
+        STATE.set(STATE_VALUES[CLOSED], endpoint=endpoint)
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def is_open(self):
+        return self.state == OPEN
+
+    def before_call(self):
+        """
+        Xin phép gửi một lời gọi, ném CircuitOpenError khi breaker đang mở
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._trials >= self.half_open_calls):
+                REJECTED.inc(endpoint=self.endpoint)
+                retry_after = max(self._opened_at + self.reset_timeout - time.monotonic(), 0)
+                raise CircuitOpenError(self.endpoint, retry_after)
+            if state == HALF_OPEN:
+                self._trials += 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        FAILURES.inc(endpoint=self.endpoint)
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or (state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def release(self):
+        """
+        Lời gọi kết thúc không cho biết node có khỏe hay không (ví dụ hết deadline)
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    @contextmanager
+    def guard(self, count_timeouts=True):
+        """
+        Bao một lời gọi tới node: từ chối khi breaker mở và ghi nhận kết quả
+
+        Dùng được quanh cả lời gọi async (with ...: await ...).
+
+        :param count_timeouts: False khi timeout của lời gọi đã bị rút ngắn theo deadline của
+                               request, timeout khi đó không có nghĩa là node chậm
+        """
+        self.before_call()
+        try:
+            yield
+        except Exception as e:
+            if is_node_error(e) and (count_timeouts or not is_timeout(e)):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        else:
+            self.record_success()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state):
+        previous, self._state = self._state, state
+        self._trials = 0
+        STATE.set(STATE_VALUES[state], endpoint=self.endpoint)
+        TRANSITIONS.inc(endpoint=self.endpoint, state=state)
+        log = logger.warning if state == OPEN else logger.info
+        log(f"Circuit breaker for {self.endpoint}: {previous} -> {state}")
+
+
+def get_breaker(endpoint_uri):
+    """
+    Lấy circuit breaker dùng chung của process cho endpoint RPC
+    """
+    endpoint = endpoint_label(endpoint_uri)
+    breaker = _breakers.get(endpoint)
+    if breaker is None:
+        with _lock:
+            breaker = _breakers.get(endpoint)
+            if breaker is None:
+                breaker = _breakers[endpoint] = CircuitBreaker(endpoint)
+    return breaker
+
+
+def reset_breakers():
+    """
+    Bỏ toàn bộ circuit breaker (khi đổi cấu hình hoặc trong kiểm thử)
+    """
+    with _lock:
+        _breakers.clear()
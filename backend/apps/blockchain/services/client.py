@@ -0,0 +1,197 @@
+import json
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from web3 import Web3
+
+from .endpoint_pool import EndpointPool
+
+logger = logging.getLogger(__name__)
+
+# Tên contract -> setting chứa địa chỉ
+CONTRACTS = {
+    'document_contract': 'DOCUMENT_CONTRACT_ADDRESS',
+    'user_contract': 'USER_CONTRACT_ADDRESS',
+    'admin_contract': 'ADMIN_CONTRACT_ADDRESS',
+}
+
+_lock = threading.Lock()
+_client = None
+
+
+def _settings_fingerprint():
+    """
+    Các setting quyết định cấu hình client, client được tạo lại khi giá trị thay đổi
+    """
+    return (
+        getattr(settings, 'WEB3_PROVIDER_URI', 'http://localhost:8545'),
+        getattr(settings, 'CONTRACT_ABI_DIR', None),
+        getattr(settings, 'BLOCKCHAIN_DIR', os.path.join(settings.BASE_DIR, '..', 'blockchain')),
+        getattr(settings, 'BLOCKCHAIN_DEFAULT_ACCOUNT', None),
+        getattr(settings, 'BLOCKCHAIN_HTTP_POOL_SIZE', 20),
+        getattr(settings, 'BLOCKCHAIN_RPC_TIMEOUT', 10),
+        tuple(getattr(settings, 'WEB3_PROVIDER_URIS', None) or ()),
+        getattr(settings, 'WEB3_SEQUENCER_URI', None),
+    ) + tuple(getattr(settings, setting, None) for setting in CONTRACTS.values())
+
+
+def sort_batch_response(response):
+    """
+    Sắp kết quả JSON-RPC batch theo id của request, node không bắt buộc trả về đúng thứ tự
+
+    Phần tử thiếu id (một số lỗi của node) thì giữ nguyên thứ tự node trả về.
+    """
+    if all(isinstance(item, dict) and item.get('id') is not None for item in response):
+        return sorted(response, key=lambda item: item['id'])
+    return response
+
+
+class GuardedHTTPProvider(Web3.HTTPProvider):
+    """
+    HTTPProvider gửi request qua EndpointPool
+
+    Lời gọi đọc được chia cho các node đọc, giao dịch và lời gọi phụ thuộc nonce đi tới
+    sequencer. Timeout của mỗi HTTP request là BLOCKCHAIN_RPC_TIMEOUT, rút ngắn theo thời
+    gian còn lại của request (deadline). Khi node lỗi liên tiếp, circuit breaker của node
+    từ chối lời gọi ngay bằng CircuitOpenError.
+    """
+
+    def __init__(self, pool, timeout, session=None, **kwargs):
+        super().__init__(pool.sequencer.uri, request_kwargs={'timeout': timeout}, session=session, **kwargs)
+        self.pool = pool
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def make_request(self, method, params):
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = self.pool.request([(method, params)], self._sender(request_data), self.timeout)
+        return self.decode_rpc_response(raw_response)
+
+    def make_batch_request(self, batch_requests):
+        request_data = self.encode_batch_rpc_request(batch_requests)
+        raw_response = self.pool.request(batch_requests, self._sender(request_data), self.timeout)
+        response = self.decode_rpc_response(raw_response)
+        if not isinstance(response, list):
+            # Node trả về một lỗi cho cả batch
+            return response
+        return sort_batch_response(response)
+
+    def _sender(self, request_data):
+        def send(endpoint_uri, timeout):
+            response = self.session.post(endpoint_uri, data=request_data, **dict(self.get_request_kwargs(), timeout=timeout))
+            response.raise_for_status()
+            return response.content
+        return send
+
+
+def load_contract_abi(contract_name, abi_dir=None, blockchain_dir=None):
+    """
+    Đọc ABI của contract từ CONTRACT_ABI_DIR hoặc blockchain_dir/contracts
+    """
+    try:
+        candidates = []
+        if abi_dir:
+            candidates.append(os.path.join(abi_dir, f'{contract_name}.json'))
+        if blockchain_dir:
+            candidates.append(os.path.join(blockchain_dir, 'contracts', f'{contract_name}.json'))
+
+        for abi_path in candidates:
+            if os.path.exists(abi_path):
+                with open(abi_path, 'r') as f:
+                    return json.load(f).get('abi', [])
+
+        logger.warning(f"Could not find ABI file for {contract_name}")
+        return []
+    except Exception as e:
+        logger.warning(f"Could not load ABI for {contract_name}: {str(e)}")
+        return []
+
+
+class BlockchainClient:
+    """
+    Web3, HTTP session keep-alive, ABI và contract dùng chung cho cả process
+
+    Không khởi tạo trực tiếp, dùng get_client().
+    """
+
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        provider_uri, abi_dir, blockchain_dir, default_account, pool_size, timeout, read_uris, sequencer_uri = fingerprint[:8]
+
+        # Giao dịch đi tới sequencer (mặc định WEB3_PROVIDER_URI), lời gọi đọc chia cho WEB3_PROVIDER_URIS
+        self.provider_uri = sequencer_uri or provider_uri
+        self.read_uris = list(read_uris) or [self.provider_uri]
+        self.timeout = timeout
+        self.blockchain_dir = blockchain_dir
+
+        # Session giữ kết nối TCP tới node giữa các request, dùng chung cho mọi thread
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.pool = EndpointPool(self.read_uris, self.provider_uri, self.session)
+        self.pool.start()
+
+        self.web3 = Web3(GuardedHTTPProvider(self.pool, timeout, session=self.session))
+        if default_account:
+            self.web3.eth.default_account = default_account
+
+        self.abis = {}
+        self.addresses = {}
+        self.contracts = {}
+
+        for contract_name, setting in CONTRACTS.items():
+            self.abis[contract_name] = load_contract_abi(contract_name, abi_dir, blockchain_dir)
+            self.addresses[contract_name] = getattr(settings, setting, None)
+            self.contracts[contract_name] = None
+
+            if self.addresses[contract_name] and self.abis[contract_name]:
+                try:
+                    self.contracts[contract_name] = self.web3.eth.contract(
+                        address=self.addresses[contract_name],
+                        abi=self.abis[contract_name]
+                    )
+                except Exception as e:
+                    logger.error(f"Error initializing {contract_name}: {str(e)}")
+
+    def close(self):
+        self.pool.stop()
+        self.session.close()
+
+
+def get_client():
+    """
+    Lấy client dùng chung của process, tạo mới khi chưa có hoặc khi setting thay đổi
+    """
+    global _client
+
+    fingerprint = _settings_fingerprint()
+    client = _client
+    if client is not None and client.fingerprint == fingerprint:
+        return client
+
+    with _lock:
+        if _client is None or _client.fingerprint != fingerprint:
+            previous = _client
+            _client = BlockchainClient(fingerprint)
+            if previous is not None:
+                # Client cũ có thể còn đang được dùng, chỉ dừng kiểm tra sức khỏe
+                previous.pool.stop()
+                logger.info("Blockchain settings changed, client reloaded")
+        return _client
+
+
+def reset_client():
+    """
+    Bỏ client hiện tại, lần gọi get_client() sau sẽ tạo lại
+    """
+    global _client
+
+    with _lock:
+        if _client is not None:
+            _client.close()
+        _client = None
@@ -0,0 +1,63 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Thời điểm (time.monotonic) mà request hiện tại phải xong, None nếu không giới hạn
+_deadline = contextvars.ContextVar('blockchain_deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    """
+    Request đã dùng hết thời gian cho phép trước khi gọi node
+    """
+
+
+@contextmanager
+def deadline(seconds):
+    """
+    Giới hạn thời gian cho các lời gọi node bên trong khối with
+
+    Deadline lồng nhau chỉ có thể ngắn hơn deadline bên ngoài. Giá trị được lưu trong
+    contextvar nên đi theo request qua sync_to_async/async_to_sync và các task asyncio.
+
+    :param seconds: Số giây, None không giới hạn thêm
+    """
+    if seconds is None:
+        yield
+        return
+
+    until = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        until = min(until, current)
+
+    token = _deadline.set(until)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining():
+    """
+    Số giây còn lại của deadline hiện tại, None nếu không có deadline
+    """
+    until = _deadline.get()
+    if until is None:
+        return None
+    return until - time.monotonic()
+
+
+def timeout_for(default):
+    """
+    Timeout cho một lời gọi node: default, rút ngắn theo thời gian còn lại của request
+
+    :raises DeadlineExceeded: Khi request đã hết thời gian
+    """
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded('Request deadline exceeded before calling the blockchain node')
+    return min(default, left) if default else left
+
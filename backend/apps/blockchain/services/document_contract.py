@@ -1,8 +1,8 @@
 import logging
 import json
-from django.conf import settings
-# from web3 import Web3
 from .blockchain_service import BlockchainService
+from .client import get_client
+from .read_cache import cached_call
 
 logger = logging.getLogger(__name__)
 
@@ -11,24 +11,22 @@ class DocumentContractService:
     Service for interacting with document smart contract on the blockchain using Web3.py
     """
     
-    def __init__(self):
-        self.blockchain_service = BlockchainService()
-        
-        # Initialize Web3 connection
-        self.web3_provider = getattr(settings, 'WEB3_PROVIDER_URI', 'http://localhost:8545')
-        # self.web3 = Web3(Web3.HTTPProvider(self.web3_provider))
-        self.web3 = None
-        
-        # Get contract address and ABI
-        self.contract_address = getattr(settings, 'DOCUMENT_CONTRACT_ADDRESS', None)
-        self.contract = None
-        
-        # Tạm thời comment phần khởi tạo contract
-        # if self.contract_address:
-        #     self.contract = self.web3.eth.contract(
-        #         address=self.contract_address,
-        #         abi=self.blockchain_service.document_contract_abi
-        #     )
+    @property
+    def blockchain_service(self):
+        return BlockchainService()
+    
+    @property
+    def web3(self):
+        return get_client().web3
+    
+    @property
+    def contract_address(self):
+        return get_client().addresses['document_contract']
+    
+    @property
+    def contract(self):
+        # Contract dùng chung trong process, được tạo lại khi setting thay đổi
+        return get_client().contracts['document_contract']
     
     def create_document(self, document_data):
         """
@@ -86,7 +84,7 @@ class DocumentContractService:
                 return {'success': False, 'error': 'Document contract is not initialized'}
             
             # Call the contract function
-            document = self.contract.functions.getDocument(document_id).call()
+            document = cached_call('document_contract', self.contract.functions.getDocument, (document_id,), ids=[document_id])
             
             # Format the response
             formatted_document = {
@@ -154,8 +152,8 @@ class DocumentContractService:
         :return: Verification result
         """
         try:
-            # Use the existing blockchain service method
-            result = self.blockchain_service.verify_document(document_id, data_hash)
+            # data_hash đã là hash của dữ liệu giấy tờ, không băm lại
+            result = self.blockchain_service.verify_document(document_id, data_hash, raw_hash=data_hash is not None)
             return result
             
         except Exception as e:
@@ -0,0 +1,280 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+from .circuit_breaker import CircuitOpenError, endpoint_label, get_breaker, is_node_error
+from .deadline import timeout_for
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Lời gọi gửi giao dịch hoặc phụ thuộc vào txpool/nonce của tài khoản: luôn đi tới sequencer,
+# để nonce, giao dịch vừa gửi và receipt được đọc từ cùng một node
+SEQUENCER_METHODS = frozenset({
+    'eth_sendRawTransaction', 'eth_sendTransaction', 'eth_signTransaction', 'eth_sign', 'eth_accounts',
+    'eth_getTransactionCount', 'eth_getTransactionByHash', 'eth_getTransactionReceipt', 'eth_estimateGas',
+})
+SEQUENCER_PREFIXES = ('personal_', 'txpool_', 'eea_', 'priv_')
+
+# Hệ số của trung bình trượt (EWMA) độ trễ
+LATENCY_DECAY = 0.2
+
+HEALTHY = REGISTRY.gauge('blockchain_endpoint_healthy', 'Endpoint RPC được coi là khỏe (1) hay không (0)', ('endpoint',))
+LATENCY = REGISTRY.gauge('blockchain_endpoint_latency_seconds', 'Độ trễ trung bình trượt của endpoint RPC', ('endpoint',))
+HEAD = REGISTRY.gauge('blockchain_endpoint_head_block', 'Block mới nhất của endpoint RPC ở lần kiểm tra gần nhất', ('endpoint',))
+REQUESTS = REGISTRY.counter(
+    'blockchain_endpoint_requests_total', 'Số request gửi tới endpoint RPC theo hướng định tuyến', ('endpoint', 'route')
+)
+
+
+# Block thấp nhất node đọc phải có, xem min_block()
+_min_block = contextvars.ContextVar('blockchain_min_block', default=None)
+
+
+@contextmanager
+def min_block(number):
+    """
+    Trong khối with, lời gọi đọc chỉ đi tới node đã biết có block number (theo lần kiểm tra
+    sức khỏe gần nhất); không có node nào như vậy thì đi tới sequencer
+
+    Dùng khi đọc lại trạng thái sau một giao dịch hoặc event đã thấy ở block number, để
+    không đọc phải kết quả cũ từ node đang chậm.
+    """
+    current = _min_block.get()
+    if number is not None and current is not None:
+        number = max(number, current)
+    token = _min_block.set(number if number is not None else current)
+    try:
+        yield
+    finally:
+        _min_block.reset(token)
+
+
+def is_sequencer_call(method, params=None):
+    """
+    Lời gọi phải đi tới sequencer: gửi giao dịch, phụ thuộc nonce hoặc đọc trạng thái pending
+    """
+    if method in SEQUENCER_METHODS or method.startswith(SEQUENCER_PREFIXES):
+        return True
+    return isinstance(params, (list, tuple)) and 'pending' in params
+
+
+class Endpoint:
+    """
+    Một node RPC trong pool: circuit breaker, độ trễ trung bình và kết quả kiểm tra sức khỏe
+    """
+
+    def __init__(self, uri):
+        self.uri = uri
+        self.label = endpoint_label(uri)
+        self.breaker = get_breaker(uri)
+        self.latency = None
+        self.head = None
+        self.healthy = True
+        HEALTHY.set(1, endpoint=self.label)
+
+    @property
+    def available(self):
+        return self.healthy and not self.breaker.is_open()
+
+    def observe(self, seconds):
+        self.latency = seconds if self.latency is None else (1 - LATENCY_DECAY) * self.latency + LATENCY_DECAY * seconds
+        LATENCY.set(self.latency, endpoint=self.label)
+
+    def set_health(self, healthy, head=None):
+        if healthy != self.healthy:
+            log = logger.info if healthy else logger.warning
+            log(f"Blockchain endpoint {self.label} is {'healthy' if healthy else 'unhealthy'}")
+        self.healthy = healthy
+        HEALTHY.set(1 if healthy else 0, endpoint=self.label)
+        if head is not None:
+            self.head = head
+            HEAD.set(head, endpoint=self.label)
+
+
+class EndpointPool:
+    """
+    Tập node RPC: lời gọi đọc được chia cho các node đọc, giao dịch đi tới sequencer
+
+    Node đọc được chọn ngẫu nhiên với trọng số nghịch đảo độ trễ trung bình, bỏ qua node
+    không khỏe (lỗi hoặc chậm hơn BLOCKCHAIN_MAX_BLOCK_LAG block so với node mới nhất) và
+    node có circuit breaker đang mở. Lời gọi đọc lỗi kết nối được thử lại trên node khác,
+    tối đa BLOCKCHAIN_READ_ATTEMPTS node. Lời gọi tới sequencer (xem is_sequencer_call)
+    không được thử lại ở node khác. Trong min_block(), chỉ node đã có block đó được chọn.
+
+    Khi có nhiều hơn một node, một thread nền kiểm tra eth_blockNumber của mọi node mỗi
+    BLOCKCHAIN_HEALTH_CHECK_INTERVAL giây.
+    """
+
+    def __init__(self, read_uris, sequencer_uri, session, max_lag=None, read_attempts=None, check_interval=None):
+        self.session = session
+        self.max_lag = max_lag if max_lag is not None else getattr(settings, 'BLOCKCHAIN_MAX_BLOCK_LAG', 5)
+        self.read_attempts = read_attempts or getattr(settings, 'BLOCKCHAIN_READ_ATTEMPTS', 2)
+        self.check_interval = (
+            check_interval if check_interval is not None else getattr(settings, 'BLOCKCHAIN_HEALTH_CHECK_INTERVAL', 5)
+        )
+        self.check_timeout = getattr(settings, 'BLOCKCHAIN_HEALTH_CHECK_TIMEOUT', 2)
+
+        self.endpoints = {}
+        for uri in [sequencer_uri] + list(read_uris):
+            if uri not in self.endpoints:
+                self.endpoints[uri] = Endpoint(uri)
+        self.sequencer = self.endpoints[sequencer_uri]
+        self.readers = [self.endpoints[uri] for uri in dict.fromkeys(read_uris)]
+
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def route(self, calls):
+        """
+        Các node lần lượt thử cho danh sách (method, params) gửi chung một request
+        """
+        if self.is_sequencer_request(calls):
+            return [self.sequencer]
+
+        floor = _min_block.get()
+        if floor is not None:
+            readers = [endpoint for endpoint in self.readers if endpoint.head is not None and endpoint.head >= floor]
+            if not readers:
+                return [self.sequencer]
+        else:
+            readers = self.readers
+
+        candidates = [endpoint for endpoint in readers if endpoint.available]
+        if not candidates:
+            # Kết quả kiểm tra sức khỏe có thể đã cũ: thử mọi node breaker chưa mở
+            candidates = [endpoint for endpoint in readers if not endpoint.breaker.is_open()]
+        if not candidates:
+            # Mọi node đều mở breaker: để breaker của node đầu tiên từ chối lời gọi
+            return readers[:1]
+
+        chosen = []
+        while candidates and len(chosen) < self.read_attempts:
+            endpoint = random.choices(candidates, weights=self._weights(candidates))[0]
+            candidates.remove(endpoint)
+            chosen.append(endpoint)
+        return chosen
+
+    def pin(self):
+        """
+        Chọn một node đọc cho chuỗi lời gọi phải thấy cùng một trạng thái của chuỗi
+        (eth_blockNumber, eth_getLogs, eth_getBlockByNumber của một lượt theo dõi log)
+        """
+        return self.route([('eth_blockNumber', [])])[0].uri
+
+    def is_sequencer_request(self, calls):
+        return any(is_sequencer_call(method, params) for method, params in calls)
+
+    def is_available(self):
+        """
+        Còn node đọc nào có circuit breaker chưa mở hay không
+        """
+        return any(not endpoint.breaker.is_open() for endpoint in self.readers)
+
+    def request(self, calls, send, timeout):
+        """
+        Gửi request tới node được chọn theo route, thử node tiếp theo khi lỗi kết nối
+
+        :param calls: Danh sách (method, params) trong request
+        :param send: Hàm send(endpoint_uri, timeout) gửi request và trả về kết quả
+        :param timeout: Timeout mặc định của một request, rút ngắn theo deadline
+        """
+        error = None
+        for endpoint in self.route(calls):
+            call_timeout = timeout_for(timeout)
+            started = time.monotonic()
+            try:
+                with endpoint.breaker.guard(count_timeouts=call_timeout >= timeout):
+                    result = send(endpoint.uri, call_timeout)
+            except CircuitOpenError as e:
+                error = e
+                continue
+            except Exception as e:
+                if not is_node_error(e):
+                    raise
+                error = e
+                continue
+            self._observe(endpoint, started, calls)
+            return result
+        raise error
+
+    async def arequest(self, calls, send, timeout):
+        """
+        Phiên bản async của request, send là coroutine function
+        """
+        error = None
+        for endpoint in self.route(calls):
+            call_timeout = timeout_for(timeout)
+            started = time.monotonic()
+            try:
+                with endpoint.breaker.guard(count_timeouts=call_timeout >= timeout):
+                    result = await send(endpoint.uri, call_timeout)
+            except CircuitOpenError as e:
+                error = e
+                continue
+            except Exception as e:
+                if not is_node_error(e):
+                    raise
+                error = e
+                continue
+            self._observe(endpoint, started, calls)
+            return result
+        raise error
+
+    def check_health(self):
+        """
+        Hỏi eth_blockNumber của mọi node, đánh dấu node lỗi hoặc chậm quá BLOCKCHAIN_MAX_BLOCK_LAG block
+        """
+        from .rpc import JsonRpcClient, to_int
+
+        heads = {}
+        for endpoint in self.endpoints.values():
+            rpc = JsonRpcClient(endpoint.uri, timeout=self.check_timeout, session=self.session)
+            started = time.monotonic()
+            try:
+                heads[endpoint.uri] = to_int(rpc.call('eth_blockNumber'))
+            except Exception as e:
+                logger.debug(f"Health check of {endpoint.label} failed: {str(e)}")
+                endpoint.set_health(False)
+                continue
+            endpoint.observe(time.monotonic() - started)
+
+        if heads:
+            best = max(heads.values())
+            for uri, head in heads.items():
+                self.endpoints[uri].set_health(best - head <= self.max_lag, head)
+        return heads
+
+    def start(self):
+        """
+        Chạy kiểm tra sức khỏe trong thread nền (chỉ khi pool có nhiều hơn một node)
+        """
+        if self._thread is not None or len(self.endpoints) < 2 or not self.check_interval:
+            return
+        self._thread = threading.Thread(target=self._run, name='blockchain-health-check', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.warning(f"Blockchain health check failed: {str(e)}")
+            self._stopped.wait(self.check_interval)
+
+    def _weights(self, candidates):
+        known = [endpoint.latency for endpoint in candidates if endpoint.latency is not None]
+        # Node chưa đo được độ trễ được coi như trung bình của các node còn lại
+        default = sum(known) / len(known) if known else 1
+        return [1 / max(endpoint.latency if endpoint.latency is not None else default, 0.001) for endpoint in candidates]
+
+    def _observe(self, endpoint, started, calls):
+        endpoint.observe(time.monotonic() - started)
+        REQUESTS.inc(endpoint=endpoint.label, route='sequencer' if self.is_sequencer_request(calls) else 'read')
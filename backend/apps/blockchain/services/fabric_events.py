@@ -0,0 +1,234 @@
+import asyncio
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Event chaincode -> trạng thái blockchain của Document
+DOCUMENT_EVENTS = {
+    'DocumentCreated': 'STORED',
+    'DocumentSubmitted': 'UPDATED',
+    'DocumentApproved': 'UPDATED',
+    'DocumentRejected': 'UPDATED',
+    'DocumentRevoked': 'UPDATED',
+}
+
+
+def record_submission(content_object, record_type, response, created_by=None, data=None):
+    """
+    Lưu BlockchainRecord 'submitted' cho giao dịch vừa gửi bằng HyperledgerService.submit
+    hoặc submit_chaincode (khi truyền content_object)
+
+    FabricBlockListener chuyển bản ghi sang confirmed/failed khi block chứa giao dịch được commit.
+    """
+    from apps.blockchain.models import BlockchainRecord
+
+    return BlockchainRecord.objects.create(
+        transaction_id=response['txId'],
+        network='hyperledger',
+        content_type=ContentType.objects.get_for_model(content_object),
+        object_id=str(content_object.pk),
+        record_type=record_type,
+        status='submitted',
+        data=data or {},
+        created_by=created_by
+    )
+
+
+class FabricBlockListener:
+    """
+    Nhận block của kênh Fabric (qua HyperledgerService.blocks) và cập nhật database
+
+    Với mỗi block: BlockchainRecord 'submitted' của các giao dịch trong block được chuyển sang
+    confirmed (VALID) hoặc failed (mã kiểm tra khác), Document liên quan và Document được nhắc
+    tới trong event của chaincode được cập nhật trạng thái blockchain. Mọi thay đổi của một block
+    và checkpoint được ghi trong cùng một transaction, nên khi khởi động lại listener tiếp tục từ
+    block sau checkpoint mà không bỏ sót hay xử lý trùng.
+
+    Khi kết nối, listener đọc lại block checkpoint và so hash: nếu ledger không còn block đó
+    (ví dụ ledger giả lập khởi động lại từ block 0), checkpoint bị xóa và kênh được đọc lại từ đầu.
+    """
+
+    def __init__(self, service=None, chaincodes=None, retry_interval=None):
+        from .hyperledger import get_hyperledger_service
+
+        self.service = service or get_hyperledger_service()
+        self.chaincodes = set(chaincodes or getattr(
+            settings, 'HYPERLEDGER_EVENT_CHAINCODES', ['document_contract', 'user_contract', 'admin_contract']
+        ))
+        self.retry_interval = retry_interval or getattr(settings, 'HYPERLEDGER_EVENT_RETRY_INTERVAL', 5)
+        self.name = f'fabric:{self.service.channel_name}'
+
+        # Ghi database tuần tự trên một thread riêng, không chặn event loop
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='fabric-events')
+
+    async def run(self, stop=None):
+        """
+        Nhận và xử lý block cho tới khi stop (asyncio.Event) được đặt, tự kết nối lại khi lỗi
+        """
+        loop = asyncio.get_running_loop()
+
+        while stop is None or not stop.is_set():
+            try:
+                start, expected_hash = await loop.run_in_executor(self._executor, self.checkpoint)
+                logger.info(f"Listening for blocks on {self.service.channel_name} from block {start}")
+
+                async for block in self.service.blocks(start):
+                    if expected_hash is not None:
+                        # Block đầu tiên là block checkpoint, đã xử lý: chỉ dùng để kiểm tra ledger
+                        matches = block['number'] == start and block['hash'] == expected_hash
+                        expected_hash = None
+                        if matches:
+                            continue
+                        await loop.run_in_executor(self._executor, self.reset, start)
+                        break
+
+                    stats = await loop.run_in_executor(self._executor, self.process_block, block)
+                    if stats['confirmed'] or stats['failed'] or stats['documents']:
+                        logger.info(f"Fabric block {block['number']}: {stats}")
+                    if stop is not None and stop.is_set():
+                        return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error listening for Fabric blocks: {str(e)}")
+                await asyncio.sleep(self.retry_interval)
+
+    def checkpoint(self):
+        """
+        Block bắt đầu đọc và hash mong đợi của nó: block checkpoint cùng hash đã lưu,
+        hoặc (0, None) khi chưa xử lý block nào
+        """
+        from apps.blockchain.models import IndexerCheckpoint
+
+        close_old_connections()
+        checkpoint = IndexerCheckpoint.objects.filter(name=self.name).first()
+        if checkpoint is None or not checkpoint.last_block_hash:
+            return 0, None
+        return checkpoint.last_block, checkpoint.last_block_hash
+
+    def next_block(self):
+        """Block đầu tiên chưa được xử lý"""
+        start, expected_hash = self.checkpoint()
+        return start + 1 if expected_hash else 0
+
+    def reset(self, block_number):
+        """Ledger không còn block checkpoint: xóa checkpoint để đọc lại kênh từ block 0"""
+        from apps.blockchain.models import IndexerCheckpoint
+
+        close_old_connections()
+        logger.warning(
+            f"Block {block_number} of {self.service.channel_name} does not match the checkpoint, "
+            "the ledger was replaced; reading the channel from block 0"
+        )
+        IndexerCheckpoint.objects.filter(name=self.name).update(last_block=0, last_block_hash=None)
+
+    def process_block(self, block):
+        """
+        Cập nhật database theo một block
+
+        :return: dict số bản ghi đã xác nhận/thất bại và số giấy tờ đã cập nhật
+        """
+        from apps.blockchain.models import BlockchainRecord, IndexerCheckpoint
+
+        close_old_connections()
+        stats = {'transactions': 0, 'confirmed': 0, 'failed': 0, 'documents': 0}
+        transactions = {
+            item['txId']: item for item in block['transactions']
+            if item['chaincode'] in self.chaincodes or item['chaincode'] is None
+        }
+        stats['transactions'] = len(transactions)
+        now = timezone.now()
+
+        with transaction.atomic():
+            checkpoint, _ = IndexerCheckpoint.objects.select_for_update().get_or_create(name=self.name)
+            if checkpoint.last_block_hash and block['number'] <= checkpoint.last_block:
+                # Block đã xử lý (ví dụ được phát lại sau khi kết nối lại)
+                return stats
+
+            records = list(
+                BlockchainRecord.objects.filter(
+                    network='hyperledger', transaction_id__in=list(transactions), status__in=['pending', 'submitted']
+                )
+            ) if transactions else []
+
+            for record in records:
+                item = transactions[record.transaction_id]
+                record.block_number = block['number']
+                record.updated_at = now
+                if item['validationCode'] == 'VALID':
+                    record.status = 'confirmed'
+                    record.confirmed_at = now
+                    record.error_message = None
+                else:
+                    record.status = 'failed'
+                    record.error_message = f"Transaction invalidated: {item['validationCode']}"
+                stats[record.status] += 1
+
+            BlockchainRecord.objects.bulk_update(
+                records, ['status', 'block_number', 'confirmed_at', 'error_message', 'updated_at']
+            )
+            stats['documents'] = self._update_documents(records, transactions, now)
+
+            checkpoint.last_block = block['number']
+            checkpoint.last_block_hash = block['hash']
+            checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+        return stats
+
+    def _update_documents(self, records, transactions, now):
+        from apps.administrative.models import Document
+
+        # Giấy tờ có BlockchainRecord trong block, theo khóa chính
+        content_type = ContentType.objects.get_for_model(Document)
+        updates = {}
+        for record in records:
+            if record.content_type_id != content_type.id:
+                continue
+            # Chỉ giao dịch tạo giấy tờ quyết định giấy tờ đã được lưu trên blockchain hay chưa
+            if record.record_type == 'document_creation':
+                status = 'STORED' if record.status == 'confirmed' else 'ERROR'
+            elif record.status == 'confirmed':
+                status = 'UPDATED'
+            else:
+                logger.error(
+                    f"{record.get_record_type_display()} of document {record.object_id} failed on Fabric "
+                    f"(tx {record.transaction_id}): {record.error_message}"
+                )
+                continue
+            updates[('pk', uuid.UUID(record.object_id))] = (status, record.transaction_id)
+
+        # Giấy tờ được nhắc tới trong event của các giao dịch hợp lệ, theo mã giấy tờ
+        for item in transactions.values():
+            if item['validationCode'] != 'VALID':
+                continue
+            for event in item['events']:
+                status = DOCUMENT_EVENTS.get(event['name'])
+                payload = event['payload']
+                if status and isinstance(payload, dict) and payload.get('documentId'):
+                    updates.setdefault(('document_id', payload['documentId']), (status, item['txId']))
+
+        if not updates:
+            return 0
+
+        document_ids = [value for key, value in updates if key == 'document_id']
+        documents = {document.pk: document for document in Document.objects.filter(
+            pk__in=[value for key, value in updates if key == 'pk']
+        ).only('pk', 'document_id')}
+        for document in Document.objects.filter(document_id__in=document_ids).only('pk', 'document_id'):
+            documents.setdefault(document.pk, document)
+
+        for document in documents.values():
+            update = updates.get(('pk', document.pk)) or updates[('document_id', document.document_id)]
+            document.blockchain_status, document.blockchain_tx_id = update
+            document.blockchain_timestamp = now
+
+        Document.objects.bulk_update(
+            list(documents.values()), ['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp']
+        )
+        return len(documents)
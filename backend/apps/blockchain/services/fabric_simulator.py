@@ -0,0 +1,735 @@
+import asyncio
+import base64
+import copy
+import hashlib
+import json
+import logging
+import math
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Mốc thời gian của ledger giả lập, timestamp giao dịch = GENESIS + số thứ tự (ms) nên không phụ thuộc đồng hồ máy
+GENESIS = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+# Độ trễ (giây) của từng giai đoạn. endorsement: peer thực thi chaincode và ký,
+# ordering: gửi giao dịch tới orderer, commit: peer kiểm tra và ghi một block
+# (cộng commit_per_tx cho mỗi giao dịch trong block), query: evaluate trên một peer.
+# batch_timeout/batch_size tương ứng BatchTimeout/MaxMessageCount của orderer.
+PROFILES = {
+    'instant': {
+        'query': 0,
+        'endorsement': 0,
+        'ordering': 0,
+        'commit': 0,
+        'commit_per_tx': 0,
+        'batch_timeout': 0,
+        'batch_size': 500,
+    },
+    'lan': {
+        'query': {'type': 'lognormal', 'median': 0.005, 'sigma': 0.4},
+        'endorsement': {'type': 'lognormal', 'median': 0.02, 'sigma': 0.4},
+        'ordering': {'type': 'lognormal', 'median': 0.005, 'sigma': 0.3},
+        'commit': {'type': 'lognormal', 'median': 0.03, 'sigma': 0.3},
+        'commit_per_tx': 0.001,
+        'batch_timeout': 2.0,
+        'batch_size': 10,
+    },
+    'wan': {
+        'query': {'type': 'lognormal', 'median': 0.08, 'sigma': 0.5},
+        'endorsement': {'type': 'lognormal', 'median': 0.15, 'sigma': 0.5},
+        'ordering': {'type': 'lognormal', 'median': 0.08, 'sigma': 0.5},
+        'commit': {'type': 'lognormal', 'median': 0.1, 'sigma': 0.4},
+        'commit_per_tx': 0.002,
+        'batch_timeout': 2.0,
+        'batch_size': 10,
+    },
+}
+
+
+class ChaincodeError(Exception):
+    """Chaincode trả lỗi khi endorse, giao dịch không được gửi tới orderer"""
+
+
+class MVCCConflictError(Exception):
+    """Giao dịch đã vào block nhưng bị đánh dấu không hợp lệ vì dữ liệu đã đọc bị thay đổi"""
+    validation_code = 'MVCC_READ_CONFLICT'
+
+    def __init__(self, tx_id, block_number):
+        self.tx_id = tx_id
+        self.block_number = block_number
+        super().__init__(f"Transaction {tx_id} invalidated in block {block_number}: {self.validation_code}")
+
+
+class Distribution:
+    """
+    Phân phối độ trễ: constant (value), uniform (low, high), normal (mean, stddev),
+    lognormal (median, sigma) hoặc exponential (mean)
+    """
+
+    def __init__(self, kind='constant', **params):
+        if kind not in ('constant', 'uniform', 'normal', 'lognormal', 'exponential'):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.params = params
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Nhận số (độ trễ cố định) hoặc dict {'type': ..., tham số}
+        """
+        if isinstance(spec, Distribution):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls('constant', value=spec)
+        spec = dict(spec)
+        return cls(spec.pop('type', 'constant'), **spec)
+
+    def sample(self, rng):
+        p = self.params
+        if self.kind == 'constant':
+            value = p.get('value', 0)
+        elif self.kind == 'uniform':
+            value = rng.uniform(p['low'], p['high'])
+        elif self.kind == 'normal':
+            value = rng.gauss(p['mean'], p['stddev'])
+        elif self.kind == 'lognormal':
+            value = rng.lognormvariate(math.log(p['median']), p['sigma']) if p['median'] > 0 else 0
+        else:
+            value = rng.expovariate(1 / p['mean']) if p['mean'] > 0 else 0
+        return max(0.0, value)
+
+
+def _field(document, path):
+    value = document
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+_MISSING = object()
+
+_OPERATORS = {
+    '$eq': lambda value, operand: value == operand,
+    '$ne': lambda value, operand: value != operand,
+    '$gt': lambda value, operand: value is not _MISSING and value > operand,
+    '$gte': lambda value, operand: value is not _MISSING and value >= operand,
+    '$lt': lambda value, operand: value is not _MISSING and value < operand,
+    '$lte': lambda value, operand: value is not _MISSING and value <= operand,
+    '$in': lambda value, operand: value in operand,
+    '$nin': lambda value, operand: value not in operand,
+    '$exists': lambda value, operand: (value is not _MISSING) == bool(operand),
+}
+
+
+def match_selector(document, selector):
+    """
+    Kiểm tra document khớp selector kiểu CouchDB (Mango), hỗ trợ so sánh bằng,
+    $eq/$ne/$gt/$gte/$lt/$lte/$in/$nin/$exists và $and/$or
+    """
+    for field, condition in selector.items():
+        if field == '$and':
+            if not all(match_selector(document, item) for item in condition):
+                return False
+        elif field == '$or':
+            if not any(match_selector(document, item) for item in condition):
+                return False
+        else:
+            value = _field(document, field)
+            if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+                for operator, operand in condition.items():
+                    if operator not in _OPERATORS:
+                        raise ChaincodeError(f"Unsupported query operator: {operator}")
+                    try:
+                        if not _OPERATORS[operator](value, operand):
+                            return False
+                    except TypeError:
+                        return False
+            elif value is _MISSING or value != condition:
+                return False
+    return True
+
+
+def _sort_key(value):
+    # Giá trị thiếu xếp trước, khác kiểu thì so theo tên kiểu như CouchDB
+    if value is _MISSING or value is None:
+        return (0, '', 0)
+    if isinstance(value, bool):
+        return (1, '', int(value))
+    if isinstance(value, (int, float)):
+        return (2, '', value)
+    if isinstance(value, str):
+        return (3, value, 0)
+    return (4, json.dumps(value, sort_keys=True), 0)
+
+
+class SimulatedStub:
+    """
+    Tương đương ctx.stub của fabric-shim cho một giao dịch
+
+    Đọc từ world state đã commit (không thấy ghi chưa commit, kể cả của chính giao dịch),
+    ghi vào write set, phiên bản các khóa đã đọc được ghi vào read set để kiểm tra MVCC
+    khi commit.
+    """
+
+    def __init__(self, simulator, namespace, tx_id, timestamp, role):
+        self.simulator = simulator
+        self.namespace = namespace
+        self.tx_id = tx_id
+        self.timestamp = timestamp
+        self.role = role
+        self.read_set = {}
+        self.write_set = {}
+        self.events = []
+
+    def get_state(self, key):
+        value, version = self.simulator.state.get((self.namespace, key), (None, None))
+        self.read_set.setdefault(key, version)
+        return value
+
+    def put_state(self, key, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self.write_set[key] = bytes(value)
+
+    def del_state(self, key):
+        self.write_set[key] = None
+
+    def set_event(self, name, payload):
+        # Fabric chỉ giữ event cuối cùng của một giao dịch
+        self.events = [{'name': name, 'payload': payload}]
+
+    def get_history_for_key(self, key):
+        return list(self.simulator.history.get((self.namespace, key), []))
+
+    def get_query_result(self, query):
+        """
+        Rich query trên world state đã commit (selector, sort, skip, limit)
+
+        Giống Fabric, kết quả rich query không vào read set nên không được kiểm tra lại khi commit.
+        """
+        if isinstance(query, str):
+            query = json.loads(query)
+        matches = self._matches(query)
+        skip = query.get('skip', 0)
+        limit = query.get('limit')
+        matches = matches[skip:skip + limit if limit is not None else None]
+        return [{'key': key, 'value': value} for key, value, _ in matches]
+
+    def get_query_result_with_pagination(self, query, page_size, bookmark=''):
+        """
+        Rich query theo trang, trả về (kết quả, metadata) với metadata gồm fetchedRecordsCount và bookmark
+
+        Bookmark ở đây là vị trí trong kết quả đã sắp xếp, không phải bookmark của CouchDB, nên
+        ghi xen giữa hai trang có thể làm lệch trang. Giống Fabric, query không được có skip/limit.
+        """
+        if isinstance(query, str):
+            query = json.loads(query)
+        if 'skip' in query or 'limit' in query:
+            raise ChaincodeError('Query with pagination must not contain skip or limit')
+
+        try:
+            offset = int(base64.urlsafe_b64decode(bookmark.encode()).decode()) if bookmark else 0
+        except ValueError:
+            raise ChaincodeError(f"Invalid bookmark: {bookmark}")
+
+        matches = self._matches(query)[offset:offset + int(page_size)]
+        results = [{'key': key, 'value': value} for key, value, _ in matches]
+        next_bookmark = base64.urlsafe_b64encode(str(offset + len(matches)).encode()).decode()
+        return results, {'fetchedRecordsCount': len(results), 'bookmark': next_bookmark}
+
+    def _matches(self, query):
+        matches = []
+        for (namespace, key), (value, _) in self.simulator.state.items():
+            if namespace != self.namespace:
+                continue
+            try:
+                document = json.loads(value)
+            except ValueError:
+                continue
+            if isinstance(document, dict) and match_selector(document, query.get('selector', {})):
+                matches.append((key, value, document))
+
+        matches.sort(key=lambda match: match[0])
+        for item in reversed(query.get('sort', [])):
+            field, direction = next(iter(item.items())) if isinstance(item, dict) else (item, 'asc')
+            matches.sort(key=lambda match: _sort_key(_field(match[2], field)), reverse=direction == 'desc')
+        return matches
+
+
+# Hằng số của document-registry.js
+DOC_TYPE = 'document'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class DocumentRegistry:
+    """
+    Chuyển thể blockchain/chaincode/document_contract/lib/document-registry.js, giữ nguyên
+    khóa world state, trạng thái, event và thông báo lỗi
+    """
+
+    def _now(self, stub):
+        return stub.timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+    def _require_role(self, stub, roles, message):
+        if stub.role not in roles:
+            raise ChaincodeError(message)
+
+    def _save(self, stub, document):
+        stub.put_state(document['documentId'], json.dumps(document))
+
+    def _load(self, stub, document_id):
+        return json.loads(self.readDocument(stub, document_id))
+
+    def _transition(self, stub, document, state, action, user_id, event, extra=None, event_extra=None):
+        now = self._now(stub)
+        document['state'] = state
+        document['updatedAt'] = now
+        entry = {'txId': stub.tx_id, 'action': action, 'timestamp': now, 'userId': user_id, 'role': stub.role}
+        entry.update(extra or {})
+        document['transactionHistory'].append(entry)
+        self._save(stub, document)
+
+        payload = {
+            'documentId': document['documentId'],
+            'documentType': document['documentType'],
+            'citizenId': document['citizenId'],
+        }
+        payload.update(event_extra or {})
+        payload['state'] = state
+        stub.set_event(event, payload)
+        return {'success': True, 'documentId': document['documentId'], 'state': state}
+
+    def initLedger(self, stub):
+        return {'success': True, 'message': 'Document Registry initialized'}
+
+    def createDocument(self, stub, documentId, documentType, citizenId, officerId, metadata, contentHash):
+        if self.documentExists(stub, documentId):
+            raise ChaincodeError(f"Document {documentId} already exists")
+        self._require_role(stub, ('officer', 'chairman'), 'Only officers or chairman can create documents')
+
+        now = self._now(stub)
+        document = {
+            'docType': DOC_TYPE,
+            'documentId': documentId,
+            'documentType': documentType,
+            'citizenId': citizenId,
+            'officerId': officerId,
+            'metadata': json.loads(metadata),
+            'contentHash': contentHash,
+            'state': 'DRAFT',
+            'createdAt': now,
+            'updatedAt': now,
+            'approvals': [],
+            'transactionHistory': [
+                {'txId': stub.tx_id, 'action': 'CREATE', 'timestamp': now, 'userId': officerId, 'role': stub.role}
+            ],
+        }
+        self._save(stub, document)
+        stub.set_event('DocumentCreated', {
+            'documentId': documentId,
+            'documentType': documentType,
+            'citizenId': citizenId,
+            'officerId': officerId,
+            'state': 'DRAFT',
+        })
+        return {'success': True, 'documentId': documentId}
+
+    def submitDocument(self, stub, documentId):
+        document = self._load(stub, documentId)
+        if document['state'] != 'DRAFT':
+            raise ChaincodeError(f"Document {documentId} is not in DRAFT state")
+        self._require_role(stub, ('officer', 'chairman'), 'Only officers or chairman can submit documents')
+        return self._transition(
+            stub, document, 'PENDING', 'SUBMIT', document['officerId'], 'DocumentSubmitted',
+            event_extra={'officerId': document['officerId']}
+        )
+
+    def approveDocument(self, stub, documentId, approverId, comments=''):
+        document = self._load(stub, documentId)
+        if document['state'] != 'PENDING':
+            raise ChaincodeError(f"Document {documentId} is not in PENDING state")
+        if document['metadata'].get('requiresChairmanApproval') is True and stub.role != 'chairman':
+            raise ChaincodeError('Only chairman can approve important documents')
+        self._require_role(stub, ('officer', 'chairman'), 'Only officers or chairman can approve documents')
+
+        document['approvals'].append({
+            'approverId': approverId,
+            'role': stub.role,
+            'timestamp': self._now(stub),
+            'comments': comments or '',
+        })
+        return self._transition(
+            stub, document, 'APPROVED', 'APPROVE', approverId, 'DocumentApproved',
+            event_extra={'approverId': approverId}
+        )
+
+    def rejectDocument(self, stub, documentId, rejectorId, reason):
+        document = self._load(stub, documentId)
+        if document['state'] != 'PENDING':
+            raise ChaincodeError(f"Document {documentId} is not in PENDING state")
+        self._require_role(stub, ('officer', 'chairman'), 'Only officers or chairman can reject documents')
+
+        document['rejectionReason'] = reason
+        document['rejectedBy'] = rejectorId
+        return self._transition(
+            stub, document, 'REJECTED', 'REJECT', rejectorId, 'DocumentRejected',
+            extra={'reason': reason}, event_extra={'rejectorId': rejectorId, 'reason': reason}
+        )
+
+    def revokeDocument(self, stub, documentId, revokerId, reason):
+        document = self._load(stub, documentId)
+        if document['state'] != 'APPROVED':
+            raise ChaincodeError(f"Document {documentId} is not in APPROVED state")
+        self._require_role(stub, ('chairman',), 'Only chairman can revoke documents')
+
+        document['revocationReason'] = reason
+        document['revokedBy'] = revokerId
+        return self._transition(
+            stub, document, 'REVOKED', 'REVOKE', revokerId, 'DocumentRevoked',
+            extra={'reason': reason}, event_extra={'revokerId': revokerId, 'reason': reason}
+        )
+
+    def verifyDocument(self, stub, documentId, contentHash):
+        document = self._load(stub, documentId)
+        return {
+            'documentId': documentId,
+            'isAuthentic': document['contentHash'] == contentHash,
+            'isValid': document['state'] == 'APPROVED',
+            'documentType': document['documentType'],
+            'state': document['state'],
+            'createdAt': document['createdAt'],
+            'verifiedAt': self._now(stub),
+        }
+
+    def readDocument(self, stub, documentId):
+        value = stub.get_state(documentId)
+        if not value:
+            raise ChaincodeError(f"Document {documentId} does not exist")
+        return value.decode('utf-8')
+
+    def documentExists(self, stub, documentId):
+        return bool(stub.get_state(documentId))
+
+    def getDocumentsByCitizen(self, stub, citizenId):
+        return self._query(stub, {'selector': {'citizenId': citizenId}, 'sort': [{'createdAt': 'desc'}]})
+
+    def getDocumentsByState(self, stub, state):
+        return self._query(stub, {'selector': {'state': state}, 'sort': [{'createdAt': 'desc'}]})
+
+    def getDocumentsByCitizenPage(self, stub, citizenId, pageSize, bookmark=''):
+        return self._query_page(stub, {'citizenId': citizenId}, 'indexCitizenDoc', pageSize, bookmark)
+
+    def getDocumentsByStatePage(self, stub, state, pageSize, bookmark=''):
+        return self._query_page(stub, {'state': state}, 'indexStateDoc', pageSize, bookmark)
+
+    def getDocumentsPage(self, stub, pageSize, bookmark=''):
+        return self._query_page(stub, {}, 'indexDocTypeDoc', pageSize, bookmark)
+
+    def getDocumentHistory(self, stub, documentId):
+        if not self.documentExists(stub, documentId):
+            raise ChaincodeError(f"Document {documentId} does not exist")
+
+        history = []
+        for item in stub.get_history_for_key(documentId):
+            entry = {'txId': item['txId'], 'timestamp': item['timestamp'], 'isDelete': item['isDelete']}
+            if not item['isDelete']:
+                entry['document'] = json.loads(item['value'])
+            history.append(entry)
+        return json.dumps(history)
+
+    def _query(self, stub, query):
+        return json.dumps([json.loads(item['value']) for item in stub.get_query_result(json.dumps(query))])
+
+    def _query_page(self, stub, selector, design_doc, page_size, bookmark):
+        try:
+            size = min(int(page_size) or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+        except ValueError:
+            size = DEFAULT_PAGE_SIZE
+        if size < 1:
+            raise ChaincodeError(f"Invalid page size {page_size}")
+
+        fields = ['docType', *selector, 'createdAt']
+        query = {
+            'selector': {'docType': DOC_TYPE, **selector},
+            'sort': [{field: 'desc'} for field in fields],
+            'use_index': [f'_design/{design_doc}'],
+        }
+        results, metadata = stub.get_query_result_with_pagination(json.dumps(query), size, bookmark)
+        records = [json.loads(item['value']) for item in results]
+        return json.dumps({
+            'records': records,
+            'fetchedRecordsCount': metadata['fetchedRecordsCount'],
+            'bookmark': '' if len(records) < size else metadata['bookmark'],
+        })
+
+
+# Chaincode được giả lập, theo tên chaincode mà HyperledgerService gọi
+CHAINCODES = {
+    'document_contract': DocumentRegistry,
+}
+
+
+def _to_payload(result):
+    # Cách fabric-contract-api chuyển giá trị trả về thành payload
+    if result is None:
+        return b''
+    if isinstance(result, bytes):
+        return result
+    if isinstance(result, str):
+        return result.encode('utf-8')
+    if isinstance(result, bool):
+        return b'true' if result else b'false'
+    if isinstance(result, (int, float)):
+        return str(result).encode('utf-8')
+    return json.dumps(result).encode('utf-8')
+
+
+class FabricSimulator:
+    """
+    Ledger Fabric giả lập trong bộ nhớ: world state có phiên bản, lịch sử theo khóa,
+    endorse - order - validate như Fabric (kể cả MVCC_READ_CONFLICT khi hai giao dịch
+    cùng đọc-ghi một khóa trước khi block được commit) và độ trễ lấy mẫu từ profile
+
+    Với cùng seed, profile và chuỗi lời gọi, timestamp, nội dung world state và các mẫu
+    độ trễ là như nhau giữa các lần chạy; txId chỉ lặp lại khi dùng cùng ledger_id. Toàn bộ
+    dữ liệu mất khi process dừng.
+    """
+
+    def __init__(self, profile=None, seed=None, overrides=None, role=None, ledger_id=None):
+        """
+        :param ledger_id: Mã của ledger, mặc định ngẫu nhiên cho mỗi lần khởi động để txId và
+                          hash block không trùng với ledger trước (BlockchainRecord, checkpoint
+                          của FabricBlockListener còn lưu trong database)
+        """
+        profile = profile or getattr(settings, 'HYPERLEDGER_SIMULATOR_PROFILE', 'lan')
+        if isinstance(profile, str):
+            if profile not in PROFILES:
+                raise ValueError(f"Unknown simulator profile: {profile}")
+            profile = PROFILES[profile]
+        profile = dict(profile)
+        profile.update(overrides if overrides is not None else getattr(settings, 'HYPERLEDGER_SIMULATOR_OVERRIDES', {}))
+
+        self.distributions = {
+            name: Distribution.parse(profile[name])
+            for name in ('query', 'endorsement', 'ordering', 'commit', 'commit_per_tx')
+        }
+        self.batch_timeout = profile['batch_timeout']
+        self.batch_size = profile['batch_size']
+        self.seed = seed if seed is not None else getattr(settings, 'HYPERLEDGER_SIMULATOR_SEED', 0)
+        self.ledger_id = ledger_id or uuid.uuid4().hex
+        self.role = role or getattr(settings, 'HYPERLEDGER_SIMULATOR_ROLE', 'chairman')
+        self.chaincodes = {name: cls() for name, cls in CHAINCODES.items()}
+
+        self.rng = random.Random(self.seed)
+        self.state = {}
+        self.history = {}
+        self.blocks = []
+        self.stats = {'endorsed': 0, 'endorsement_failures': 0, 'valid': 0, 'mvcc_conflicts': 0, 'queries': 0}
+
+        self._sequence = 0
+        self._pending = []
+        self._timer = None
+        self._last_commit = None
+        self._previous_hash = '0' * 64
+        self._block_waiters = []
+
+    def sample(self, name):
+        return self.distributions[name].sample(self.rng)
+
+    async def query(self, cc_name, function_name, args):
+        """
+        Evaluate chaincode trên world state đã commit, trả về payload (bytes)
+        """
+        await asyncio.sleep(self.sample('query'))
+        self.stats['queries'] += 1
+        stub = self._stub(cc_name, f"query-{self.stats['queries']}")
+        return _to_payload(self._execute(stub, cc_name, function_name, args))
+
+    async def invoke(self, cc_name, function_name, args):
+        """
+        Endorse, gửi tới orderer và chờ block chứa giao dịch được commit
+
+        :return: dict gồm txId, blockNumber và payload (bytes)
+        :raises ChaincodeError: chaincode trả lỗi khi endorse
+        :raises MVCCConflictError: giao dịch bị đánh dấu không hợp lệ khi commit
+        """
+        response = await self._submit(cc_name, function_name, args)
+        block_number = await response.pop('committed')
+        return dict(response, blockNumber=block_number)
+
+    async def submit(self, cc_name, function_name, args):
+        """
+        Endorse và gửi tới orderer, không chờ commit; kết quả commit có trong block
+
+        :return: dict gồm txId và payload (bytes)
+        :raises ChaincodeError: chaincode trả lỗi khi endorse
+        """
+        response = await self._submit(cc_name, function_name, args)
+        # Kết quả commit được đọc qua blocks_from, không ai chờ future này
+        response.pop('committed').add_done_callback(lambda future: future.exception())
+        return response
+
+    async def blocks_from(self, start=0):
+        """
+        Lần lượt trả về các block từ số start, chờ block mới khi đã tới block cuối
+
+        Ledger giả lập mất khi process dừng: nếu start lớn hơn số block hiện có thì đọc lại từ block 0.
+        """
+        if start > len(self.blocks):
+            logger.warning(f"Simulated ledger has {len(self.blocks)} blocks, replaying from block 0 instead of {start}")
+            start = 0
+
+        number = start
+        while True:
+            while number < len(self.blocks):
+                yield self.blocks[number]
+                number += 1
+
+            waiter = asyncio.get_running_loop().create_future()
+            self._block_waiters.append(waiter)
+            await waiter
+
+    async def _submit(self, cc_name, function_name, args):
+        loop = asyncio.get_running_loop()
+        stub = self._stub(cc_name)
+
+        try:
+            result = self._execute(stub, cc_name, function_name, args)
+        except ChaincodeError:
+            self.stats['endorsement_failures'] += 1
+            await asyncio.sleep(self.sample('endorsement'))
+            raise
+        self.stats['endorsed'] += 1
+        await asyncio.sleep(self.sample('endorsement'))
+        await asyncio.sleep(self.sample('ordering'))
+
+        transaction = {
+            'stub': stub,
+            'chaincode': cc_name,
+            'function': function_name,
+            'future': loop.create_future(),
+        }
+        self._enqueue(transaction)
+
+        return {'txId': stub.tx_id, 'payload': _to_payload(result), 'committed': transaction['future']}
+
+    def _stub(self, cc_name, label=None):
+        self._sequence += 1
+        tx_id = hashlib.sha256(f'{self.ledger_id}:{self.seed}:{label or self._sequence}'.encode()).hexdigest()
+        timestamp = GENESIS + timedelta(milliseconds=self._sequence)
+        return SimulatedStub(self, cc_name, tx_id, timestamp, self.role)
+
+    def _execute(self, stub, cc_name, function_name, args):
+        chaincode = self.chaincodes.get(cc_name)
+        if chaincode is None:
+            raise ChaincodeError(f"Chaincode {cc_name} is not installed on the simulator")
+
+        # Tên dạng "DocumentRegistry:createDocument" như fabric-contract-api
+        function_name = function_name.split(':')[-1]
+        method = getattr(chaincode, function_name, None)
+        if function_name.startswith('_') or method is None:
+            raise ChaincodeError(f"You've asked to invoke a function that does not exist: {function_name}")
+
+        try:
+            return method(stub, *[str(arg) for arg in args])
+        except ChaincodeError:
+            raise
+        except (TypeError, ValueError, KeyError) as e:
+            raise ChaincodeError(str(e))
+
+    def _enqueue(self, transaction):
+        self._pending.append(transaction)
+        if len(self._pending) >= self.batch_size:
+            self._cut()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_timeout, self._cut)
+
+    def _cut(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.batch_timeout, self._cut)
+        if not batch:
+            return
+
+        self._last_commit = asyncio.ensure_future(self._commit(batch, self._last_commit))
+
+    async def _commit(self, batch, previous):
+        # Các block được commit tuần tự theo thứ tự cắt
+        if previous is not None:
+            await previous
+        await asyncio.sleep(self.sample('commit') + self.sample('commit_per_tx') * len(batch))
+
+        number = len(self.blocks)
+        transactions = []
+        for index, transaction in enumerate(batch):
+            stub = transaction['stub']
+            conflict = any(
+                self.state.get((stub.namespace, key), (None, None))[1] != version
+                for key, version in stub.read_set.items()
+            )
+            if conflict:
+                self.stats['mvcc_conflicts'] += 1
+                validation_code = MVCCConflictError.validation_code
+            else:
+                self.stats['valid'] += 1
+                validation_code = 'VALID'
+                self._apply(stub, (number, index))
+
+            transactions.append({
+                'txId': stub.tx_id,
+                'chaincode': transaction['chaincode'],
+                'function': transaction['function'],
+                'timestamp': stub.timestamp.isoformat(),
+                'validationCode': validation_code,
+                'events': copy.deepcopy(stub.events) if not conflict else [],
+            })
+
+        block_hash = hashlib.sha256(
+            (self._previous_hash + ''.join(item['txId'] for item in transactions)).encode()
+        ).hexdigest()
+        self.blocks.append({
+            'number': number,
+            'hash': block_hash,
+            'previousHash': self._previous_hash,
+            'transactions': transactions,
+        })
+        self._previous_hash = block_hash
+
+        waiters, self._block_waiters = self._block_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(number)
+
+        for transaction, item in zip(batch, transactions):
+            if transaction['future'].done():
+                continue
+            if item['validationCode'] == 'VALID':
+                transaction['future'].set_result(number)
+            else:
+                transaction['future'].set_exception(MVCCConflictError(item['txId'], number))
+
+    def _apply(self, stub, version):
+        timestamp = stub.timestamp.isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+        for key, value in stub.write_set.items():
+            state_key = (stub.namespace, key)
+            if value is None:
+                self.state.pop(state_key, None)
+            else:
+                self.state[state_key] = (value, version)
+            self.history.setdefault(state_key, []).append({
+                'txId': stub.tx_id,
+                'timestamp': timestamp,
+                'isDelete': value is None,
+                'value': value,
+            })
@@ -3,155 +3,573 @@ import logging
 from pathlib import Path
 import json
 import asyncio
-from hfc.fabric import Client
+import threading
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
+
+class _BackgroundLoop:
+    """
+    Event loop chạy trong một thread nền, dùng chung cho mọi lời gọi Fabric của process
+
+    Client Fabric và các kênh gRPC tới peer/orderer gắn với event loop tạo ra chúng,
+    nên mọi coroutine đều được chạy trên loop này thay vì tạo loop mới mỗi request.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name='hyperledger-loop', daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def is_current(self):
+        try:
+            return self._loop is not None and asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def run(self, coro, timeout=None):
+        """
+        Chạy coroutine trên loop nền và chờ kết quả từ code đồng bộ
+        """
+        if self.is_current():
+            raise RuntimeError('Cannot block on the Hyperledger loop from inside it')
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro):
+        """
+        Chạy coroutine trên loop nền từ một event loop khác (ví dụ view async)
+        """
+        if self.is_current():
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, self.loop))
+
+    async def iterate(self, agen):
+        """
+        Duyệt async generator chạy trên loop nền từ một event loop khác
+        """
+        if self.is_current():
+            async for item in agen:
+                yield item
+            return
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for item in agen:
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+                loop.call_soon_threadsafe(queue.put_nowait, (done, None))
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (done, e))
+
+        producer = asyncio.run_coroutine_threadsafe(produce(), self.loop)
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            producer.cancel()
+
+
+_background = _BackgroundLoop()
+
+
 class HyperledgerService:
     """
     Service for connecting to and interacting with Hyperledger Fabric blockchain
+
+    Client Fabric được tạo khi cần lần đầu và dùng lại cho mọi lời gọi, số lời gọi
+    invoke/query đồng thời được giới hạn bởi semaphore. Code đồng bộ (view Django,
+    lệnh quản lý) dùng query/invoke/query_many, các hàm này chạy trên event loop
+    nền của process thay vì asyncio.run mỗi lần.
     """
-    
+
     def __init__(self):
         # Read network configuration from environment variables or use defaults
         self.network_profile_path = os.getenv(
-            'BLOCKCHAIN_NETWORK_PROFILE', 
+            'BLOCKCHAIN_NETWORK_PROFILE',
             os.path.join(Path(__file__).parent.parent.parent.parent.parent, 'blockchain', 'networks', 'hyperledger', 'connection-profile.json')
         )
         self.channel_name = os.getenv('BLOCKCHAIN_CHANNEL_NAME', 'adminchannel')
         self.org_name = os.getenv('BLOCKCHAIN_ORG_NAME', 'Org1')
         self.peer_name = os.getenv('BLOCKCHAIN_PEER_NAME', 'peer0.org1.example.com')
         self.user_name = os.getenv('BLOCKCHAIN_USER_NAME', 'Admin')
-        
-        # Initialize client connection
-        self._initialize_client()
-    
+
+        self.simulate = getattr(settings, 'HYPERLEDGER_SIMULATE', True)
+        self.max_concurrent_invokes = getattr(settings, 'HYPERLEDGER_MAX_CONCURRENT_INVOKES', 32)
+        self.max_concurrent_queries = getattr(settings, 'HYPERLEDGER_MAX_CONCURRENT_QUERIES', 128)
+        self.timeout = getattr(settings, 'HYPERLEDGER_REQUEST_TIMEOUT', 30)
+
+        # Được tạo trên loop nền ở lần gọi đầu tiên
+        self.client = None
+        self.user = None
+        self.simulator = None
+        self._listener_task = None
+        self.is_connected = False
+        self._init_lock = None
+        self._invoke_semaphore = None
+        self._query_semaphore = None
+
+    async def _ensure_client(self):
+        """Khởi tạo client Fabric một lần trên loop nền"""
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+            self._invoke_semaphore = asyncio.BoundedSemaphore(self.max_concurrent_invokes)
+            self._query_semaphore = asyncio.BoundedSemaphore(self.max_concurrent_queries)
+
+        if self.is_connected:
+            return
+
+        async with self._init_lock:
+            if not self.is_connected:
+                self._initialize_client()
+
     def _initialize_client(self):
         """Initialize the Fabric client"""
+        if self.simulate:
+            # Ledger giả lập trong bộ nhớ cho môi trường phát triển và đo hiệu năng
+            from .fabric_simulator import FabricSimulator
+
+            self.simulator = FabricSimulator()
+            self.is_connected = True
+
+            # Ledger giả lập chỉ tồn tại trong process này nên listener cũng phải chạy ở đây
+            if getattr(settings, 'HYPERLEDGER_EVENT_LISTENER_IN_PROCESS', True):
+                self.start_block_listener()
+            return
+
         try:
+            from hfc.fabric import Client
+
             if not os.path.exists(self.network_profile_path):
                 logger.error(f"Network profile not found at: {self.network_profile_path}")
                 raise FileNotFoundError(f"Network profile not found at: {self.network_profile_path}")
-            
+
+            # Peer/orderer và kênh gRPC của chúng được tạo một lần từ network profile
             self.client = Client(net_profile=self.network_profile_path)
-            
-            # Set client user context
+            self.user = self.client.get_user(org_name=self.org_name, name=self.user_name)
             self.client.new_channel(self.channel_name)
-            
+
             logger.info(f"Successfully initialized Hyperledger Fabric client for {self.channel_name}")
-            
-            # For simulation purposes in development
             self.is_connected = True
-            
+
         except Exception as e:
             logger.error(f"Failed to initialize Hyperledger Fabric client: {str(e)}")
-            # For development, set this to True for simulation
-            self.is_connected = True
+            raise ConnectionError(f"Not connected to Hyperledger Fabric network: {str(e)}")
+
+    def start_block_listener(self):
+        """
+        Chạy FabricBlockListener trên loop nền của service (một lần cho mỗi service)
+        """
+        from .fabric_events import FabricBlockListener
+
+        if self._listener_task is None or self._listener_task.done():
+            listener = FabricBlockListener(service=self)
+            self._listener_task = asyncio.run_coroutine_threadsafe(listener.run(), _background.loop)
+        return self._listener_task
 
     async def query_chaincode(self, cc_name, function_name, args):
         """
         Query the chaincode
-        
+
         :param cc_name: Name of the chaincode
         :param function_name: Name of the function to invoke
         :param args: Arguments to pass to the function
         :return: Response from the chaincode
         """
-        try:
-            if not self.is_connected:
-                raise ConnectionError("Not connected to Hyperledger Fabric network")
-            
-            # In a real implementation, this would query the actual blockchain
-            # For development, we'll simulate the response
-            response = await self._simulate_query(cc_name, function_name, args)
-            return response
-            
-        except Exception as e:
-            logger.error(f"Error querying chaincode: {str(e)}")
-            raise
-    
+        return await _background.run_async(self._query(cc_name, function_name, args))
+
     async def invoke_chaincode(self, cc_name, function_name, args):
         """
         Invoke chaincode transaction
-        
+
         :param cc_name: Name of the chaincode
         :param function_name: Name of the function to invoke
         :param args: Arguments to pass to the function
         :return: Transaction ID
         """
+        return await _background.run_async(self._invoke(cc_name, function_name, args))
+
+    async def submit_chaincode(self, cc_name, function_name, args, content_object=None, record_type=None,
+                               created_by=None, data=None):
+        """
+        Gửi giao dịch tới orderer mà không chờ commit
+
+        Trạng thái commit được FabricBlockListener cập nhật khi block chứa giao dịch được phát:
+        với content_object, giao dịch được ghi vào BlockchainRecord 'submitted' (record_type)
+        để listener chuyển sang confirmed/failed.
+
+        :return: dict gồm success, txId và result (payload chaincode trả về khi endorse)
+        """
+        from asgiref.sync import sync_to_async
+
+        response = await _background.run_async(self._submit(cc_name, function_name, args))
+        if content_object is not None:
+            await sync_to_async(self._record_submission)(content_object, record_type, response, created_by, data)
+        return response
+
+    async def query_many_chaincode(self, calls):
+        """
+        Query nhiều lời gọi (cc_name, function_name, args) đồng thời
+
+        :return: Danh sách kết quả theo thứ tự calls, lời gọi lỗi trả về
+                 {'success': False, 'error': ...} thay vì ném ra
+        """
+        return await _background.run_async(self._gather(self._query, calls))
+
+    async def invoke_many_chaincode(self, calls):
+        """
+        Invoke nhiều giao dịch đồng thời, tối đa HYPERLEDGER_MAX_CONCURRENT_INVOKES cùng lúc
+        """
+        return await _background.run_async(self._gather(self._invoke, calls))
+
+    # Facade đồng bộ cho view Django và lệnh quản lý
+
+    def query(self, cc_name, function_name, args):
+        return _background.run(self._query(cc_name, function_name, args), self.timeout)
+
+    def invoke(self, cc_name, function_name, args):
+        return _background.run(self._invoke(cc_name, function_name, args), self.timeout)
+
+    def submit(self, cc_name, function_name, args, content_object=None, record_type=None, created_by=None, data=None):
+        response = _background.run(self._submit(cc_name, function_name, args), self.timeout)
+        if content_object is not None:
+            self._record_submission(content_object, record_type, response, created_by, data)
+        return response
+
+    def query_many(self, calls):
+        return _background.run(self._gather(self._query, calls), self.timeout)
+
+    def invoke_many(self, calls):
+        return _background.run(self._gather(self._invoke, calls), self.timeout)
+
+    def get_documents(self, document_ids, cc_name='document_contract'):
+        """
+        Đọc nhiều giấy tờ song song
+        """
+        return self.query_many([(cc_name, 'readDocument', [document_id]) for document_id in document_ids])
+
+    def _record_submission(self, content_object, record_type, response, created_by, data):
+        from .fabric_events import record_submission
+
         try:
-            if not self.is_connected:
-                raise ConnectionError("Not connected to Hyperledger Fabric network")
-            
-            # In a real implementation, this would invoke the actual chaincode
-            # For development, we'll simulate the response
-            response = await self._simulate_invoke(cc_name, function_name, args)
-            return response
-            
+            return record_submission(content_object, record_type, response, created_by=created_by, data=data)
+        except Exception as e:
+            # Giao dịch đã được orderer nhận, lỗi ghi database không được làm mất txId
+            logger.exception(f"Error recording Fabric transaction {response.get('txId')}: {str(e)}")
+
+    async def _query(self, cc_name, function_name, args):
+        try:
+            await self._ensure_client()
+
+            async with self._query_semaphore:
+                if self.simulate:
+                    return await self._simulate_query(cc_name, function_name, args)
+
+                response = await self.client.chaincode_query(
+                    requestor=self.user,
+                    channel_name=self.channel_name,
+                    peers=[self.peer_name],
+                    args=[str(arg) for arg in args],
+                    cc_name=cc_name,
+                    fcn=function_name
+                )
+                return self._parse_response(response)
+
+        except Exception as e:
+            logger.error(f"Error querying chaincode: {str(e)}")
+            raise
+
+    async def _invoke(self, cc_name, function_name, args):
+        try:
+            await self._ensure_client()
+
+            async with self._invoke_semaphore:
+                if self.simulate:
+                    return await self._simulate_invoke(cc_name, function_name, args)
+
+                response = await self.client.chaincode_invoke(
+                    requestor=self.user,
+                    channel_name=self.channel_name,
+                    peers=[self.peer_name],
+                    args=[str(arg) for arg in args],
+                    cc_name=cc_name,
+                    fcn=function_name,
+                    wait_for_event=True
+                )
+                return {'success': True, 'result': self._parse_response(response)}
+
         except Exception as e:
             logger.error(f"Error invoking chaincode: {str(e)}")
             raise
-    
-    async def _simulate_query(self, cc_name, function_name, args):
-        """Simulate chaincode query for development"""
-        await asyncio.sleep(0.5)  # Simulate network delay
-        
-        # Generate appropriate mock responses based on chaincode and function
-        if cc_name == "document_contract":
-            if function_name == "getDocument":
-                doc_id = args[0]
-                return {
-                    "id": doc_id,
-                    "type": "Giấy khai sinh" if "birth" in doc_id.lower() else "CMND",
-                    "issuedTo": "Nguyễn Văn A",
-                    "issuedBy": "UBND Xã ABC",
-                    "issuedDate": "2023-05-15",
-                    "status": "ACTIVE",
-                    "txId": f"tx_{doc_id}_{function_name}"
-                }
-            
-            elif function_name == "verifyDocument":
-                doc_id = args[0]
-                return {
-                    "verified": True,
-                    "document": {
-                        "id": doc_id,
-                        "isValid": True,
-                        "verificationDate": "2023-06-20T14:35:22Z"
-                    }
-                }
-        
-        elif cc_name == "user_contract":
-            if function_name == "getUser":
-                user_id = args[0]
-                return {
-                    "id": user_id,
-                    "role": "citizen",
-                    "status": "ACTIVE",
-                    "documents": ["doc1", "doc2"],
-                    "txId": f"tx_{user_id}_{function_name}"
-                }
-        
-        # Default response
+
+    async def _submit(self, cc_name, function_name, args):
+        try:
+            await self._ensure_client()
+
+            async with self._invoke_semaphore:
+                if self.simulate:
+                    response = await self.simulator.submit(cc_name, function_name, args)
+                    return {'success': True, 'txId': response['txId'], 'result': self._parse_response(response['payload'])}
+
+                return await self._submit_to_orderer(cc_name, function_name, args)
+
+        except Exception as e:
+            logger.error(f"Error submitting chaincode transaction: {str(e)}")
+            raise
+
+    async def _submit_to_orderer(self, cc_name, function_name, args):
+        """
+        Các bước endorse và broadcast của Client.chaincode_invoke, dừng sau khi orderer nhận giao dịch
+        """
+        from hfc.fabric.transaction.tx_context import create_tx_context
+        from hfc.fabric.transaction.tx_proposal_request import CC_INVOKE, CC_TYPE_NODE, TXProposalRequest, create_tx_prop_req
+        from hfc.util.utils import build_tx_req, send_transaction
+
+        proposal_request = create_tx_prop_req(
+            prop_type=CC_INVOKE,
+            cc_name=cc_name,
+            cc_type=CC_TYPE_NODE,
+            fcn=function_name,
+            args=[str(arg) for arg in args]
+        )
+        tx_context = create_tx_context(self.user, self.user.cryptoSuite, proposal_request)
+        channel = self.client.get_channel(self.channel_name)
+
+        responses, proposal, header = channel.send_tx_proposal(tx_context, [self.client.get_peer(self.peer_name)])
+        proposal_responses = await asyncio.gather(*responses)
+        failed = [response for response in proposal_responses if response.response.status != 200]
+        if failed:
+            raise RuntimeError(f"Endorsement failed: {failed[0].response.message}")
+
+        transaction_request = build_tx_req((proposal_responses, proposal, header))
+        broadcast_context = create_tx_context(self.user, self.user.cryptoSuite, TXProposalRequest())
+        async for response in send_transaction(self.client.orderers, transaction_request, broadcast_context):
+            if response.status != 200:
+                raise RuntimeError(f"Orderer rejected transaction {tx_context.tx_id}: {response.info}")
+            break
+
         return {
-            "success": True,
-            "message": f"Simulated query for {cc_name}.{function_name}({args})",
-            "txId": f"tx_query_{cc_name}_{function_name}"
+            'success': True,
+            'txId': tx_context.tx_id,
+            'result': self._parse_response(proposal_responses[0].response.payload)
         }
-    
+
+    async def subscribe_blocks(self, start=0):
+        """
+        Như blocks() nhưng dùng được từ event loop bất kỳ
+        """
+        async for block in _background.iterate(self.blocks(start)):
+            yield block
+
+    async def iter_documents_by_citizen(self, citizen_id, page_size=None, cc_name='document_contract'):
+        """
+        Giấy tờ của công dân, mới nhất trước, đọc từng trang bằng getDocumentsByCitizenPage
+        """
+        async for document in self.iter_pages(cc_name, 'getDocumentsByCitizenPage', [citizen_id], page_size):
+            yield document
+
+    async def iter_documents_by_state(self, state, page_size=None, cc_name='document_contract'):
+        """
+        Giấy tờ ở trạng thái state, mới nhất trước, đọc từng trang bằng getDocumentsByStatePage
+        """
+        async for document in self.iter_pages(cc_name, 'getDocumentsByStatePage', [state], page_size):
+            yield document
+
+    async def iter_pages(self, cc_name, function_name, args, page_size=None):
+        """
+        Duyệt mọi bản ghi của một hàm query phân trang theo bookmark, dùng được từ event loop bất kỳ
+
+        Hàm chaincode nhận thêm hai tham số pageSize, bookmark và trả về {records, bookmark},
+        bookmark rỗng ở trang cuối, mỗi lời gọi chaincode chỉ đọc một trang.
+
+        :param page_size: Số bản ghi mỗi trang, mặc định HYPERLEDGER_PAGE_SIZE
+        """
+        async for record in _background.iterate(self._pages(cc_name, function_name, args, page_size)):
+            yield record
+
+    async def _pages(self, cc_name, function_name, args, page_size=None):
+        page_size = page_size or getattr(settings, 'HYPERLEDGER_PAGE_SIZE', 50)
+        bookmark = ''
+        while True:
+            page = await self._query(cc_name, function_name, [*args, page_size, bookmark])
+            for record in page['records']:
+                yield record
+            bookmark = page['bookmark']
+            if not bookmark:
+                return
+
+    async def blocks(self, start=0):
+        """
+        Block của kênh từ số start (dạng block của FabricSimulator), chờ block mới khi đã bắt kịp
+
+        Phải chạy trên loop nền của service, xem FabricBlockListener.
+        """
+        await self._ensure_client()
+
+        if self.simulate:
+            async for block in self.simulator.blocks_from(start):
+                yield block
+            return
+
+        queue = asyncio.Queue()
+        channel = self.client.get_channel(self.channel_name)
+        event_hub = channel.newChannelEventHub(self.client.get_peer(self.peer_name), self.user)
+        event_hub.registerBlockEvent(start=start, onEvent=queue.put_nowait)
+        stream = asyncio.ensure_future(event_hub.connect(start=start, filtered=False))
+        try:
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait([getter, stream], return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    # Stream kết thúc (peer đóng kết nối hoặc lỗi), để người gọi kết nối lại
+                    stream.result()
+                    raise ConnectionError('Channel event stream closed')
+                yield _block_from_fabric(getter.result())
+        finally:
+            stream.cancel()
+            event_hub.disconnect()
+
+    async def _gather(self, method, calls):
+        results = await asyncio.gather(
+            *(method(cc_name, function_name, args) for cc_name, function_name, args in calls),
+            return_exceptions=True
+        )
+        return [
+            {'success': False, 'error': str(result)} if isinstance(result, Exception) else result
+            for result in results
+        ]
+
+    def _parse_response(self, response):
+        if isinstance(response, bytes):
+            response = response.decode('utf-8')
+        if isinstance(response, str):
+            try:
+                return json.loads(response)
+            except ValueError:
+                return response
+        return response
+
+    async def _simulate_query(self, cc_name, function_name, args):
+        """Query trên ledger giả lập, trả về payload giống peer"""
+        return self._parse_response(await self.simulator.query(cc_name, function_name, args))
+
     async def _simulate_invoke(self, cc_name, function_name, args):
-        """Simulate chaincode invoke for development"""
-        await asyncio.sleep(1)  # Simulate network delay
-        
-        # Generate a transaction ID
-        tx_id = f"tx_invoke_{cc_name}_{function_name}_{hash(str(args))}"
-        
+        """Invoke trên ledger giả lập, chờ tới khi giao dịch được commit"""
+        response = await self.simulator.invoke(cc_name, function_name, args)
         return {
-            "success": True,
-            "message": f"Simulated invoke for {cc_name}.{function_name}({args})",
-            "txId": tx_id
+            'success': True,
+            'txId': response['txId'],
+            'blockNumber': response['blockNumber'],
+            'result': self._parse_response(response['payload'])
         }
 
 
-# Singleton instance
-hyperledger_service = HyperledgerService()
+# Mã kiểm tra giao dịch (TxValidationCode) thường gặp
+VALIDATION_CODES = {
+    0: 'VALID',
+    1: 'NIL_ENVELOPE',
+    2: 'BAD_PAYLOAD',
+    10: 'ENDORSEMENT_POLICY_FAILURE',
+    11: 'MVCC_READ_CONFLICT',
+    12: 'PHANTOM_READ_CONFLICT',
+    13: 'UNKNOWN_TX_TYPE',
+    254: 'NOT_VALIDATED',
+    255: 'INVALID_OTHER_REASON',
+}
+
+
+def _block_from_fabric(block):
+    """
+    Chuyển block đã giải mã của fabric-sdk-py sang dạng block của FabricSimulator
+    """
+    header = block['header']
+    validation_codes = block['metadata']['metadata'][2]
+    transactions = []
+
+    for index, envelope in enumerate(block['data']['data']):
+        payload = envelope['payload']
+        channel_header = payload['header']['channel_header']
+        if channel_header.get('type') not in (3, 'ENDORSER_TRANSACTION'):
+            continue
+
+        chaincode = None
+        events = []
+        for action in payload['data'].get('actions', []):
+            extension = action['payload']['action']['proposal_response_payload']['extension']
+            chaincode = extension.get('chaincode_id', {}).get('name', chaincode)
+            event = extension.get('events')
+            if event and event.get('event_name'):
+                event_payload = event.get('payload') or b''
+                try:
+                    event_payload = json.loads(event_payload)
+                except ValueError:
+                    event_payload = event_payload.decode('utf-8', 'replace') if isinstance(event_payload, bytes) else event_payload
+                events.append({'name': event['event_name'], 'payload': event_payload})
+
+        code = validation_codes[index] if index < len(validation_codes) else 254
+        transactions.append({
+            'txId': channel_header['tx_id'],
+            'chaincode': chaincode,
+            'function': None,
+            'timestamp': channel_header.get('timestamp'),
+            'validationCode': VALIDATION_CODES.get(code, str(code)),
+            'events': events,
+        })
+
+    data_hash = header.get('data_hash', b'')
+    previous_hash = header.get('previous_hash', b'')
+    return {
+        'number': int(header['number']),
+        'hash': data_hash.hex() if isinstance(data_hash, bytes) else data_hash,
+        'previousHash': previous_hash.hex() if isinstance(previous_hash, bytes) else previous_hash,
+        'transactions': transactions,
+    }
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hyperledger_service():
+    """
+    Lấy HyperledgerService dùng chung của process, được tạo ở lần gọi đầu tiên
+    """
+    global _service
+
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = HyperledgerService()
+    return _service
+
+
+def __getattr__(name):
+    # Tương thích với `from .hyperledger import hyperledger_service` mà không tạo client khi import
+    if name == 'hyperledger_service':
+        return get_hyperledger_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,368 @@
+import logging
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+
+from .rpc import JsonRpcClient, to_int
+
+logger = logging.getLogger(__name__)
+
+# Event của DocumentContract -> hành động trong lịch sử giấy tờ (HistoryRecord.action)
+EVENT_ACTIONS = {
+    'DocumentCreated': 'CREATE',
+    'DocumentSubmitted': 'SUBMIT_FOR_APPROVAL',
+    'DocumentApproved': 'APPROVE',
+    'DocumentRejected': 'REJECT',
+    'DocumentRevoked': 'REVOKE',
+    'DocumentUpdated': 'UPDATE_STATUS',
+}
+
+# DocumentContract.DocumentState
+STATE_DRAFT, STATE_PENDING_APPROVAL, STATE_ACTIVE, STATE_REVOKED = 0, 1, 2, 3
+
+
+class DocumentEventIndexer:
+    """
+    Đọc event của DocumentContract bằng eth_getLogs theo từng khoảng block và lưu vào
+    bảng DocumentEvent/ChainDocument để truy vấn lịch sử giấy tờ từ database
+
+    Vị trí đã xử lý được lưu trong IndexerCheckpoint. Khi hash của block checkpoint
+    không còn khớp với node (reorg), indexer xóa các event trong
+    BLOCKCHAIN_INDEXER_REORG_DEPTH block gần nhất và đọc lại từ đó.
+    """
+
+    name = 'document_contract'
+
+    def __init__(self, rpc=None, contract_address=None, contract_abi=None):
+        self.rpc = rpc or JsonRpcClient()
+        self.start_block = getattr(settings, 'BLOCKCHAIN_INDEXER_START_BLOCK', 0)
+        self.block_range = getattr(settings, 'BLOCKCHAIN_INDEXER_BLOCK_RANGE', 2000)
+        self.reorg_depth = getattr(settings, 'BLOCKCHAIN_INDEXER_REORG_DEPTH', 12)
+
+        if contract_address is None or contract_abi is None:
+            from .client import get_client
+            client = get_client()
+            contract_address = contract_address or client.addresses['document_contract']
+            contract_abi = contract_abi or client.abis['document_contract']
+
+        self.contract_address = contract_address
+        self.web3 = Web3()
+        self.contract = self.web3.eth.contract(abi=contract_abi)
+
+        # topic0 -> (tên event, danh sách (tên, kiểu) tham số)
+        self.events = {}
+        for entry in contract_abi:
+            if entry.get('type') != 'event' or entry.get('name') not in EVENT_ACTIONS:
+                continue
+            inputs = [(item['name'], item['type']) for item in entry['inputs']]
+            signature = f"{entry['name']}({','.join(t for _, t in inputs)})"
+            self.events['0x' + bytes(Web3.keccak(text=signature)).hex()] = (entry['name'], inputs)
+
+    def tick(self):
+        """
+        Xử lý khoảng block tiếp theo
+
+        :return: dict gồm khoảng block đã xử lý, số event và cờ reorg
+        """
+        from apps.blockchain.models import IndexerCheckpoint
+
+        checkpoint, _ = IndexerCheckpoint.objects.get_or_create(name=self.name)
+        # Cả lượt đọc từ cùng một node, xem JsonRpcClient.pinned
+        rpc = self.rpc.pinned()
+
+        calls = [('eth_blockNumber', [])]
+        if checkpoint.last_block_hash:
+            calls.append(('eth_getBlockByNumber', [hex(checkpoint.last_block), False]))
+        results = self._batch(rpc, calls)
+        head = to_int(results[0])
+
+        if checkpoint.last_block_hash:
+            block = results[1]
+            if block is None or block['hash'] != checkpoint.last_block_hash:
+                self._rollback(rpc, checkpoint)
+                return {'reorg': True, 'last_block': checkpoint.last_block, 'events': 0}
+            from_block = checkpoint.last_block + 1
+        else:
+            from_block = self.start_block
+
+        if from_block > head:
+            return {'reorg': False, 'last_block': checkpoint.last_block, 'events': 0}
+
+        to_block = min(head, from_block + self.block_range - 1)
+
+        logs = rpc.call('eth_getLogs', [{
+            'address': self.contract_address,
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+        }])
+        logs = [log for log in logs if log.get('topics') and log['topics'][0] in self.events and not log.get('removed')]
+
+        # Block (timestamp, hash) và input của giao dịch được lấy trong cùng một batch
+        block_numbers = sorted({to_int(log['blockNumber']) for log in logs} | {to_block})
+        tx_hashes = sorted({log['transactionHash'] for log in logs})
+        results = self._batch(
+            rpc,
+            [('eth_getBlockByNumber', [hex(number), False]) for number in block_numbers] +
+            [('eth_getTransactionByHash', [tx_hash]) for tx_hash in tx_hashes]
+        )
+        blocks = dict(zip(block_numbers, results[:len(block_numbers)]))
+        # Mỗi giao dịch chỉ giải mã input một lần, dù phát nhiều event (createDocuments)
+        tx_calls = {tx_hash: self._decode_input(tx) for tx_hash, tx in zip(tx_hashes, results[len(block_numbers):])}
+
+        events = []
+        for log in logs:
+            block = blocks[to_int(log['blockNumber'])]
+            if block is None or block['hash'] != log['blockHash']:
+                # Chuỗi thay đổi trong lúc đọc, để lượt sau xử lý lại
+                logger.warning(f"Block {to_int(log['blockNumber'])} changed while indexing, retrying")
+                return {'reorg': True, 'last_block': checkpoint.last_block, 'events': 0}
+            events.append(self._decode(log, block, tx_calls.get(log['transactionHash'])))
+
+        with transaction.atomic():
+            self._store(events)
+            checkpoint.last_block = to_block
+            checkpoint.last_block_hash = blocks[to_block]['hash']
+            checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+        return {'reorg': False, 'from_block': from_block, 'last_block': to_block, 'head': head, 'events': len(events)}
+
+    def run_until_head(self):
+        """
+        Xử lý liên tục cho đến khi bắt kịp block mới nhất
+        """
+        total = 0
+        while True:
+            result = self.tick()
+            total += result['events']
+            if not result.get('reorg') and result.get('head', result['last_block']) <= result['last_block']:
+                return total
+
+    def _batch(self, rpc, calls):
+        results = rpc.batch(calls)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def _decode_input(self, tx):
+        """
+        Hàm contract và tham số của giao dịch, None nếu không giải mã được
+        """
+        if not tx or not tx.get('input'):
+            return None
+        try:
+            return self.contract.decode_function_input(tx['input'])
+        except Exception:
+            return None
+
+    def _call_args(self, call, document_id):
+        """
+        Tham số của lời gọi contract (ghi chú, ngày cấp, data hash...) không có trong event
+
+        Tham số mảng struct (createDocuments(DocumentInput[])) được lấy theo phần tử có
+        documentId của event.
+        """
+        if call is None:
+            return {}
+        function, values = call
+
+        components = {item['name']: [c['name'] for c in item.get('components', [])] for item in function.abi['inputs']}
+        call_args = {}
+        for key, value in values.items():
+            if isinstance(value, (str, int)):
+                call_args[key] = value
+            elif isinstance(value, (list, tuple)) and components.get(key):
+                for item in value:
+                    if not isinstance(item, dict):
+                        item = dict(zip(components[key], item))
+                    if item.get('documentId') == document_id:
+                        call_args.update((name, field) for name, field in item.items() if isinstance(field, (str, int)))
+                        break
+        return call_args
+
+    def _decode(self, log, block, call):
+        from apps.blockchain.models import DocumentEvent
+
+        event_name, inputs = self.events[log['topics'][0]]
+        values = self.web3.codec.decode([t for _, t in inputs], bytes.fromhex(log['data'][2:]))
+        args = dict(zip([name for name, _ in inputs], values))
+        call_args = self._call_args(call, args['documentId'])
+
+        action = EVENT_ACTIONS[event_name]
+        user_id = args.get('issuedBy') or args.get('userId') or args.get('approvedBy') or args.get('rejectedBy') or args.get('revokedBy') or ''
+        comments = args.get('reason') or call_args.get('comments') or call_args.get('reason') or ''
+
+        return DocumentEvent(
+            document_id=args['documentId'],
+            event_name=event_name,
+            action=action,
+            user_id=user_id,
+            user_role='officer' if action in ('CREATE', 'SUBMIT_FOR_APPROVAL', 'UPDATE_STATUS') else '',
+            comments=comments,
+            chain_tx_id=args.get('txId', ''),
+            args={**call_args, **args},
+            block_number=to_int(log['blockNumber']),
+            block_hash=log['blockHash'],
+            block_timestamp=to_int(block['timestamp']),
+            transaction_hash=log['transactionHash'],
+            log_index=to_int(log['logIndex']),
+        )
+
+    def _store(self, events):
+        from apps.blockchain.models import DocumentEvent
+
+        if not events:
+            return
+
+        DocumentEvent.objects.bulk_create(events, ignore_conflicts=True)
+        self.rebuild_documents({event.document_id for event in events})
+
+    def _rollback(self, rpc, checkpoint):
+        from apps.blockchain.models import DocumentEvent
+
+        # Lùi từng bước reorg_depth block cho đến khi event mới nhất còn lại khớp với chuỗi hiện tại
+        target, target_hash = checkpoint.last_block, None
+        while True:
+            target -= self.reorg_depth
+            if target <= self.start_block:
+                target, target_hash = None, None
+                break
+
+            latest = DocumentEvent.objects.filter(block_number__lte=target).order_by('-block_number').first()
+            blocks = self._batch(
+                rpc,
+                [('eth_getBlockByNumber', [hex(target), False])] +
+                ([('eth_getBlockByNumber', [hex(latest.block_number), False])] if latest else [])
+            )
+            target_hash = blocks[0]['hash']
+            if latest is None or (blocks[1] and blocks[1]['hash'] == latest.block_hash):
+                break
+
+        logger.warning(f"Reorg detected at block {checkpoint.last_block}, rolling back to {target}")
+
+        with transaction.atomic():
+            stale = DocumentEvent.objects.all() if target is None else DocumentEvent.objects.filter(block_number__gt=target)
+            affected = set(stale.values_list('document_id', flat=True).distinct())
+            stale.delete()
+            self.rebuild_documents(affected)
+
+            checkpoint.last_block = target or 0
+            checkpoint.last_block_hash = target_hash
+            checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+    def rebuild_documents(self, document_ids):
+        """
+        Dựng lại ChainDocument của các giấy tờ từ toàn bộ event đã lưu
+        """
+        from apps.blockchain.models import ChainDocument, DocumentEvent
+
+        documents = {}
+        for event in DocumentEvent.objects.filter(document_id__in=document_ids).order_by('block_number', 'log_index'):
+            document = documents.get(event.document_id)
+            if document is None:
+                document = documents[event.document_id] = ChainDocument(
+                    document_id=event.document_id,
+                    created_block=event.block_number,
+                    created_at_chain=event.block_timestamp
+                )
+            self._apply(document, event)
+
+        ChainDocument.objects.filter(document_id__in=document_ids).delete()
+        ChainDocument.objects.bulk_create(documents.values())
+
+    def _apply(self, document, event):
+        args = event.args
+
+        if event.action == 'CREATE':
+            document.document_type = args.get('documentType', '')
+            document.citizen_id = args.get('citizenId', '')
+            document.issued_by = args.get('issuedBy', '')
+            document.issue_date = args.get('issueDate', '')
+            document.valid_until = args.get('validUntil', '')
+            document.data_hash = args.get('dataHash', '')
+            document.metadata = args.get('metadata', '')
+            document.state = STATE_DRAFT
+        elif event.action == 'SUBMIT_FOR_APPROVAL':
+            document.state = STATE_PENDING_APPROVAL
+        elif event.action == 'APPROVE':
+            document.state = STATE_ACTIVE
+            document.approved_by = event.user_id
+            document.approved_at = event.block_timestamp
+        elif event.action == 'REJECT':
+            document.state = STATE_DRAFT
+        elif event.action == 'REVOKE':
+            document.state = STATE_REVOKED
+            document.revoked_by = event.user_id
+            document.revoked_at = event.block_timestamp
+            document.revocation_reason = event.comments
+        elif event.action == 'UPDATE_STATUS':
+            document.state = args.get('newState', document.state)
+
+        document.updated_at_chain = event.block_timestamp
+        document.updated_block = event.block_number
+
+
+def is_index_available():
+    """
+    Kiểm tra indexer đã chạy ít nhất một lần (có checkpoint) hay chưa
+    """
+    from apps.blockchain.models import IndexerCheckpoint
+
+    return IndexerCheckpoint.objects.filter(name=DocumentEventIndexer.name, last_block_hash__isnull=False).exists()
+
+
+def get_document_history(document_id):
+    """
+    Lịch sử giấy tờ từ bảng DocumentEvent, cùng định dạng với getDocumentHistory
+    (action, timestamp, userId, userRole, comments, txId)
+    """
+    from apps.blockchain.models import DocumentEvent
+
+    return [
+        tuple(row) for row in
+        DocumentEvent.objects.filter(document_id=document_id)
+        .order_by('block_number', 'log_index')
+        .values_list('action', 'block_timestamp', 'user_id', 'user_role', 'comments', 'chain_tx_id')
+    ]
+
+
+def get_documents_by_citizen(citizen_id):
+    """
+    Giấy tờ của công dân từ bảng ChainDocument, cùng định dạng với getDocumentsByCitizen
+    """
+    from apps.blockchain.models import ChainDocument
+
+    return [document.as_struct() for document in ChainDocument.objects.filter(citizen_id=str(citizen_id)).order_by('created_block')]
+
+
+def verify_documents(items):
+    """
+    Xác thực nhiều giấy tờ từ bảng ChainDocument, cùng định dạng với verifyDocument của
+    DocumentContract (verified, exists, isActive, isExpired, dataIntegrity, document)
+
+    Dùng thay cho node khi node không khả dụng; kết quả trễ so với chain tối đa một lượt indexer.
+
+    :param items: Danh sách cặp (document_id, data_hash), data_hash rỗng là không đối chiếu
+    """
+    from apps.blockchain.models import ChainDocument
+
+    documents = ChainDocument.objects.in_bulk([document_id for document_id, _ in items], field_name='document_id')
+
+    results = []
+    for document_id, data_hash in items:
+        document = documents.get(document_id)
+        if document is None:
+            results.append((False, False, False, False, False, ChainDocument().as_struct()))
+            continue
+
+        is_active = document.state == 2
+        data_integrity = not data_hash or data_hash == document.data_hash
+        results.append((is_active and data_integrity, True, is_active, False, data_integrity, document.as_struct()))
+    return results
+
+
+def verify_document(document_id, data_hash=''):
+    """
+    Xác thực một giấy tờ từ bảng ChainDocument, xem verify_documents
+    """
+    return verify_documents([(document_id, data_hash)])[0]
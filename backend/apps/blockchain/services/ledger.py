@@ -0,0 +1,360 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from web3 import Web3
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = REGISTRY.counter(
+    'ledger_requests_total', 'Số lời gọi ledger theo mạng, thao tác và kết quả', ('network', 'operation', 'status')
+)
+LATENCY = REGISTRY.histogram(
+    'ledger_request_seconds', 'Thời gian xử lý lời gọi ledger', ('network', 'operation')
+)
+
+_lock = threading.Lock()
+_ledgers = {}
+
+
+class LedgerError(Exception):
+    """
+    Lời gọi đọc ledger thất bại
+    """
+
+
+class LedgerAdapter:
+    """
+    Giao diện async chung cho các mạng blockchain (Quorum, Hyperledger Fabric)
+
+    Contract/chaincode được gọi theo tên (document_contract, user_contract, admin_contract).
+
+    - submit/submit_many trả về dict {'success', 'status', 'txId', ...} hoặc
+      {'success': False, 'error'}, không ném lỗi
+    - query trả về kết quả hoặc ném LedgerError; query_many trả về
+      {'success': True, 'result'} / {'success': False, 'error'} cho từng lời gọi
+    - subscribe trả về các event của contract đã được commit, từ block start
+
+    Lớp con cài đặt _submit, _query, _query_many và _subscribe. Metric được ghi chung ở đây.
+    """
+
+    network = None
+
+    async def submit(self, contract, function, args=(), wait=True, routing_key=None):
+        """
+        Gửi giao dịch
+
+        :param wait: Chờ giao dịch được commit; False trả về ngay với status 'submitted'
+        :param routing_key: Khóa chọn tài khoản ký (Quorum), mặc định là tham số đầu tiên
+        """
+        started = time.monotonic()
+        try:
+            result = await self._submit(contract, function, tuple(args), wait, routing_key)
+        except Exception as e:
+            logger.error(f"Error submitting {contract}.{function} on {self.network}: {str(e)}")
+            result = {'success': False, 'error': str(e)}
+        self._observe('submit', started, 'success' if result.get('success') else 'error')
+        return result
+
+    async def submit_many(self, calls, wait=True):
+        """
+        Gửi nhiều giao dịch đồng thời
+
+        :param calls: Danh sách (contract, function, args)
+        :return: Danh sách kết quả như submit, cùng thứ tự với calls
+        """
+        return await asyncio.gather(*(
+            self.submit(contract, function, args, wait) for contract, function, args in calls
+        ))
+
+    async def query(self, contract, function, args=(), ids=None):
+        """
+        Gọi hàm chỉ đọc
+
+        :param ids: Các id mà kết quả phụ thuộc, dùng cho cache đọc (nếu backend hỗ trợ)
+        """
+        started = time.monotonic()
+        try:
+            result = await self._query(contract, function, tuple(args), ids)
+        except Exception as e:
+            self._observe('query', started, 'error')
+            if isinstance(e, LedgerError):
+                raise
+            raise LedgerError(str(e)) from e
+        self._observe('query', started, 'success')
+        return result
+
+    async def query_many(self, calls):
+        """
+        Gọi nhiều hàm chỉ đọc, gom thành ít round trip nhất mà backend hỗ trợ
+
+        :param calls: Danh sách (contract, function, args)
+        """
+        if not calls:
+            return []
+
+        started = time.monotonic()
+        try:
+            results = await self._query_many([(contract, function, tuple(args)) for contract, function, args in calls])
+        except Exception as e:
+            logger.error(f"Error querying {self.network}: {str(e)}")
+            results = [{'success': False, 'error': str(e)} for _ in calls]
+        self._observe('query_many', started, 'success' if all(item['success'] for item in results) else 'error')
+        return results
+
+    async def subscribe(self, start=None):
+        """
+        Event của các contract từ block start (mặc định block mới nhất), chờ block mới khi đã bắt kịp
+
+        Mỗi event là dict gồm network, blockNumber, txId, contract, event và args.
+        """
+        async for event in self._subscribe(start):
+            REQUESTS.inc(network=self.network, operation='event', status='success')
+            yield event
+
+    def _observe(self, operation, started, status):
+        REQUESTS.inc(network=self.network, operation=operation, status=status)
+        LATENCY.observe(time.monotonic() - started, network=self.network, operation=operation)
+
+    async def _submit(self, contract, function, args, wait, routing_key):
+        raise NotImplementedError
+
+    async def _query(self, contract, function, args, ids):
+        raise NotImplementedError
+
+    async def _query_many(self, calls):
+        raise NotImplementedError
+
+    async def _subscribe(self, start):
+        raise NotImplementedError
+        yield
+
+
+class QuorumLedger(LedgerAdapter):
+    """
+    Backend Quorum/Ethereum trên BlockchainService (web3 đồng bộ)
+
+    Lời gọi web3 chạy trong thread pool riêng (LEDGER_THREAD_POOL_SIZE thread), giao dịch
+    đi qua SignerPool, lời gọi đọc qua ReadCache và ContractCaller.
+    """
+
+    network = 'quorum'
+
+    def __init__(self, max_workers=None, poll_interval=None):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or getattr(settings, 'LEDGER_THREAD_POOL_SIZE', 32),
+            thread_name_prefix='ledger-quorum'
+        )
+        self.poll_interval = poll_interval or getattr(settings, 'LEDGER_POLL_INTERVAL', 2)
+        self._codec = Web3().codec
+
+    @property
+    def service(self):
+        from .blockchain_service import BlockchainService
+
+        return BlockchainService()
+
+    def _function(self, service, contract, function):
+        contract_instance = getattr(service, contract, None)
+        if contract_instance is None:
+            raise LedgerError(f"Contract {contract} is not configured")
+        return getattr(contract_instance.functions, function)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def _submit(self, contract, function, args, wait, routing_key):
+        def send():
+            service = self.service
+            transaction = self._function(service, contract, function)(*args)
+            return service._sign_and_send_transaction(transaction, wait_for_receipt=wait, routing_key=routing_key)
+
+        return await self._run(send)
+
+    async def _query(self, contract, function, args, ids):
+        from .read_cache import cached_call
+
+        def call():
+            return cached_call(contract, self._function(self.service, contract, function), args, ids)
+
+        return await self._run(call)
+
+    async def _query_many(self, calls):
+        def call():
+            service = self.service
+            bound = []
+            results = [None] * len(calls)
+            for index, (contract, function, args) in enumerate(calls):
+                try:
+                    bound.append((index, (self._function(service, contract, function), args)))
+                except Exception as e:
+                    results[index] = {'success': False, 'error': str(e)}
+
+            for (index, _), result in zip(bound, service.call_many([call for _, call in bound])):
+                results[index] = result
+            return results
+
+        return await self._run(call)
+
+    async def _subscribe(self, start):
+        from .rpc import JsonRpcClient, to_int
+
+        rpc = JsonRpcClient()
+        depth = getattr(settings, 'BLOCKCHAIN_CONFIRMATION_DEPTH', 1)
+        block_range = getattr(settings, 'BLOCKCHAIN_INDEXER_BLOCK_RANGE', 2000)
+        addresses, events = await self._run(self._event_map)
+
+        next_block = start
+        while True:
+            head = to_int(await self._run(rpc.call, 'eth_blockNumber')) - depth + 1
+            if next_block is None:
+                next_block = head + 1
+            if not addresses or next_block > head:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            to_block = min(head, next_block + block_range - 1)
+            logs = await self._run(rpc.call, 'eth_getLogs', [{
+                'address': list(addresses),
+                'fromBlock': hex(next_block),
+                'toBlock': hex(to_block),
+            }])
+
+            for log in logs:
+                event = self._decode(addresses, events, log)
+                if event is not None:
+                    yield event
+            next_block = to_block + 1
+
+    def _event_map(self):
+        """
+        Địa chỉ contract -> tên contract và topic0 -> (tên event, tham số indexed, tham số còn lại)
+        """
+        from .client import CONTRACTS, get_client
+
+        client = get_client()
+        addresses = {}
+        events = {}
+        for contract in CONTRACTS:
+            if not client.addresses[contract]:
+                continue
+            addresses[client.addresses[contract].lower()] = contract
+            for entry in client.abis[contract]:
+                if entry.get('type') != 'event':
+                    continue
+                signature = f"{entry['name']}({','.join(item['type'] for item in entry['inputs'])})"
+                events['0x' + bytes(Web3.keccak(text=signature)).hex()] = (
+                    entry['name'],
+                    [(item['name'], item['type']) for item in entry['inputs'] if item.get('indexed')],
+                    [(item['name'], item['type']) for item in entry['inputs'] if not item.get('indexed')],
+                )
+        return addresses, events
+
+    def _decode(self, addresses, events, log):
+        from .rpc import to_int
+
+        contract = addresses.get(log['address'].lower())
+        event = events.get(log['topics'][0]) if log.get('topics') else None
+        if contract is None or event is None or log.get('removed'):
+            return None
+
+        name, indexed, data = event
+        codec = self._codec
+        try:
+            args = dict(zip([item for item, _ in data], codec.decode([t for _, t in data], bytes.fromhex(log['data'][2:]))))
+            for (item, type_), topic in zip(indexed, log['topics'][1:]):
+                # Tham số indexed kiểu động (string, bytes, mảng) chỉ còn lại hash
+                dynamic = type_ in ('string', 'bytes') or type_.endswith(']')
+                args[item] = topic if dynamic else codec.decode([type_], bytes.fromhex(topic[2:]))[0]
+        except Exception as e:
+            logger.warning(f"Could not decode log {log['transactionHash']}:{log['logIndex']}: {str(e)}")
+            return None
+
+        return {
+            'network': self.network,
+            'blockNumber': to_int(log['blockNumber']),
+            'txId': log['transactionHash'],
+            'contract': contract,
+            'event': name,
+            'args': args,
+        }
+
+
+class FabricLedger(LedgerAdapter):
+    """
+    Backend Hyperledger Fabric trên HyperledgerService (hoặc ledger giả lập khi HYPERLEDGER_SIMULATE)
+    """
+
+    network = 'hyperledger'
+
+    @property
+    def service(self):
+        from .hyperledger import get_hyperledger_service
+
+        return get_hyperledger_service()
+
+    async def _submit(self, contract, function, args, wait, routing_key):
+        # Fabric không có nonce theo tài khoản, routing_key không cần dùng
+        if not wait:
+            result = await self.service.submit_chaincode(contract, function, args)
+            return dict(result, status='submitted')
+
+        result = await self.service.invoke_chaincode(contract, function, args)
+        return dict(result, status='confirmed')
+
+    async def _query(self, contract, function, args, ids):
+        return await self.service.query_chaincode(contract, function, args)
+
+    async def _query_many(self, calls):
+        results = await asyncio.gather(
+            *(self.service.query_chaincode(contract, function, args) for contract, function, args in calls),
+            return_exceptions=True
+        )
+        return [
+            {'success': False, 'error': str(result)} if isinstance(result, Exception)
+            else {'success': True, 'result': result}
+            for result in results
+        ]
+
+    async def _subscribe(self, start):
+        async for block in self.service.subscribe_blocks(start or 0):
+            for transaction in block['transactions']:
+                if transaction['validationCode'] != 'VALID':
+                    continue
+                for event in transaction['events']:
+                    yield {
+                        'network': self.network,
+                        'blockNumber': block['number'],
+                        'txId': transaction['txId'],
+                        'contract': transaction['chaincode'],
+                        'event': event['name'],
+                        'args': event['payload'],
+                    }
+
+
+LEDGERS = {
+    'quorum': QuorumLedger,
+    'hyperledger': FabricLedger,
+}
+
+
+def get_ledger(network=None):
+    """
+    Lấy LedgerAdapter dùng chung của process cho mạng network
+    (giá trị của BlockchainRecord.network), mặc định LEDGER_DEFAULT_NETWORK
+    """
+    network = network or getattr(settings, 'LEDGER_DEFAULT_NETWORK', 'quorum')
+    if network not in LEDGERS:
+        raise ValueError(f"Unknown ledger network: {network}")
+
+    ledger = _ledgers.get(network)
+    if ledger is None:
+        with _lock:
+            ledger = _ledgers.get(network)
+            if ledger is None:
+                ledger = _ledgers[network] = LEDGERS[network]()
+    return ledger
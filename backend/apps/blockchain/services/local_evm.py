@@ -0,0 +1,318 @@
+import collections
+import json
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from hexbytes import HexBytes
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# File Solidity của từng contract trong blockchain/contracts/solidity
+SOLIDITY_SOURCES = {
+    'document_contract': ('DocumentContract.sol', 'DocumentContract'),
+    'user_contract': ('UserContract.sol', 'UserContract'),
+    'admin_contract': ('AdminContract.sol', 'AdminContract'),
+}
+
+
+def _to_rpc(value):
+    """
+    Kết quả của EthereumTesterProvider (số nguyên, bytes, một số khóa snake_case) -> định dạng JSON-RPC của node
+    """
+    if isinstance(value, dict):
+        return {_camel_case(key): _to_rpc(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_rpc(item) for item in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, int):
+        return hex(value)
+    if isinstance(value, bytes):
+        return '0x' + value.hex()
+    return value
+
+
+def _transaction_nonce(raw):
+    if raw[0] > 0x7f:
+        from eth_account._utils.legacy_transactions import Transaction
+        return Transaction.from_bytes(raw).nonce
+
+    from eth_account.typed_transactions import TypedTransaction
+    return TypedTransaction.from_bytes(raw).as_dict()['nonce']
+
+
+def _camel_case(key):
+    head, *rest = key.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+class LocalEVMNode:
+    """
+    Node JSON-RPC chạy trong process trên eth-tester (py-evm), dùng cho benchmark
+
+    Node nghe HTTP trên 127.0.0.1 nên BlockchainService, EndpointPool và JsonRpcClient
+    được đo đúng như với node thật, kể cả JSON-RPC batch. Số request HTTP và số lời gọi
+    theo method được đếm để tính số RPC cho mỗi thao tác.
+
+    :param block_time: 0 thực thi giao dịch ngay khi nhận, > 0 thực thi giao dịch đang chờ
+                       sau mỗi block_time giây như thời gian tạo block của Quorum (IBFT/Raft)
+    """
+
+    def __init__(self, block_time=0):
+        try:
+            from eth_tester import EthereumTester, PyEVMBackend
+            from web3 import EthereumTesterProvider
+        except ImportError as e:
+            raise ImportError('LocalEVMNode cần eth-tester và py-evm (pip install "eth-tester[py-evm]")') from e
+
+        self.tester = EthereumTester(PyEVMBackend())
+        provider = EthereumTesterProvider(self.tester)
+        # Middleware của provider chuyển tham số JSON-RPC (hex) sang dạng eth-tester và định dạng lại kết quả
+        web3 = Web3(provider, middleware=[])
+        self._request = provider.request_func(web3, web3.middleware_onion)
+        self.block_time = block_time
+
+        self.requests = 0
+        self.calls = collections.Counter()
+        # txpool: địa chỉ -> {nonce: giao dịch đã ký} chưa được thực thi
+        self._queued = collections.defaultdict(dict)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+        self._miner = None
+
+    @property
+    def uri(self):
+        return f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    @property
+    def accounts(self):
+        """
+        Các tài khoản có sẵn tiền của eth-tester: danh sách (address, private key hex)
+        """
+        return [
+            (Web3.to_checksum_address(key.public_key.to_canonical_address()), key.to_hex())
+            for key in self.tester.backend.account_keys
+        ]
+
+    def start(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                if isinstance(body, list):
+                    response = [node.handle(request) for request in body]
+                else:
+                    response = node.handle(body)
+                with node._lock:
+                    node.requests += 1
+
+                data = Web3.to_json(response).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='local-evm', daemon=True).start()
+
+        if self.block_time:
+            self._miner = threading.Thread(target=self._mine, name='local-evm-miner', daemon=True)
+            self._miner.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def handle(self, request):
+        """
+        Xử lý một lời gọi JSON-RPC (eth-tester không an toàn giữa các thread nên xử lý tuần tự)
+        """
+        method, params = request['method'], request.get('params') or []
+        with self._lock:
+            self.calls[method] += 1
+            try:
+                if method == 'eth_sendRawTransaction':
+                    response = self._send_raw_transaction(params[0])
+                elif method == 'eth_getTransactionCount' and params[1:] == ['pending']:
+                    response = {'result': self._pending_nonce(Web3.to_checksum_address(params[0]))}
+                else:
+                    response = dict(self._request(method, params))
+            except Exception as e:
+                # Revert, nonce sai...: trả về lỗi JSON-RPC như node thật
+                response = {'error': {'code': -32000, 'message': str(e)}}
+
+        if 'result' in response:
+            response['result'] = _to_rpc(response['result'])
+        response['id'] = request.get('id')
+        response['jsonrpc'] = '2.0'
+        return response
+
+    def _send_raw_transaction(self, raw_transaction):
+        """
+        Nhận giao dịch đã ký vào txpool của node, giống geth
+
+        Giao dịch có nonce chưa tới lượt được giữ lại đến khi đủ các nonce trước đó (eth-tester
+        từ chối ngay, trong khi giao dịch gửi song song từ một tài khoản có thể tới lệch thứ tự).
+        Với block_time > 0 mọi giao dịch chờ tới block kế tiếp mới được thực thi.
+        """
+        from eth_account import Account
+
+        raw = HexBytes(raw_transaction)
+        sender = Account.recover_transaction(raw)
+        nonce = _transaction_nonce(raw)
+        if nonce != self._chain_nonce(sender) or self.block_time:
+            if nonce < self._chain_nonce(sender):
+                raise ValueError(f'nonce too low: next nonce {self._chain_nonce(sender)}, tx nonce {nonce}')
+            self._queued[sender][nonce] = raw.to_0x_hex()
+            if not self.block_time:
+                self._execute_queued(sender)
+            return {'result': Web3.keccak(raw)}
+
+        response = dict(self._request('eth_sendRawTransaction', [raw.to_0x_hex()]))
+        self._execute_queued(sender)
+        return response
+
+    def _execute_queued(self, sender):
+        """
+        Thực thi các giao dịch trong txpool của sender theo thứ tự nonce, dừng ở khoảng trống
+        """
+        queued = self._queued[sender]
+        while queued:
+            nonce = self._chain_nonce(sender)
+            if nonce not in queued:
+                break
+            try:
+                self._request('eth_sendRawTransaction', [queued.pop(nonce)])
+            except Exception as e:
+                logger.warning(f"Queued transaction {sender}/{nonce} rejected: {str(e)}")
+
+    def _pending_nonce(self, sender):
+        nonce = self._chain_nonce(sender)
+        while nonce in self._queued.get(sender, ()):
+            nonce += 1
+        return nonce
+
+    def _chain_nonce(self, sender):
+        return self._request('eth_getTransactionCount', [sender, 'latest'])['result']
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.calls.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'requests': self.requests, 'calls': sum(self.calls.values()), 'methods': dict(self.calls)}
+
+    def deploy(self, abi, bytecode, args=(), sender=None):
+        """
+        Triển khai contract từ tài khoản sender (mặc định tài khoản đầu tiên), trả về địa chỉ
+        """
+        web3 = Web3(Web3.HTTPProvider(self.uri))
+        sender = sender or self.accounts[0][0]
+        tx_hash = web3.eth.contract(abi=abi, bytecode=bytecode).constructor(*args).transact({'from': sender})
+        receipt = web3.eth.wait_for_transaction_receipt(tx_hash, timeout=max(30, self.block_time * 5))
+        if receipt.status != 1:
+            raise RuntimeError('Contract deployment failed')
+        return receipt.contractAddress
+
+    def transact(self, address, abi, function_name, args=(), sender=None):
+        """
+        Gửi giao dịch từ tài khoản của node (không cần ký) và chờ receipt
+        """
+        web3 = Web3(Web3.HTTPProvider(self.uri))
+        sender = sender or self.accounts[0][0]
+        function = getattr(web3.eth.contract(address=address, abi=abi).functions, function_name)
+        tx_hash = function(*args).transact({'from': sender})
+        return web3.eth.wait_for_transaction_receipt(tx_hash, timeout=max(30, self.block_time * 5))
+
+    def _mine(self):
+        # eth-tester đào một block cho mỗi giao dịch: giao dịch trong txpool được thực thi
+        # sau mỗi block_time giây, receipt chỉ xuất hiện từ lúc đó
+        while not self._stopped.wait(self.block_time):
+            with self._lock:
+                for sender in list(self._queued):
+                    self._execute_queued(sender)
+
+
+def compile_contracts(contract_names, solc_version=None, openzeppelin_dir=None, blockchain_dir=None):
+    """
+    Biên dịch contract trong blockchain/contracts/solidity bằng py-solc-x
+
+    :param solc_version: Phiên bản solc, mặc định BLOCKCHAIN_SOLC_VERSION; được cài nếu chưa có
+    :param openzeppelin_dir: Thư mục @openzeppelin (OpenZeppelin Contracts 4.x),
+                             mặc định blockchain/node_modules/@openzeppelin
+    :return: dict tên contract -> {'abi', 'bytecode'}
+    """
+    try:
+        import solcx
+    except ImportError as e:
+        raise ImportError('Biên dịch contract cần py-solc-x (pip install py-solc-x)') from e
+
+    blockchain_dir = blockchain_dir or getattr(
+        settings, 'BLOCKCHAIN_DIR', os.path.join(settings.BASE_DIR, '..', 'blockchain')
+    )
+    source_dir = os.path.abspath(os.path.join(blockchain_dir, 'contracts', 'solidity'))
+    openzeppelin_dir = os.path.abspath(openzeppelin_dir or os.path.join(blockchain_dir, 'node_modules', '@openzeppelin'))
+    if not os.path.isdir(openzeppelin_dir):
+        raise FileNotFoundError(f'OpenZeppelin contracts not found in {openzeppelin_dir} (npm install @openzeppelin/contracts@4)')
+
+    solc_version = solc_version or getattr(settings, 'BLOCKCHAIN_SOLC_VERSION', '0.8.19')
+    if solc_version not in [str(version) for version in solcx.get_installed_solc_versions()]:
+        solcx.install_solc(solc_version)
+
+    files = [os.path.join(source_dir, SOLIDITY_SOURCES[name][0]) for name in contract_names]
+    output = solcx.compile_files(
+        files,
+        output_values=['abi', 'bin'],
+        solc_version=solc_version,
+        import_remappings={'@openzeppelin/': openzeppelin_dir + '/'},
+        allow_paths=[source_dir, openzeppelin_dir],
+        optimize=True,
+    )
+
+    artifacts = {}
+    for name in contract_names:
+        file_name, contract_name = SOLIDITY_SOURCES[name]
+        key = f'{os.path.join(source_dir, file_name)}:{contract_name}'
+        artifacts[name] = {'abi': output[key]['abi'], 'bytecode': '0x' + output[key]['bin']}
+    return artifacts
+
+
+def load_artifacts(contract_names, artifacts_dir):
+    """
+    Đọc ABI và bytecode đã biên dịch sẵn: <tên contract>.json (định dạng của backend) hoặc
+    <DocumentContract>.json (artifact của Truffle/Hardhat), cần có trường bytecode
+    """
+    artifacts = {}
+    for name in contract_names:
+        candidates = [os.path.join(artifacts_dir, f'{name}.json'), os.path.join(artifacts_dir, f'{SOLIDITY_SOURCES[name][1]}.json')]
+        for path in candidates:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                data = json.load(f)
+            bytecode = data.get('bytecode')
+            if isinstance(bytecode, dict):
+                bytecode = bytecode.get('object')
+            if bytecode:
+                artifacts[name] = {'abi': data['abi'], 'bytecode': bytecode if bytecode.startswith('0x') else '0x' + bytecode}
+                break
+        else:
+            raise FileNotFoundError(f'No compiled artifact with bytecode for {name} in {artifacts_dir}')
+    return artifacts
@@ -0,0 +1,92 @@
+import hashlib
+
+# Tiền tố phân biệt lá và nút trong, tránh tấn công second-preimage
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def _to_bytes(value):
+    if isinstance(value, bytes):
+        return value
+    value = value[2:] if value.startswith('0x') else value
+    return bytes.fromhex(value)
+
+
+def hash_leaf(data_hash):
+    """
+    Tạo hash lá từ data hash (hex) của giấy tờ
+    """
+    return hashlib.sha256(LEAF_PREFIX + _to_bytes(data_hash)).digest()
+
+
+def hash_node(left, right):
+    """
+    Tạo hash nút cha từ hai nút con
+    """
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def build_tree(data_hashes):
+    """
+    Xây dựng cây Merkle từ danh sách data hash
+
+    :param data_hashes: Danh sách data hash dạng hex, theo thứ tự leaf index
+    :return: Danh sách các tầng, tầng 0 là lá, tầng cuối chứa root
+    """
+    if not data_hashes:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+
+    levels = [[hash_leaf(data_hash) for data_hash in data_hashes]]
+
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        # Tầng lẻ: nhân đôi nút cuối
+        if len(level) % 2 == 1:
+            level = level + [level[-1]]
+        levels.append([hash_node(level[i], level[i + 1]) for i in range(0, len(level), 2)])
+
+    return levels
+
+
+def merkle_root(levels):
+    """
+    Lấy Merkle root (hex) từ cây đã xây dựng
+    """
+    return levels[-1][0].hex()
+
+
+def inclusion_proof(levels, leaf_index):
+    """
+    Tạo inclusion proof cho lá tại leaf_index
+
+    :return: Danh sách hash anh em (hex) từ lá lên root
+    """
+    proof = []
+    index = leaf_index
+
+    for level in levels[:-1]:
+        sibling_index = index ^ 1
+        if sibling_index >= len(level):
+            sibling_index = index
+        proof.append(level[sibling_index].hex())
+        index //= 2
+
+    return proof
+
+
+def verify_proof(data_hash, leaf_index, proof, root):
+    """
+    Kiểm tra data hash có thuộc cây Merkle có root đã cho hay không
+    """
+    node = hash_leaf(data_hash)
+    index = leaf_index
+
+    for sibling_hex in proof:
+        sibling = _to_bytes(sibling_hex)
+        if index % 2 == 0:
+            node = hash_node(node, sibling)
+        else:
+            node = hash_node(sibling, node)
+        index //= 2
+
+    return node.hex() == (root[2:] if root.startswith('0x') else root)
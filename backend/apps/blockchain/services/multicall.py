@@ -0,0 +1,190 @@
+import logging
+from django.conf import settings
+from web3 import Web3
+from web3._utils.abi import map_abi_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+
+try:
+    from eth_utils.abi import collapse_if_tuple
+except ImportError:  # eth-utils cũ đi kèm web3 v6
+    from web3._utils.abi import collapse_if_tuple
+
+from .rpc import JsonRpcClient, RPCError
+
+logger = logging.getLogger(__name__)
+
+# Multicall3 (cùng địa chỉ trên hầu hết các mạng EVM), chỉ cần hàm aggregate3
+MULTICALL3_ABI = [
+    {
+        'inputs': [
+            {
+                'components': [
+                    {'internalType': 'address', 'name': 'target', 'type': 'address'},
+                    {'internalType': 'bool', 'name': 'allowFailure', 'type': 'bool'},
+                    {'internalType': 'bytes', 'name': 'callData', 'type': 'bytes'},
+                ],
+                'internalType': 'struct Multicall3.Call3[]',
+                'name': 'calls',
+                'type': 'tuple[]',
+            }
+        ],
+        'name': 'aggregate3',
+        'outputs': [
+            {
+                'components': [
+                    {'internalType': 'bool', 'name': 'success', 'type': 'bool'},
+                    {'internalType': 'bytes', 'name': 'returnData', 'type': 'bytes'},
+                ],
+                'internalType': 'struct Multicall3.Result[]',
+                'name': 'returnData',
+                'type': 'tuple[]',
+            }
+        ],
+        'stateMutability': 'payable',
+        'type': 'function',
+    }
+]
+
+# Selector của Error(string) mà require/revert trả về
+ERROR_SELECTOR = bytes.fromhex('08c379a0')
+
+
+def _bind(call):
+    """
+    Nhận lời gọi dạng contract.functions.f(*args) hoặc cặp (contract.functions.f, args)
+    """
+    if isinstance(call, (tuple, list)):
+        function, args = call
+        return function(*args)
+    return call
+
+
+def _output_types(function):
+    return [collapse_if_tuple(output) for output in function.abi.get('outputs', [])]
+
+
+def _decode_output(web3, function, data):
+    """
+    Giải mã kết quả eth_call giống ContractFunction.call(): một output trả về giá trị,
+    nhiều output trả về list
+    """
+    output_types = _output_types(function)
+    values = web3.codec.decode(output_types, data)
+    values = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, values)
+    if len(output_types) == 1:
+        return values[0]
+    return list(values)
+
+
+def _revert_reason(web3, data):
+    if data[:4] == ERROR_SELECTOR:
+        try:
+            return f"execution reverted: {web3.codec.decode(['string'], data[4:])[0]}"
+        except Exception:
+            pass
+    return 'execution reverted'
+
+
+def _to_bytes(value):
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value or b'')
+
+
+class ContractCaller:
+    """
+    Thực hiện nhiều lời gọi view tới contract trong một round trip
+
+    Mặc định gửi các eth_call trong một JSON-RPC batch. Khi có MULTICALL_CONTRACT_ADDRESS,
+    các lời gọi được gom vào Multicall3.aggregate3 và chỉ tốn một eth_call cho mỗi
+    BLOCKCHAIN_MULTICALL_BATCH_SIZE lời gọi. Kết quả trả về cùng thứ tự với đầu vào,
+    lời gọi lỗi không làm hỏng các lời gọi khác.
+    """
+
+    def __init__(self, web3, rpc=None, multicall_address=None, batch_size=None):
+        self.web3 = web3
+        self.rpc = rpc or JsonRpcClient()
+        self.batch_size = batch_size or getattr(settings, 'BLOCKCHAIN_MULTICALL_BATCH_SIZE', 200)
+
+        if multicall_address is None:
+            multicall_address = getattr(settings, 'MULTICALL_CONTRACT_ADDRESS', None)
+        self.multicall = None
+        if multicall_address:
+            self.multicall = web3.eth.contract(
+                address=Web3.to_checksum_address(multicall_address),
+                abi=MULTICALL3_ABI
+            )
+
+    def call_many(self, calls, block_identifier='latest'):
+        """
+        :param calls: Danh sách contract.functions.f(*args) hoặc cặp (contract.functions.f, args)
+        :param block_identifier: Block để đọc, mặc định 'latest'
+        :return: Danh sách {'success': True, 'result': ...} hoặc {'success': False, 'error': ...}
+                 cùng thứ tự với calls
+        """
+        functions = []
+        results = [None] * len(calls)
+
+        for index, call in enumerate(calls):
+            try:
+                function = _bind(call)
+                functions.append((index, function, function._encode_transaction_data()))
+            except Exception as e:
+                results[index] = {'success': False, 'error': str(e)}
+
+        if isinstance(block_identifier, int):
+            block_identifier = hex(block_identifier)
+
+        if self.multicall is not None:
+            self._call_multicall(functions, results, block_identifier)
+        else:
+            self._call_batch(functions, results, block_identifier)
+
+        return results
+
+    def _call_batch(self, functions, results, block_identifier):
+        try:
+            responses = self.rpc.batch([
+                ('eth_call', [{'to': function.address, 'data': data}, block_identifier])
+                for _, function, data in functions
+            ])
+        except Exception as e:
+            logger.error(f"Error sending eth_call batch: {str(e)}")
+            for index, _, _ in functions:
+                results[index] = {'success': False, 'error': str(e)}
+            return
+
+        for (index, function, _), response in zip(functions, responses):
+            results[index] = self._result(function, response)
+
+    def _call_multicall(self, functions, results, block_identifier):
+        for start in range(0, len(functions), self.batch_size):
+            chunk = functions[start:start + self.batch_size]
+            try:
+                responses = self.multicall.functions.aggregate3([
+                    (function.address, True, data) for _, function, data in chunk
+                ]).call(block_identifier=block_identifier)
+            except Exception as e:
+                logger.error(f"Error calling multicall aggregate3: {str(e)}")
+                for index, _, _ in chunk:
+                    results[index] = {'success': False, 'error': str(e)}
+                continue
+
+            for (index, function, _), (success, return_data) in zip(chunk, responses):
+                if not success:
+                    results[index] = {'success': False, 'error': _revert_reason(self.web3, return_data)}
+                else:
+                    results[index] = self._result(function, return_data)
+
+    def _result(self, function, response):
+        if isinstance(response, RPCError):
+            return {'success': False, 'error': str(response)}
+
+        try:
+            data = _to_bytes(response)
+            if not data and _output_types(function):
+                # Địa chỉ không có contract hoặc hàm không tồn tại
+                return {'success': False, 'error': 'Empty result from contract call'}
+            return {'success': True, 'result': _decode_output(self.web3, function, data)}
+        except Exception as e:
+            return {'success': False, 'error': str(e)}
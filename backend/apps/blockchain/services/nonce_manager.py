@@ -0,0 +1,268 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from web3 import Web3
+
+logger = logging.getLogger(__name__)
+
+# Các thông báo lỗi từ node cho biết nonce đã bị dùng hoặc lệch so với chuỗi
+NONCE_ERROR_MESSAGES = (
+    'nonce too low',
+    'nonce too high',
+    'replacement transaction underpriced',
+    'invalid nonce',
+)
+
+# Nonce vượt quá nonce tiếp theo của node: nonce chưa được dùng
+NONCE_TOO_HIGH_MESSAGES = (
+    'nonce too high',
+)
+
+# Node đã có giao dịch cùng hash (ví dụ gửi lại sau timeout): giao dịch đã được gửi
+ALREADY_KNOWN_MESSAGES = (
+    'already known',
+    'known transaction',
+)
+
+
+def _error_matches(error, messages):
+    message = str(error).lower()
+    return any(text in message for text in messages)
+
+
+def is_nonce_error(error):
+    """
+    Kiểm tra lỗi gửi giao dịch có phải do nonce hay không
+    """
+    return _error_matches(error, NONCE_ERROR_MESSAGES)
+
+
+def is_nonce_too_high(error):
+    """
+    Kiểm tra node có từ chối giao dịch vì nonce cao hơn nonce tiếp theo của tài khoản hay không
+    """
+    return _error_matches(error, NONCE_TOO_HIGH_MESSAGES)
+
+
+def is_already_known(error):
+    """
+    Kiểm tra node có báo giao dịch đã nằm trong mempool hay không
+    """
+    return _error_matches(error, ALREADY_KNOWN_MESSAGES)
+
+
+class NonceManager:
+    """
+    Cấp phát nonce cục bộ cho một tài khoản, an toàn giữa các thread và process
+
+    Bộ đếm dùng chung được lưu trong bảng AccountNonce. Mỗi process khoá bản ghi
+    và giữ riêng một khối nonce liên tiếp trong BLOCKCHAIN_NONCE_LEASE giây, nên phần
+    lớn các lần cấp phát không cần truy vấn database hay node.
+
+    Bộ đếm dùng chung không bao giờ lùi (process khác có thể đang giữ các khối bên dưới).
+    Nonce đã cấp mà không được gửi là khoảng trống làm kẹt các giao dịch sau nó, nên:
+
+    - nonce được trả lại (release) và phần còn lại của khối hết hạn được đưa vào
+      AccountNonce.free_nonces và cấp lại trước nonce mới
+    - khi nonce 'pending' của node đứng yên dưới bộ đếm quá BLOCKCHAIN_NONCE_GAP_TIMEOUT
+      giây (lâu hơn thời hạn khối, nên không process nào còn được dùng nonce đó),
+      nonce này được coi là khoảng trống và đưa vào free_nonces (check_gaps())
+    """
+
+    def __init__(self, web3, address, block_size=None):
+        self.web3 = web3
+        self.address = Web3.to_checksum_address(address)
+        self.block_size = block_size or getattr(settings, 'BLOCKCHAIN_NONCE_BLOCK_SIZE', 10)
+        self.lease = getattr(settings, 'BLOCKCHAIN_NONCE_LEASE', 30)
+        self.gap_timeout = getattr(settings, 'BLOCKCHAIN_NONCE_GAP_TIMEOUT', 120)
+
+        self._lock = threading.Lock()
+        self._next = None
+        self._end = None
+        self._lease_until = None
+        self._released = []
+
+    def allocate(self):
+        """
+        Lấy nonce tiếp theo cho giao dịch mới
+        """
+        with self._lock:
+            if self._lease_until is not None and time.monotonic() >= self._lease_until:
+                self._return_block()
+
+            if self._released:
+                return heapq.heappop(self._released)
+
+            if self._next is None or self._next >= self._end:
+                self._reserve_block()
+                # Nonce lấp khoảng trống lấy từ database được dùng trước
+                if self._released:
+                    return heapq.heappop(self._released)
+
+            nonce = self._next
+            self._next += 1
+            return nonce
+
+    def release(self, nonce):
+        """
+        Trả lại nonce chưa được gửi lên node để dùng cho giao dịch kế tiếp
+        """
+        with self._lock:
+            if nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+
+    def resync(self):
+        """
+        Đồng bộ lại theo nonce 'pending' của node khi node báo lỗi nonce
+
+        Khối nonce cục bộ bị huỷ (phần chưa dùng được trả về free_nonces), bộ đếm dùng
+        chung chỉ tiến tới nonce của node nếu đang thấp hơn.
+        """
+        with self._lock:
+            unused = self._take_local()
+            chain_nonce = self._chain_nonce()
+
+            with transaction.atomic():
+                row = self._locked_row()
+                row.next_nonce = max(row.next_nonce, chain_nonce)
+                row.free_nonces = list(set(row.free_nonces) | set(unused))
+                self._check_gap(row, chain_nonce)
+                row.synced_at = timezone.now()
+                row.save(update_fields=[
+                    'next_nonce', 'free_nonces', 'stalled_nonce', 'stalled_since', 'synced_at', 'updated_at'
+                ])
+
+            logger.warning(f"Resynced nonce for {self.address} at {chain_nonce} (next {row.next_nonce})")
+            return chain_nonce
+
+    def check_gaps(self):
+        """
+        Phát hiện nonce bị bỏ trống đang chặn các giao dịch sau; gọi định kỳ khi tài khoản
+        còn giao dịch chờ receipt (ReceiptTracker)
+
+        :return: Nonce vừa được đưa vào free_nonces hoặc None
+        """
+        with self._lock:
+            chain_nonce = self._chain_nonce()
+            with transaction.atomic():
+                row = self._locked_row()
+                gap = self._check_gap(row, chain_nonce)
+                row.save(update_fields=['free_nonces', 'stalled_nonce', 'stalled_since', 'updated_at'])
+            return gap
+
+    def _reserve_block(self):
+        """
+        Xin một khối nonce mới từ bản ghi dùng chung (gọi khi đang giữ self._lock)
+        """
+        with transaction.atomic():
+            row = self._locked_row()
+
+            chain_nonce = self._chain_nonce()
+            self._check_gap(row, chain_nonce)
+
+            taken = row.free_nonces[:self.block_size]
+            row.free_nonces = row.free_nonces[self.block_size:]
+
+            # Nếu tài khoản được dùng bên ngoài hệ thống, nhảy tới nonce của node
+            start = max(row.next_nonce, chain_nonce)
+            size = self.block_size - len(taken)
+
+            row.next_nonce = start + size
+            row.synced_at = timezone.now()
+            row.save(update_fields=[
+                'next_nonce', 'free_nonces', 'stalled_nonce', 'stalled_since', 'synced_at', 'updated_at'
+            ])
+
+        self._released = list(taken)
+        heapq.heapify(self._released)
+        self._next = start
+        self._end = start + size
+        self._lease_until = time.monotonic() + self.lease
+
+    def _return_block(self):
+        """
+        Trả phần chưa dùng của khối hết hạn về free_nonces (gọi khi đang giữ self._lock)
+        """
+        unused = self._take_local()
+        if not unused:
+            return
+
+        with transaction.atomic():
+            row = self._locked_row()
+            row.free_nonces = sorted(set(row.free_nonces) | set(unused))
+            row.save(update_fields=['free_nonces', 'updated_at'])
+
+    def _take_local(self):
+        unused = list(self._released)
+        if self._next is not None:
+            unused.extend(range(self._next, self._end))
+
+        self._next = None
+        self._end = None
+        self._lease_until = None
+        self._released = []
+        return unused
+
+    def _check_gap(self, row, chain_nonce):
+        """
+        Cập nhật free_nonces và trạng thái kẹt của bản ghi đang khoá theo nonce của node
+
+        :return: Nonce được xác định là khoảng trống hoặc None
+        """
+        # Nonce dưới nonce của node đã được dùng
+        row.free_nonces = sorted(nonce for nonce in set(row.free_nonces) if nonce >= chain_nonce)
+
+        if chain_nonce >= row.next_nonce or chain_nonce in row.free_nonces:
+            row.stalled_nonce = None
+            row.stalled_since = None
+            return None
+
+        now = timezone.now()
+        if row.stalled_nonce != chain_nonce or row.stalled_since is None:
+            row.stalled_nonce = chain_nonce
+            row.stalled_since = now
+            return None
+
+        if now - row.stalled_since < timedelta(seconds=self.gap_timeout):
+            return None
+
+        logger.warning(f"Nonce {chain_nonce} of {self.address} was never broadcast, filling the gap")
+        row.free_nonces.insert(0, chain_nonce)
+        row.stalled_nonce = None
+        row.stalled_since = None
+        return chain_nonce
+
+    def _locked_row(self):
+        from apps.blockchain.models import AccountNonce
+
+        row, _ = AccountNonce.objects.select_for_update().get_or_create(address=self.address)
+        return row
+
+    def _chain_nonce(self):
+        return self.web3.eth.get_transaction_count(self.address, 'pending')
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_nonce_manager(web3, address):
+    """
+    Trả về NonceManager dùng chung trong process cho tài khoản
+    """
+    key = Web3.to_checksum_address(address)
+
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = NonceManager(web3, key)
+            _managers[key] = manager
+        elif manager.web3 is not web3:
+            # Client được tạo lại khi cấu hình node thay đổi: hỏi nonce qua kết nối mới
+            manager.web3 = web3
+        return manager
@@ -0,0 +1,302 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+Operation = namedtuple('Operation', ['record_type', 'handler'])
+
+
+def _register_user(service, user, payload):
+    return service.register_user_on_blockchain(user, created_by=payload.get('created_by', 'system'))
+
+
+def _create_document(service, document, payload):
+    return service.save_document_to_blockchain(document, payload.get('officer_id') or 'system')
+
+
+def _anchor_document(service, document):
+    # Neo theo lô: DocumentContract không lưu riêng từng giấy tờ nên approveDocument/revokeDocument
+    # sẽ revert. Trạng thái mới nằm trong data hash, được neo lại cùng lô tiếp theo
+    anchor = service.anchor_service.enqueue(document)
+    return {'success': True, 'status': 'queued', 'anchorId': anchor.id, 'dataHash': anchor.data_hash}
+
+
+def _approve_document(service, document, payload):
+    if service._batch_anchoring():
+        return _anchor_document(service, document)
+
+    approve_transaction = service.document_contract.functions.approveDocument(
+        document.document_id,
+        payload.get('approver_id') or '',
+        payload.get('comments', '')
+    )
+    result = service._sign_and_send_transaction(approve_transaction)
+    if result.get('success'):
+        document.add_blockchain_record(result.get('txId'))
+    return result
+
+
+def _revoke_document(service, document, payload):
+    if service._batch_anchoring():
+        return _anchor_document(service, document)
+
+    result = service.revoke_document(document.document_id, payload.get('revoker_id') or '', payload.get('reason', ''))
+    if result.get('success'):
+        document.add_blockchain_record(result.get('txId'))
+    return result
+
+
+def _create_approval(service, approval, payload):
+    result = service.create_approval_workflow(
+        payload['approval_id'],
+        payload['approval_type'],
+        payload['target_id'],
+        payload['requested_by'],
+        payload.get('approvers', ''),
+        payload.get('metadata', '{}'),
+        payload.get('priority', 'MEDIUM')
+    )
+    if result.get('success'):
+        approval.add_blockchain_record(result.get('txId'))
+    return result
+
+
+def _approve_approval(service, approval, payload):
+    result = service.approve_workflow(payload['approval_id'], payload.get('approver_id') or '', payload.get('comments', ''))
+    if result.get('success'):
+        approval.add_blockchain_record(result.get('txId'))
+    return result
+
+
+def _reject_approval(service, approval, payload):
+    # AdminContract không có thao tác hủy riêng, quy trình bị hủy được đóng bằng rejectWorkflow
+    result = service.reject_workflow(payload['approval_id'], payload.get('approver_id') or '', payload.get('reason') or '')
+    if result.get('success'):
+        approval.add_blockchain_record(result.get('txId'))
+    return result
+
+
+# Thao tác outbox -> (loại BlockchainRecord, hàm gửi giao dịch)
+OPERATIONS = {
+    'register_user': Operation('user_registration', _register_user),
+    'document_create': Operation('document_creation', _create_document),
+    'document_approve': Operation('document_approval', _approve_document),
+    'document_revoke': Operation('document_revocation', _revoke_document),
+    'approval_create': Operation('approval_creation', _create_approval),
+    'approval_approve': Operation('approval_update', _approve_approval),
+    'approval_reject': Operation('approval_update', _reject_approval),
+    'approval_cancel': Operation('approval_update', _reject_approval),
+}
+
+
+def enqueue(instance, operation, payload=None, created_by=None, network='quorum', data_hash=None):
+    """
+    Ghi một thao tác blockchain vào outbox trong transaction hiện tại
+
+    Gọi ngay sau khi lưu model nghiệp vụ, trong cùng transaction.atomic(), để thay đổi
+    của model và thao tác blockchain cùng được commit hoặc cùng bị rollback.
+
+    :return: BlockchainRecord ở trạng thái 'pending'
+    """
+    from apps.blockchain.models import BlockchainRecord, BlockchainOutbox
+
+    if operation not in OPERATIONS:
+        raise ValueError(f"Unknown outbox operation: {operation}")
+
+    payload = payload or {}
+
+    with transaction.atomic():
+        record = BlockchainRecord.objects.create(
+            network=network,
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=str(instance.pk),
+            record_type=OPERATIONS[operation].record_type,
+            status='pending',
+            data={'operation': operation, **payload},
+            created_by=created_by,
+            verification_hash=data_hash
+        )
+        BlockchainOutbox.objects.create(record=record, operation=operation, payload=payload)
+
+    return record
+
+
+def has_pending(instance, operation):
+    """
+    Kiểm tra đối tượng còn thao tác chưa xử lý trong outbox hay không
+    """
+    from apps.blockchain.models import BlockchainOutbox
+
+    return BlockchainOutbox.objects.filter(
+        operation=operation,
+        processed_at__isnull=True,
+        record__content_type=ContentType.objects.get_for_model(instance),
+        record__object_id=str(instance.pk)
+    ).exists()
+
+
+class OutboxDispatcher:
+    """
+    Lấy các thao tác đang chờ trong outbox và gửi lên blockchain bằng nhiều worker
+
+    Các dòng được nhận bằng SELECT ... FOR UPDATE SKIP LOCKED nên nhiều dispatcher có
+    thể chạy song song. Thao tác của cùng một đối tượng luôn được gửi theo thứ tự ghi
+    vào outbox. Lỗi được thử lại với backoff tăng dần theo BlockchainRecord.retry_count
+    cho đến BLOCKCHAIN_OUTBOX_MAX_RETRIES.
+
+    Worker không chờ receipt: giao dịch được ghi ở trạng thái 'submitted' và
+    ReceiptTracker (lệnh track_receipts) chuyển sang 'confirmed'/'failed'. Với
+    BLOCKCHAIN_ANCHOR_MODE = 'batch', bản ghi tạo, duyệt và thu hồi giấy tờ giữ trạng
+    thái 'pending' cho đến khi lô neo chứa giấy tờ được gửi.
+    """
+
+    def __init__(self, workers=None, blockchain_service_factory=None):
+        self.workers = workers or getattr(settings, 'BLOCKCHAIN_OUTBOX_WORKERS', 4)
+        self.max_retries = getattr(settings, 'BLOCKCHAIN_OUTBOX_MAX_RETRIES', 5)
+        self.retry_backoff = getattr(settings, 'BLOCKCHAIN_OUTBOX_RETRY_BACKOFF', 5)
+        self.lock_timeout = getattr(settings, 'BLOCKCHAIN_OUTBOX_LOCK_TIMEOUT', 300)
+
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='blockchain-outbox')
+
+        self._blockchain_service_factory = blockchain_service_factory
+        self._local = threading.local()
+
+    @property
+    def blockchain_service(self):
+        # Mỗi worker thread giữ một BlockchainService, Web3 và HTTP session dùng chung trong process
+        if not hasattr(self._local, 'blockchain_service'):
+            if self._blockchain_service_factory:
+                self._local.blockchain_service = self._blockchain_service_factory()
+            else:
+                from .blockchain_service import BlockchainService
+                self._local.blockchain_service = BlockchainService(wait_for_receipt=False)
+        return self._local.blockchain_service
+
+    def claim(self, limit):
+        """
+        Nhận tối đa limit dòng outbox đến hạn xử lý cho dispatcher này
+        """
+        from apps.blockchain.models import BlockchainOutbox
+
+        now = timezone.now()
+
+        # Dòng có thao tác trước đó của cùng đối tượng chưa xử lý xong phải chờ
+        earlier = BlockchainOutbox.objects.filter(
+            record__content_type=OuterRef('record__content_type'),
+            record__object_id=OuterRef('record__object_id'),
+            processed_at__isnull=True,
+            id__lt=OuterRef('id')
+        )
+
+        with transaction.atomic():
+            ids = list(
+                BlockchainOutbox.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(processed_at__isnull=True, available_at__lte=now)
+                .filter(Q(locked_at__isnull=True) | Q(locked_at__lt=now - timedelta(seconds=self.lock_timeout)))
+                .filter(~Exists(earlier))
+                .order_by('available_at', 'id')
+                .values_list('id', flat=True)[:limit]
+            )
+
+            if ids:
+                BlockchainOutbox.objects.filter(id__in=ids).update(locked_by=self.worker_id, locked_at=now)
+
+        return ids
+
+    def run_once(self):
+        """
+        Nhận một lượt các dòng đến hạn và xử lý song song
+
+        :return: Số dòng đã xử lý
+        """
+        ids = self.claim(self.workers * 2)
+        list(self.executor.map(self._process_in_thread, ids))
+        return len(ids)
+
+    def run_forever(self, interval=1.0, stop_event=None):
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            if not self.run_once():
+                stop_event.wait(interval)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+    def _process_in_thread(self, outbox_id):
+        close_old_connections()
+        try:
+            self.process(outbox_id)
+        except Exception as e:
+            logger.exception(f"Error processing outbox entry {outbox_id}: {str(e)}")
+        finally:
+            connections.close_all()
+
+    def process(self, outbox_id):
+        """
+        Gửi một thao tác trong outbox và cập nhật BlockchainRecord theo kết quả
+        """
+        from apps.blockchain.models import BlockchainOutbox
+
+        outbox = BlockchainOutbox.objects.select_related('record', 'record__content_type').get(id=outbox_id)
+        record = outbox.record
+
+        instance = record.content_object
+        if instance is None:
+            result = {'success': False, 'error': f"{record.content_type.model} {record.object_id} does not exist"}
+            # Đối tượng đã bị xóa, không thử lại
+            record.retry_count = self.max_retries
+        else:
+            try:
+                result = OPERATIONS[outbox.operation].handler(self.blockchain_service, instance, outbox.payload)
+            except Exception as e:
+                logger.exception(f"Error running outbox operation {outbox.operation}: {str(e)}")
+                result = {'success': False, 'error': str(e)}
+
+        now = timezone.now()
+
+        if result.get('success') and result.get('status') == 'queued':
+            # Neo theo lô: chưa có giao dịch, bản ghi chờ đến khi DocumentAnchorService gửi lô
+            record.error_message = None
+            record.metadata = {**record.metadata, 'anchor_id': result.get('anchorId')}
+            outbox.processed_at = now
+        elif result.get('success'):
+            record.status = 'confirmed' if result.get('status') == 'confirmed' else 'submitted'
+            record.transaction_id = result.get('txId')
+            record.transaction_hash = result.get('txId')
+            record.block_number = result.get('blockNumber')
+            record.error_message = None
+            record.metadata = {**record.metadata, 'nonce': result.get('nonce'), 'from': result.get('from')}
+            if record.status == 'confirmed':
+                record.confirmed_at = now
+            outbox.processed_at = now
+        else:
+            record.retry_count += 1
+            record.error_message = result.get('error')
+            if record.retry_count >= self.max_retries:
+                record.status = 'failed'
+                outbox.processed_at = now
+                logger.error(f"Outbox operation {outbox.operation} for {record.object_id} failed permanently: {record.error_message}")
+            else:
+                outbox.available_at = now + timedelta(seconds=self.retry_backoff * 2 ** (record.retry_count - 1))
+                logger.warning(f"Outbox operation {outbox.operation} for {record.object_id} failed, retry {record.retry_count}: {record.error_message}")
+
+        outbox.locked_by = None
+        outbox.locked_at = None
+
+        with transaction.atomic():
+            record.save()
+            outbox.save(update_fields=['available_at', 'locked_by', 'locked_at', 'processed_at', 'updated_at'])
+
+        return result
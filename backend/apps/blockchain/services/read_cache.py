@@ -0,0 +1,365 @@
+import copy
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from web3 import Web3
+
+from .circuit_breaker import CircuitOpenError
+from .client import CONTRACTS, get_client
+from .endpoint_pool import min_block
+from .rpc import JsonRpcClient, to_int
+
+logger = logging.getLogger(__name__)
+
+# Tag đặc biệt: mọi event của contract (WILDCARD) và toàn bộ cache (EPOCH, tăng khi có reorg)
+WILDCARD = '*'
+EPOCH = ('*', '*')
+
+_lock = threading.Lock()
+_read_cache = None
+
+
+class ReadCache:
+    """
+    Cache kết quả các hàm view của contract, khóa theo (contract, hàm, tham số)
+
+    Gồm hai tầng: LRU trong process (giới hạn BLOCKCHAIN_READ_CACHE_SIZE mục, phục vụ
+    không cần hỏi lại tầng chung trong BLOCKCHAIN_READ_CACHE_LOCAL_TTL giây) và
+    Django cache dùng chung giữa các process (Redis, BLOCKCHAIN_READ_CACHE_ALIAS).
+
+    Mỗi mục gắn với thế hệ (generation) của các id mà nó phụ thuộc và block đã đọc.
+    ReadCacheInvalidator đọc event log của các contract và tăng thế hệ của id
+    được nhắc tới trong event, nên mục cũ không còn được dùng sau khi có block mới
+    thay đổi id đó. Riêng khi circuit breaker của node đang mở, mục cũ (còn trong TTL)
+    được trả về thay vì lỗi.
+    """
+
+    def __init__(self, max_size=None, ttl=None, local_ttl=None, cache_alias=None):
+        self.enabled = getattr(settings, 'BLOCKCHAIN_READ_CACHE_ENABLED', True)
+        self.max_size = max_size or getattr(settings, 'BLOCKCHAIN_READ_CACHE_SIZE', 10000)
+        self.ttl = ttl or getattr(settings, 'BLOCKCHAIN_READ_CACHE_TTL', 300)
+        self.local_ttl = local_ttl if local_ttl is not None else getattr(settings, 'BLOCKCHAIN_READ_CACHE_LOCAL_TTL', 2)
+        self.prefix = getattr(settings, 'BLOCKCHAIN_READ_CACHE_PREFIX', 'bcread')
+        self.cache = caches[cache_alias or getattr(settings, 'BLOCKCHAIN_READ_CACHE_ALIAS', 'default')]
+
+        self._local = OrderedDict()
+        self._local_lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'stale_hits': 0}
+
+    def call(self, contract_name, function, args=(), ids=None):
+        """
+        Gọi hàm view của contract qua cache
+
+        :param contract_name: Tên contract trong CONTRACTS (document_contract, ...)
+        :param function: contract.functions.<tên hàm>
+        :param args: Tham số của hàm
+        :param ids: Các id mà kết quả phụ thuộc; None nghĩa là mọi event của contract
+        :return: Kết quả giống function(*args).call()
+        """
+        args = tuple(args)
+        if not self.enabled:
+            return function(*args).call()
+
+        key = self._key(contract_name, function, args)
+        tags = [(contract_name, str(value)) for value in ids] if ids is not None else [(contract_name, WILDCARD)]
+        tags.append(EPOCH)
+
+        value = self._get_local(key)
+        if value is not None:
+            self.stats['local_hits'] += 1
+            return copy.deepcopy(value[0])
+
+        # Thế hệ được đọc trước khi gọi node: event đến sau lần đọc này luôn làm mục mới bị bỏ
+        generation_keys = [self._generation_key(tag) for tag in tags]
+        head_key = f'{self.prefix}:head'
+        try:
+            shared = self.cache.get_many([key, head_key] + generation_keys)
+        except Exception as e:
+            logger.warning(f"Read cache unavailable: {str(e)}")
+            return function(*args).call()
+
+        generations = tuple(shared.get(generation_key, 0) for generation_key in generation_keys)
+        entry = shared.get(key)
+        if entry is not None and entry['generations'] == generations:
+            self.stats['shared_hits'] += 1
+            self._set_local(key, entry['value'], entry['block'])
+            return copy.deepcopy(entry['value'])
+
+        self.stats['misses'] += 1
+        try:
+            # Chỉ đọc từ node đã có block invalidator xử lý gần nhất: node chậm hơn trả về
+            # kết quả cũ, sẽ được lưu dưới thế hệ mới
+            with min_block(shared.get(head_key)):
+                result = function(*args).call()
+        except CircuitOpenError:
+            return self._stale(entry)
+
+        entry = {'value': result, 'generations': generations, 'block': shared.get(head_key)}
+        try:
+            self.cache.set(key, entry, self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not store read cache entry: {str(e)}")
+        self._set_local(key, result, entry['block'])
+
+        return copy.deepcopy(result)
+
+    async def acall(self, contract_name, function, args=(), ids=None):
+        """
+        Phiên bản async của call cho hàm của contract AsyncWeb3
+
+        Dùng chung khóa và thế hệ với call, nên mục được ghi bởi lời gọi đồng bộ
+        cũng được dùng cho lời gọi async và ngược lại.
+        """
+        args = tuple(args)
+        if not self.enabled:
+            return await function(*args).call()
+
+        key = self._key(contract_name, function, args)
+        tags = [(contract_name, str(value)) for value in ids] if ids is not None else [(contract_name, WILDCARD)]
+        tags.append(EPOCH)
+
+        value = self._get_local(key)
+        if value is not None:
+            self.stats['local_hits'] += 1
+            return copy.deepcopy(value[0])
+
+        generation_keys = [self._generation_key(tag) for tag in tags]
+        head_key = f'{self.prefix}:head'
+        try:
+            shared = await self.cache.aget_many([key, head_key] + generation_keys)
+        except Exception as e:
+            logger.warning(f"Read cache unavailable: {str(e)}")
+            return await function(*args).call()
+
+        generations = tuple(shared.get(generation_key, 0) for generation_key in generation_keys)
+        entry = shared.get(key)
+        if entry is not None and entry['generations'] == generations:
+            self.stats['shared_hits'] += 1
+            self._set_local(key, entry['value'], entry['block'])
+            return copy.deepcopy(entry['value'])
+
+        self.stats['misses'] += 1
+        try:
+            # Chỉ đọc từ node đã có block invalidator xử lý gần nhất: node chậm hơn trả về
+            # kết quả cũ, sẽ được lưu dưới thế hệ mới
+            with min_block(shared.get(head_key)):
+                result = await function(*args).call()
+        except CircuitOpenError:
+            return self._stale(entry)
+
+        entry = {'value': result, 'generations': generations, 'block': shared.get(head_key)}
+        try:
+            await self.cache.aset(key, entry, self.ttl)
+        except Exception as e:
+            logger.warning(f"Could not store read cache entry: {str(e)}")
+        self._set_local(key, result, entry['block'])
+
+        return copy.deepcopy(result)
+
+    def invalidate(self, tags, block_number=None):
+        """
+        Tăng thế hệ của các tag (contract, id) để bỏ các mục phụ thuộc vào chúng
+
+        :param block_number: Block mới nhất đã xử lý, được ghi lại cùng các mục đọc sau đó
+        """
+        for tag in set(tags):
+            generation_key = self._generation_key(tag)
+            try:
+                self.cache.incr(generation_key)
+            except ValueError:
+                # Khóa chưa tồn tại (hoặc đã hết hạn): đặt thế hệ khác 0
+                self.cache.set(generation_key, int(time.time() * 1000), None)
+
+        if block_number is not None:
+            self.cache.set(f'{self.prefix}:head', block_number, None)
+
+        # Tầng LRU chỉ giữ mục trong thời gian ngắn, xóa luôn cho process hiện tại
+        if tags:
+            self.clear_local()
+
+    def invalidate_all(self, block_number=None):
+        self.invalidate([EPOCH], block_number)
+
+    def clear_local(self):
+        with self._local_lock:
+            self._local.clear()
+
+    def _stale(self, entry):
+        """
+        Node không khả dụng (circuit breaker mở): trả về mục cũ trong tầng chung nếu còn,
+        ngược lại ném lại CircuitOpenError
+        """
+        if entry is None:
+            raise
+        self.stats['stale_hits'] += 1
+        logger.info(f"Serving stale read cache entry from block {entry['block']}")
+        return copy.deepcopy(entry['value'])
+
+    def _key(self, contract_name, function, args):
+        raw = repr((function.address, function.fn_name, args)).encode()
+        return f'{self.prefix}:{contract_name}:{function.fn_name}:{hashlib.sha1(raw).hexdigest()}'
+
+    def _generation_key(self, tag):
+        return f'{self.prefix}:gen:{tag[0]}:{tag[1]}'
+
+    def _get_local(self, key):
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            if entry[2] < time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return entry
+
+    def _set_local(self, key, value, block):
+        if not self.local_ttl:
+            return
+        with self._local_lock:
+            self._local[key] = (value, block, time.monotonic() + self.local_ttl)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_size:
+                self._local.popitem(last=False)
+
+
+def get_read_cache():
+    """
+    Lấy ReadCache dùng chung của process
+    """
+    global _read_cache
+
+    if _read_cache is None:
+        with _lock:
+            if _read_cache is None:
+                _read_cache = ReadCache()
+    return _read_cache
+
+
+def cached_call(contract_name, function, args=(), ids=None):
+    """
+    Gọi hàm view của contract qua ReadCache dùng chung, xem ReadCache.call
+    """
+    return get_read_cache().call(contract_name, function, args, ids)
+
+
+async def acached_call(contract_name, function, args=(), ids=None):
+    """
+    Gọi hàm view của contract AsyncWeb3 qua ReadCache dùng chung, xem ReadCache.acall
+    """
+    return await get_read_cache().acall(contract_name, function, args, ids)
+
+
+class ReadCacheInvalidator:
+    """
+    Đọc event log của các contract bằng eth_getLogs và bỏ các mục cache liên quan
+
+    Mỗi event tăng thế hệ của contract (WILDCARD) và của các id trong tham số event
+    (tham số kiểu string có tên kết thúc bằng Id hoặc By, trừ txId). Khi phát hiện reorg hoặc
+    khi chạy lần đầu, toàn bộ cache được bỏ.
+    """
+
+    name = 'read_cache'
+
+    def __init__(self, rpc=None, read_cache=None):
+        self.rpc = rpc or JsonRpcClient()
+        self.read_cache = read_cache or get_read_cache()
+        self.block_range = getattr(settings, 'BLOCKCHAIN_INDEXER_BLOCK_RANGE', 2000)
+
+        client = get_client()
+        self.addresses = {}
+        self.events = {}
+        for contract_name in CONTRACTS:
+            address = client.addresses[contract_name]
+            if not address:
+                continue
+            self.addresses[address.lower()] = contract_name
+
+            for entry in client.abis[contract_name]:
+                if entry.get('type') != 'event':
+                    continue
+                types = [item['type'] for item in entry['inputs'] if not item.get('indexed')]
+                id_positions = [
+                    position for position, item in enumerate(item for item in entry['inputs'] if not item.get('indexed'))
+                    if item['type'] == 'string' and item['name'] != 'txId' and item['name'].endswith(('Id', 'By'))
+                ]
+                signature = f"{entry['name']}({','.join(item['type'] for item in entry['inputs'])})"
+                self.events['0x' + bytes(Web3.keccak(text=signature)).hex()] = (types, id_positions)
+
+        self.web3 = Web3()
+
+    def tick(self):
+        """
+        Xử lý khoảng block tiếp theo
+
+        :return: dict gồm block cuối đã xử lý, số id bị bỏ khỏi cache và cờ reorg
+        """
+        from apps.blockchain.models import IndexerCheckpoint
+
+        checkpoint, _ = IndexerCheckpoint.objects.get_or_create(name=self.name)
+        # Cả lượt đọc từ cùng một node, xem JsonRpcClient.pinned
+        rpc = self.rpc.pinned()
+
+        calls = [('eth_blockNumber', [])]
+        if checkpoint.last_block_hash:
+            calls.append(('eth_getBlockByNumber', [hex(checkpoint.last_block), False]))
+        results = rpc.batch(calls)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        head = to_int(results[0])
+
+        if not checkpoint.last_block_hash or results[1] is None or results[1]['hash'] != checkpoint.last_block_hash:
+            # Lần chạy đầu hoặc reorg: không biết mục nào còn đúng, bỏ toàn bộ và bắt đầu từ head
+            reorg = bool(checkpoint.last_block_hash)
+            block = rpc.call('eth_getBlockByNumber', [hex(head), False])
+            self.read_cache.invalidate_all(head)
+
+            checkpoint.last_block = head
+            checkpoint.last_block_hash = block['hash']
+            checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+            return {'reorg': reorg, 'last_block': head, 'head': head, 'invalidated': 0}
+
+        from_block = checkpoint.last_block + 1
+        if from_block > head:
+            return {'reorg': False, 'last_block': checkpoint.last_block, 'head': head, 'invalidated': 0}
+
+        to_block = min(head, from_block + self.block_range - 1)
+        logs = rpc.call('eth_getLogs', [{
+            'address': list(self.addresses),
+            'fromBlock': hex(from_block),
+            'toBlock': hex(to_block),
+        }]) if self.addresses else []
+        block = rpc.call('eth_getBlockByNumber', [hex(to_block), False])
+
+        tags = set()
+        for log in logs:
+            contract_name = self.addresses.get(log['address'].lower())
+            if contract_name is None or not log.get('topics'):
+                continue
+            tags.add((contract_name, WILDCARD))
+
+            event = self.events.get(log['topics'][0])
+            if event is None:
+                continue
+            types, id_positions = event
+            try:
+                values = self.web3.codec.decode(types, bytes.fromhex(log['data'][2:]))
+            except Exception as e:
+                logger.warning(f"Could not decode log {log['transactionHash']}:{log['logIndex']}: {str(e)}")
+                continue
+            for position in id_positions:
+                tags.add((contract_name, values[position]))
+
+        # Bỏ cache trước khi lưu checkpoint: nếu lỗi giữa chừng, lượt sau xử lý lại khoảng block này
+        self.read_cache.invalidate(tags, to_block)
+
+        checkpoint.last_block = to_block
+        checkpoint.last_block_hash = block['hash']
+        checkpoint.save(update_fields=['last_block', 'last_block_hash', 'updated_at'])
+
+        return {'reorg': False, 'last_block': to_block, 'head': head, 'invalidated': len(tags)}
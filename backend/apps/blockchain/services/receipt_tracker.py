@@ -0,0 +1,225 @@
+import logging
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from .rpc import JsonRpcClient, RPCError, to_int
+
+logger = logging.getLogger(__name__)
+
+
+class ReceiptTracker:
+    """
+    Theo dõi receipt của các giao dịch đã gửi và chuyển trạng thái BlockchainRecord
+
+    Mỗi lượt gửi một JSON-RPC batch gồm eth_blockNumber và eth_getTransactionReceipt
+    cho toàn bộ giao dịch đang chờ. Giao dịch được xác nhận khi đủ
+    BLOCKCHAIN_CONFIRMATION_DEPTH block, bị đánh dấu thất bại khi revert hoặc khi
+    không có receipt sau BLOCKCHAIN_RECEIPT_TIMEOUT giây. Kết quả được cập nhật
+    hàng loạt vào BlockchainRecord, DocumentAnchorBatch và Document.
+    """
+
+    def __init__(self, rpc=None, confirmation_depth=None, receipt_timeout=None, batch_size=None):
+        self.rpc = rpc or JsonRpcClient()
+        self.confirmation_depth = confirmation_depth or getattr(settings, 'BLOCKCHAIN_CONFIRMATION_DEPTH', 1)
+        self.receipt_timeout = receipt_timeout or getattr(settings, 'BLOCKCHAIN_RECEIPT_TIMEOUT', 600)
+        self.batch_size = batch_size or getattr(settings, 'BLOCKCHAIN_RECEIPT_BATCH_SIZE', 500)
+
+    def tick(self):
+        """
+        Kiểm tra receipt của một lượt giao dịch đang chờ
+
+        :return: dict số giao dịch đã kiểm tra/xác nhận/thất bại
+        """
+        from apps.blockchain.models import BlockchainRecord, DocumentAnchorBatch
+
+        records = list(
+            BlockchainRecord.objects.select_related('content_type')
+            .filter(status='submitted', network='quorum', transaction_hash__isnull=False)
+            .order_by('updated_at')[:self.batch_size]
+        )
+        batches = list(
+            DocumentAnchorBatch.objects.filter(status='submitted', transaction_hash__isnull=False)
+            .order_by('submitted_at')[:self.batch_size]
+        )
+
+        stats = {'checked': len(records) + len(batches), 'confirmed': 0, 'failed': 0}
+        if not records and not batches:
+            return stats
+
+        calls = [('eth_blockNumber', [])]
+        calls += [('eth_getTransactionReceipt', [record.transaction_hash]) for record in records]
+        calls += [('eth_getTransactionReceipt', [batch.transaction_hash]) for batch in batches]
+
+        results = self.rpc.batch(calls)
+        if isinstance(results[0], RPCError):
+            raise results[0]
+
+        head = to_int(results[0])
+        record_receipts = results[1:len(records) + 1]
+        batch_receipts = results[len(records) + 1:]
+
+        now = timezone.now()
+        deadline = now - timedelta(seconds=self.receipt_timeout)
+
+        done_records = []
+        stale_accounts = set()
+        waiting_accounts = set()
+
+        for record, receipt in zip(records, record_receipts):
+            state = self._receipt_state(receipt, head, record.updated_at < deadline)
+            if state is None:
+                if receipt is None and record.metadata.get('from'):
+                    waiting_accounts.add(record.metadata['from'])
+                continue
+
+            status, block_number, error = state
+            record.status = status
+            record.block_number = block_number
+            record.error_message = error
+            record.updated_at = now
+            if status == 'confirmed':
+                record.confirmed_at = now
+            elif receipt is None and record.metadata.get('from'):
+                # Giao dịch bị node bỏ: nonce cục bộ có thể đã lệch
+                stale_accounts.add(record.metadata['from'])
+            done_records.append(record)
+
+        done_batches = []
+        for batch, receipt in zip(batches, batch_receipts):
+            state = self._receipt_state(receipt, head, batch.submitted_at and batch.submitted_at < deadline)
+            if state is None:
+                continue
+
+            batch.status, batch.block_number, batch.error_message = state
+            batch.updated_at = now
+            done_batches.append(batch)
+
+        with transaction.atomic():
+            BlockchainRecord.objects.bulk_update(
+                done_records, ['status', 'block_number', 'error_message', 'confirmed_at', 'updated_at']
+            )
+            DocumentAnchorBatch.objects.bulk_update(
+                done_batches, ['status', 'block_number', 'error_message', 'updated_at']
+            )
+            self._update_documents(done_records, now)
+
+        for address in stale_accounts:
+            self._resync_nonce(address)
+
+        # Giao dịch chưa có receipt có thể đang kẹt sau một nonce không được gửi
+        for address in waiting_accounts - stale_accounts:
+            self._check_nonce_gaps(address)
+
+        for item in done_records + done_batches:
+            stats[item.status] += 1
+
+        if done_records or done_batches:
+            logger.info(f"Receipt tracker at block {head}: {stats}")
+
+        return stats
+
+    def _receipt_state(self, receipt, head, timed_out):
+        """
+        :return: (status, block_number, error) hoặc None nếu giao dịch còn phải chờ
+        """
+        if isinstance(receipt, RPCError):
+            logger.warning(f"Error getting receipt: {str(receipt)}")
+            return None
+
+        if receipt is None:
+            if timed_out:
+                return 'failed', None, 'Transaction receipt not found before timeout'
+            return None
+
+        block_number = to_int(receipt.get('blockNumber'))
+        if to_int(receipt.get('status')) == 0:
+            return 'failed', block_number, 'Transaction reverted'
+
+        if head - block_number + 1 < self.confirmation_depth:
+            return None
+
+        return 'confirmed', block_number, None
+
+    def _records_for_model(self, records, model):
+        content_type = ContentType.objects.get_for_model(model)
+        return [record for record in records if record.content_type_id == content_type.id]
+
+    def _update_documents(self, records, now):
+        from apps.administrative.models import Document
+
+        documents = []
+        state_changes = []
+        for record in self._records_for_model(records, Document):
+            # Chỉ giao dịch tạo giấy tờ quyết định giấy tờ đã được lưu trên blockchain hay chưa
+            if record.record_type != 'document_creation':
+                state_changes.append(record)
+                continue
+            documents.append(Document(
+                id=uuid.UUID(record.object_id),
+                blockchain_status='STORED' if record.status == 'confirmed' else 'ERROR',
+                blockchain_tx_id=record.transaction_hash,
+                blockchain_timestamp=now
+            ))
+
+        Document.objects.bulk_update(documents, ['blockchain_status', 'blockchain_tx_id', 'blockchain_timestamp'])
+        self._update_state_changes(state_changes, now)
+
+    def _update_state_changes(self, records, now):
+        """
+        Duyệt/thu hồi giấy tờ: giữ nguyên blockchain_status của giấy tờ đã lưu
+
+        Giao dịch thất bại được ghi log, blockchain_tx_id của giấy tờ (đã trỏ tới giao dịch
+        này từ lúc gửi) được đưa về giao dịch đã xác nhận gần nhất.
+        """
+        from apps.administrative.models import Document
+        from apps.blockchain.models import BlockchainRecord
+
+        for record in records:
+            if record.status == 'confirmed':
+                Document.objects.filter(id=record.object_id).update(
+                    blockchain_tx_id=record.transaction_hash,
+                    blockchain_timestamp=now
+                )
+                continue
+
+            logger.error(
+                f"{record.get_record_type_display()} of document {record.object_id} failed on chain "
+                f"(tx {record.transaction_hash}): {record.error_message}"
+            )
+            last_confirmed = (
+                BlockchainRecord.objects.filter(
+                    content_type_id=record.content_type_id,
+                    object_id=record.object_id,
+                    status='confirmed',
+                    transaction_hash__isnull=False
+                )
+                .order_by('-confirmed_at')
+                .values_list('transaction_hash', flat=True)
+                .first()
+            )
+            if last_confirmed:
+                Document.objects.filter(id=record.object_id, blockchain_tx_id=record.transaction_hash).update(
+                    blockchain_tx_id=last_confirmed
+                )
+
+    def _check_nonce_gaps(self, address):
+        from .client import get_client
+        from .nonce_manager import get_nonce_manager
+
+        try:
+            get_nonce_manager(get_client().web3, address).check_gaps()
+        except Exception as e:
+            logger.error(f"Error checking nonce gaps for {address}: {str(e)}")
+
+    def _resync_nonce(self, address):
+        from .client import get_client
+        from .nonce_manager import get_nonce_manager
+
+        try:
+            get_nonce_manager(get_client().web3, address).resync()
+        except Exception as e:
+            logger.error(f"Error resyncing nonce for {address}: {str(e)}")
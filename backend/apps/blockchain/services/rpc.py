@@ -0,0 +1,130 @@
+import itertools
+import logging
+from django.conf import settings
+
+from .circuit_breaker import get_breaker
+from .deadline import timeout_for
+
+logger = logging.getLogger(__name__)
+
+
+class RPCError(Exception):
+    """
+    Lỗi trả về từ node cho một lời gọi JSON-RPC
+    """
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+class JsonRpcClient:
+    """
+    Client JSON-RPC tối giản hỗ trợ gửi nhiều lời gọi trong một HTTP request (batch)
+
+    web3.py gửi mỗi lời gọi thành một request riêng, nên các thao tác đọc hàng loạt
+    (receipt, block, log) dùng client này để gom thành một round trip.
+    """
+
+    def __init__(self, endpoint_uri=None, timeout=None, session=None):
+        """
+        :param endpoint_uri: Node cố định; mặc định gửi qua EndpointPool của client chung
+                             (lời gọi đọc chia cho các node đọc, lời gọi phụ thuộc nonce
+                             tới sequencer)
+        """
+        self.endpoint_uri = endpoint_uri
+        self.timeout = timeout or getattr(settings, 'BLOCKCHAIN_RPC_TIMEOUT', 10)
+        self.batch_limit = getattr(settings, 'BLOCKCHAIN_RPC_BATCH_LIMIT', 1000)
+
+        self.pool = None
+        if endpoint_uri is None or session is None:
+            # Dùng lại session keep-alive và pool node của client chung trong process
+            from .client import get_client
+            client = get_client()
+            session = session or client.session
+            if endpoint_uri is None:
+                self.pool = client.pool
+        self.session = session
+        self._ids = itertools.count(1)
+
+    def pinned(self):
+        """
+        Client gửi mọi lời gọi tới cùng một node, chọn một lần từ EndpointPool
+
+        Các node đọc có thể chậm hơn nhau vài block: đọc eth_blockNumber ở node này rồi
+        eth_getLogs ở node khác có thể bỏ sót log. Client đã cố định node thì trả về chính nó.
+        """
+        if self.pool is None:
+            return self
+        return JsonRpcClient(self.pool.pin(), timeout=self.timeout, session=self.session)
+
+    def call(self, method, params=None):
+        """
+        Gửi một lời gọi JSON-RPC, ném RPCError nếu node trả về lỗi
+        """
+        result = self.batch([(method, params or [])])[0]
+        if isinstance(result, RPCError):
+            raise result
+        return result
+
+    def batch(self, calls):
+        """
+        Gửi danh sách lời gọi (method, params) theo batch
+
+        :return: Danh sách kết quả cùng thứ tự với calls, lời gọi lỗi được trả về
+                 dưới dạng RPCError thay vì ném ra
+        """
+        results = []
+        for start in range(0, len(calls), self.batch_limit):
+            results.extend(self._send_batch(calls[start:start + self.batch_limit]))
+        return results
+
+    def _send_batch(self, calls):
+        if not calls:
+            return []
+
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': list(params or [])}
+            for request_id, (method, params) in zip(ids, calls)
+        ]
+
+        def send(endpoint_uri, timeout):
+            response = self.session.post(endpoint_uri, json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response
+
+        if self.pool is not None:
+            response = self.pool.request(calls, send, self.timeout)
+        else:
+            timeout = timeout_for(self.timeout)
+            with get_breaker(self.endpoint_uri).guard(count_timeouts=timeout >= self.timeout):
+                response = send(self.endpoint_uri, timeout)
+        data = response.json()
+
+        # Node không hỗ trợ batch hoặc từ chối cả request
+        if isinstance(data, dict):
+            error = data.get('error') or {}
+            raise RPCError(error.get('message', 'Invalid JSON-RPC batch response'), error.get('code'))
+
+        by_id = {item.get('id'): item for item in data}
+
+        results = []
+        for request_id in ids:
+            item = by_id.get(request_id)
+            if item is None:
+                results.append(RPCError('Missing JSON-RPC response'))
+            elif item.get('error'):
+                results.append(RPCError(item['error'].get('message'), item['error'].get('code')))
+            else:
+                results.append(item.get('result'))
+        return results
+
+
+def to_int(value):
+    """
+    Chuyển số dạng hex quantity của JSON-RPC sang int
+    """
+    if value is None or isinstance(value, int):
+        return value
+    return int(value, 16)
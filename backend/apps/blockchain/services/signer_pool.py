@@ -0,0 +1,225 @@
+import hashlib
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from eth_account import Account
+
+from .metrics import REGISTRY
+from .nonce_manager import get_nonce_manager
+
+logger = logging.getLogger(__name__)
+
+LANE_LABELS = ('lane', 'address')
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    'blockchain_signer_queue_depth', 'Số giao dịch đang chờ đến lượt gửi trên lane', LANE_LABELS
+)
+IN_FLIGHT = REGISTRY.gauge(
+    'blockchain_signer_in_flight', 'Số giao dịch đang được gửi trên lane', LANE_LABELS
+)
+QUEUE_WAIT = REGISTRY.histogram(
+    'blockchain_signer_queue_wait_seconds', 'Thời gian chờ đến lượt gửi trên lane', LANE_LABELS
+)
+LATENCY = REGISTRY.histogram(
+    'blockchain_signer_latency_seconds', 'Thời gian ký và gửi giao dịch (kể cả chờ receipt nếu có)', LANE_LABELS
+)
+TRANSACTIONS = REGISTRY.counter(
+    'blockchain_signer_transactions_total', 'Số giao dịch đã gửi theo kết quả', LANE_LABELS + ('status',)
+)
+
+_lock = threading.Lock()
+_pool = None
+
+
+class SignerLane:
+    """
+    Một tài khoản ký giao dịch với dãy nonce riêng và giới hạn số giao dịch gửi đồng thời
+    """
+
+    def __init__(self, index, address, private_key=None, max_in_flight=None):
+        self.index = index
+        self.address = address
+        self.private_key = private_key
+        self.max_in_flight = max_in_flight or getattr(settings, 'BLOCKCHAIN_SIGNER_MAX_IN_FLIGHT', 16)
+        self._semaphore = threading.BoundedSemaphore(self.max_in_flight)
+        self.labels = {'lane': str(index), 'address': address}
+
+        self.waiting = 0
+        self.in_flight = 0
+        self._state_lock = threading.Lock()
+        QUEUE_DEPTH.set(0, **self.labels)
+        IN_FLIGHT.set(0, **self.labels)
+
+    def nonce_manager(self, web3):
+        return get_nonce_manager(web3, self.address)
+
+    @contextmanager
+    def acquire(self):
+        """
+        Giữ một chỗ gửi trên lane, chờ nếu lane đã đủ max_in_flight giao dịch
+        """
+        self._track('waiting', 1, QUEUE_DEPTH)
+        started = time.monotonic()
+        self._semaphore.acquire()
+        acquired = time.monotonic()
+        self._track('waiting', -1, QUEUE_DEPTH)
+        QUEUE_WAIT.observe(acquired - started, **self.labels)
+
+        self._track('in_flight', 1, IN_FLIGHT)
+        try:
+            yield self
+        finally:
+            self._track('in_flight', -1, IN_FLIGHT)
+            self._semaphore.release()
+            LATENCY.observe(time.monotonic() - acquired, **self.labels)
+
+    def record(self, result):
+        if not result.get('success'):
+            status = 'error' if result.get('error') else 'failed'
+        else:
+            status = result.get('status', 'confirmed')
+        TRANSACTIONS.inc(status=status, **self.labels)
+
+    def _track(self, attribute, delta, gauge):
+        with self._state_lock:
+            value = getattr(self, attribute) + delta
+            setattr(self, attribute, value)
+        gauge.set(value, **self.labels)
+
+
+class SignerPool:
+    """
+    Nhóm tài khoản ký giao dịch, mỗi tài khoản là một lane có nonce riêng
+
+    Giao dịch có routing key (mã giấy tờ, mã người dùng...) luôn đi cùng một lane,
+    nên thứ tự nonce giữ đúng thứ tự các thao tác trên cùng đối tượng. Giao dịch
+    không có key được gửi qua lane đang ít việc nhất.
+    """
+
+    def __init__(self, accounts, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.lanes = [
+            SignerLane(index, account['address'], account.get('private_key'), account.get('max_in_flight'))
+            for index, account in enumerate(accounts)
+        ]
+
+    def lane_for(self, routing_key=None):
+        if not self.lanes:
+            raise ValueError('No signer account configured')
+
+        if routing_key is None:
+            return min(self.lanes, key=lambda lane: (lane.waiting + lane.in_flight, lane.index))
+
+        digest = hashlib.sha256(str(routing_key).encode('utf-8')).digest()
+        return self.lanes[int.from_bytes(digest[:8], 'big') % len(self.lanes)]
+
+    def stats(self):
+        return [
+            {
+                'lane': lane.index,
+                'address': lane.address,
+                'waiting': lane.waiting,
+                'in_flight': lane.in_flight,
+                'max_in_flight': lane.max_in_flight,
+            }
+            for lane in self.lanes
+        ]
+
+
+def _signer_accounts():
+    """
+    Danh sách tài khoản từ BLOCKCHAIN_SIGNER_ACCOUNTS, mặc định là tài khoản BLOCKCHAIN_DEFAULT_*
+
+    Mỗi phần tử là private key (chuỗi) hoặc dict gồm address, private_key, max_in_flight.
+    """
+    accounts = []
+    for item in getattr(settings, 'BLOCKCHAIN_SIGNER_ACCOUNTS', None) or []:
+        if isinstance(item, str):
+            item = {'private_key': item}
+        item = dict(item)
+        if item.get('private_key') and not item.get('address'):
+            item['address'] = Account.from_key(item['private_key']).address
+        accounts.append(item)
+
+    if not accounts:
+        private_key = getattr(settings, 'BLOCKCHAIN_DEFAULT_PRIVATE_KEY', None)
+        address = getattr(settings, 'BLOCKCHAIN_DEFAULT_ACCOUNT', None)
+        if private_key:
+            address = Account.from_key(private_key).address
+        accounts.append({'address': address, 'private_key': private_key})
+
+    return accounts
+
+
+def _authorized_accounts(accounts):
+    """
+    Bỏ các tài khoản thiếu role BLOCKCHAIN_SIGNER_REQUIRED_ROLES trên DocumentContract
+
+    Giao dịch được chia lane theo mã giấy tờ, nên mọi lane đều phải tạo, gửi duyệt giấy tờ
+    (OFFICER_ROLE) cũng như duyệt, từ chối, thu hồi (OFFICER_ROLE hoặc CHAIRMAN_ROLE; phê duyệt
+    trong AdminContract/UserContract cần CHAIRMAN_ROLE). Lane thiếu role làm các giao dịch đó bị revert. Role được kiểm tra một lần khi tạo pool; khi không kiểm
+    tra được (chưa cấu hình contract, node lỗi) hoặc không tài khoản nào đủ role thì giữ nguyên danh sách.
+    """
+    roles = getattr(settings, 'BLOCKCHAIN_SIGNER_REQUIRED_ROLES', ('OFFICER_ROLE', 'CHAIRMAN_ROLE'))
+    if not roles:
+        return accounts
+
+    from web3 import Web3
+    from .client import get_client
+
+    try:
+        contract = get_client().contracts['document_contract']
+        if contract is None:
+            return accounts
+
+        authorized = []
+        for account in accounts:
+            if not account.get('address'):
+                authorized.append(account)
+                continue
+            missing = [
+                role for role in roles
+                if not contract.functions.hasRole(Web3.keccak(text=role), account['address']).call()
+            ]
+            if missing:
+                logger.error(f"Signer account {account['address']} lacks {', '.join(missing)} on DocumentContract, lane disabled")
+            else:
+                authorized.append(account)
+    except Exception as e:
+        logger.warning(f"Could not check signer account roles: {str(e)}")
+        return accounts
+
+    if not authorized:
+        logger.error(f"No signer account has {', '.join(roles)} on DocumentContract, keeping all accounts")
+        return accounts
+    return authorized
+
+
+def get_signer_pool():
+    """
+    Lấy SignerPool dùng chung của process, tạo lại khi danh sách tài khoản hoặc contract thay đổi
+
+    Role cấp cho tài khoản sau khi pool đã được tạo chỉ có hiệu lực khi process khởi động lại.
+    """
+    global _pool
+
+    fingerprint = repr((
+        getattr(settings, 'BLOCKCHAIN_SIGNER_ACCOUNTS', None),
+        getattr(settings, 'BLOCKCHAIN_DEFAULT_ACCOUNT', None),
+        getattr(settings, 'BLOCKCHAIN_DEFAULT_PRIVATE_KEY', None),
+        getattr(settings, 'BLOCKCHAIN_SIGNER_MAX_IN_FLIGHT', 16),
+        getattr(settings, 'BLOCKCHAIN_SIGNER_REQUIRED_ROLES', ('OFFICER_ROLE', 'CHAIRMAN_ROLE')),
+        getattr(settings, 'DOCUMENT_CONTRACT_ADDRESS', None),
+    ))
+
+    pool = _pool
+    if pool is not None and pool.fingerprint == fingerprint:
+        return pool
+
+    with _lock:
+        if _pool is None or _pool.fingerprint != fingerprint:
+            _pool = SignerPool(_authorized_accounts(_signer_accounts()), fingerprint)
+            logger.info(f"Signer pool configured with {len(_pool.lanes)} account(s)")
+        return _pool
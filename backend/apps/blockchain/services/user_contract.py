@@ -1,8 +1,8 @@
 import logging
 import json
-from django.conf import settings
-from web3 import Web3
 from .blockchain_service import BlockchainService
+from .client import get_client
+from .read_cache import cached_call
 
 logger = logging.getLogger(__name__)
 
@@ -11,22 +11,22 @@ class UserContractService:
     Service for interacting with user smart contract on the blockchain using Web3.py
     """
     
-    def __init__(self):
-        self.blockchain_service = BlockchainService()
-        
-        # Initialize Web3 connection
-        self.web3_provider = getattr(settings, 'WEB3_PROVIDER_URI', 'http://localhost:8545')
-        self.web3 = Web3(Web3.HTTPProvider(self.web3_provider))
-        
-        # Get contract address and ABI
-        self.contract_address = getattr(settings, 'USER_CONTRACT_ADDRESS', None)
-        self.contract = None
-        
-        if self.contract_address:
-            self.contract = self.web3.eth.contract(
-                address=self.contract_address,
-                abi=self.blockchain_service.user_contract_abi
-            )
+    @property
+    def blockchain_service(self):
+        return BlockchainService()
+    
+    @property
+    def web3(self):
+        return get_client().web3
+    
+    @property
+    def contract_address(self):
+        return get_client().addresses['user_contract']
+    
+    @property
+    def contract(self):
+        # Contract dùng chung trong process, được tạo lại khi setting thay đổi
+        return get_client().contracts['user_contract']
     
     def register_user(self, user_data):
         """
@@ -80,7 +80,7 @@ class UserContractService:
                 return {'success': False, 'error': 'User contract is not initialized'}
             
             # Call the contract function
-            user = self.contract.functions.getUser(user_id).call()
+            user = cached_call('user_contract', self.contract.functions.getUser, (user_id,), ids=[user_id])
             
             # Format the response
             formatted_user = {
@@ -176,7 +176,7 @@ class UserContractService:
                 return {'success': False, 'error': 'User contract is not initialized'}
             
             # Call the contract function
-            documents = self.contract.functions.getUserDocuments(user_id).call()
+            documents = cached_call('user_contract', self.contract.functions.getUserDocuments, (user_id,), ids=[user_id])
             
             return {'success': True, 'documents': documents}
             
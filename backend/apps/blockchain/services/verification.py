@@ -0,0 +1,31 @@
+# Định dạng chung của kết quả xác thực giấy tờ (verifyDocument của DocumentContract,
+# bảng ChainDocument của indexer, inclusion proof của lô neo Merkle)
+
+# Các trường của struct Document trong kết quả verifyDocument
+DOCUMENT_FIELDS = (
+    'documentId', 'documentType', 'citizenId', 'issuedBy', 'issueDate', 'validUntil', 'dataHash', 'metadata',
+    'state', 'createdAt', 'updatedAt', 'approvedBy', 'approvedAt', 'revokedBy', 'revokedAt', 'revocationReason',
+)
+
+
+def verification_result(result):
+    """
+    Chuyển kết quả verifyDocument (tuple của contract hoặc indexer.verify_documents) sang dict
+
+    :return: dict verified, exists, isActive, isExpired, dataIntegrity và document; dict
+             (lỗi, kết quả đã chuyển) được trả về nguyên vẹn
+    """
+    if isinstance(result, dict):
+        return result
+
+    verified, exists, is_active, is_expired, data_integrity, document = result
+    if exists and not isinstance(document, dict):
+        document = dict(zip(DOCUMENT_FIELDS, document))
+    return {
+        'verified': verified,
+        'exists': exists,
+        'isActive': is_active,
+        'isExpired': is_expired,
+        'dataIntegrity': data_integrity,
+        'document': document if exists else {},
+    }
@@ -0,0 +1,105 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.administrative.models import Document
+from apps.blockchain.models import DocumentAnchorBatch
+from apps.blockchain.services.anchoring import DocumentAnchorService
+
+BATCH_TX = '0x' + '04' * 32
+
+
+class FakeAnchorBlockchainService:
+    def __init__(self, results):
+        self.results = list(results)
+        self.sent = []
+
+    def generate_blockchain_id(self, prefix='DOC'):
+        return f'{prefix}-{len(self.sent)}-{timezone.now().timestamp()}'
+
+    def anchor_merkle_root(self, batch_id, merkle_root, leaf_count):
+        self.sent.append(batch_id)
+        return self.results.pop(0)
+
+
+@override_settings(BLOCKCHAIN_ANCHOR_PENDING_GRACE=60)
+class DocumentAnchorRetryTests(TestCase):
+    def setUp(self):
+        self.document = Document.objects.create(document_id='DOC-1', document_type='birth_certificate', title='Test')
+
+    def service(self, *results):
+        blockchain_service = FakeAnchorBlockchainService(results)
+        return DocumentAnchorService(blockchain_service=blockchain_service), blockchain_service
+
+    def unsent_batch(self, anchor_service, age):
+        # Lô đã ghi vào database nhưng process dừng trước khi gửi giao dịch
+        anchor_service.enqueue(self.document)
+        batch = anchor_service._create_batch()
+        DocumentAnchorBatch.objects.filter(pk=batch.pk).update(created_at=timezone.now() - timezone.timedelta(seconds=age))
+        return batch
+
+    def test_unsent_pending_batch_is_sent_after_grace(self):
+        anchor_service, blockchain_service = self.service({'success': True, 'status': 'submitted', 'txId': BATCH_TX})
+        batch = self.unsent_batch(anchor_service, age=120)
+
+        anchor_service.retry_failed()
+
+        batch.refresh_from_db()
+        self.assertEqual(blockchain_service.sent, [batch.batch_id])
+        self.assertEqual((batch.status, batch.transaction_hash), ('submitted', BATCH_TX))
+
+    def test_recent_pending_batch_is_left_alone(self):
+        anchor_service, blockchain_service = self.service()
+        self.unsent_batch(anchor_service, age=10)
+
+        anchor_service.retry_failed()
+
+        self.assertEqual(blockchain_service.sent, [])
+
+
+@override_settings(BLOCKCHAIN_ANCHOR_MAX_ATTEMPTS=2, BLOCKCHAIN_ANCHOR_RETRY_BACKOFF=30)
+class DocumentAnchorBackoffTests(TestCase):
+    def setUp(self):
+        self.document = Document.objects.create(document_id='DOC-1', document_type='birth_certificate', title='Test')
+
+    def failed_batch(self, *results):
+        blockchain_service = FakeAnchorBlockchainService([{'success': False, 'error': 'execution reverted'}, *results])
+        anchor_service = DocumentAnchorService(blockchain_service=blockchain_service)
+        anchor_service.enqueue(self.document)
+        batch = anchor_service.flush(force=True)
+        return anchor_service, blockchain_service, batch
+
+    def make_due(self, batch):
+        DocumentAnchorBatch.objects.filter(pk=batch.pk).update(next_attempt_at=timezone.now())
+
+    def test_failed_batch_waits_for_backoff(self):
+        anchor_service, blockchain_service, batch = self.failed_batch()
+
+        anchor_service.retry_failed()
+
+        self.assertEqual(blockchain_service.sent, [batch.batch_id])
+        batch.refresh_from_db()
+        self.assertEqual((batch.status, batch.attempts), ('failed', 1))
+
+    def test_failed_batch_is_resent_after_backoff(self):
+        anchor_service, blockchain_service, batch = self.failed_batch({'success': True, 'status': 'submitted', 'txId': BATCH_TX})
+        self.make_due(batch)
+
+        anchor_service.retry_failed()
+
+        batch.refresh_from_db()
+        self.assertEqual(len(blockchain_service.sent), 2)
+        self.assertEqual((batch.status, batch.attempts, batch.transaction_hash), ('submitted', 2, BATCH_TX))
+        self.assertGreater(batch.next_attempt_at, timezone.now() + timezone.timedelta(seconds=30))
+
+    def test_batch_is_abandoned_at_max_attempts(self):
+        anchor_service, blockchain_service, batch = self.failed_batch({'success': False, 'error': 'execution reverted'})
+        self.make_due(batch)
+
+        with self.assertLogs('apps.blockchain.services.anchoring', 'ERROR'):
+            anchor_service.retry_failed()
+        self.make_due(batch)
+        anchor_service.retry_failed()
+
+        batch.refresh_from_db()
+        self.assertEqual(len(blockchain_service.sent), 2)
+        self.assertEqual((batch.status, batch.attempts), ('abandoned', 2))
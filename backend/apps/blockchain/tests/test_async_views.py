@@ -0,0 +1,64 @@
+import json
+from contextlib import asynccontextmanager
+from unittest import mock
+from django.test import RequestFactory, TestCase
+from rest_framework.authtoken.models import Token
+
+from api.v1.views.async_blockchain import AsyncDocumentVerificationView
+from apps.accounts.models import User
+from apps.administrative.models import Document
+
+
+class FakeAsyncClient:
+    async def verify_document_record(self, document):
+        return {'verified': True, 'exists': True, 'document': {}}
+
+
+@asynccontextmanager
+async def fake_client():
+    yield FakeAsyncClient()
+
+
+@mock.patch.object(AsyncDocumentVerificationView, 'client', lambda self: fake_client())
+class AsyncDocumentVerificationViewTests(TestCase):
+    def setUp(self):
+        self.citizen = User.objects.create_user(email='citizen@example.com', password='secret', role='CITIZEN')
+        self.other = User.objects.create_user(email='other@example.com', password='secret', role='CITIZEN')
+        self.officer = User.objects.create_user(email='officer@example.com', password='secret', role='OFFICER')
+        self.document = Document.objects.create(
+            document_id='DOC-1', document_type='birth_certificate', title='Test',
+            citizen=self.citizen, blockchain_status='STORED'
+        )
+
+    async def get(self, user=None):
+        headers = {}
+        if user is not None:
+            token, _ = await Token.objects.aget_or_create(user=user)
+            headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        request = RequestFactory().get('/verify/document/DOC-1/', **headers)
+        response = await AsyncDocumentVerificationView.as_view()(request, document_id='DOC-1')
+        return response.status_code, json.loads(response.content)
+
+    async def test_officer_sees_citizen(self):
+        status_code, data = await self.get(self.officer)
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['document_info']['citizen']['email'], 'citizen@example.com')
+
+    async def test_document_owner_sees_citizen(self):
+        status_code, data = await self.get(self.citizen)
+
+        self.assertEqual(status_code, 200)
+        self.assertIn('citizen', data['document_info'])
+
+    async def test_other_citizen_does_not_see_citizen(self):
+        status_code, data = await self.get(self.other)
+
+        self.assertEqual(status_code, 200)
+        self.assertNotIn('citizen', data['document_info'])
+
+    async def test_anonymous_does_not_see_citizen(self):
+        status_code, data = await self.get()
+
+        self.assertEqual(status_code, 200)
+        self.assertNotIn('citizen', data['document_info'])
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from apps.blockchain.services.endpoint_pool import EndpointPool, min_block
+from apps.blockchain.services.rpc import JsonRpcClient
+
+SEQUENCER = 'http://sequencer.test:8545'
+READERS = ['http://reader-a.test:8545', 'http://reader-b.test:8545']
+READ = [('eth_call', [{}, 'latest'])]
+
+
+class EndpointPoolRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = EndpointPool(READERS, SEQUENCER, session=None, read_attempts=2, check_interval=0)
+        self.pool.endpoints[SEQUENCER].head = 100
+        self.pool.endpoints[READERS[0]].head = 100
+        self.pool.endpoints[READERS[1]].head = 97
+
+    def uris(self, calls=READ):
+        return [endpoint.uri for endpoint in self.pool.route(calls)]
+
+    def test_reads_use_every_reader(self):
+        self.assertCountEqual(self.uris(), READERS)
+
+    def test_sequencer_calls_skip_readers(self):
+        self.assertEqual(self.uris([('eth_getTransactionCount', ['0x0', 'pending'])]), [SEQUENCER])
+
+    def test_min_block_excludes_lagging_readers(self):
+        with min_block(99):
+            self.assertEqual(self.uris(), [READERS[0]])
+        self.assertCountEqual(self.uris(), READERS)
+
+    def test_min_block_falls_back_to_sequencer(self):
+        self.pool.endpoints[READERS[0]].head = None
+        with min_block(99):
+            self.assertEqual(self.uris(), [SEQUENCER])
+
+    def test_nested_min_block_keeps_highest(self):
+        with min_block(99):
+            with min_block(10):
+                self.assertEqual(self.uris(), [READERS[0]])
+            with min_block(None):
+                self.assertEqual(self.uris(), [READERS[0]])
+
+    def test_pin_returns_one_reader(self):
+        self.assertIn(self.pool.pin(), READERS)
+
+
+class JsonRpcClientPinnedTests(SimpleTestCase):
+    def test_fixed_endpoint_is_already_pinned(self):
+        rpc = JsonRpcClient(SEQUENCER, session=object())
+        self.assertIs(rpc.pinned(), rpc)
+
+    def test_pool_client_is_pinned_to_one_reader(self):
+        pool = EndpointPool(READERS, SEQUENCER, session=None, check_interval=0)
+        rpc = JsonRpcClient(SEQUENCER, session=object())
+        rpc.pool = pool
+
+        pinned = rpc.pinned()
+        self.assertIsNone(pinned.pool)
+        self.assertIn(pinned.endpoint_uri, READERS)
+        self.assertIs(pinned.session, rpc.session)
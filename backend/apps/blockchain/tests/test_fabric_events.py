@@ -0,0 +1,122 @@
+import asyncio
+import os
+from concurrent.futures import Executor, Future
+from unittest import mock
+from django.test import TestCase, TransactionTestCase
+
+from apps.administrative.models import Document
+from apps.blockchain.models import BlockchainRecord, IndexerCheckpoint
+from apps.blockchain.services.fabric_events import FabricBlockListener
+from apps.blockchain.services.hyperledger import HyperledgerService
+
+
+class InlineExecutor(Executor):
+    """Chạy ngay trên thread hiện tại để test dùng chung kết nối database"""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class FakeLedgerService:
+    channel_name = 'testchannel'
+
+    def __init__(self, hashes, stop):
+        self.ledger = [{'number': number, 'hash': block_hash, 'transactions': []} for number, block_hash in enumerate(hashes)]
+        self.stop = stop
+        self.starts = []
+
+    async def blocks(self, start=0):
+        self.starts.append(start)
+        # Như FabricSimulator.blocks_from: ledger ngắn hơn start thì đọc lại từ đầu
+        if start > len(self.ledger):
+            start = 0
+        for block in self.ledger[start:]:
+            yield block
+        self.stop.set()
+
+
+class FabricBlockListenerCheckpointTests(TransactionTestCase):
+    def listen(self, hashes):
+        async def run():
+            stop = asyncio.Event()
+            service = FakeLedgerService(hashes, stop)
+            listener = FabricBlockListener(service=service, retry_interval=0.01)
+            listener._executor = InlineExecutor()
+            await asyncio.wait_for(listener.run(stop), 5)
+            return service
+
+        # InlineExecutor chạy truy vấn database ngay trong event loop
+        with mock.patch.dict(os.environ, {'DJANGO_ALLOW_ASYNC_UNSAFE': 'true'}):
+            return asyncio.run(run())
+
+    def checkpoint(self):
+        return IndexerCheckpoint.objects.get(name='fabric:testchannel')
+
+    def test_resumes_after_matching_checkpoint(self):
+        IndexerCheckpoint.objects.create(name='fabric:testchannel', last_block=1, last_block_hash='h1')
+
+        service = self.listen(['h0', 'h1', 'h2'])
+
+        self.assertEqual(service.starts, [1])
+        self.assertEqual((self.checkpoint().last_block, self.checkpoint().last_block_hash), (2, 'h2'))
+
+    def test_replaced_ledger_is_read_from_block_zero(self):
+        # Checkpoint của ledger giả lập trước, ledger mới đã có block 3 với hash khác
+        IndexerCheckpoint.objects.create(name='fabric:testchannel', last_block=3, last_block_hash='old3')
+
+        service = self.listen(['n0', 'n1', 'n2', 'n3', 'n4'])
+
+        self.assertEqual(service.starts, [3, 0])
+        self.assertEqual((self.checkpoint().last_block, self.checkpoint().last_block_hash), (4, 'n4'))
+
+    def test_shorter_ledger_is_read_from_block_zero(self):
+        IndexerCheckpoint.objects.create(name='fabric:testchannel', last_block=7, last_block_hash='old7')
+
+        service = self.listen(['n0', 'n1'])
+
+        self.assertEqual(service.starts, [7, 0])
+        self.assertEqual(self.checkpoint().last_block, 1)
+
+
+class FabricSubmissionTests(TestCase):
+    def setUp(self):
+        self.document = Document.objects.create(document_id='DOC-1', document_type='birth_certificate', title='Test')
+        self.service = HyperledgerService()
+        self.service.channel_name = 'testchannel'
+        submit = mock.AsyncMock(return_value={'success': True, 'txId': 'tx1', 'result': None})
+        patcher = mock.patch.object(self.service, '_submit', submit)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def block(self, validation_code):
+        return {'number': 1, 'hash': 'h1', 'transactions': [
+            {'txId': 'tx1', 'chaincode': 'document_contract', 'validationCode': validation_code, 'events': []}
+        ]}
+
+    def test_submission_is_confirmed_by_the_listener(self):
+        self.service.submit('document_contract', 'createDocument', ['DOC-1'], self.document, 'document_creation')
+
+        record = BlockchainRecord.objects.get(transaction_id='tx1')
+        self.assertEqual((record.network, record.status), ('hyperledger', 'submitted'))
+
+        FabricBlockListener(service=self.service).process_block(self.block('VALID'))
+
+        record.refresh_from_db()
+        self.document.refresh_from_db()
+        self.assertEqual(record.status, 'confirmed')
+        self.assertEqual((self.document.blockchain_status, self.document.blockchain_tx_id), ('STORED', 'tx1'))
+
+    async def test_async_submission_is_recorded(self):
+        await self.service.submit_chaincode(
+            'document_contract', 'revokeDocument', ['DOC-1'], self.document, 'document_revocation'
+        )
+
+        record = await BlockchainRecord.objects.aget(transaction_id='tx1')
+        self.assertEqual((record.record_type, record.status), ('document_revocation', 'submitted'))
+
+    def test_submission_without_object_is_not_recorded(self):
+        self.service.submit('document_contract', 'createDocument', ['DOC-1'])
+
+        self.assertFalse(BlockchainRecord.objects.filter(network='hyperledger').exists())
@@ -0,0 +1,117 @@
+import datetime
+import hashlib
+import json
+import uuid
+from decimal import Decimal
+from django.test import SimpleTestCase
+
+from utils.hashing import StreamHasher, canonical_json, hash_data, hash_data_many
+
+UTC = datetime.timezone.utc
+
+# (tên, giá trị, hash mong đợi). Bốn vector đầu có hash bằng với cách tính trước đây
+# (json.dumps(sort_keys=True) với ngày tháng đã chuyển thành chuỗi) của Document, User,
+# Approval và BlockchainService.create_hash; đổi đặc tả làm sai các vector này là đổi hash
+# của mọi bản ghi đã lưu và đã ghi lên chain.
+GOLDEN_VECTORS = [
+    (
+        'document',
+        {
+            'document_id': 'BIRT-7Q2K9ZL0XA',
+            'document_type': 'birth_certificate',
+            'title': 'Giấy khai sinh',
+            'issue_date': datetime.date(2024, 3, 15),
+            'valid_from': datetime.date(2024, 3, 15),
+            'valid_until': None,
+            'content': {'father': 'Nguyễn Văn A', 'children': [1, 2.5, True, None]},
+            'citizen_id': '42',
+            'status': 'DRAFT',
+        },
+        'd74cedde42f53d682349eb749f26a71467db4ec44d91d12ab17510f94c1fd8f1',
+    ),
+    (
+        'user',
+        {
+            'id': '42',
+            'email': 'citizen@example.vn',
+            'role': 'CITIZEN',
+            'full_name': 'Trần Thị B',
+            'is_active': True,
+            'is_verified': False,
+        },
+        'e7cc489ba31fbea3d79a9e86986435c3b94e510d124e6e429d3b96e68a67ebe3',
+    ),
+    (
+        'approval',
+        {
+            'approval_id': 'APR-20240315-0001',
+            'approval_type': 'document',
+            'title': 'Phê duyệt',
+            'description': None,
+            'status': 'approved',
+            'object_id': '7',
+            'requested_by': '3',
+            'requested_at': datetime.datetime(2024, 3, 15, 8, 30, 0, 123456, tzinfo=UTC),
+            'approved_by': '5',
+            'approved_at': datetime.datetime(2024, 3, 16, 9, 0, tzinfo=UTC),
+        },
+        '6137fee8e4dc8d8ac71d854aa3dd30b6c769fb3824e0f03f18fb9992adcb1e84',
+    ),
+    ('string', 'abc', 'ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad'),
+    ('escapes', {'b': [], 'a': {'z': 1, 'y': '\n"'}}, '9a316725ac995142fa7b56e151382cc18f8a527f8461b4d4e14fd2ca8d077e86'),
+    (
+        'extended_types',
+        {
+            'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+            'amount': Decimal('10.50'),
+            'raw': b'\x00\xff',
+            'tags': {'b', 'a'},
+            'time': datetime.time(7, 5),
+        },
+        '9bbbb543ad3a759c6e7790780c541d11fc9a858b7012533fca2613628b384763',
+    ),
+]
+
+
+class HashingGoldenVectorTests(SimpleTestCase):
+    def test_hash_data(self):
+        for name, value, expected in GOLDEN_VECTORS:
+            with self.subTest(name):
+                self.assertEqual(hash_data(value), expected)
+
+    def test_hash_data_many_matches_hash_data(self):
+        values = [value for _, value, _ in GOLDEN_VECTORS]
+        expected = [expected for _, _, expected in GOLDEN_VECTORS]
+        self.assertEqual(hash_data_many(values, workers=1), expected)
+        self.assertEqual(hash_data_many(values, workers=2), expected)
+
+    def test_hash_data_many_large_records(self):
+        # Bản ghi từ GIL_RELEASE_SIZE byte trở lên được hash trên thread pool
+        values = [{'index': index, 'content': 'x' * 5000} for index in range(10)] + ['abc']
+        self.assertEqual(hash_data_many(values, workers=4), [hash_data(value) for value in values])
+
+
+class CanonicalJsonTests(SimpleTestCase):
+    def test_matches_legacy_json_dumps(self):
+        value = {'b': [1, 2.5, None, True], 'a': {'y': 'Nguyễn\n"', 'x': {}}}
+        self.assertEqual(canonical_json(value), json.dumps(value, sort_keys=True))
+
+    def test_rejects_nan(self):
+        with self.assertRaises(ValueError):
+            canonical_json({'value': float('nan')})
+
+    def test_rejects_unknown_types(self):
+        with self.assertRaises(TypeError):
+            canonical_json({'value': object()})
+
+
+class StreamHasherTests(SimpleTestCase):
+    def test_matches_sha256(self):
+        data = bytes(range(256)) * 1000
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                hasher = StreamHasher(workers=workers)
+                for start in range(0, len(data), 3000):
+                    hasher.update(data[start:start + 3000])
+                self.assertEqual(hasher.hexdigest(), hashlib.sha256(data).hexdigest())
+                self.assertEqual(hasher.size, len(data))
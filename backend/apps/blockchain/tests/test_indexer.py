@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.test import SimpleTestCase
+from web3 import Web3
+
+from apps.blockchain.services.client import load_contract_abi
+from apps.blockchain.services.indexer import DocumentEventIndexer
+
+ADDRESS = '0x' + '22' * 20
+
+
+def document_input(document_id, data_hash):
+    return (document_id, 'birth_certificate', 'C001', 'officer1', '2024-01-01', 'UNLIMITED', data_hash, '{"a": 1}')
+
+
+class DocumentEventIndexerDecodeTests(SimpleTestCase):
+    def setUp(self):
+        abi = load_contract_abi('document_contract', settings.CONTRACT_ABI_DIR)
+        self.indexer = DocumentEventIndexer(rpc=object(), contract_address=ADDRESS, contract_abi=abi)
+        self.contract = Web3().eth.contract(abi=abi)
+        self.topic = next(topic for topic, (name, _) in self.indexer.events.items() if name == 'DocumentCreated')
+
+    def created_log(self, document_id, log_index):
+        data = Web3().codec.encode(['string'] * 5, [document_id, 'birth_certificate', 'C001', 'officer1', f'tx-{document_id}'])
+        return {
+            'topics': [self.topic],
+            'data': '0x' + data.hex(),
+            'blockNumber': '0x5',
+            'blockHash': '0x' + 'ab' * 32,
+            'transactionHash': '0x' + 'cd' * 32,
+            'logIndex': hex(log_index),
+        }
+
+    def decode(self, tx_input, document_id, log_index=0):
+        call = self.indexer._decode_input({'input': tx_input})
+        return self.indexer._decode(self.created_log(document_id, log_index), {'timestamp': '0x10'}, call)
+
+    def test_single_create_keeps_call_arguments(self):
+        tx_input = self.contract.encode_abi('createDocument', args=list(document_input('D1', 'hash-1')))
+        event = self.decode(tx_input, 'D1')
+        self.assertEqual(event.args['dataHash'], 'hash-1')
+        self.assertEqual(event.args['issueDate'], '2024-01-01')
+
+    def test_batch_create_matches_input_by_document_id(self):
+        tx_input = self.contract.encode_abi(
+            'createDocuments', args=[[document_input('D1', 'hash-1'), document_input('D2', 'hash-2')]]
+        )
+        first, second = self.decode(tx_input, 'D1', 0), self.decode(tx_input, 'D2', 1)
+
+        self.assertEqual(first.args['dataHash'], 'hash-1')
+        self.assertEqual(second.args['dataHash'], 'hash-2')
+        self.assertEqual(second.args['validUntil'], 'UNLIMITED')
+        self.assertEqual(second.args['metadata'], '{"a": 1}')
+        self.assertNotIn('inputs', second.args)
+
+    def test_undecodable_input_is_ignored(self):
+        event = self.decode('0xdeadbeef', 'D1')
+        self.assertEqual(event.args['documentId'], 'D1')
+        self.assertNotIn('dataHash', event.args)
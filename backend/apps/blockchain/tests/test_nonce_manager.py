@@ -0,0 +1,146 @@
+from datetime import timedelta
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from eth_account import Account
+from web3 import Web3
+
+from apps.blockchain.models import AccountNonce
+from apps.blockchain.services.blockchain_service import BlockchainService
+from apps.blockchain.services.nonce_manager import NonceManager
+
+ADDRESS = '0x' + '11' * 20
+
+
+class FakeEth:
+    def __init__(self):
+        self.pending = 0
+
+    def get_transaction_count(self, address, block_identifier):
+        return self.pending
+
+
+class FakeWeb3:
+    def __init__(self):
+        self.eth = FakeEth()
+
+
+@override_settings(BLOCKCHAIN_NONCE_LEASE=30, BLOCKCHAIN_NONCE_GAP_TIMEOUT=120)
+class NonceManagerTests(TestCase):
+    def setUp(self):
+        self.web3 = FakeWeb3()
+
+    def manager(self):
+        return NonceManager(self.web3, ADDRESS, block_size=10)
+
+    def row(self):
+        return AccountNonce.objects.get(address=NonceManager(self.web3, ADDRESS).address)
+
+    def test_processes_get_disjoint_blocks(self):
+        first, second = self.manager(), self.manager()
+        self.assertEqual(first.allocate(), 0)
+        self.assertEqual(second.allocate(), 10)
+        self.assertEqual(first.allocate(), 1)
+
+    def test_resync_never_moves_counter_below_held_blocks(self):
+        first, second = self.manager(), self.manager()
+        first.allocate()
+        second.allocate()
+        self.web3.eth.pending = 1
+
+        first.resync()
+
+        row = self.row()
+        self.assertEqual(row.next_nonce, 20)
+        # Phần chưa dùng của khối được cấp lại thay vì bỏ trống
+        self.assertEqual(row.free_nonces, list(range(1, 10)))
+        self.assertEqual(self.manager().allocate(), 1)
+
+    def test_expired_lease_returns_unused_nonces(self):
+        first = self.manager()
+        with mock.patch('apps.blockchain.services.nonce_manager.time.monotonic', return_value=1000):
+            self.assertEqual(first.allocate(), 0)
+        self.web3.eth.pending = 1
+
+        with mock.patch('apps.blockchain.services.nonce_manager.time.monotonic', return_value=1031):
+            self.assertEqual(first.allocate(), 1)
+
+            # Phần đuôi 1..9 được trả về rồi cấp lại trước khi lấy nonce mới
+            self.assertEqual([first.allocate() for _ in range(9)], list(range(2, 11)))
+
+        row = self.row()
+        self.assertEqual(row.free_nonces, [])
+        self.assertEqual(row.next_nonce, 11)
+
+    def test_stalled_nonce_is_filled_after_timeout(self):
+        first, second = self.manager(), self.manager()
+        first.allocate()
+        second.allocate()
+        # Nonce 0 đã gửi, 1..9 nằm trong khối của process đã dừng, process kia gửi 10
+        self.web3.eth.pending = 1
+
+        self.assertIsNone(second.check_gaps())
+        self.assertEqual(self.row().stalled_nonce, 1)
+        self.assertIsNone(second.check_gaps())
+
+        AccountNonce.objects.update(stalled_since=timezone.now() - timedelta(seconds=121))
+        self.assertEqual(second.check_gaps(), 1)
+        self.assertEqual(self.row().free_nonces, [1])
+
+        third = self.manager()
+        self.assertEqual(third.allocate(), 1)
+        self.assertEqual(third.allocate(), 20)
+
+    def test_no_gap_when_counter_is_reached(self):
+        manager = self.manager()
+        manager.allocate()
+        self.web3.eth.pending = 10
+        self.assertIsNone(manager.check_gaps())
+        self.assertIsNone(self.row().stalled_nonce)
+
+
+class SendWithLaneTests(TestCase):
+    def setUp(self):
+        self.account = Account.create()
+        self.nonce_manager = mock.Mock()
+        self.nonce_manager.allocate.side_effect = [5, 6]
+        self.lane = mock.Mock(private_key=self.account.key, address=self.account.address)
+        self.lane.nonce_manager.return_value = self.nonce_manager
+
+        self.service = BlockchainService.__new__(BlockchainService)
+        self.service.web3 = mock.Mock(to_wei=Web3.to_wei)
+        self.service.web3.eth.account = Account
+        self.transaction = mock.Mock()
+        self.transaction.build_transaction.side_effect = lambda params: dict(
+            params, to=self.account.address, value=0, data='0x', chainId=1
+        )
+
+    def send(self, *responses):
+        self.service.web3.eth.send_raw_transaction.side_effect = responses
+        return self.service._send_with_lane(self.lane, self.transaction, wait_for_receipt=False)
+
+    def test_already_known_is_the_sent_transaction(self):
+        result = self.send(ValueError({'code': -32000, 'message': 'already known'}))
+
+        # Hash giao dịch là keccak của raw transaction đã gửi
+        raw_transaction = self.service.web3.eth.send_raw_transaction.call_args.args[0]
+        self.assertTrue(result['success'])
+        self.assertEqual(result['nonce'], 5)
+        self.assertEqual(result['txId'], Web3.to_hex(Web3.keccak(raw_transaction)))
+        self.assertEqual(self.service.web3.eth.send_raw_transaction.call_count, 1)
+        self.nonce_manager.resync.assert_not_called()
+        self.nonce_manager.release.assert_not_called()
+
+    def test_nonce_too_high_releases_the_nonce(self):
+        result = self.send(ValueError({'code': -32000, 'message': 'nonce too high'}), b'\x01' * 32)
+
+        self.assertEqual(result['nonce'], 6)
+        self.nonce_manager.release.assert_called_once_with(5)
+        self.nonce_manager.resync.assert_called_once_with()
+
+    def test_nonce_too_low_is_not_released(self):
+        result = self.send(ValueError({'code': -32000, 'message': 'nonce too low'}), b'\x01' * 32)
+
+        self.assertEqual(result['nonce'], 6)
+        self.nonce_manager.release.assert_not_called()
+        self.nonce_manager.resync.assert_called_once_with()
@@ -0,0 +1,85 @@
+from django.test import TestCase, override_settings
+
+from apps.administrative.models import Document
+from apps.blockchain.models import BlockchainOutbox
+from apps.blockchain.services import outbox
+from apps.blockchain.services.anchoring import DocumentAnchorService
+from apps.blockchain.services.receipt_tracker import ReceiptTracker
+from apps.blockchain.tests.test_receipt_tracker import FakeRpc, receipt
+
+BATCH_TX = '0x' + '03' * 32
+
+
+class FakeBatchService:
+    """BlockchainService ở chế độ neo theo lô, không kết nối node"""
+
+    def __init__(self):
+        self.anchor_service = DocumentAnchorService(blockchain_service=self)
+        self.ids = 0
+
+    def _batch_anchoring(self):
+        return True
+
+    def save_document_to_blockchain(self, document, officer_id, metadata=None):
+        anchor = self.anchor_service.enqueue(document)
+        return {'success': True, 'status': 'queued', 'anchorId': anchor.id, 'dataHash': anchor.data_hash}
+
+    def generate_blockchain_id(self, prefix='DOC'):
+        self.ids += 1
+        return f'{prefix}-TEST-{self.ids}'
+
+    def anchor_merkle_root(self, batch_id, merkle_root, leaf_count):
+        return {'success': True, 'status': 'submitted', 'txId': BATCH_TX}
+
+
+@override_settings(BLOCKCHAIN_ANCHOR_MODE='batch')
+class OutboxBatchAnchorTests(TestCase):
+    def setUp(self):
+        self.service = FakeBatchService()
+        self.dispatcher = outbox.OutboxDispatcher(workers=1, blockchain_service_factory=lambda: self.service)
+        self.addCleanup(self.dispatcher.shutdown)
+        self.document = Document.objects.create(document_id='DOC-1', document_type='birth_certificate', title='Test')
+
+    def test_queued_creation_is_confirmed_with_its_anchor_batch(self):
+        record = outbox.enqueue(self.document, 'document_create', {'officer_id': 'system'})
+        entry = BlockchainOutbox.objects.get(record=record)
+        self.dispatcher.process(entry.id)
+
+        # Chưa có giao dịch: bản ghi chờ lô neo
+        record.refresh_from_db()
+        self.assertEqual(record.status, 'pending')
+        self.assertIsNone(record.transaction_hash)
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.processed_at)
+
+        self.service.anchor_service.flush(force=True)
+        record.refresh_from_db()
+        self.assertEqual((record.status, record.transaction_hash), ('submitted', BATCH_TX))
+
+        ReceiptTracker(rpc=FakeRpc({BATCH_TX: receipt(1)}), confirmation_depth=1).tick()
+        record.refresh_from_db()
+        self.document.refresh_from_db()
+        self.assertEqual(record.status, 'confirmed')
+        self.assertEqual((self.document.blockchain_status, self.document.blockchain_tx_id), ('STORED', BATCH_TX))
+
+    def test_revocation_is_anchored_with_the_next_batch(self):
+        self.service.anchor_service.enqueue(self.document)
+        self.service.anchor_service.flush(force=True)
+        created_hash = self.document.calculate_data_hash()
+
+        self.document.revoke(None, 'test')
+        entry = BlockchainOutbox.objects.get(operation='document_revoke')
+        record = entry.record
+        # FakeBatchService không có document_contract: gọi revokeDocument sẽ lỗi
+        self.dispatcher.process(entry.id)
+
+        record.refresh_from_db()
+        entry.refresh_from_db()
+        self.assertEqual((record.status, record.retry_count), ('pending', 0))
+        self.assertIsNotNone(entry.processed_at)
+        anchor = self.document.blockchain_anchors.get(id=record.metadata['anchor_id'])
+        self.assertNotEqual(anchor.data_hash, created_hash)
+
+        self.service.anchor_service.flush(force=True)
+        record.refresh_from_db()
+        self.assertEqual((record.status, record.transaction_hash), ('submitted', BATCH_TX))
@@ -0,0 +1,84 @@
+from django.contrib.contenttypes.models import ContentType
+from django.test import TestCase
+from django.utils import timezone
+
+from apps.administrative.models import Document
+from apps.blockchain.models import BlockchainRecord
+from apps.blockchain.services.receipt_tracker import ReceiptTracker
+
+CREATE_TX = '0x' + '01' * 32
+APPROVE_TX = '0x' + '02' * 32
+
+
+class FakeRpc:
+    def __init__(self, receipts, head=10):
+        self.receipts = receipts
+        self.head = head
+
+    def batch(self, calls):
+        results = []
+        for method, params in calls:
+            if method == 'eth_blockNumber':
+                results.append(hex(self.head))
+            else:
+                results.append(self.receipts.get(params[0]))
+        return results
+
+
+def receipt(status, block=5):
+    return {'status': hex(status), 'blockNumber': hex(block)}
+
+
+class ReceiptTrackerDocumentTests(TestCase):
+    def setUp(self):
+        self.document = Document.objects.create(document_id='DOC-1', document_type='birth_certificate', title='Test')
+        self.content_type = ContentType.objects.get_for_model(Document)
+
+    def record(self, record_type, tx_hash, status='submitted'):
+        return BlockchainRecord.objects.create(
+            network='quorum', content_type=self.content_type, object_id=str(self.document.pk),
+            record_type=record_type, status=status, transaction_hash=tx_hash,
+            confirmed_at=timezone.now() if status == 'confirmed' else None
+        )
+
+    def track(self, receipts):
+        ReceiptTracker(rpc=FakeRpc(receipts), confirmation_depth=1).tick()
+        self.document.refresh_from_db()
+
+    def test_confirmed_creation_marks_document_stored(self):
+        self.record('document_creation', CREATE_TX)
+
+        self.track({CREATE_TX: receipt(1)})
+
+        self.assertEqual(self.document.blockchain_status, 'STORED')
+        self.assertEqual(self.document.blockchain_tx_id, CREATE_TX)
+
+    def test_failed_creation_marks_document_error(self):
+        self.record('document_creation', CREATE_TX)
+
+        self.track({CREATE_TX: receipt(0)})
+
+        self.assertEqual(self.document.blockchain_status, 'ERROR')
+
+    def test_failed_approval_keeps_stored_document(self):
+        self.record('document_creation', CREATE_TX, status='confirmed')
+        # Lúc gửi giao dịch duyệt, giấy tờ đã trỏ tới giao dịch đó
+        Document.objects.filter(pk=self.document.pk).update(blockchain_status='STORED', blockchain_tx_id=APPROVE_TX)
+        approval = self.record('document_approval', APPROVE_TX)
+
+        with self.assertLogs('apps.blockchain.services.receipt_tracker', 'ERROR'):
+            self.track({APPROVE_TX: receipt(0)})
+
+        approval.refresh_from_db()
+        self.assertEqual(approval.status, 'failed')
+        self.assertEqual(self.document.blockchain_status, 'STORED')
+        self.assertEqual(self.document.blockchain_tx_id, CREATE_TX)
+
+    def test_confirmed_approval_keeps_status_and_records_transaction(self):
+        Document.objects.filter(pk=self.document.pk).update(blockchain_status='STORED', blockchain_tx_id=CREATE_TX)
+        self.record('document_approval', APPROVE_TX)
+
+        self.track({APPROVE_TX: receipt(1)})
+
+        self.assertEqual(self.document.blockchain_status, 'STORED')
+        self.assertEqual(self.document.blockchain_tx_id, APPROVE_TX)
@@ -0,0 +1,47 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from web3 import Web3
+
+from apps.blockchain.services import signer_pool
+
+OFFICER = Web3.keccak(text='OFFICER_ROLE')
+CHAIRMAN = Web3.keccak(text='CHAIRMAN_ROLE')
+
+
+class FakeDocumentContract:
+    def __init__(self, grants):
+        self.grants = grants
+        self.functions = self
+
+    def hasRole(self, role, address):
+        return mock.Mock(call=mock.Mock(return_value=(role, address) in self.grants))
+
+
+@override_settings(BLOCKCHAIN_SIGNER_REQUIRED_ROLES=['OFFICER_ROLE', 'CHAIRMAN_ROLE'])
+class AuthorizedAccountsTests(SimpleTestCase):
+    accounts = [{'address': '0xA'}, {'address': '0xB'}]
+
+    def authorized(self, contract):
+        client = mock.Mock(contracts={'document_contract': contract})
+        with mock.patch('apps.blockchain.services.client.get_client', return_value=client):
+            return signer_pool._authorized_accounts(self.accounts)
+
+    def test_account_missing_a_role_is_excluded(self):
+        contract = FakeDocumentContract({(OFFICER, '0xA'), (CHAIRMAN, '0xA'), (OFFICER, '0xB')})
+
+        with self.assertLogs(signer_pool.logger, 'ERROR'):
+            self.assertEqual(self.authorized(contract), [{'address': '0xA'}])
+
+    def test_all_accounts_kept_when_none_is_authorized(self):
+        with self.assertLogs(signer_pool.logger, 'ERROR'):
+            self.assertEqual(self.authorized(FakeDocumentContract(set())), self.accounts)
+
+    def test_accounts_kept_without_document_contract(self):
+        self.assertEqual(self.authorized(None), self.accounts)
+
+    def test_accounts_kept_when_node_is_unreachable(self):
+        contract = mock.Mock()
+        contract.functions.hasRole.return_value.call.side_effect = ConnectionError('node down')
+
+        with self.assertLogs(signer_pool.logger, 'WARNING'):
+            self.assertEqual(self.authorized(contract), self.accounts)
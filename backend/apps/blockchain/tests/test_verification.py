@@ -0,0 +1,59 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+
+from apps.blockchain.services import blockchain_service
+from apps.blockchain.services.blockchain_service import BlockchainService
+from apps.blockchain.services.circuit_breaker import CircuitOpenError
+
+DOCUMENT = ('D1', 'birth_certificate', 'C001', 'officer1', '2024-01-01', 'UNLIMITED', 'hash-1', '{}',
+            1, 10, 10, 'chairman1', 11, '', 0, '')
+
+
+class VerifyDocumentTests(SimpleTestCase):
+    def setUp(self):
+        # Không kết nối node: chỉ cần contract và anchor service cho verify_document
+        self.service = BlockchainService.__new__(BlockchainService)
+        self.service.document_contract = mock.Mock()
+        self.service._anchor_service = mock.Mock()
+
+    def verify(self, chain_result, **kwargs):
+        with mock.patch.object(blockchain_service, 'cached_call', return_value=chain_result):
+            return self.service.verify_document('D1', 'hash-1', raw_hash=True, **kwargs)
+
+    def test_contract_tuple_is_returned_as_dict(self):
+        result = self.verify((True, True, True, False, True, DOCUMENT))
+
+        self.assertTrue(result['verified'])
+        self.assertTrue(result['exists'])
+        self.assertTrue(result['dataIntegrity'])
+        self.assertEqual(result['document']['dataHash'], 'hash-1')
+
+    def test_missing_document_has_empty_document(self):
+        result = self.verify((False, False, False, False, False, DOCUMENT))
+        self.assertFalse(result['exists'])
+        self.assertEqual(result['document'], {})
+
+    def test_indexer_fallback_is_returned_as_dict(self):
+        from apps.blockchain.services import indexer
+
+        with mock.patch.object(blockchain_service, 'cached_call', side_effect=CircuitOpenError('http://node.test', 1.0)), \
+                mock.patch.object(indexer, 'is_index_available', return_value=True), \
+                mock.patch.object(indexer, 'verify_document', return_value=(True, True, True, False, True, DOCUMENT)):
+            result = self.service.verify_document('D1', 'hash-1', raw_hash=True)
+
+        self.assertTrue(result['verified'])
+        self.assertEqual(result['document']['documentId'], 'D1')
+
+    @override_settings(BLOCKCHAIN_ANCHOR_MODE='single')
+    def test_single_mode_skips_anchor_lookup(self):
+        self.verify((True, True, True, False, True, DOCUMENT))
+        self.service._anchor_service.get_anchor.assert_not_called()
+
+    @override_settings(BLOCKCHAIN_ANCHOR_MODE='batch')
+    def test_batch_mode_verifies_anchored_document_by_proof(self):
+        self.service._anchor_service.verify_membership.return_value = {'verified': True, 'proofValid': True}
+
+        result = self.verify((False, False, False, False, False, DOCUMENT))
+
+        self.service._anchor_service.get_anchor.assert_called_once_with('D1')
+        self.assertEqual(result, {'verified': True, 'proofValid': True})
@@ -1,7 +1,11 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
 from rest_framework import permissions
 
+from apps.blockchain.services.deadline import deadline
+
 class AllowAnyPermission(permissions.BasePermission):
     """
     Allow any access.
@@ -51,15 +55,12 @@ class CsrfExemptMiddleware(MiddlewareMixin):
         return None
 
 
-class CitizenAccessMiddleware:
+class CitizenAccessMiddleware(MiddlewareMixin):
     """
     Middleware to grant citizen access to users with the officer role.
     This is a temporary solution to allow officers to access citizen endpoints.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
+    def process_request(self, request):
         # Process request before view is called
         if hasattr(request, 'user') and request.user.is_authenticated:
             # Check if the user has roles
@@ -70,24 +71,15 @@ class CitizenAccessMiddleware:
                 if 'officer' in roles:
                     request.user._has_citizen_access = True
                     print(f"DEBUG CitizenAccessMiddleware: Granting citizen access to officer {request.user.email}")
-        
-        # Call the next middleware or view
-        response = self.get_response(request)
-        
-        # Process response after view is called
-        return response
 
 
-class OfficerAccessMiddleware:
+class OfficerAccessMiddleware(MiddlewareMixin):
     """
     Middleware to handle dual-role users for officer endpoints.
     This middleware checks if a user has the officer role in their roles relationship
     and sets a flag on the user object to indicate that they have access to officer endpoints.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
+    def process_request(self, request):
         # Process request before view is called
         if hasattr(request, 'user') and request.user.is_authenticated:
             # Check if the user has roles
@@ -98,24 +90,15 @@ class OfficerAccessMiddleware:
                 if 'officer' in roles:
                     request.user._has_officer_access = True
                     print(f"DEBUG OfficerAccessMiddleware: Granting officer access to user {request.user.email}")
-        
-        # Call the next middleware or view
-        response = self.get_response(request)
-        
-        # Process response after view is called
-        return response
 
 
-class ChairmanAccessMiddleware:
+class ChairmanAccessMiddleware(MiddlewareMixin):
     """
     Middleware to handle dual-role users for chairman endpoints.
     This middleware checks if a user has the chairman role in their roles relationship
     and sets a flag on the user object to indicate that they have access to chairman endpoints.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
+    def process_request(self, request):
         # Process request before view is called
         if hasattr(request, 'user') and request.user.is_authenticated:
             # Check if the user has roles
@@ -126,31 +109,53 @@ class ChairmanAccessMiddleware:
                 if 'chairman' in roles:
                     request.user._has_chairman_access = True
                     print(f"DEBUG ChairmanAccessMiddleware: Granting chairman access to user {request.user.email}")
-        
-        # Call the next middleware or view
-        response = self.get_response(request)
-        
-        # Process response after view is called
-        return response
 
 
-class PermissionOverrideMiddleware:
+class PermissionOverrideMiddleware(MiddlewareMixin):
     """
     Middleware to override permissions for debugging purposes.
     """
-    def __init__(self, get_response):
-        self.get_response = get_response
-
-    def __call__(self, request):
+    def process_request(self, request):
         # Check for debug parameter in query string
         debug_mode = request.GET.get('debug_permissions', None)
         if debug_mode == 'true':
             # Set a flag on the request to bypass permission checks
             request._bypass_permissions = True
             print(f"DEBUG PermissionOverrideMiddleware: Bypassing permissions for request {request.path}")
-        
-        # Call the next middleware or view
-        response = self.get_response(request)
-        
-        # Process response after view is called
-        return response 
\ No newline at end of file
+
+
+class RequestDeadlineMiddleware:
+    """
+    Gắn deadline BLOCKCHAIN_REQUEST_BUDGET giây cho mỗi request
+
+    Client có thể rút ngắn (không kéo dài) thời gian bằng header X-Request-Timeout (giây).
+    Chạy được cả với view đồng bộ và view async.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with deadline(self.budget(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with deadline(self.budget(request)):
+            return await self.get_response(request)
+
+    def budget(self, request):
+        budget = getattr(settings, 'BLOCKCHAIN_REQUEST_BUDGET', 20)
+        try:
+            requested = float(request.headers.get('X-Request-Timeout', ''))
+        except ValueError:
+            return budget
+        if requested <= 0:
+            return budget
+        return min(budget, requested) if budget else requested
\ No newline at end of file
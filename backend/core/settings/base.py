@@ -62,6 +62,7 @@ MIDDLEWARE = [
     'core.middleware.PermissionOverrideMiddleware',
     'core.middleware.CsrfExemptMiddleware',
     'utils.middleware.MultiRoleMiddleware',
+    'core.middleware.RequestDeadlineMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -126,9 +127,10 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # File upload settings
 FILE_UPLOAD_PERMISSIONS = 0o644
+# Tính SHA-256, kích thước và loại file trong lúc nhận upload (utils/uploads.py)
 FILE_UPLOAD_HANDLERS = [
-    'django.core.files.uploadhandler.MemoryFileUploadHandler',
-    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+    'utils.uploads.HashingMemoryFileUploadHandler',
+    'utils.uploads.HashingTemporaryFileUploadHandler',
 ]
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5 MB
 
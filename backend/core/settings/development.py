@@ -85,6 +85,112 @@ CONTRACT_ABI_DIR = os.path.join(os.path.dirname(BASE_DIR), 'blockchain', 'contra
 BLOCKCHAIN_DEFAULT_ACCOUNT = '0x0000000000000000000000000000000000000000'
 BLOCKCHAIN_DEFAULT_PRIVATE_KEY = None  # Should be set securely in production
 
+# Transaction submission
+BLOCKCHAIN_WAIT_FOR_RECEIPT = True  # False: trả về tx hash ngay, receipt được xác nhận bởi track_receipts
+BLOCKCHAIN_NONCE_BLOCK_SIZE = 10  # Số nonce mỗi process giữ trước từ bảng AccountNonce
+BLOCKCHAIN_NONCE_LEASE = 30  # Số giây một process được dùng khối nonce của mình, hết hạn thì trả phần chưa dùng
+BLOCKCHAIN_NONCE_GAP_TIMEOUT = 120  # Nonce 'pending' của node đứng yên quá số giây này (lớn hơn LEASE) được coi là khoảng trống và cấp lại
+BLOCKCHAIN_WRITE_BATCH_SIZE = 20  # Số item mỗi giao dịch của createDocuments/approveDocuments/registerUsers (*_many)
+BLOCKCHAIN_BATCH_GAS_PER_ITEM = 500000  # Gas cộng thêm cho mỗi item của giao dịch theo lô
+BLOCKCHAIN_PAGE_SIZE = 100  # Số giấy tờ mỗi lời gọi getDocumentsBy*Page (tối đa MAX_PAGE_SIZE của contract)
+DATA_HASH_WORKERS = 4  # Số thread hash song song của utils.hashing.hash_data_many
+ATTACHMENT_CONTENT_ADDRESSED = True  # Lưu file đính kèm theo SHA-256 (ContentBlob), file trùng nội dung chỉ lưu một lần
+CONTENT_BLOB_GC_GRACE = 3600  # Số giây blob không còn tham chiếu được giữ lại trước khi collect_content_blobs xóa
+RESUMABLE_UPLOAD_DIR = None  # Thư mục file đang upload dở (mặc định <FILE_UPLOAD_TEMP_DIR hoặc thư mục tạm>/resumable-uploads), nên cùng ổ đĩa với MEDIA_ROOT
+RESUMABLE_UPLOAD_MAX_SIZE = 104857600  # 100 MB, kích thước tối đa của một file upload nhiều phần
+RESUMABLE_UPLOAD_EXPIRY = 86400  # Số giây phiên upload được giữ kể từ lần nhận dữ liệu cuối
+RESUMABLE_UPLOAD_LOCK_TIMEOUT = 60  # Số giây khóa ghi của một PATCH được giữ khi không gia hạn, sau đó coi như request đã dừng
+
+# Document anchoring: 'single' (một giao dịch mỗi giấy tờ) hoặc 'batch' (Merkle root theo lô)
+BLOCKCHAIN_ANCHOR_MODE = 'single'
+BLOCKCHAIN_ANCHOR_BATCH_SIZE = 500  # Số giấy tờ tối đa trong một lô
+BLOCKCHAIN_ANCHOR_BATCH_WINDOW = 30  # Số giây tối đa một giấy tờ chờ trong hàng đợi
+BLOCKCHAIN_ANCHOR_PENDING_GRACE = 300  # Số giây trước khi lô đã tạo nhưng chưa được gửi (process dừng giữa chừng) được gửi lại
+BLOCKCHAIN_ANCHOR_MAX_ATTEMPTS = 5  # Số lần gửi tối đa của một lô trước khi ngừng gửi lại
+BLOCKCHAIN_ANCHOR_RETRY_BACKOFF = 30  # Số giây chờ trước lần gửi lại đầu tiên, nhân đôi sau mỗi lần lỗi
+
+# Outbox: các thao tác ghi blockchain được gửi bởi run_outbox_dispatcher
+BLOCKCHAIN_OUTBOX_WORKERS = 4
+BLOCKCHAIN_OUTBOX_MAX_RETRIES = 5
+BLOCKCHAIN_OUTBOX_RETRY_BACKOFF = 5  # Số giây chờ trước lần thử lại đầu tiên, nhân đôi sau mỗi lần lỗi
+BLOCKCHAIN_OUTBOX_LOCK_TIMEOUT = 300  # Số giây trước khi thao tác bị worker giữ quá lâu được nhận lại
+
+# Receipt tracker (lệnh track_receipts)
+BLOCKCHAIN_CONFIRMATION_DEPTH = 1  # Số block tính từ block chứa giao dịch để coi là đã xác nhận
+BLOCKCHAIN_RECEIPT_TIMEOUT = 600  # Số giây không có receipt trước khi đánh dấu giao dịch thất bại
+BLOCKCHAIN_RECEIPT_BATCH_SIZE = 500  # Số giao dịch kiểm tra mỗi lượt
+BLOCKCHAIN_RPC_TIMEOUT = 10  # Timeout (giây) của mỗi HTTP request tới node
+BLOCKCHAIN_HTTP_POOL_SIZE = 20  # Số kết nối keep-alive tới node giữ trong mỗi process
+BLOCKCHAIN_RPC_BATCH_LIMIT = 1000  # Số lời gọi tối đa trong một JSON-RPC batch
+
+# Event indexer (lệnh index_document_events)
+BLOCKCHAIN_INDEXER_START_BLOCK = 0  # Block triển khai DocumentContract
+BLOCKCHAIN_INDEXER_BLOCK_RANGE = 2000  # Số block mỗi lần gọi eth_getLogs
+BLOCKCHAIN_INDEXER_REORG_DEPTH = 12  # Số block được đọc lại khi phát hiện reorg
+
+# Đọc contract hàng loạt (BlockchainService.call_many)
+MULTICALL_CONTRACT_ADDRESS = None  # Địa chỉ Multicall3, None: gửi các eth_call theo JSON-RPC batch
+BLOCKCHAIN_MULTICALL_BATCH_SIZE = 200  # Số lời gọi tối đa trong một lần gọi aggregate3
+
+# Xác thực giấy tờ hàng loạt (POST /api/v1/documents/verify/bulk/)
+DOCUMENT_BULK_VERIFY_MAX_ITEMS = 500  # Số mã giấy tờ/data hash tối đa mỗi request
+DOCUMENT_BULK_VERIFY_CHUNK_SIZE = 100  # Số giấy tờ xác thực trong mỗi lần đọc blockchain
+
+# Cache kết quả đọc contract, được làm mới bởi lệnh invalidate_read_cache
+BLOCKCHAIN_READ_CACHE_ENABLED = True
+BLOCKCHAIN_READ_CACHE_ALIAS = 'default'  # Cache dùng chung giữa các process (Redis)
+BLOCKCHAIN_READ_CACHE_TTL = 300  # Số giây tối đa một kết quả được giữ trong cache dùng chung
+BLOCKCHAIN_READ_CACHE_SIZE = 10000  # Số kết quả tối đa trong LRU của mỗi process
+BLOCKCHAIN_READ_CACHE_LOCAL_TTL = 2  # Số giây LRU trả kết quả mà không kiểm tra lại cache dùng chung
+
+# Tài khoản ký giao dịch: mỗi tài khoản là một lane có nonce riêng, mặc định dùng BLOCKCHAIN_DEFAULT_*
+# Mỗi phần tử là private key hoặc dict {'address', 'private_key', 'max_in_flight'}
+BLOCKCHAIN_SIGNER_ACCOUNTS = [key for key in os.environ.get('BLOCKCHAIN_SIGNER_PRIVATE_KEYS', '').split(',') if key]
+BLOCKCHAIN_SIGNER_MAX_IN_FLIGHT = 16  # Số giao dịch gửi đồng thời tối đa trên mỗi lane trong một process
+# Role mọi tài khoản ký phải được cấp (grantRole) trên DocumentContract, lane thiếu role bị bỏ khi tạo pool
+BLOCKCHAIN_SIGNER_REQUIRED_ROLES = ['OFFICER_ROLE', 'CHAIRMAN_ROLE']
+
+# Hyperledger Fabric
+HYPERLEDGER_SIMULATE = os.environ.get('HYPERLEDGER_SIMULATE', 'True') == 'True'  # Trả kết quả giả lập, không cần mạng Fabric
+HYPERLEDGER_MAX_CONCURRENT_INVOKES = 32  # Số invoke gửi đồng thời tối đa trong một process
+HYPERLEDGER_MAX_CONCURRENT_QUERIES = 128  # Số query gửi đồng thời tối đa trong một process
+HYPERLEDGER_PAGE_SIZE = 50  # Số bản ghi mỗi trang khi duyệt getDocumentsBy*Page (tối đa 200)
+HYPERLEDGER_REQUEST_TIMEOUT = 30  # Thời gian chờ tối đa (giây) của lời gọi đồng bộ
+HYPERLEDGER_SIMULATOR_PROFILE = 'lan'  # Profile độ trễ của ledger giả lập: instant, lan, wan
+HYPERLEDGER_SIMULATOR_SEED = 0
+HYPERLEDGER_SIMULATOR_OVERRIDES = {}  # Ghi đè từng giai đoạn, ví dụ {'endorsement': {'type': 'uniform', 'low': 0.01, 'high': 0.05}}
+HYPERLEDGER_SIMULATOR_ROLE = 'chairman'  # Thuộc tính role của danh tính gửi giao dịch
+HYPERLEDGER_EVENT_CHAINCODES = ['document_contract', 'user_contract', 'admin_contract']  # Chaincode mà listener block theo dõi
+HYPERLEDGER_EVENT_LISTENER_IN_PROCESS = True  # Chạy listener trong process khi dùng ledger giả lập
+HYPERLEDGER_EVENT_RETRY_INTERVAL = 5  # Số giây chờ trước khi kết nối lại event stream
+
+# Ledger adapter (apps.blockchain.services.ledger)
+LEDGER_DEFAULT_NETWORK = 'quorum'  # Mạng mặc định của get_ledger(): quorum hoặc hyperledger
+LEDGER_THREAD_POOL_SIZE = 32  # Số thread chạy lời gọi web3 đồng bộ của QuorumLedger
+LEDGER_POLL_INTERVAL = 2  # Số giây giữa hai lần hỏi block mới khi subscribe trên Quorum
+
+# View async cho endpoint đọc blockchain (api.v1.views.async_blockchain)
+BLOCKCHAIN_ASYNC_VIEWS = True  # Dùng view async (AsyncWeb3) cho các endpoint xác thực và lịch sử giấy tờ
+BLOCKCHAIN_ASYNC_POOL_SIZE = 100  # Số kết nối keep-alive tới node của mỗi event loop
+
+# Deadline và circuit breaker cho lời gọi node (services.deadline, services.circuit_breaker)
+BLOCKCHAIN_REQUEST_BUDGET = 20  # Số giây tối đa một request được dùng cho lời gọi node (header X-Request-Timeout chỉ rút ngắn)
+BLOCKCHAIN_RECEIPT_WAIT_TIMEOUT = 30  # Số giây chờ receipt, quá hạn trả về status 'submitted'
+BLOCKCHAIN_BREAKER_FAILURE_THRESHOLD = 5  # Số lỗi kết nối/timeout liên tiếp trước khi ngừng gọi node
+BLOCKCHAIN_BREAKER_RESET_TIMEOUT = 30  # Số giây ngừng gọi node trước khi thử lại
+BLOCKCHAIN_BREAKER_HALF_OPEN_CALLS = 1  # Số lời gọi thử khi hết thời gian ngừng
+
+# Pool node RPC (services.endpoint_pool)
+WEB3_PROVIDER_URIS = []  # Các node nhận lời gọi đọc, để trống chỉ dùng WEB3_PROVIDER_URI
+WEB3_SEQUENCER_URI = None  # Node nhận giao dịch và lời gọi phụ thuộc nonce, mặc định WEB3_PROVIDER_URI
+BLOCKCHAIN_READ_ATTEMPTS = 2  # Số node đọc được thử cho một lời gọi khi node lỗi kết nối
+BLOCKCHAIN_HEALTH_CHECK_INTERVAL = 5  # Số giây giữa hai lần kiểm tra sức khỏe các node (0 để tắt)
+BLOCKCHAIN_HEALTH_CHECK_TIMEOUT = 2  # Timeout (giây) của lời gọi kiểm tra sức khỏe
+BLOCKCHAIN_MAX_BLOCK_LAG = 5  # Node chậm hơn số block này so với node mới nhất không nhận lời gọi đọc
+
+# Benchmark giao dịch (manage.py benchmark_transactions)
+BLOCKCHAIN_SOLC_VERSION = '0.8.19'  # Phiên bản solc để biên dịch contract trong blockchain/contracts/solidity
+
 # Logging for development
 LOGGING = {
     'version': 1,
@@ -0,0 +1,86 @@
+import copy
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from .hashing import hash_data
+
+
+class DataHashMixin(models.Model):
+    """
+    Lưu data hash (hash_data(hash_payload()), xem utils/hashing.py) vào cột data_hash có index
+
+    Hash chỉ được tính lại trong save() khi một trường trong HASHED_FIELDS thay đổi so với
+    lúc tải từ database, nên calculate_data_hash() của bản ghi chưa sửa chỉ là đọc cột và
+    tìm theo hash là một lần tra index (data_hash__in).
+
+    Model con khai báo HASHED_FIELDS (tên trường mà hash_payload() đọc) và hash_payload().
+    QuerySet.update() trên các trường này bỏ qua save() nên không cập nhật data_hash,
+    chạy lệnh refresh_data_hashes sau khi sửa dữ liệu theo cách đó.
+    """
+    HASHED_FIELDS = ()
+
+    data_hash = models.CharField(_('Data hash'), max_length=64, blank=True, default='', db_index=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._hashed_snapshot = instance._hashed_values()
+        return instance
+
+    def hash_payload(self):
+        raise NotImplementedError
+
+    def compute_data_hash(self):
+        """Tính hash từ dữ liệu hiện tại, không dùng giá trị đã lưu"""
+        return hash_data(self.hash_payload())
+
+    def calculate_data_hash(self):
+        """Hash của dữ liệu hiện tại, đọc từ cột data_hash khi các trường được hash chưa đổi"""
+        if self.data_hash and not self.data_hash_changed():
+            return self.data_hash
+        return self.compute_data_hash()
+
+    def data_hash_changed(self):
+        """Có trường nào trong HASHED_FIELDS khác với lúc tải từ database (hoặc lần save gần nhất) không"""
+        snapshot = getattr(self, '_hashed_snapshot', None)
+        return snapshot is None or snapshot != self._hashed_values()
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        refresh = (
+            (update_fields is None or not set(update_fields).isdisjoint({*self.HASHED_FIELDS, *self._hashed_attnames()})) and
+            (not self.data_hash or self.data_hash_changed())
+        )
+        # Hash có thể phụ thuộc khóa chính tự tăng, chỉ có sau khi insert
+        after_insert = refresh and self.pk is None
+
+        if refresh and not after_insert:
+            self.data_hash = self.compute_data_hash()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'data_hash'}
+
+        super().save(*args, **kwargs)
+
+        if after_insert:
+            self.data_hash = self.compute_data_hash()
+            type(self)._base_manager.using(self._state.db).filter(pk=self.pk).update(data_hash=self.data_hash)
+        if update_fields is None or refresh:
+            self._hashed_snapshot = self._hashed_values()
+
+    def _hashed_values(self):
+        if not self.get_deferred_fields().isdisjoint(self._hashed_attnames()):
+            # Không đọc trường bị defer (mỗi trường một truy vấn), coi như đã thay đổi
+            return None
+        values = []
+        for attname in self._hashed_attnames():
+            value = getattr(self, attname)
+            # JSONField có thể bị sửa tại chỗ
+            values.append(copy.deepcopy(value) if isinstance(value, (dict, list)) else value)
+        return tuple(values)
+
+    @classmethod
+    def _hashed_attnames(cls):
+        return tuple(cls._meta.get_field(name).attname for name in cls.HASHED_FIELDS)
@@ -0,0 +1,153 @@
+import datetime
+import hashlib
+import json
+import math
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from django.conf import settings
+
+# Mã hóa chuẩn (canonical) và hash dữ liệu gửi lên blockchain
+#
+# Đặc tả, dùng chung cho mọi nơi tạo data hash (model, BlockchainService):
+#
+# - dict/list/tuple được mã hóa JSON với key sắp xếp tăng dần, phân cách ', ' và ': ', ký tự
+#   ngoài ASCII viết dạng \uXXXX (đúng kết quả json.dumps(..., sort_keys=True) trước đây,
+#   nên hash đã lưu và đã ghi lên chain không đổi)
+# - date, datetime, time viết theo ISO 8601 (isoformat()), datetime giữ múi giờ và micro giây
+# - UUID và Decimal viết thành chuỗi, bytes thành chuỗi hex, set thành danh sách đã sắp xếp
+# - NaN và Infinity không hợp lệ
+# - str được hash nguyên văn (UTF-8), bytes hash nguyên văn, kiểu khác hash str(value)
+#
+# Hash là SHA-256 dạng hex của chuỗi UTF-8 trên.
+
+# hashlib nhả GIL khi dữ liệu từ 2048 byte trở lên (HASHLIB_GIL_MINSIZE), dữ liệu nhỏ hơn hash trong thread gọi
+GIL_RELEASE_SIZE = 2048
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _default(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not canonically serializable")
+
+
+# Encoder dựng một lần, dùng bộ mã hóa C của module json (_json.c_make_encoder) vì không có indent.
+# json.dumps với tham số khác mặc định tạo JSONEncoder mới ở mỗi lần gọi.
+_ENCODER = json.JSONEncoder(sort_keys=True, allow_nan=False, check_circular=False, default=_default)
+
+
+def canonical_json(value):
+    """
+    Chuỗi JSON chuẩn của value theo đặc tả của module
+    """
+    return _ENCODER.encode(value)
+
+
+def canonical_bytes(value):
+    """
+    Dữ liệu được hash: JSON chuẩn cho dict/list/tuple, str/bytes nguyên văn, kiểu khác str(value)
+    """
+    if isinstance(value, (dict, list, tuple)):
+        value = _ENCODER.encode(value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    elif not isinstance(value, str):
+        value = str(value)
+    return value.encode('utf-8')
+
+
+def hash_data(value):
+    """
+    SHA-256 (hex) của canonical_bytes(value)
+    """
+    return hashlib.sha256(canonical_bytes(value)).hexdigest()
+
+
+def hash_data_many(values, workers=None):
+    """
+    Hash nhiều giá trị, cùng kết quả với [hash_data(value) for value in values]
+
+    Mã hóa JSON cần GIL nên chạy trong thread gọi; các bản ghi từ GIL_RELEASE_SIZE byte trở lên
+    được chia thành từng nhóm và hash song song trên thread pool.
+
+    :param workers: Số thread, mặc định DATA_HASH_WORKERS; 1 là không dùng thread pool
+    """
+    encoded = [canonical_bytes(value) for value in values]
+    workers = workers or getattr(settings, 'DATA_HASH_WORKERS', 4)
+
+    results = [None] * len(encoded)
+    large = [index for index, data in enumerate(encoded) if len(data) >= GIL_RELEASE_SIZE]
+    groups, hashed = [], []
+    if workers > 1 and len(large) > 1:
+        size = math.ceil(len(large) / workers)
+        groups = [large[start:start + size] for start in range(0, len(large), size)]
+        hashed = _get_executor(workers).map(_hash_group, [[encoded[index] for index in group] for group in groups])
+
+    # Các bản ghi không gửi vào pool được hash trong lúc chờ pool
+    for index, data in enumerate(encoded):
+        if not groups or len(data) < GIL_RELEASE_SIZE:
+            results[index] = hashlib.sha256(data).hexdigest()
+
+    for group, digests in zip(groups, hashed):
+        for index, digest in zip(group, digests):
+            results[index] = digest
+    return results
+
+
+class StreamHasher:
+    """
+    SHA-256 tính dần theo từng đoạn dữ liệu (file upload)
+
+    Đoạn từ GIL_RELEASE_SIZE byte trở lên được hash trên thread pool, mỗi hasher có tối đa một
+    đoạn đang chờ nên thứ tự được giữ nguyên, còn thread gọi tiếp tục đọc/ghi đoạn sau. Nhiều
+    file cùng một request dùng chung pool nên được hash song song.
+
+    :param workers: Số thread, mặc định DATA_HASH_WORKERS; 1 là hash ngay trong thread gọi
+    """
+
+    def __init__(self, workers=None):
+        self.size = 0
+        self._workers = workers or getattr(settings, 'DATA_HASH_WORKERS', 4)
+        self._sha256 = hashlib.sha256()
+        self._pending = None
+
+    def update(self, data):
+        self.size += len(data)
+        self._wait()
+        if self._workers > 1 and len(data) >= GIL_RELEASE_SIZE:
+            self._pending = _get_executor(self._workers).submit(self._sha256.update, data)
+        else:
+            self._sha256.update(data)
+
+    def hexdigest(self):
+        self._wait()
+        return self._sha256.hexdigest()
+
+    def _wait(self):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            pending.result()
+
+
+def _hash_group(items):
+    return [hashlib.sha256(data).hexdigest() for data in items]
+
+
+def _get_executor(workers):
+    executor = _executors.get(workers)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(workers)
+            if executor is None:
+                executor = _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data-hash')
+    return executor
@@ -0,0 +1,144 @@
+import mimetypes
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+from .hashing import StreamHasher
+
+# Upload handler tính SHA-256, kích thước và loại file (MIME) ngay khi dữ liệu được nhận,
+# để model không phải đọc lại file đã ghi xuống đĩa. Khai báo trong FILE_UPLOAD_HANDLERS
+# thay cho handler mặc định của Django; file nhận được có thêm thuộc tính:
+#
+# - digest: StreamHasher của nội dung file (digest.hexdigest(), digest.size)
+# - sniffed_content_type: loại file đoán từ các byte đầu, xem sniff_content_type()
+
+# Số byte đầu file giữ lại để đoán loại file
+SNIFF_BYTES = 64
+
+# (byte đầu, loại file)
+_SIGNATURES = [
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'II*\x00', 'image/tiff'),
+    (b'MM\x00*', 'image/tiff'),
+    (b'BM', 'image/bmp'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', 'application/x-ole-storage'),
+]
+
+# Định dạng vỏ chứa: docx/xlsx/odt là zip, doc/xls là OLE, nên ưu tiên loại đoán từ tên file
+_CONTAINERS = {'application/zip', 'application/x-ole-storage'}
+
+
+def sniff_content_type(head, name=None, default=None):
+    """
+    Đoán loại file từ các byte đầu, sau đó từ phần mở rộng của tên file, sau cùng là default
+    (loại file trình duyệt gửi lên)
+    """
+    sniffed = None
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        sniffed = 'image/webp'
+    else:
+        for signature, content_type in _SIGNATURES:
+            if head.startswith(signature):
+                sniffed = content_type
+                break
+
+    guessed = mimetypes.guess_type(name)[0] if name else None
+    if sniffed in _CONTAINERS and guessed:
+        return guessed
+    return sniffed or guessed or default or 'application/octet-stream'
+
+
+class HashingUploadMixin:
+    """
+    Hash dữ liệu trong receive_data_chunk() trước khi handler gốc ghi vào bộ nhớ hoặc file tạm
+    """
+
+    def stores_file(self):
+        return True
+
+    def new_file(self, *args, **kwargs):
+        # MemoryFileUploadHandler.new_file() dừng chuỗi handler bằng StopFutureHandlers,
+        # nên phải khởi tạo trước khi gọi super()
+        self.digest = StreamHasher() if self.stores_file() else None
+        self.head = b''
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.digest is not None:
+            self.digest.update(raw_data)
+            if len(self.head) < SNIFF_BYTES:
+                self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        uploaded = super().file_complete(file_size)
+        if uploaded is not None and self.digest is not None:
+            # Không gọi hexdigest() ở đây: đoạn cuối tiếp tục hash trong lúc nhận file sau
+            uploaded.digest = self.digest
+            uploaded.sniffed_content_type = sniff_content_type(self.head, uploaded.name, uploaded.content_type)
+        return uploaded
+
+
+class HashingMemoryFileUploadHandler(HashingUploadMixin, MemoryFileUploadHandler):
+    def stores_file(self):
+        # Request lớn hơn FILE_UPLOAD_MAX_MEMORY_SIZE được chuyển cho handler sau
+        return self.activated
+
+
+class HashingTemporaryFileUploadHandler(HashingUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+class StagedUploadedFile(UploadedFile):
+    """
+    File đã ghi sẵn trên đĩa (upload nhiều phần), dùng như file upload thông thường
+
+    Có temporary_file_path() nên FileSystemStorage chuyển (rename) file thay vì chép lại;
+    digest và sniffed_content_type giống file nhận qua các handler ở trên.
+    """
+
+    def __init__(self, path, name, digest, sniffed_content_type):
+        super().__init__(open(path, 'rb'), name, sniffed_content_type, digest.size)
+        self.path = path
+        self.digest = digest
+        self.sniffed_content_type = sniffed_content_type
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def file_digest(field_file):
+    """
+    SHA-256, kích thước và loại file của một FileField
+
+    File vừa upload qua các handler ở trên dùng kết quả đã tính khi nhận dữ liệu; trường hợp
+    khác (file tạo trong code, file đã lưu) đọc file một lần.
+
+    :return: dict với sha256, size, content_type
+    """
+    uploaded = field_file.file if not field_file._committed else None
+    digest = getattr(uploaded, 'digest', None)
+    if digest is not None:
+        return {
+            'sha256': digest.hexdigest(),
+            'size': digest.size,
+            'content_type': uploaded.sniffed_content_type,
+        }
+
+    digest = StreamHasher()
+    head = b''
+    for chunk in field_file.chunks():
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        digest.update(chunk)
+        if len(head) < SNIFF_BYTES:
+            head += chunk[:SNIFF_BYTES - len(head)]
+    return {
+        'sha256': digest.hexdigest(),
+        'size': digest.size,
+        'content_type': sniff_content_type(head, field_file.name, getattr(uploaded, 'content_type', None)),
+    }
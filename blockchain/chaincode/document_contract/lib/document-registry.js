@@ -11,6 +11,13 @@ const DocumentState = {
   REVOKED: 'REVOKED'
 };
 
+// Value of the docType field that marks document records in the world state
+const DOC_TYPE = 'document';
+
+// Page size limits for the paginated queries
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+
 class DocumentRegistry extends Contract {
   
   /**
@@ -51,6 +58,7 @@ class DocumentRegistry extends Contract {
     
     // Create document object
     const document = {
+      docType: DOC_TYPE,
       documentId,
       documentType,
       citizenId,
@@ -436,6 +444,91 @@ class DocumentRegistry extends Contract {
     return JSON.stringify(documents);
   }
   
+  /**
+   * Get one page of a citizen's documents, newest first
+   * @param {Context} ctx transaction context
+   * @param {String} citizenId ID of the citizen
+   * @param {String} pageSize maximum number of documents in the page
+   * @param {String} bookmark bookmark returned by the previous page, empty for the first page
+   */
+  async getDocumentsByCitizenPage(ctx, citizenId, pageSize, bookmark) {
+    console.info('============= Get Documents By Citizen Page =============');
+    return this._queryDocumentsPage(ctx, { citizenId }, 'indexCitizenDoc', pageSize, bookmark);
+  }
+  
+  /**
+   * Get one page of the documents in a state, newest first
+   * @param {Context} ctx transaction context
+   * @param {String} state document state to filter by
+   * @param {String} pageSize maximum number of documents in the page
+   * @param {String} bookmark bookmark returned by the previous page, empty for the first page
+   */
+  async getDocumentsByStatePage(ctx, state, pageSize, bookmark) {
+    console.info('============= Get Documents By State Page =============');
+    return this._queryDocumentsPage(ctx, { state }, 'indexStateDoc', pageSize, bookmark);
+  }
+  
+  /**
+   * Get one page of all documents, newest first
+   * @param {Context} ctx transaction context
+   * @param {String} pageSize maximum number of documents in the page
+   * @param {String} bookmark bookmark returned by the previous page, empty for the first page
+   */
+  async getDocumentsPage(ctx, pageSize, bookmark) {
+    console.info('============= Get Documents Page =============');
+    return this._queryDocumentsPage(ctx, {}, 'indexDocTypeDoc', pageSize, bookmark);
+  }
+  
+  /**
+   * Run a paginated rich query over document records using one of the
+   * indexes in META-INF/statedb/couchdb/indexes
+   *
+   * Only records written with a docType field are returned.
+   *
+   * @param {Context} ctx transaction context
+   * @param {Object} selector fields to match in addition to docType
+   * @param {String} designDoc design document of the index to use
+   * @param {String} pageSize maximum number of documents in the page
+   * @param {String} bookmark bookmark returned by the previous page
+   * @returns {String} JSON with records, bookmark (empty when there are no more pages) and fetchedRecordsCount
+   */
+  async _queryDocumentsPage(ctx, selector, designDoc, pageSize, bookmark) {
+    const size = Math.min(parseInt(pageSize, 10) || DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE);
+    if (size < 1) {
+      throw new Error(`Invalid page size ${pageSize}`);
+    }
+    
+    // CouchDB only serves a sort from an index when every indexed field is sorted in the same direction
+    const fields = ['docType', ...Object.keys(selector), 'createdAt'];
+    const query = {
+      selector: { docType: DOC_TYPE, ...selector },
+      sort: fields.map(field => ({ [field]: 'desc' })),
+      use_index: [`_design/${designDoc}`]
+    };
+    
+    const { iterator, metadata } = await ctx.stub.getQueryResultWithPagination(
+      JSON.stringify(query), size, bookmark || ''
+    );
+    
+    const records = [];
+    try {
+      let result = await iterator.next();
+      while (!result.done) {
+        records.push(JSON.parse(Buffer.from(result.value.value.toString()).toString('utf8')));
+        result = await iterator.next();
+      }
+    } finally {
+      await iterator.close();
+    }
+    
+    // A short page is the last one, CouchDB still returns a bookmark for it
+    return JSON.stringify({
+      records,
+      fetchedRecordsCount: metadata.fetchedRecordsCount,
+      bookmark: records.length < size ? '' : metadata.bookmark
+    });
+  }
+  
   /**
    * Get document history
    * @param {Context} ctx transaction context
@@ -344,4 +344,78 @@ describe('Document Contract', () => {
       expect(result).to.have.property('isValid').that.equals(true);
     });
   });
+  
+  describe('#getDocumentsByCitizenPage', () => {
+    // Iterator over the given documents, like the one returned by getQueryResultWithPagination
+    const pageIterator = (documents) => {
+      const items = documents.map(document => ({ value: { value: Buffer.from(JSON.stringify(document)) } }));
+      const iterator = { close: sinon.stub().resolves() };
+      iterator.next = sinon.stub();
+      items.forEach((item, index) => iterator.next.onCall(index).resolves({ value: item, done: false }));
+      iterator.next.onCall(items.length).resolves({ done: true });
+      return iterator;
+    };
+    
+    it('should query the citizen index and return the bookmark of a full page', async () => {
+      // Setup
+      const documents = [
+        { docType: 'document', documentId: 'DOC002', citizenId: 'CIT001', createdAt: '2023-01-02T00:00:00.000Z' },
+        { docType: 'document', documentId: 'DOC001', citizenId: 'CIT001', createdAt: '2023-01-01T00:00:00.000Z' }
+      ];
+      const iterator = pageIterator(documents);
+      
+      // Mock
+      mockStub.getQueryResultWithPagination.resolves({
+        iterator,
+        metadata: { fetchedRecordsCount: 2, bookmark: 'bookmark1' }
+      });
+      
+      // Execute
+      const result = JSON.parse(await contract.getDocumentsByCitizenPage(ctx, 'CIT001', '2', ''));
+      
+      // Assertions
+      const [queryString, pageSize, bookmark] = mockStub.getQueryResultWithPagination.firstCall.args;
+      const query = JSON.parse(queryString);
+      expect(query.selector).to.deep.equal({ docType: 'document', citizenId: 'CIT001' });
+      expect(query.sort).to.deep.equal([{ docType: 'desc' }, { citizenId: 'desc' }, { createdAt: 'desc' }]);
+      expect(query.use_index).to.deep.equal(['_design/indexCitizenDoc']);
+      expect(pageSize).to.equal(2);
+      expect(bookmark).to.equal('');
+      expect(result.records).to.deep.equal(documents);
+      expect(result.bookmark).to.equal('bookmark1');
+      expect(iterator.close).to.have.been.calledOnce;
+    });
+    
+    it('should return an empty bookmark for the last page', async () => {
+      // Mock
+      mockStub.getQueryResultWithPagination.resolves({
+        iterator: pageIterator([{ docType: 'document', documentId: 'DOC001', state: 'DRAFT' }]),
+        metadata: { fetchedRecordsCount: 1, bookmark: 'bookmark2' }
+      });
+      
+      // Execute
+      const result = JSON.parse(await contract.getDocumentsByStatePage(ctx, 'DRAFT', '50', 'bookmark1'));
+      
+      // Assertions
+      const [queryString, , bookmark] = mockStub.getQueryResultWithPagination.firstCall.args;
+      expect(JSON.parse(queryString).use_index).to.deep.equal(['_design/indexStateDoc']);
+      expect(bookmark).to.equal('bookmark1');
+      expect(result.records).to.have.lengthOf(1);
+      expect(result.bookmark).to.equal('');
+    });
+    
+    it('should cap the page size', async () => {
+      // Mock
+      mockStub.getQueryResultWithPagination.resolves({
+        iterator: pageIterator([]),
+        metadata: { fetchedRecordsCount: 0, bookmark: '' }
+      });
+      
+      // Execute
+      await contract.getDocumentsByCitizenPage(ctx, 'CIT001', '100000', '');
+      
+      // Assertions
+      expect(mockStub.getQueryResultWithPagination.firstCall.args[1]).to.equal(200);
+    });
+  });
 });
@@ -13,6 +13,9 @@ contract DocumentContract is AccessControl, Pausable {
     bytes32 public constant CHAIRMAN_ROLE = keccak256("CHAIRMAN_ROLE");
     bytes32 public constant OFFICER_ROLE = keccak256("OFFICER_ROLE");
     
+    // Số giấy tờ tối đa của một trang trong các hàm *Page
+    uint256 public constant MAX_PAGE_SIZE = 100;
+    
     // Document states
     enum DocumentState { DRAFT, PENDING_APPROVAL, ACTIVE, REVOKED, EXPIRED }
     
@@ -36,6 +39,18 @@ contract DocumentContract is AccessControl, Pausable {
         string revocationReason;
     }
     
+    // Input structure of createDocuments
+    struct DocumentInput {
+        string documentId;
+        string documentType;
+        string citizenId;
+        string issuedBy;
+        string issueDate;
+        string validUntil;
+        string dataHash;
+        string metadata;
+    }
+    
     // History record structure
     struct HistoryRecord {
         string action;
@@ -55,6 +70,12 @@ contract DocumentContract is AccessControl, Pausable {
     // Mapping from citizenId to their documents
     mapping(string => string[]) private citizenDocuments;
     
+    // Mapping from state to ids of documents currently in that state
+    mapping(DocumentState => string[]) private stateDocuments;
+    
+    // Mapping from documentId to its position + 1 in stateDocuments of its current state
+    mapping(string => uint256) private stateDocumentPositions;
+    
     // Events
     event DocumentCreated(string documentId, string documentType, string citizenId, string issuedBy, string txId);
     event DocumentSubmitted(string documentId, string userId, string txId);
@@ -108,11 +129,7 @@ contract DocumentContract is AccessControl, Pausable {
         string memory dataHash,
         string memory metadata
     ) public whenNotPaused onlyRole(OFFICER_ROLE) {
-        // Check if document already exists
-        require(bytes(documents[documentId].documentId).length == 0, "Document already exists");
-        
-        // Create new document
-        Document memory newDoc = Document({
+        _createDocument(DocumentInput({
             documentId: documentId,
             documentType: documentType,
             citizenId: citizenId,
@@ -120,37 +137,21 @@ contract DocumentContract is AccessControl, Pausable {
             issueDate: issueDate,
             validUntil: validUntil,
             dataHash: dataHash,
-            metadata: metadata,
-            state: DocumentState.DRAFT,
-            createdAt: block.timestamp,
-            updatedAt: block.timestamp,
-            approvedBy: "",
-            approvedAt: 0,
-            revokedBy: "",
-            revokedAt: 0,
-            revocationReason: ""
-        });
-        
-        // Store document
-        documents[documentId] = newDoc;
-        
-        // Add to citizen's documents
-        citizenDocuments[citizenId].push(documentId);
-        
-        // Create history record
-        HistoryRecord memory historyRecord = HistoryRecord({
-            action: "CREATE",
-            timestamp: block.timestamp,
-            userId: issuedBy,
-            userRole: "officer",
-            comments: "",
-            txId: _generateTxId()
-        });
-        
-        documentHistory[documentId].push(historyRecord);
+            metadata: metadata
+        }));
+    }
+    
+    /**
+     * @dev Create many documents in one transaction
+     * @param inputs Danh sách giấy tờ, mỗi giấy tờ phát một event DocumentCreated
+     * @notice Cả lô bị revert nếu một giấy tờ đã tồn tại
+     */
+    function createDocuments(DocumentInput[] memory inputs) public whenNotPaused onlyRole(OFFICER_ROLE) {
+        require(inputs.length > 0, "Empty batch");
         
-        // Emit event
-        emit DocumentCreated(documentId, documentType, citizenId, issuedBy, historyRecord.txId);
+        for (uint i = 0; i < inputs.length; i++) {
+            _createDocument(inputs[i]);
+        }
     }
     
     /**
@@ -165,7 +166,7 @@ contract DocumentContract is AccessControl, Pausable {
         require(documents[documentId].state == DocumentState.DRAFT, "Document must be in DRAFT state");
         
         // Update document state
-        documents[documentId].state = DocumentState.PENDING_APPROVAL;
+        _setState(documentId, DocumentState.PENDING_APPROVAL);
         documents[documentId].updatedAt = block.timestamp;
         
         // Create history record
@@ -195,45 +196,38 @@ contract DocumentContract is AccessControl, Pausable {
         string memory approverId,
         string memory comments
     ) public whenNotPaused {
-        // Check if document exists
-        require(bytes(documents[documentId].documentId).length > 0, "Document does not exist");
-        
-        // Check if document is in PENDING_APPROVAL state
-        require(documents[documentId].state == DocumentState.PENDING_APPROVAL, "Document must be in PENDING_APPROVAL state");
-        
         // Check approver role
         bool isChairman = hasRole(CHAIRMAN_ROLE, msg.sender);
         bool isOfficer = hasRole(OFFICER_ROLE, msg.sender);
         
         require(isChairman || isOfficer, "Only chairman or officer can approve documents");
         
-        // Check if document requires chairman approval
-        bool requiresChairmanApproval = _documentRequiresChairmanApproval(documentId);
-        
-        if (requiresChairmanApproval) {
-            require(isChairman, "This document requires chairman approval");
-        }
-        
-        // Update document state
-        documents[documentId].state = DocumentState.ACTIVE;
-        documents[documentId].updatedAt = block.timestamp;
-        documents[documentId].approvedBy = approverId;
-        documents[documentId].approvedAt = block.timestamp;
+        _approveDocument(documentId, approverId, comments, isChairman);
+    }
+    
+    /**
+     * @dev Approve many documents in one transaction
+     * @param documentIds Danh sách ID giấy tờ, mỗi giấy tờ phát một event DocumentApproved
+     * @param approverId ID của người phê duyệt
+     * @param comments Ghi chú khi phê duyệt
+     * @notice Cả lô bị revert nếu một giấy tờ không thể phê duyệt
+     */
+    function approveDocuments(
+        string[] memory documentIds,
+        string memory approverId,
+        string memory comments
+    ) public whenNotPaused {
+        require(documentIds.length > 0, "Empty batch");
         
-        // Create history record
-        HistoryRecord memory historyRecord = HistoryRecord({
-            action: "APPROVE",
-            timestamp: block.timestamp,
-            userId: approverId,
-            userRole: isChairman ? "chairman" : "officer",
-            comments: comments,
-            txId: _generateTxId()
-        });
+        // Check approver role
+        bool isChairman = hasRole(CHAIRMAN_ROLE, msg.sender);
+        bool isOfficer = hasRole(OFFICER_ROLE, msg.sender);
         
-        documentHistory[documentId].push(historyRecord);
+        require(isChairman || isOfficer, "Only chairman or officer can approve documents");
         
-        // Emit event
-        emit DocumentApproved(documentId, approverId, historyRecord.txId);
+        for (uint i = 0; i < documentIds.length; i++) {
+            _approveDocument(documentIds[i], approverId, comments, isChairman);
+        }
     }
     
     /**
@@ -260,7 +254,7 @@ contract DocumentContract is AccessControl, Pausable {
         require(isChairman || isOfficer, "Only chairman or officer can reject documents");
         
         // Update document state
-        documents[documentId].state = DocumentState.DRAFT;
+        _setState(documentId, DocumentState.DRAFT);
         documents[documentId].updatedAt = block.timestamp;
         
         // Create history record
@@ -303,7 +297,7 @@ contract DocumentContract is AccessControl, Pausable {
         require(isChairman || isOfficer, "Only chairman or officer can revoke documents");
         
         // Update document state
-        documents[documentId].state = DocumentState.REVOKED;
+        _setState(documentId, DocumentState.REVOKED);
         documents[documentId].updatedAt = block.timestamp;
         documents[documentId].revokedBy = revokerId;
         documents[documentId].revokedAt = block.timestamp;
@@ -343,7 +337,7 @@ contract DocumentContract is AccessControl, Pausable {
         DocumentState oldState = documents[documentId].state;
         
         // Update document state
-        documents[documentId].state = newState;
+        _setState(documentId, newState);
         documents[documentId].updatedAt = block.timestamp;
         
         // Create history record
@@ -452,21 +446,71 @@ contract DocumentContract is AccessControl, Pausable {
      * @dev Get documents by state
      * @param state Trạng thái giấy tờ
      * @return Document[] Danh sách giấy tờ
+     * @notice Trả về toàn bộ danh sách, dùng getDocumentsByStatePage khi số giấy tờ lớn
      */
     function getDocumentsByState(DocumentState state) public view returns (Document[] memory) {
-        // Count documents with the specified state
-        uint count = 0;
-        string[] memory allDocIds = new string[](1000); // Assume max 1000 docs for simplicity
-        uint docCount = 0;
+        string[] storage docIds = stateDocuments[state];
+        Document[] memory result = new Document[](docIds.length);
         
-        // This is inefficient in Solidity, but necessary due to lack of iteration over mappings
-        // In a production environment, you would use events or a better data structure
+        for (uint i = 0; i < docIds.length; i++) {
+            result[i] = documents[docIds[i]];
+        }
         
-        // For demo purposes, just return an empty array
-        Document[] memory result = new Document[](count);
         return result;
     }
     
+    /**
+     * @dev Get one page of a citizen's documents, in creation order
+     * @param citizenId ID của công dân
+     * @param cursor Vị trí bắt đầu, 0 cho trang đầu
+     * @param limit Số giấy tờ tối đa của trang (1..MAX_PAGE_SIZE)
+     * @return page Giấy tờ của trang
+     * @return nextCursor Cursor của trang tiếp theo, 0 khi đã hết
+     */
+    function getDocumentsByCitizenPage(string memory citizenId, uint256 cursor, uint256 limit)
+        public
+        view
+        returns (Document[] memory page, uint256 nextCursor)
+    {
+        return _page(citizenDocuments[citizenId], cursor, limit);
+    }
+    
+    /**
+     * @dev Get one page of the documents in a state
+     * @param state Trạng thái giấy tờ
+     * @param cursor Vị trí bắt đầu, 0 cho trang đầu
+     * @param limit Số giấy tờ tối đa của trang (1..MAX_PAGE_SIZE)
+     * @return page Giấy tờ của trang
+     * @return nextCursor Cursor của trang tiếp theo, 0 khi đã hết
+     * @notice Thứ tự trong một trạng thái thay đổi khi giấy tờ chuyển trạng thái,
+     *         giấy tờ đổi trạng thái giữa hai trang có thể bị bỏ sót hoặc trả về hai lần
+     */
+    function getDocumentsByStatePage(DocumentState state, uint256 cursor, uint256 limit)
+        public
+        view
+        returns (Document[] memory page, uint256 nextCursor)
+    {
+        return _page(stateDocuments[state], cursor, limit);
+    }
+    
+    /**
+     * @dev Count documents of a citizen
+     * @param citizenId ID của công dân
+     * @return uint256 Số giấy tờ
+     */
+    function countDocumentsByCitizen(string memory citizenId) public view returns (uint256) {
+        return citizenDocuments[citizenId].length;
+    }
+    
+    /**
+     * @dev Count documents in a state
+     * @param state Trạng thái giấy tờ
+     * @return uint256 Số giấy tờ
+     */
+    function countDocumentsByState(DocumentState state) public view returns (uint256) {
+        return stateDocuments[state].length;
+    }
+    
     /**
      * @dev Get document history
      * @param documentId ID của giấy tờ
@@ -477,6 +521,166 @@ contract DocumentContract is AccessControl, Pausable {
         return documentHistory[documentId];
     }
     
+    /**
+     * @dev Store a new document
+     * @param input Thông tin giấy tờ
+     */
+    function _createDocument(DocumentInput memory input) private {
+        // Check if document already exists
+        require(bytes(documents[input.documentId].documentId).length == 0, "Document already exists");
+        
+        // Create new document
+        Document memory newDoc = Document({
+            documentId: input.documentId,
+            documentType: input.documentType,
+            citizenId: input.citizenId,
+            issuedBy: input.issuedBy,
+            issueDate: input.issueDate,
+            validUntil: input.validUntil,
+            dataHash: input.dataHash,
+            metadata: input.metadata,
+            state: DocumentState.DRAFT,
+            createdAt: block.timestamp,
+            updatedAt: block.timestamp,
+            approvedBy: "",
+            approvedAt: 0,
+            revokedBy: "",
+            revokedAt: 0,
+            revocationReason: ""
+        });
+        
+        // Store document
+        documents[input.documentId] = newDoc;
+        
+        // Add to citizen's documents
+        citizenDocuments[input.citizenId].push(input.documentId);
+        
+        // Add to state index
+        stateDocuments[DocumentState.DRAFT].push(input.documentId);
+        stateDocumentPositions[input.documentId] = stateDocuments[DocumentState.DRAFT].length;
+        
+        // Create history record
+        HistoryRecord memory historyRecord = HistoryRecord({
+            action: "CREATE",
+            timestamp: block.timestamp,
+            userId: input.issuedBy,
+            userRole: "officer",
+            comments: "",
+            txId: _generateTxId()
+        });
+        
+        documentHistory[input.documentId].push(historyRecord);
+        
+        // Emit event
+        emit DocumentCreated(input.documentId, input.documentType, input.citizenId, input.issuedBy, historyRecord.txId);
+    }
+    
+    /**
+     * @dev Approve a document (caller role already checked)
+     * @param documentId ID của giấy tờ
+     * @param approverId ID của người phê duyệt
+     * @param comments Ghi chú khi phê duyệt
+     * @param isChairman Người gọi có CHAIRMAN_ROLE không
+     */
+    function _approveDocument(
+        string memory documentId,
+        string memory approverId,
+        string memory comments,
+        bool isChairman
+    ) private {
+        // Check if document exists
+        require(bytes(documents[documentId].documentId).length > 0, "Document does not exist");
+        
+        // Check if document is in PENDING_APPROVAL state
+        require(documents[documentId].state == DocumentState.PENDING_APPROVAL, "Document must be in PENDING_APPROVAL state");
+        
+        // Check if document requires chairman approval
+        bool requiresChairmanApproval = _documentRequiresChairmanApproval(documentId);
+        
+        if (requiresChairmanApproval) {
+            require(isChairman, "This document requires chairman approval");
+        }
+        
+        // Update document state
+        _setState(documentId, DocumentState.ACTIVE);
+        documents[documentId].updatedAt = block.timestamp;
+        documents[documentId].approvedBy = approverId;
+        documents[documentId].approvedAt = block.timestamp;
+        
+        // Create history record
+        HistoryRecord memory historyRecord = HistoryRecord({
+            action: "APPROVE",
+            timestamp: block.timestamp,
+            userId: approverId,
+            userRole: isChairman ? "chairman" : "officer",
+            comments: comments,
+            txId: _generateTxId()
+        });
+        
+        documentHistory[documentId].push(historyRecord);
+        
+        // Emit event
+        emit DocumentApproved(documentId, approverId, historyRecord.txId);
+    }
+    
+    /**
+     * @dev Move a document to a new state and keep stateDocuments in sync
+     * @param documentId ID của giấy tờ
+     * @param newState Trạng thái mới
+     */
+    function _setState(string memory documentId, DocumentState newState) private {
+        DocumentState oldState = documents[documentId].state;
+        if (oldState == newState) {
+            return;
+        }
+        
+        // Remove from the old state's list by moving its last id into the freed slot
+        string[] storage oldIds = stateDocuments[oldState];
+        uint256 position = stateDocumentPositions[documentId];
+        if (position > 0) {
+            string memory lastId = oldIds[oldIds.length - 1];
+            oldIds[position - 1] = lastId;
+            stateDocumentPositions[lastId] = position;
+            oldIds.pop();
+        }
+        
+        stateDocuments[newState].push(documentId);
+        stateDocumentPositions[documentId] = stateDocuments[newState].length;
+        documents[documentId].state = newState;
+    }
+    
+    /**
+     * @dev Slice an id list into a page of documents
+     * @param docIds Danh sách id
+     * @param cursor Vị trí bắt đầu
+     * @param limit Số giấy tờ tối đa của trang
+     * @return page Giấy tờ của trang
+     * @return nextCursor Cursor của trang tiếp theo, 0 khi đã hết
+     */
+    function _page(string[] storage docIds, uint256 cursor, uint256 limit)
+        private
+        view
+        returns (Document[] memory page, uint256 nextCursor)
+    {
+        require(limit > 0 && limit <= MAX_PAGE_SIZE, "Invalid page size");
+        
+        if (cursor >= docIds.length) {
+            return (new Document[](0), 0);
+        }
+        
+        uint256 end = cursor + limit;
+        if (end > docIds.length) {
+            end = docIds.length;
+        }
+        
+        page = new Document[](end - cursor);
+        for (uint256 i = cursor; i < end; i++) {
+            page[i - cursor] = documents[docIds[i]];
+        }
+        
+        nextCursor = end < docIds.length ? end : 0;
+    }
+    
     /**
      * @dev Check if document requires chairman approval
      * @param documentId ID của giấy tờ
@@ -36,6 +36,17 @@ contract UserContract is AccessControl, Pausable {
         uint256 approvedToChairmanAt;
     }
     
+    // Input structure of registerUsers
+    struct UserInput {
+        string userId;
+        string role;
+        string name;
+        string email;
+        string createdBy;
+        string status;
+        string metadata;
+    }
+    
     // History record structure
     struct HistoryRecord {
         string action;
@@ -101,43 +112,28 @@ contract UserContract is AccessControl, Pausable {
         string memory status,
         string memory metadata
     ) public whenNotPaused {
-        // Check if user already exists
-        require(bytes(users[userId].userId).length == 0, "User already exists");
-        
-        // Create new user
-        User memory newUser = User({
+        _registerUser(UserInput({
             userId: userId,
             role: role,
             name: name,
             email: email,
-            dataHash: _createHash(string(abi.encodePacked(userId, ":", role, ":", name, ":", email))),
-            state: _stringToUserState(status),
-            metadata: metadata,
-            documents: new string[](0),
             createdBy: createdBy,
-            createdAt: block.timestamp,
-            updatedAt: block.timestamp,
-            approvedToChairmanBy: "",
-            approvedToChairmanAt: 0
-        });
-        
-        // Store user
-        users[userId] = newUser;
-        
-        // Create history record
-        HistoryRecord memory historyRecord = HistoryRecord({
-            action: "REGISTER",
-            timestamp: block.timestamp,
-            by: createdBy,
-            oldRole: "",
-            newRole: role,
-            txId: _generateTxId()
-        });
-        
-        userHistory[userId].push(historyRecord);
+            status: status,
+            metadata: metadata
+        }));
+    }
+    
+    /**
+     * @dev Register many users in one transaction
+     * @param inputs Danh sách người dùng, mỗi người dùng phát một event UserRegistered
+     * @notice Cả lô bị revert nếu một người dùng đã tồn tại
+     */
+    function registerUsers(UserInput[] memory inputs) public whenNotPaused {
+        require(inputs.length > 0, "Empty batch");
         
-        // Emit event
-        emit UserRegistered(userId, role, email, historyRecord.txId);
+        for (uint i = 0; i < inputs.length; i++) {
+            _registerUser(inputs[i]);
+        }
     }
     
     /**
@@ -358,6 +354,50 @@ contract UserContract is AccessControl, Pausable {
         return bytes(users[userId].userId).length > 0;
     }
     
+    /**
+     * @dev Store a new user
+     * @param input Thông tin người dùng
+     */
+    function _registerUser(UserInput memory input) private {
+        // Check if user already exists
+        require(bytes(users[input.userId].userId).length == 0, "User already exists");
+        
+        // Create new user
+        User memory newUser = User({
+            userId: input.userId,
+            role: input.role,
+            name: input.name,
+            email: input.email,
+            dataHash: _createHash(string(abi.encodePacked(input.userId, ":", input.role, ":", input.name, ":", input.email))),
+            state: _stringToUserState(input.status),
+            metadata: input.metadata,
+            documents: new string[](0),
+            createdBy: input.createdBy,
+            createdAt: block.timestamp,
+            updatedAt: block.timestamp,
+            approvedToChairmanBy: "",
+            approvedToChairmanAt: 0
+        });
+        
+        // Store user
+        users[input.userId] = newUser;
+        
+        // Create history record
+        HistoryRecord memory historyRecord = HistoryRecord({
+            action: "REGISTER",
+            timestamp: block.timestamp,
+            by: input.createdBy,
+            oldRole: "",
+            newRole: input.role,
+            txId: _generateTxId()
+        });
+        
+        userHistory[input.userId].push(historyRecord);
+        
+        // Emit event
+        emit UserRegistered(input.userId, input.role, input.email, historyRecord.txId);
+    }
+    
     /**
      * @dev Convert string to UserState
      * @param state String representation of state